@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文章相关路由（Flask蓝图）
+把文章存储、全文搜索、渲染缓存、浏览量计数和站点地图接到网站上：
+- GET  /api/articles?page=&limit=&category=&tag=   文章列表（首页文章区使用）
+- GET  /api/articles/search?q=&limit=&offset=      全文搜索
+- GET  /api/articles/popular?limit=                热门文章
+- GET  /api/articles/<id>                          文章详情（含正文，计一次浏览）
+- POST /api/articles/<id>/view                     浏览量信标（静态article.html页面使用）
+- GET  /blog、/article/<id>                        渲染缓存输出的HTML页面（支持ETag/304、gzip/brotli）
+- GET  /sitemap.xml 及分块文件                      增量生成的站点地图（最多每SITEMAP_REBUILD_INTERVAL秒检查一次）
+
+用法：
+    from article_api import article_bp
+    app.register_blueprint(article_bp)
+"""
+
+import os
+import re
+import time
+import threading
+
+from flask import Blueprint, Response, jsonify, request, send_from_directory
+
+from article_store import get_article_store
+from article_search import get_article_search
+from article_render_cache import get_render_cache
+from article_views import get_view_counter
+
+article_bp = Blueprint('articles', __name__)
+
+# 站点地图文件名：sitemap.xml、sitemap-pages.xml、sitemap-articles-NNN.xml
+_SITEMAP_NAME = re.compile(r'^sitemap(-pages|-articles-\d{3})?\.xml$')
+
+sitemap_builder = None
+_sitemap_lock = threading.Lock()
+_sitemap_checked_at = 0.0
+
+
+def _int_arg(name, default):
+    try:
+        return int(request.args.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_sitemap_builder():
+    """获取站点地图生成器实例"""
+    global sitemap_builder
+    if sitemap_builder is None:
+        from sitemap_builder import SitemapBuilder
+        sitemap_builder = SitemapBuilder()
+    return sitemap_builder
+
+
+def _refresh_sitemap():
+    """按间隔增量生成站点地图；文章和静态页面都没变时build()直接返回"""
+    global _sitemap_checked_at
+    interval = float(os.getenv('SITEMAP_REBUILD_INTERVAL', '300'))
+    with _sitemap_lock:
+        if _sitemap_checked_at and time.time() - _sitemap_checked_at < interval:
+            return
+        try:
+            # build()有新增/更新的URL时会同时写当天的提交清单
+            get_sitemap_builder().build()
+        except Exception as e:
+            print(f"❌ 站点地图生成失败: {e}")
+        _sitemap_checked_at = time.time()
+
+
+# ---- JSON接口 ----
+
+@article_bp.route('/api/articles', methods=['GET'])
+def list_articles():
+    """文章列表（不含正文），浏览量包含尚未写回的增量"""
+    result = get_article_store().list_articles(
+        page=_int_arg('page', 1),
+        limit=_int_arg('limit', 10),
+        category=request.args.get('category') or None,
+        tag=request.args.get('tag') or None
+    )
+    counter = get_view_counter()
+    for article in result['articles']:
+        article['views'] = (article.get('views') or 0) + counter.pending(article['id'])
+    return jsonify(result)
+
+
+@article_bp.route('/api/articles/search', methods=['GET'])
+def search_articles():
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'success': False, 'error': '请输入搜索关键词'}), 400
+    return jsonify(get_article_search().search(query, limit=_int_arg('limit', 10), offset=_int_arg('offset', 0)))
+
+
+@article_bp.route('/api/articles/popular', methods=['GET'])
+def popular_articles():
+    limit = max(1, min(_int_arg('limit', 10), 50))
+    return jsonify({'success': True, 'articles': get_view_counter().top(limit)})
+
+
+@article_bp.route('/api/articles/<article_id>', methods=['GET'])
+def get_article(article_id):
+    """文章详情；草稿等未发布文章不对外返回"""
+    article = get_article_store().get_article(article_id)
+    if article is None or article['status'] != 'published':
+        return jsonify({'success': False, 'error': '文章不存在'}), 404
+    counter = get_view_counter()
+    counter.hit(article_id)
+    article['views'] = (article.get('views') or 0) + counter.pending(article_id)
+    return jsonify({'success': True, 'article': article})
+
+
+@article_bp.route('/api/articles/<article_id>/view', methods=['POST'])
+def article_view_beacon(article_id):
+    """浏览量信标（navigator.sendBeacon），只改内存计数"""
+    meta = get_article_store().get_article(article_id, with_content=False)
+    if meta is None or meta['status'] != 'published':
+        return jsonify({'success': False, 'error': '文章不存在'}), 404
+    get_view_counter().hit(article_id)
+    return '', 204
+
+
+# ---- HTML页面 ----
+
+@article_bp.route('/blog', methods=['GET'])
+def blog_page():
+    return get_render_cache().flask_response(page=_int_arg('page', 1))
+
+
+@article_bp.route('/article/<article_id>', methods=['GET'])
+def article_page(article_id):
+    response = get_render_cache().flask_response(article_id)
+    if response.status_code != 404:
+        get_view_counter().hit(article_id)
+    return response
+
+
+# ---- 站点地图 ----
+
+@article_bp.route('/sitemap.xml', methods=['GET'])
+@article_bp.route('/sitemap-pages.xml', methods=['GET'])
+@article_bp.route('/sitemap-articles-<chunk>.xml', methods=['GET'])
+def sitemap(chunk=None):
+    name = request.path.lstrip('/')
+    if not _SITEMAP_NAME.match(name):
+        return Response('Not Found', status=404, content_type='text/plain; charset=utf-8')
+    _refresh_sitemap()
+    output_dir = get_sitemap_builder().output_dir
+    # 有预压缩文件且客户端支持gzip时直接返回.gz
+    if 'gzip' in (request.headers.get('Accept-Encoding') or '') and (output_dir / f'{name}.gz').exists():
+        response = send_from_directory(output_dir, f'{name}.gz', mimetype='application/xml')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+    return send_from_directory(output_dir, name, mimetype='application/xml')
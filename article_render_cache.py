@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文章HTML渲染缓存
+热门文章每天被搜索引擎和用户访问上千次，每次都把Markdown转HTML、套模板是重复劳动。这里：
+- 每篇文章只渲染一次：Markdown -> 安全的HTML（原始HTML一律转义，链接只允许http/https/站内/mailto），
+  再套用frontend/article.html模板；博客列表页（frontend/blog.html）同样缓存
+- 缓存键包含文章id、updated_at和模板文件版本，文章更新或模板修改后自动失效
+- 预先计算ETag和gzip/brotli压缩版本，If-None-Match命中时返回304
+
+用法（Flask路由中）：
+    from article_render_cache import get_render_cache
+    return get_render_cache().flask_response(article_id)
+"""
+
+import os
+import re
+import gzip
+import html
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from article_store import get_article_store
+
+try:
+    import brotli
+except ImportError:  # 未安装brotli时只提供gzip
+    brotli = None
+
+TEMPLATE_DIR = Path(os.getenv('ARTICLE_TEMPLATE_DIR', Path(__file__).resolve().parent / 'frontend'))
+
+_SAFE_URL = re.compile(r'^(https?://|/|#|mailto:)', re.IGNORECASE)
+
+
+# ---- Markdown渲染 ----
+
+def _safe_url(url):
+    url = url.strip()
+    return html.escape(url, quote=True) if _SAFE_URL.match(url) else '#'
+
+
+def _inline(text):
+    """行内元素：先整体转义，再处理代码、图片、链接、粗体和斜体"""
+    codes = []
+
+    def keep_code(match):
+        codes.append(f'<code>{match.group(1)}</code>')
+        return f'\x00{len(codes) - 1}\x00'
+
+    text = html.escape(text, quote=False)
+    text = re.sub(r'`([^`]+)`', keep_code, text)
+    text = re.sub(
+        r'!\[([^\]]*)\]\(([^)\s]+)\)',
+        lambda m: f'<img src="{_safe_url(html.unescape(m.group(2)))}" alt="{html.escape(html.unescape(m.group(1)))}" loading="lazy">',
+        text
+    )
+    text = re.sub(
+        r'\[([^\]]+)\]\(([^)\s]+)\)',
+        lambda m: f'<a href="{_safe_url(html.unescape(m.group(2)))}" rel="nofollow noopener">{m.group(1)}</a>',
+        text
+    )
+    text = re.sub(r'\*\*(.+?)\*\*|__(.+?)__', lambda m: f'<strong>{m.group(1) or m.group(2)}</strong>', text)
+    text = re.sub(r'(?<![*\w])\*(?!\s)(.+?)(?<!\s)\*(?![*\w])', r'<em>\1</em>', text)
+    return re.sub(r'\x00(\d+)\x00', lambda m: codes[int(m.group(1))], text)
+
+
+def render_markdown(text):
+    """Markdown转HTML：标题、段落、列表、引用、代码块、分隔线和行内格式；原始HTML不会被输出"""
+    out = []
+    paragraph = []
+    list_tag = None
+    in_code = False
+    code_lines = []
+
+    def flush_paragraph():
+        if paragraph:
+            out.append(f"<p>{'<br>'.join(_inline(line) for line in paragraph)}</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            out.append(f'</{list_tag}>')
+            list_tag = None
+
+    for raw in (text or '').replace('\r\n', '\n').split('\n'):
+        line = raw.rstrip()
+        if line.lstrip().startswith('```'):
+            if in_code:
+                out.append(f"<pre><code>{html.escape(chr(10).join(code_lines), quote=False)}</code></pre>")
+                code_lines = []
+                in_code = False
+            else:
+                flush_paragraph()
+                close_list()
+                in_code = True
+            continue
+        if in_code:
+            code_lines.append(raw)
+            continue
+
+        stripped = line.strip()
+        heading = re.match(r'^(#{1,6})\s+(.*?)\s*#*$', stripped)
+        bullet = re.match(r'^[-*+]\s+(.*)$', stripped)
+        ordered = re.match(r'^\d+[.)]\s+(.*)$', stripped)
+
+        if not stripped:
+            flush_paragraph()
+            close_list()
+        elif heading:
+            flush_paragraph()
+            close_list()
+            level = len(heading.group(1))
+            out.append(f'<h{level}>{_inline(heading.group(2))}</h{level}>')
+        elif re.match(r'^([-*_])(\s*\1){2,}$', stripped):
+            flush_paragraph()
+            close_list()
+            out.append('<hr>')
+        elif bullet or ordered:
+            flush_paragraph()
+            tag = 'ul' if bullet else 'ol'
+            if list_tag != tag:
+                close_list()
+                out.append(f'<{tag}>')
+                list_tag = tag
+            out.append(f'<li>{_inline((bullet or ordered).group(1))}</li>')
+        elif stripped.startswith('>'):
+            flush_paragraph()
+            close_list()
+            out.append(f"<blockquote><p>{_inline(stripped.lstrip('>').strip())}</p></blockquote>")
+        else:
+            close_list()
+            paragraph.append(stripped)
+
+    if in_code:
+        out.append(f"<pre><code>{html.escape(chr(10).join(code_lines), quote=False)}</code></pre>")
+    flush_paragraph()
+    close_list()
+    return '\n'.join(out)
+
+
+# ---- 缓存条目 ----
+
+class RenderedPage:
+    """一个渲染结果及其预先计算的ETag和压缩版本"""
+
+    __slots__ = ('key', 'body', 'gzip', 'br', 'etag', 'last_modified')
+
+    def __init__(self, key, body, last_modified=None):
+        self.key = key
+        self.body = body.encode('utf-8')
+        self.gzip = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.br = brotli.compress(self.body) if brotli is not None else None
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.last_modified = last_modified
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return etag in candidates or f'W/{etag}' in candidates
+
+
+def _choose_encoding(accept_encoding, page):
+    """按Accept-Encoding选择br/gzip/不压缩（忽略q=0）"""
+    accepted = set()
+    for part in (accept_encoding or '').lower().split(','):
+        name, _, params = part.strip().partition(';')
+        if name and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            accepted.add(name)
+    if page.br is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+class ArticleRenderCache:
+    """渲染缓存（LRU）"""
+
+    def __init__(self, store=None, template_dir=None, max_entries=None, max_age=None):
+        self.store = store or get_article_store()
+        self.template_dir = Path(template_dir or TEMPLATE_DIR)
+        self.max_entries = max_entries or int(os.getenv('ARTICLE_RENDER_CACHE', '256'))
+        self.max_age = max_age if max_age is not None else int(os.getenv('ARTICLE_CACHE_MAX_AGE', '300'))
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._env = None
+        self.stats_data = {'hits': 0, 'misses': 0, 'renders': 0, 'not_modified': 0, 'evictions': 0}
+
+    def _template(self, name):
+        if self._env is None:
+            from jinja2 import Environment, FileSystemLoader, select_autoescape
+            self._env = Environment(
+                loader=FileSystemLoader(str(self.template_dir)),
+                autoescape=select_autoescape(['html']),
+                auto_reload=True
+            )
+        return self._env.get_template(name)
+
+    def _template_version(self, name):
+        try:
+            return (self.template_dir / name).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _get_or_render(self, cache_key, render):
+        with self._lock:
+            page = self._entries.get(cache_key[0])
+            if page is not None and page.key == cache_key:
+                self._entries.move_to_end(cache_key[0])
+                self.stats_data['hits'] += 1
+                return page
+            self.stats_data['misses'] += 1
+        # 在锁外渲染，避免一篇慢渲染阻塞其他文章
+        page = render()
+        with self._lock:
+            self._entries[cache_key[0]] = page
+            self._entries.move_to_end(cache_key[0])
+            self.stats_data['renders'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats_data['evictions'] += 1
+        return page
+
+    def get_article_page(self, article_id):
+        """文章详情页（文章不存在或未发布时返回None）"""
+        meta = self.store.get_article(article_id, with_content=False)
+        if meta is None or meta['status'] != 'published':
+            return None
+        key = (('article', article_id), meta['updated_at'], self._template_version('article.html'))
+
+        def render():
+            content = self.store.get_content(article_id) or ''
+            body = self._template('article.html').render(
+                title=meta['title'],
+                summary=meta['summary'] or '',
+                date=(meta['created_at'] or '')[:10],
+                content=render_markdown(content)
+            )
+            return RenderedPage(key, body, meta['updated_at'])
+
+        return self._get_or_render(key, render)
+
+    def get_blog_page(self, page=1, limit=100):
+        """博客列表页；文章存储版本变化（增删改）后失效"""
+        version = self.store.current_version()
+        key = (('blog', page, limit), version, self._template_version('blog.html'))
+
+        def render():
+            listing = self.store.list_articles(page=page, limit=limit)
+            articles = [
+                dict(article, date=(article['created_at'] or '')[:10], slug=article['id'])
+                for article in listing['articles']
+            ]
+            body = self._template('blog.html').render(articles=articles, page=listing['page'],
+                                                     total_pages=listing['total_pages'])
+            return RenderedPage(key, body)
+
+        return self._get_or_render(key, render)
+
+    def invalidate(self, article_id=None):
+        """手动清除缓存（article_id为None时全部清除）"""
+        with self._lock:
+            if article_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(('article', article_id), None)
+
+    def respond(self, page, if_none_match=None, accept_encoding=None):
+        """按条件请求头生成 (状态码, 响应头, 响应体)"""
+        headers = {
+            'ETag': page.etag,
+            'Cache-Control': f'public, max-age={self.max_age}',
+            'Vary': 'Accept-Encoding'
+        }
+        if _etag_matches(if_none_match, page.etag):
+            self.stats_data['not_modified'] += 1
+            return 304, headers, b''
+        encoding = _choose_encoding(accept_encoding, page)
+        body = page.br if encoding == 'br' else page.gzip if encoding == 'gzip' else page.body
+        headers['Content-Type'] = 'text/html; charset=utf-8'
+        headers['Content-Length'] = str(len(body))
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return 200, headers, body
+
+    def flask_response(self, article_id=None, page=None, limit=100):
+        """在Flask路由中使用：article_id为None时返回博客列表页"""
+        from flask import request, Response
+        rendered = self.get_blog_page(page or 1, limit) if article_id is None else self.get_article_page(article_id)
+        if rendered is None:
+            return Response('文章不存在', status=404, content_type='text/plain; charset=utf-8')
+        status, headers, body = self.respond(
+            rendered, request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding')
+        )
+        return Response(body, status=status, headers=headers)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.stats_data)
+            stats['entries'] = len(self._entries)
+            stats['brotli'] = brotli is not None
+        return stats
+
+
+# 全局渲染缓存实例
+render_cache = None
+
+
+def get_render_cache():
+    """获取文章渲染缓存实例"""
+    global render_cache
+    if render_cache is None:
+        render_cache = ArticleRenderCache()
+    return render_cache
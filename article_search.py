@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文章全文搜索（中文二元组倒排索引 + BM25排序）
+- 分词：连续的中文切成相邻两字的二元组（单字保留单字），英文/数字按单词，统一小写
+- 排序：BM25（k1=1.2, b=0.75），标题和标签的词频加权
+- 增量更新：文章存储版本变化时，只对标题或正文文件变化的文章重新分词
+- 持久化：data/articles/search_index.json保存每篇文章的词频，启动时加载后重建倒排表，不需要重新读正文
+
+用法：
+    from article_search import get_article_search
+    get_article_search().search('跨境电商 物流', limit=10)
+"""
+
+import re
+import math
+import html
+import time
+import threading
+from pathlib import Path
+
+from article_store import get_article_store
+from data_serializer import get_serializer, read_file, write_atomic
+
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+SNIPPET_CHARS = 80
+
+_CJK = re.compile(r'[㐀-鿿]+')
+_TOKEN = re.compile(r'[㐀-鿿]+|[a-z0-9]+(?:[._+-][a-z0-9]+)*')
+
+
+def tokenize(text):
+    """分词：中文二元组 + 英文/数字单词"""
+    tokens = []
+    for run in _TOKEN.findall((text or '').lower()):
+        if _CJK.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def _term_frequencies(title, tags, content):
+    tf = {}
+    for weight, text in ((TITLE_WEIGHT, title), (TAG_WEIGHT, ' '.join(tags or [])), (1, content)):
+        for token in tokenize(text):
+            tf[token] = tf.get(token, 0) + weight
+    return tf
+
+
+class ArticleSearch:
+    """文章倒排索引"""
+
+    def __init__(self, store=None, index_file=None):
+        self.store = store or get_article_store()
+        self.index_file = Path(index_file) if index_file else self.store.store_dir / 'search_index.json'
+        self.serializer = get_serializer()
+        self._lock = threading.RLock()
+
+        self._docs = {}  # id -> {'sig': 签名, 'len': 文档长度, 'tf': {词: 词频}}
+        self._postings = {}  # 词 -> {id: 词频}
+        self._total_length = 0
+        self._synced_version = None
+        self.stats_data = {'searches': 0, 'indexed': 0, 'removed': 0, 'syncs': 0, 'last_search_ms': 0.0}
+        self._load()
+
+    # ---- 索引维护 ----
+
+    def _load(self):
+        """加载持久化的词频并重建倒排表"""
+        if not self.index_file.exists():
+            return
+        try:
+            data = read_file(self.index_file)
+        except Exception as e:
+            print(f"⚠️ 搜索索引 {self.index_file.name} 读取失败，将重建: {e}")
+            return
+        for article_id, doc in data.get('docs', {}).items():
+            self._add(article_id, doc)
+        print(f"✅ 加载搜索索引: {len(self._docs)} 篇文章, {len(self._postings)} 个词")
+
+    def _add(self, article_id, doc):
+        self._docs[article_id] = doc
+        self._total_length += doc['len']
+        for term, freq in doc['tf'].items():
+            self._postings.setdefault(term, {})[article_id] = freq
+
+    def _remove(self, article_id):
+        doc = self._docs.pop(article_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc['len']
+        for term in doc['tf']:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(article_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def index_article(self, article, content=None):
+        """（重新）索引一篇文章"""
+        article_id = article['id']
+        if content is None:
+            content = self.store.get_content(article_id) or ''
+        tf = _term_frequencies(article.get('title'), article.get('tags'), content)
+        doc = {
+            'sig': [article.get('title'), article.get('tags')] + (self.store.content_signature(article_id) or []),
+            'len': sum(tf.values()),
+            'tf': tf
+        }
+        with self._lock:
+            self._remove(article_id)
+            self._add(article_id, doc)
+            self.stats_data['indexed'] += 1
+
+    def remove_article(self, article_id):
+        with self._lock:
+            self._remove(article_id)
+            self.stats_data['removed'] += 1
+
+    def sync(self, force=False):
+        """与文章存储同步：新增/修改的文章重新分词，已删除的移出索引；有变化时写回磁盘"""
+        if not force and self.store.current_version() == self._synced_version:
+            return 0
+        version, metas = self.store.snapshot()
+        with self._lock:
+            changed = 0
+            current = set()
+            for meta in metas:
+                article_id = meta['id']
+                current.add(article_id)
+                sig = [meta.get('title'), meta.get('tags')] + (self.store.content_signature(article_id) or [])
+                doc = self._docs.get(article_id)
+                if doc is None or doc['sig'] != sig:
+                    self.index_article(meta)
+                    changed += 1
+            for article_id in [article_id for article_id in self._docs if article_id not in current]:
+                self.remove_article(article_id)
+                changed += 1
+            self._synced_version = version
+            self.stats_data['syncs'] += 1
+            if changed:
+                self.save()
+            return changed
+
+    def save(self):
+        with self._lock:
+            payload = self.serializer.dumps({'version': 1, 'docs': self._docs})
+        write_atomic(self.index_file, payload, fsync=False)
+
+    # ---- 查询 ----
+
+    def _score(self, terms):
+        n = len(self._docs)
+        avg_len = (self._total_length / n) if n else 0
+        scores = {}
+        for term in terms:
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for article_id, freq in posting.items():
+                length = self._docs[article_id]['len']
+                norm = freq * (K1 + 1) / (freq + K1 * (1 - B + B * length / avg_len))
+                scores[article_id] = scores.get(article_id, 0.0) + idf * norm
+        return scores
+
+    def search(self, query, limit=10, offset=0, status='published'):
+        """搜索，返回按BM25得分排序的文章id、元数据和高亮摘要"""
+        started = time.perf_counter()
+        limit = max(1, min(int(limit or 10), 50))
+        offset = max(0, int(offset or 0))
+        self.sync()
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            scores = self._score(terms) if terms else {}
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+        results = []
+        total = 0
+        for article_id, score in ranked:
+            meta = self.store.get_article(article_id, with_content=False)
+            if meta is None or (status and meta['status'] != status):
+                continue
+            total += 1
+            if offset < total <= offset + limit:
+                content = self.store.get_content(article_id) or ''
+                results.append({
+                    'id': article_id,
+                    'title': meta['title'],
+                    'title_highlight': highlight(meta['title'] or '', query),
+                    'summary': meta['summary'],
+                    'category': meta['category'],
+                    'created_at': meta['created_at'],
+                    'score': round(score, 4),
+                    'snippet': make_snippet(content, query)
+                })
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+        self.stats_data['searches'] += 1
+        self.stats_data['last_search_ms'] = elapsed_ms
+        return {
+            'success': True,
+            'query': query,
+            'total': total,
+            'results': results,
+            'took_ms': elapsed_ms
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.stats_data)
+            stats['documents'] = len(self._docs)
+            stats['terms'] = len(self._postings)
+        return stats
+
+
+def _query_patterns(query):
+    """高亮用的匹配串：查询中的整段中文/英文单词及其二元组，长的优先（同一位置优先匹配整段）"""
+    parts = set(_TOKEN.findall((query or '').lower())) | set(tokenize(query))
+    return sorted(parts, key=len, reverse=True)
+
+
+def highlight(text, query):
+    """HTML转义后用<mark>标出查询词"""
+    parts = _query_patterns(query)
+    if not parts:
+        return html.escape(text)
+    pattern = re.compile('|'.join(re.escape(part) for part in parts), re.IGNORECASE)
+    pieces = []
+    last = 0
+    for match in pattern.finditer(text):
+        pieces.append(html.escape(text[last:match.start()]))
+        pieces.append(f'<mark>{html.escape(match.group(0))}</mark>')
+        last = match.end()
+    pieces.append(html.escape(text[last:]))
+    return ''.join(pieces)
+
+
+def make_snippet(content, query, width=SNIPPET_CHARS):
+    """截取第一个命中位置附近的一段正文（去掉Markdown符号）并高亮"""
+    text = re.sub(r'[#*>`\[\]]+', '', content)
+    text = re.sub(r'\s+', ' ', text).strip()
+    lowered = text.lower()
+    positions = [p for p in (lowered.find(part) for part in _query_patterns(query)) if p >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    snippet = text[start:start + width]
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if start + width < len(text) else ''
+    return prefix + highlight(snippet, query) + suffix
+
+
+# 全局搜索实例
+article_search = None
+_instance_lock = threading.Lock()
+
+
+def get_article_search():
+    """获取文章搜索实例（首次调用时加载持久化索引并与文章存储同步）"""
+    global article_search
+    with _instance_lock:
+        if article_search is None:
+            article_search = ArticleSearch()
+            article_search.sync()
+    return article_search
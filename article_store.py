@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文章存储（元数据索引 + 正文按需加载）
+data/articles.json把所有文章正文放在一个文件里，列表页也要解析全部正文。这里把它拆成：
+- data/articles/index.json   元数据（id、标题、摘要、分类、标签、状态、时间、浏览量），常驻内存
+- data/articles/<id>.md      每篇文章的Markdown正文，打开文章时才读取（带LRU缓存）
+
+内存中按分类、标签、日期建立索引，列表分页只处理当页的元数据，文章数增长时延迟和内存基本不变。
+首次使用时从articles.json迁移；之后articles.json若被旧的发布脚本修改，只合并新增或内容确实变化的文章
+（按每篇文章的内容摘要判断），不覆盖存储中的浏览量，也不恢复已在存储中删除的文章。
+"""
+
+import os
+import ast
+import hashlib
+import json
+import re
+import threading
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+from data_serializer import get_serializer, read_file, write_atomic
+
+# 索引中保存的元数据字段（正文除外）
+META_FIELDS = ('id', 'title', 'summary', 'category', 'tags', 'author', 'status', 'created_at', 'updated_at', 'views')
+
+_SAFE_ID = re.compile(r'^[A-Za-z0-9_\-]+$')
+
+
+def _normalize_tags(tags):
+    """标签统一为列表（旧数据中有"['a', 'b']"这样的字符串）"""
+    if isinstance(tags, list):
+        return [str(tag) for tag in tags]
+    if isinstance(tags, str) and tags.strip():
+        try:
+            parsed = ast.literal_eval(tags)
+            if isinstance(parsed, (list, tuple)):
+                return [str(tag) for tag in parsed]
+        except (ValueError, SyntaxError):
+            pass
+        return [tag.strip() for tag in re.split(r'[,，]', tags) if tag.strip()]
+    return []
+
+
+def _legacy_digest(article):
+    """articles.json中一篇文章的内容摘要（不含浏览量）"""
+    payload = {k: v for k, v in article.items() if k != 'views'}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+
+def _make_meta(article):
+    meta = {field: article.get(field) for field in META_FIELDS}
+    meta['tags'] = _normalize_tags(meta['tags'])
+    meta['views'] = int(meta['views'] or 0)
+    meta['created_at'] = meta['created_at'] or datetime.now().isoformat()
+    meta['updated_at'] = meta['updated_at'] or meta['created_at']
+    meta['status'] = meta['status'] or 'published'
+    return meta
+
+
+class ArticleStore:
+    """文章存储：元数据常驻内存，正文按需读取"""
+
+    def __init__(self, data_dir='data', body_cache_size=None):
+        self.data_dir = Path(data_dir)
+        self.store_dir = self.data_dir / 'articles'
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.store_dir / 'index.json'
+        self.legacy_file = self.data_dir / 'articles.json'
+        self.serializer = get_serializer()
+
+        self._lock = threading.RLock()
+        self._body_cache = OrderedDict()
+        self._body_cache_size = body_cache_size or int(os.getenv('ARTICLE_BODY_CACHE', '64'))
+        self._index_generation = None
+        self._legacy_generation = None
+        # articles.json中每篇文章上次导入时的内容摘要，以及从中导入后又在存储中删除的id
+        self._legacy_digests = {}
+        self._legacy_deleted = set()
+        self._meta = {}
+        # 文章集合或正文变化时递增，搜索索引据此判断是否需要同步
+        self.version = 0
+        # 站点地图相关字段（文章增删、发布状态、创建/更新时间）变化时换新值，写回浏览量时不变；随索引持久化
+        self._sitemap_generation = None
+        self._build_indexes()
+
+        self.stats_data = {'body_reads': 0, 'body_cache_hits': 0, 'reloads': 0, 'legacy_imports': 0}
+        self._load()
+
+    # ---- 加载与索引 ----
+
+    def _generation(self, path):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _load(self):
+        """加载元数据索引；articles.json比上次导入的版本新时合并导入"""
+        with self._lock:
+            index = {}
+            self._index_generation = self._generation(self.index_file)
+            if self.index_file.exists():
+                index = read_file(self.index_file)
+            self._meta = {meta['id']: meta for meta in index.get('articles', [])}
+            self._legacy_generation = tuple(index['legacy']) if index.get('legacy') else None
+            self._legacy_digests = dict(index.get('legacy_digests') or {})
+            self._legacy_deleted = set(index.get('legacy_deleted') or [])
+            self._sitemap_generation = index.get('sitemap_generation') or uuid.uuid4().hex
+            self._build_indexes()
+
+            legacy = self._generation(self.legacy_file)
+            if legacy is not None and legacy != self._legacy_generation:
+                self._import_legacy(legacy)
+
+    def _import_legacy(self, generation):
+        """从articles.json导入新增或内容变化的文章：
+        - 内容摘要与上次导入时相同的文章跳过，存储中的修改保留
+        - 已在存储中删除的文章不再导入
+        - 浏览量以存储为准（由浏览量计数器写回），只有新文章使用articles.json中的值
+        - 旧版本索引没有记录摘要时，存储中已有的文章以存储为准，只记录摘要"""
+        articles = read_file(self.legacy_file)
+        if isinstance(articles, list):
+            articles = {article['id']: article for article in articles}
+        imported = 0
+        for article_id, article in articles.items():
+            article = dict(article, id=article.get('id') or article_id)
+            article_id = article['id']
+            digest = _legacy_digest(article)
+            if article_id in self._legacy_deleted or self._legacy_digests.get(article_id) == digest:
+                continue
+            existing = self._meta.get(article_id)
+            known = article_id in self._legacy_digests
+            self._legacy_digests[article_id] = digest
+            if existing is not None and not known:
+                continue
+            self._write_body(article_id, article.get('content') or '')
+            meta = _make_meta(article)
+            if existing is not None:
+                meta['views'] = existing['views']
+            self._meta[article_id] = meta
+            imported += 1
+        self._legacy_generation = generation
+        if imported:
+            self._touch_sitemap()
+        self._build_indexes()
+        self._save_index()
+        self.stats_data['legacy_imports'] += 1
+        if imported:
+            print(f"📥 从 {self.legacy_file.name} 导入 {imported} 篇文章到文章索引")
+
+    def _build_indexes(self):
+        """按created_at倒序的id列表，以及分类/标签索引（都保持倒序，分页直接切片）"""
+        ordered = sorted(self._meta.values(), key=lambda meta: (meta['created_at'], meta['id']), reverse=True)
+        by_category = {}
+        by_tag = {}
+        by_status = {}
+        for meta in ordered:
+            by_category.setdefault(meta['category'], []).append(meta['id'])
+            by_status.setdefault(meta['status'], []).append(meta['id'])
+            for tag in meta['tags']:
+                by_tag.setdefault(tag, []).append(meta['id'])
+        self._ordered = [meta['id'] for meta in ordered]
+        # 日期索引：升序的created_at列表，按日期范围二分查找
+        self._dates_asc = [meta['created_at'] for meta in reversed(ordered)]
+        self._by_category = by_category
+        self._by_tag = by_tag
+        self._by_status = by_status
+        self.version += 1
+
+    def _refresh(self):
+        """其他进程修改过索引文件时重新加载（一次stat判断）"""
+        if self._generation(self.index_file) != self._index_generation or (
+                self._generation(self.legacy_file) not in (None, self._legacy_generation)):
+            self.stats_data['reloads'] += 1
+            self._body_cache.clear()
+            self._load()
+
+    def _touch_sitemap(self):
+        self._sitemap_generation = uuid.uuid4().hex
+
+    def _save_index(self):
+        payload = {
+            'version': 1,
+            'sitemap_generation': self._sitemap_generation,
+            'legacy': list(self._legacy_generation) if self._legacy_generation else None,
+            'legacy_digests': self._legacy_digests,
+            'legacy_deleted': sorted(self._legacy_deleted),
+            'articles': [self._meta[article_id] for article_id in self._ordered]
+        }
+        write_atomic(self.index_file, self.serializer.dumps(payload))
+        self._index_generation = self._generation(self.index_file)
+
+    # ---- 正文 ----
+
+    def _body_path(self, article_id):
+        if not _SAFE_ID.match(article_id or ''):
+            raise ValueError(f"非法的文章ID: {article_id}")
+        return self.store_dir / f'{article_id}.md'
+
+    def _write_body(self, article_id, content):
+        write_atomic(self._body_path(article_id), content, fsync=False)
+        self._body_cache.pop(article_id, None)
+
+    def get_content(self, article_id):
+        """读取正文（LRU缓存）"""
+        with self._lock:
+            if article_id in self._body_cache:
+                self._body_cache.move_to_end(article_id)
+                self.stats_data['body_cache_hits'] += 1
+                return self._body_cache[article_id]
+        try:
+            with open(self._body_path(article_id), 'r', encoding='utf-8') as f:
+                content = f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+        with self._lock:
+            self.stats_data['body_reads'] += 1
+            self._body_cache[article_id] = content
+            while len(self._body_cache) > self._body_cache_size:
+                self._body_cache.popitem(last=False)
+        return content
+
+    # ---- 查询 ----
+
+    def _date_window(self, ids, date_from, date_to):
+        """按日期范围二分查找，返回窗口内的id（保持倒序）"""
+        n = len(self._dates_asc)
+        lo = bisect_left(self._dates_asc, date_from) if date_from else 0
+        # date_to当天的所有时间都排在 date_to + '\uffff' 之前
+        hi = bisect_right(self._dates_asc, date_to + '\uffff') if date_to else n
+        # 升序下标[lo, hi)对应倒序列表的[n - hi, n - lo)
+        window = self._ordered[n - hi:n - lo]
+        if ids is None:
+            return window
+        allowed = set(window)
+        return [article_id for article_id in ids if article_id in allowed]
+
+    def list_articles(self, page=1, limit=10, category=None, tag=None, status='published',
+                      date_from=None, date_to=None):
+        """分页列出文章元数据（不含正文），按创建时间倒序；date_from/date_to为YYYY-MM-DD"""
+        page = max(1, int(page or 1))
+        limit = max(1, min(int(limit or 10), 100))
+        with self._lock:
+            self._refresh()
+            ids = None
+            if category:
+                ids = self._by_category.get(category, [])
+            if tag:
+                tagged = self._by_tag.get(tag, [])
+                if ids is None:
+                    ids = tagged
+                else:
+                    tagged_set = set(tagged)
+                    ids = [article_id for article_id in ids if article_id in tagged_set]
+            if date_from or date_to:
+                ids = self._date_window(ids, date_from, date_to)
+            if ids is None:
+                ids = self._ordered
+            if status and len(self._by_status.get(status, ())) != len(self._meta):
+                # 全部文章都是该状态时（通常都是published）不需要逐条过滤
+                ids = [article_id for article_id in ids if self._meta[article_id]['status'] == status]
+
+            total = len(ids)
+            start = (page - 1) * limit
+            articles = [dict(self._meta[article_id]) for article_id in ids[start:start + limit]]
+
+        return {
+            'success': True,
+            'articles': articles,
+            'page': page,
+            'limit': limit,
+            'total': total,
+            'total_pages': (total + limit - 1) // limit
+        }
+
+    def get_article(self, article_id, with_content=True):
+        """获取单篇文章；with_content=True时读取正文"""
+        with self._lock:
+            self._refresh()
+            meta = self._meta.get(article_id)
+            if meta is None:
+                return None
+            article = dict(meta)
+        if with_content:
+            article['content'] = self.get_content(article_id) or ''
+        return article
+
+    def get_categories(self):
+        """分类 -> 文章数"""
+        with self._lock:
+            self._refresh()
+            return {category: len(ids) for category, ids in self._by_category.items()}
+
+    def get_tags(self):
+        """标签 -> 文章数（按数量倒序）"""
+        with self._lock:
+            self._refresh()
+            return dict(sorted(((tag, len(ids)) for tag, ids in self._by_tag.items()), key=lambda x: -x[1]))
+
+    def __len__(self):
+        return len(self._meta)
+
+    # ---- 写入 ----
+
+    def save_article(self, article):
+        """新建或更新文章（正文写单独文件，元数据写索引），返回元数据"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._refresh()
+            article_id = article.get('id') or f"article_{datetime.now().strftime('%Y%m%d')}_{uuid.uuid4().hex[:8]}"
+            existing = self._meta.get(article_id, {})
+            merged = dict(existing)
+            merged.update({k: v for k, v in article.items() if k != 'content'})
+            merged['id'] = article_id
+            merged['created_at'] = existing.get('created_at') or article.get('created_at') or now
+            merged['updated_at'] = now
+            if 'content' in article:
+                content = article['content'] or ''
+                self._write_body(article_id, content)
+                if not merged.get('summary'):
+                    merged['summary'] = re.sub(r'[#*>\s]+', ' ', content).strip()[:100]
+            meta = _make_meta(merged)
+            self._meta[article_id] = meta
+            self._touch_sitemap()
+            self._build_indexes()
+            self._save_index()
+            return dict(meta)
+
+    def delete_article(self, article_id):
+        with self._lock:
+            self._refresh()
+            if self._meta.pop(article_id, None) is None:
+                return False
+            if article_id in self._legacy_digests:
+                self._legacy_deleted.add(article_id)
+            self._touch_sitemap()
+            self._build_indexes()
+            self._save_index()
+            self._body_cache.pop(article_id, None)
+            try:
+                self._body_path(article_id).unlink()
+            except FileNotFoundError:
+                pass
+            return True
+
+    def update_meta(self, article_id, **fields):
+        """只修改元数据字段（如views），不读写正文"""
+        with self._lock:
+            self._refresh()
+            meta = self._meta.get(article_id)
+            if meta is None:
+                return None
+            meta.update({k: v for k, v in fields.items() if k in META_FIELDS and k != 'id'})
+            if {'status', 'created_at', 'updated_at'} & set(fields):
+                self._touch_sitemap()
+            if 'created_at' in fields or 'tags' in fields or 'category' in fields:
+                meta['tags'] = _normalize_tags(meta['tags'])
+                self._build_indexes()
+            elif set(fields) - {'views'}:
+                self.version += 1
+            self._save_index()
+            return dict(meta)
+
+    def add_views(self, deltas):
+        """批量累加浏览量（只写一次索引），返回 {id: 新浏览量}；已删除的文章忽略"""
+        with self._lock:
+            self._refresh()
+            totals = {}
+            for article_id, delta in deltas.items():
+                meta = self._meta.get(article_id)
+                if meta is not None and delta:
+                    meta['views'] = int(meta['views'] or 0) + delta
+                    totals[article_id] = meta['views']
+            if totals:
+                self._save_index()
+            return totals
+
+    def current_version(self):
+        """检查其他进程的修改后返回当前版本号"""
+        with self._lock:
+            self._refresh()
+            return self.version
+
+    def sitemap_generation(self):
+        """站点地图相关字段的版本标识（持久化在索引中），只写回浏览量时不变"""
+        with self._lock:
+            self._refresh()
+            return self._sitemap_generation
+
+    def snapshot(self):
+        """(版本号, 全部文章元数据列表)，供搜索索引同步使用"""
+        with self._lock:
+            self._refresh()
+            return self.version, [dict(self._meta[article_id]) for article_id in self._ordered]
+
+    def content_signature(self, article_id):
+        """正文文件的(mtime_ns, 大小)，正文没有变化时不需要重新分词"""
+        try:
+            st = self._body_path(article_id).stat()
+        except (FileNotFoundError, ValueError):
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.stats_data)
+            stats['articles'] = len(self._meta)
+            stats['cached_bodies'] = len(self._body_cache)
+        return stats
+
+
+# 全局文章存储实例
+article_store = None
+
+
+def get_article_store():
+    """获取文章存储实例"""
+    global article_store
+    if article_store is None:
+        article_store = ArticleStore()
+    return article_store
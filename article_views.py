@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文章浏览量计数（内存分片计数 + 定期批量写回）
+每次浏览都改写文章索引代价太大，这里：
+- 浏览量先记在内存里，按文章id分成若干分片，每个分片一把锁，并发请求基本不会互相等待
+- 后台线程每ARTICLE_VIEWS_FLUSH_INTERVAL秒把增量一次性写回文章存储，进程退出时也会写回
+- 维护一个容量为ARTICLE_VIEWS_TOP_CAPACITY的最小堆，"热门文章"直接从堆里取，不需要对全部文章排序
+
+用法：
+    from article_views import get_view_counter
+    counter = get_view_counter()
+    counter.hit(article_id)        # 文章页每次访问
+    counter.top(10)                # 热门文章
+"""
+
+import os
+import time
+import heapq
+import atexit
+import threading
+
+from article_store import get_article_store
+
+
+class TopArticles:
+    """浏览量前N的文章（最小堆，更新时惰性删除旧条目）"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._members = {}  # id -> 浏览量
+        self._heap = []  # (浏览量, id)，可能含过期条目
+
+    def _clean_min(self):
+        """弹出堆顶的过期条目，返回当前最小的有效条目"""
+        while self._heap:
+            views, article_id = self._heap[0]
+            if self._members.get(article_id) == views:
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
+    def _push(self, article_id, views):
+        self._members[article_id] = views
+        heapq.heappush(self._heap, (views, article_id))
+        # 过期条目太多时重建，堆的大小保持在容量的常数倍
+        if len(self._heap) > self.capacity * 4:
+            self._heap = [(views, article_id) for article_id, views in self._members.items()]
+            heapq.heapify(self._heap)
+
+    def update(self, article_id, views):
+        if article_id in self._members:
+            if self._members[article_id] != views:
+                self._push(article_id, views)
+            return
+        if len(self._members) < self.capacity:
+            self._push(article_id, views)
+            return
+        smallest = self._clean_min()
+        if smallest is not None and (views, article_id) > smallest:
+            heapq.heappop(self._heap)
+            del self._members[smallest[1]]
+            self._push(article_id, views)
+
+    def rebuild(self, items):
+        """从 (id, 浏览量) 全量重建（启动时或文章被删除后）"""
+        best = heapq.nlargest(self.capacity, ((views, article_id) for article_id, views in items))
+        self._members = {article_id: views for views, article_id in best}
+        self._heap = list(best)
+        heapq.heapify(self._heap)
+
+    def __contains__(self, article_id):
+        return article_id in self._members
+
+    def top(self, n):
+        return sorted(self._members.items(), key=lambda item: (-item[1], item[0]))[:n]
+
+
+class ViewCounter:
+    """分片浏览量计数器"""
+
+    def __init__(self, store=None, shards=None, flush_interval=None, top_capacity=None, start=True):
+        self.store = store or get_article_store()
+        self.shard_count = shards or int(os.getenv('ARTICLE_VIEWS_SHARDS', '16'))
+        self.flush_interval = flush_interval if flush_interval is not None else \
+            float(os.getenv('ARTICLE_VIEWS_FLUSH_INTERVAL', '30'))
+        self._shards = [{} for _ in range(self.shard_count)]
+        self._shard_locks = [threading.Lock() for _ in range(self.shard_count)]
+        self._flush_lock = threading.Lock()
+        self._top_lock = threading.Lock()
+        self._top = TopArticles(top_capacity or int(os.getenv('ARTICLE_VIEWS_TOP_CAPACITY', '50')))
+        self._top_version = None
+        self._stop = threading.Event()
+        self.stats_data = {'hits': 0, 'flushes': 0, 'flushed_views': 0, 'dropped_views': 0,
+                           'last_flush_at': None, 'last_flush_ms': 0.0}
+
+        if start and self.flush_interval > 0:
+            threading.Thread(target=self._flush_loop, name='article-views-flush', daemon=True).start()
+            atexit.register(self.close)
+
+    def _shard(self, article_id):
+        return hash(article_id) % self.shard_count
+
+    def hit(self, article_id, count=1):
+        """记录一次浏览（只改内存）"""
+        index = self._shard(article_id)
+        with self._shard_locks[index]:
+            shard = self._shards[index]
+            shard[article_id] = shard.get(article_id, 0) + count
+        self.stats_data['hits'] += count
+
+    def pending(self, article_id=None):
+        """尚未写回的浏览量（article_id为None时返回全部）"""
+        if article_id is not None:
+            return self._shards[self._shard(article_id)].get(article_id, 0)
+        return sum(sum(shard.values()) for shard in self._shards)
+
+    def get_views(self, article_id):
+        """已写回的浏览量 + 内存中的增量"""
+        meta = self.store.get_article(article_id, with_content=False)
+        if meta is None:
+            return None
+        return meta['views'] + self.pending(article_id)
+
+    def _take_deltas(self):
+        """逐个分片取走增量（换成空字典），计数请求只会在换分片的瞬间等待"""
+        deltas = {}
+        for index, lock in enumerate(self._shard_locks):
+            with lock:
+                shard = self._shards[index]
+                if not shard:
+                    continue
+                self._shards[index] = {}
+            deltas.update(shard)
+        return deltas
+
+    def _restore(self, deltas):
+        for article_id, count in deltas.items():
+            index = self._shard(article_id)
+            with self._shard_locks[index]:
+                shard = self._shards[index]
+                shard[article_id] = shard.get(article_id, 0) + count
+
+    def flush(self):
+        """把内存中的增量写回文章存储，返回写回的浏览次数"""
+        with self._flush_lock:
+            deltas = self._take_deltas()
+            if not deltas:
+                return 0
+            started = time.perf_counter()
+            try:
+                totals = self.store.add_views(deltas)
+            except Exception as e:
+                # 写回失败时放回内存，下次再写
+                self._restore(deltas)
+                print(f"❌ 文章浏览量写回失败: {e}")
+                return 0
+
+            flushed = sum(deltas[article_id] for article_id in totals)
+            self._update_top(totals)
+            self.stats_data['flushes'] += 1
+            self.stats_data['flushed_views'] += flushed
+            self.stats_data['dropped_views'] += sum(deltas.values()) - flushed
+            self.stats_data['last_flush_at'] = time.time()
+            self.stats_data['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            return flushed
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """停止后台线程并写回剩余增量"""
+        self._stop.set()
+        flushed = self.flush()
+        if flushed:
+            print(f"✅ 退出前写回 {flushed} 次文章浏览")
+
+    # ---- 热门文章 ----
+
+    def _ensure_top(self):
+        """文章集合变化（新增、删除、改状态）后从存储全量重建一次堆"""
+        version = self.store.current_version()
+        if version == self._top_version:
+            return
+        _, metas = self.store.snapshot()
+        self._top.rebuild((meta['id'], meta['views']) for meta in metas if meta['status'] == 'published')
+        self._top_version = version
+
+    def _update_top(self, totals):
+        with self._top_lock:
+            if self._top_version is None:
+                return
+            for article_id, views in totals.items():
+                self._top.update(article_id, views)
+
+    def top(self, n=10):
+        """浏览量最高的n篇已发布文章（按已写回的浏览量）"""
+        with self._top_lock:
+            self._ensure_top()
+            ranked = self._top.top(n)
+        articles = []
+        for article_id, views in ranked:
+            meta = self.store.get_article(article_id, with_content=False)
+            if meta is not None and meta['status'] == 'published':
+                meta['views'] = views
+                articles.append(meta)
+        return articles
+
+    def stats(self):
+        stats = dict(self.stats_data)
+        stats['pending'] = self.pending()
+        stats['shards'] = self.shard_count
+        return stats
+
+
+# 全局浏览量计数器实例
+view_counter = None
+_instance_lock = threading.Lock()
+
+
+def get_view_counter():
+    """获取文章浏览量计数器实例（首次调用时启动后台写回线程）"""
+    global view_counter
+    with _instance_lock:
+        if view_counter is None:
+            view_counter = ViewCounter()
+    return view_counter
@@ -8,11 +8,12 @@ import json
 import time
 import uuid
 import hashlib
-import base64
 from urllib.parse import quote_plus
 from datetime import datetime
 import requests
 
+from payment_signing import RSASigner, build_sign_string
+
 class AlipayClient:
     """支付宝客户端"""
     
@@ -38,37 +39,27 @@ class AlipayClient:
         
         if debug:
             self.gateway_url = "https://openapi.alipaydev.com/gateway.do"
+        
+        # 私钥和支付宝公钥只解析一次（见payment_signing）
+        self.signer = RSASigner(private_key, alipay_public_key)
     
     def _generate_sign(self, params):
         """生成签名"""
-        # 过滤空值并排序
-        filtered_params = {}
-        for key, value in params.items():
-            if value and value != "" and key != "sign":
-                filtered_params[key] = value
-        
-        # 按字典序排序
-        sorted_params = sorted(filtered_params.items(), key=lambda x: x[0])
-        
-        # 构建待签名字符串
-        sign_string = "&".join([f"{k}={v}" for k, v in sorted_params])
+        # 过滤空值，按字典序构建待签名字符串
+        sign_string = build_sign_string(params, exclude=('sign',))
         
         # 使用RSA私钥签名
         try:
-            from Crypto.PublicKey import RSA
-            from Crypto.Signature import pkcs1_15
-            from Crypto.Hash import SHA256
-            
-            key = RSA.import_key(self.private_key)
-            h = SHA256.new(sign_string.encode('utf-8'))
-            signature = pkcs1_15.new(key).sign(h)
-            
-            return base64.b64encode(signature).decode('utf-8')
+            return self.signer.sign(sign_string)
         except ImportError:
             # 如果没有pycryptodome，使用简化版本（仅用于开发测试）
             print("警告：未安装pycryptodome，使用模拟签名")
             return "mock_signature_for_development"
     
+    def sign_many(self, params_list):
+        """批量签名（对账任务一次签多笔请求），返回签名列表"""
+        return self.signer.sign_many([build_sign_string(params, exclude=('sign',)) for params in params_list])
+    
     def _build_params(self, method, biz_content, **kwargs):
         """构建请求参数"""
         params = {
@@ -247,31 +238,32 @@ class AlipayClient:
         Returns:
             验证结果
         """
-        # 开发环境直接返回True
-        if self.debug:
-            return True
+        # 未配置支付宝公钥时只有沙箱模式放行
+        if not self.signer.can_verify:
+            if self.debug:
+                return True
+            print("❌ 未配置支付宝公钥或未安装pycryptodome，无法验签")
+            return False
         
         try:
-            # 提取签名
+            # 提取签名，sign和sign_type不参与验签
             sign = data.get('sign', '')
             sign_type = data.get('sign_type', 'RSA2')
+            if not sign:
+                return False
             
-            # 构建待验签字符串
-            filtered_data = {}
-            for key, value in data.items():
-                if key not in ['sign', 'sign_type'] and value:
-                    filtered_data[key] = value
+            verify_string = build_sign_string(data, exclude=('sign', 'sign_type'))
             
-            sorted_data = sorted(filtered_data.items(), key=lambda x: x[0])
-            verify_string = "&".join([f"{k}={v}" for k, v in sorted_data])
-            
-            # 这里应该使用支付宝公钥验证签名
-            # 简化实现，生产环境需要完整的RSA验证
-            return True
+            # 使用支付宝公钥验证签名
+            return self.signer.verify(verify_string, sign, sign_type)
             
         except Exception as e:
             print(f"验签失败: {e}")
             return False
+    
+    def verify_notify_many(self, data_list):
+        """批量验证通知（对账时核对历史通知），返回对应的True/False列表"""
+        return [self.verify_notify(data) for data in data_list]
 
 # 支付宝配置（从环境变量读取）
 def get_alipay_client():
@@ -28,7 +28,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger('crossborder_tools_api')
 
-from supabase_db import db, user_db, usage_db, storage_db
+from supabase_db import db, user_db, usage_db, storage_db, start_rollup_compaction
+
+# 后台定期重算已结束日期的使用汇总（USAGE_ROLLUP_COMPACTION=0关闭）
+if os.getenv('USAGE_ROLLUP_COMPACTION', '1') != '0':
+    start_rollup_compaction(usage_db)
 
 # 初始化应用
 app = Flask(__name__, 
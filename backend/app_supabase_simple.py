@@ -4,6 +4,7 @@ Supabase集成版Flask应用 - 完整版（集成rembg背景移除）
 """
 
 import os
+import sys
 import json
 import uuid
 import requests
@@ -12,13 +13,20 @@ from flask import Flask, request, jsonify, send_file, render_template
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
-from supabase import create_client
+from supabase_pool import get_supabase_client, get_pool_metrics
+from supabase_resilience import cached_read, latency_budget, get_resilience_stats
+from supabase_memory import is_memory_backend
 from PIL import Image
 import io
 import base64
 import rembg
 from rembg import new_session, remove
 
+# 套餐目录、关键词批量分析、文章路由等共享模块在项目根目录，直接运行本文件时也能导入
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(1, PROJECT_ROOT)
+
 # 导入支付API
 from payment_api import payment_bp
 
@@ -40,51 +48,38 @@ app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-here')
 app.config['SUPABASE_URL'] = os.getenv('SUPABASE_URL')
 app.config['SUPABASE_KEY'] = os.getenv('SUPABASE_SERVICE_KEY')
 
-if not app.config['SUPABASE_URL'] or not app.config['SUPABASE_KEY']:
-    print("❌ 错误：请设置SUPABASE_URL和SUPABASE_SERVICE_KEY环境变量")
+# SUPABASE_BACKEND=memory 时使用内存版后端（压测/基准测试），不需要真实Supabase配置
+if not is_memory_backend() and (not app.config['SUPABASE_URL'] or not app.config['SUPABASE_KEY']):
+    print("❌ 错误：请设置SUPABASE_URL和SUPABASE_SERVICE_KEY环境变量（压测可设置SUPABASE_BACKEND=memory）")
     exit(1)
 
-supabase = create_client(app.config['SUPABASE_URL'], app.config['SUPABASE_KEY'])
+supabase = get_supabase_client(app.config['SUPABASE_URL'], app.config['SUPABASE_KEY'])
 
 # 确保上传目录存在
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# 工具积分消耗配置 - 根据会员等级调整
-TOOL_CREDITS = {
-    'background_remover': {'free': 3, 'basic': 2, 'pro': 1},
-    'image_compressor': {'free': 2, 'basic': 1, 'pro': 1},
-    'format_converter': {'free': 2, 'basic': 1, 'pro': 0},  # 专业版免费
-    'image_cropper': {'free': 2, 'basic': 1, 'pro': 0}   # 专业版免费
-}
-
-# 会员等级配置 - 与会员策略文档保持一致
-# 会员计划配置 - 仅包含每日次数限制
-MEMBERSHIP_PLANS = {
-    'free': {
-        'name': '免费版',
-        'daily_limit': 3,  # 免费版每天3次
-        'price': 0,
-        'features': ['基础背景移除', '标准质量输出']
-    },
-    'basic': {
-        'name': '基础版',
-        'daily_limit': 10,  # 基础版每天10次，与会员政策一致
-        'price': 19,
-        'features': ['高质量背景移除', '多格式支持', '优先处理']
-    },
-    'pro': {
-        'name': '专业版',
-        'daily_limit': 100,  # 专业版每天100次，与会员政策一致
-        'price': 99,
-        'features': ['无限背景移除', '批量处理', 'API访问', '高级功能']
-    }
-}
+# 会员套餐（每日次数限制、工具积分）统一来自项目根目录的套餐目录，修改PLAN_CATALOG_FILE后无需重启
+from plan_catalog import get_plan_catalog
 
 def allowed_file(filename):
     """检查文件类型是否允许"""
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def load_user_profile(user_id):
+    """读取用户资料 - Supabase熔断或网络故障时返回最近一次的缓存"""
+    return cached_read(
+        ('profile', user_id),
+        lambda: supabase.table('user_profiles').select('*').eq('user_id', user_id).execute().data or []
+    )
+
+def count_usage_since(user_id, since):
+    """统计某时间之后的使用次数 - 故障时返回缓存值"""
+    return cached_read(
+        ('usage_since', user_id, since),
+        lambda: len(supabase.table('tool_usage').select('id').eq('user_id', user_id).gte('created_at', since).execute().data or [])
+    )
+
 def get_user_from_token():
     """从请求头获取用户信息"""
     auth_header = request.headers.get('Authorization')
@@ -138,20 +133,33 @@ def check_user_permissions(user_id, tool_name):
                 'remaining_daily': 100
             }
         
-        # 获取用户资料
-        profile_response = supabase.table('user_profiles').select('*').eq('user_id', user_id).single().execute()
-        if not profile_response.data or len(profile_response.data) == 0:
-            return False, "用户不存在", {}
-        
-        user_data = profile_response.data[0] if isinstance(profile_response.data, list) else profile_response.data
-        user_plan = user_data.get('plan', 'free')
+        with latency_budget('plan_lookup'):
+            # 获取用户资料
+            profiles = load_user_profile(user_id)
+            if not profiles:
+                return False, "用户不存在", {}
+            
+            user_data = profiles[0]
+            user_plan = user_data.get('plan', 'free')
+            
+            # 获取今日使用次数
+            today = datetime.now().strftime('%Y-%m-%d')
+            today_usage = count_usage_since(user_id, today)
         
-        # 获取今日使用次数
-        today = datetime.now().strftime('%Y-%m-%d')
-        usage_response = supabase.table('tool_usage').select('*').eq('user_id', user_id).gte('created_at', today).execute()
+        catalog = get_plan_catalog()
+        daily_limit = catalog.daily_limit(user_plan)
         
-        today_usage = len(usage_response.data) if usage_response.data else 0
-        daily_limit = MEMBERSHIP_PLANS[user_plan]['daily_limit']
+        # 套餐目录中该工具的次数限制：0表示套餐不含此工具，比总限制更严时以工具限制为准
+        tool_limit = catalog.tool_limit(user_plan, tool_name)
+        if tool_limit == 0:
+            return False, "当前套餐不支持此工具", {
+                'plan': user_plan,
+                'today_usage': today_usage,
+                'daily_limit': 0,
+                'remaining_daily': 0
+            }
+        if tool_limit is not None and tool_limit > 0 and (daily_limit <= 0 or tool_limit < daily_limit):
+            daily_limit = tool_limit
         
         # 检查每日限制
         if daily_limit > 0 and today_usage >= daily_limit:
@@ -176,18 +184,18 @@ def check_user_permissions(user_id, tool_name):
 def get_user_plan_info(user_id):
     """获取用户会员信息 - 仅显示每日次数限制"""
     try:
-        profile_response = supabase.table('user_profiles').select('*').eq('user_id', user_id).single().execute()
-        if not profile_response.data or len(profile_response.data) == 0:
-            return None
-        
-        user_data = profile_response.data[0] if isinstance(profile_response.data, list) else profile_response.data
-        user_plan = user_data.get('plan', 'free')
-        plan_info = MEMBERSHIP_PLANS[user_plan].copy()
-        
-        # 获取今日使用次数
-        today = datetime.now().strftime('%Y-%m-%d')
-        usage_response = supabase.table('tool_usage').select('*').eq('user_id', user_id).gte('created_at', today).execute()
-        today_usage = len(usage_response.data) if usage_response.data else 0
+        with latency_budget('plan_lookup'):
+            profiles = load_user_profile(user_id)
+            if not profiles:
+                return None
+            
+            user_data = profiles[0]
+            user_plan = user_data.get('plan', 'free')
+            plan_info = get_plan_catalog().membership_info(user_plan)
+            
+            # 获取今日使用次数
+            today = datetime.now().strftime('%Y-%m-%d')
+            today_usage = count_usage_since(user_id, today)
         
         plan_info.update({
             'current_plan': user_plan,
@@ -223,6 +231,15 @@ def get_plan_info():
 from payment_api import payment_bp
 app.register_blueprint(payment_bp)
 
+# 注册批量关键词分析蓝图（需要登录；keyword_bulk在项目根目录，同样依赖PYTHONPATH）
+from keyword_bulk import keyword_bulk_bp
+app.config['KEYWORD_BULK_AUTHORIZE'] = get_user_from_token
+app.register_blueprint(keyword_bulk_bp)
+
+# 注册文章路由（首页文章列表/详情；article_api在项目根目录，同样依赖PYTHONPATH）
+from article_api import article_bp
+app.register_blueprint(article_bp)
+
 print("🚀 AI背景移除工具启动成功!")
 print("📊 支付系统已集成: 支付宝、微信支付")
 print("🔗 前端地址: http://localhost:8000")
@@ -261,10 +278,11 @@ def upgrade_plan():
         }).eq('user_id', user.id).execute()
         
         if update_response.data:
+            new_plan_info = get_plan_catalog().membership_info(new_plan)
             return jsonify({
-                'message': f'成功升级到{MEMBERSHIP_PLANS[new_plan]["name"]}',
+                'message': f'成功升级到{new_plan_info["name"]}',
                 'new_plan': new_plan,
-                'daily_limit': MEMBERSHIP_PLANS[new_plan]['daily_limit']
+                'daily_limit': new_plan_info['daily_limit']
             })
         else:
             return jsonify({'error': '升级失败'}), 500
@@ -1370,10 +1388,9 @@ def check_user_credits(user_id, tool_name):
         if response.data:
             credits = response.data.get('credits', 0)
             user_plan = response.data.get('plan', 'free')
-            tool_credits = TOOL_CREDITS.get(tool_name, {})
-            required_credits = tool_credits.get(user_plan, 1)
+            required_credits = get_plan_catalog().tool_credits(user_plan, tool_name)
             return credits >= required_credits, credits, required_credits
-        return False, 0, TOOL_CREDITS.get(tool_name, 1)
+        return False, 0, get_plan_catalog().tool_credits('free', tool_name)
     except Exception as e:
         print(f"检查用户积分失败: {e}")
         return False, 0, 0
@@ -1479,9 +1496,10 @@ def cookie():
 def health_check():
     """健康检查"""
     try:
-        # 简化健康检查 - 不依赖数据库连接
+        # 简化健康检查 - 不依赖数据库连接，熔断器打开时标记为degraded
+        resilience = get_resilience_stats()
         return jsonify({
-            'status': 'healthy',
+            'status': 'degraded' if resilience['degraded'] else 'healthy',
             'timestamp': datetime.now().isoformat(),
             'features': {
                 'background_removal': 'enabled',
@@ -1491,7 +1509,9 @@ def health_check():
                 'batch_processing': 'enabled'
             },
             'version': '2.1.0-enhanced',
-            'rembg_status': 'loaded'
+            'rembg_status': 'loaded',
+            'supabase_pool': get_pool_metrics(),
+            'supabase_resilience': resilience
         })
     except Exception as e:
         return jsonify({
@@ -1536,7 +1556,7 @@ def register():
                 'email': email,
                 'name': name,
                 'plan': 'free',
-                'daily_limit': MEMBERSHIP_PLANS['free']['daily_limit'],
+                'daily_limit': get_plan_catalog().daily_limit('free'),
                 'note': '开发模式：已绕过邮件验证'
             })
         else:
@@ -1571,7 +1591,7 @@ def login():
                     'email': user_data.get('email'),
                     'name': user_data.get('name', ''),
                     'plan': user_data.get('plan', 'free'),
-                    'daily_limit': MEMBERSHIP_PLANS[user_data.get('plan', 'free')]['daily_limit']
+                    'daily_limit': get_plan_catalog().daily_limit(user_data.get('plan', 'free'))
                 },
                 'token': 'dev-token-' + user_data.get('user_id'),  # 临时token
                 'usage_stats': usage_stats,
@@ -1586,24 +1606,20 @@ def login():
 def get_user_usage_stats(user_id):
     """获取用户使用统计 - 仅基于每日次数限制"""
     try:
-        # 获取今日使用统计
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-        response = supabase.table('tool_usage').select('*').eq('user_id', user_id).gte('created_at', today_start).execute()
-        
-        # 获取用户资料
-        profile_response = supabase.table('user_profiles').select('*').eq('user_id', user_id).execute()
+        with latency_budget('usage_stats'):
+            # 获取今日使用统计（所有工具共享每日限制）
+            today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+            today_usage_count = count_usage_since(user_id, today_start)
+            
+            # 获取用户资料
+            profiles = load_user_profile(user_id)
         
-        if not profile_response.data or len(profile_response.data) == 0:
+        if not profiles:
             return {}
         
-        user_data = profile_response.data[0]
+        user_data = profiles[0]
         user_plan = user_data.get('plan', 'free')
-        daily_limit = MEMBERSHIP_PLANS[user_plan]['daily_limit']
-        
-        # 统计今日总使用次数（所有工具共享每日限制）
-        today_usage_count = 0
-        if response.data:
-            today_usage_count = len(response.data)
+        daily_limit = get_plan_catalog().daily_limit(user_plan)
         
         # 计算剩余可用次数
         remaining_daily = max(0, daily_limit - today_usage_count) if daily_limit > 0 else -1
@@ -1641,7 +1657,7 @@ def get_profile():
                     'email': user.email,
                     'name': user_data.get('name', ''),
                     'plan': user_data.get('plan', 'free'),
-                    'daily_limit': MEMBERSHIP_PLANS[user_data.get('plan', 'free')]['daily_limit'],
+                    'daily_limit': get_plan_catalog().daily_limit(user_data.get('plan', 'free')),
                     'created_at': user_data.get('created_at'),
                     'updated_at': user_data.get('updated_at')
                 },
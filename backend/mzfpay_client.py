@@ -3,13 +3,17 @@
 支持支付宝、微信支付等多种支付方式
 """
 
-import hashlib
 import requests
 from urllib.parse import urlencode, quote
 
+from payment_signing import MD5Signer, build_sign_string
+
 class MzfPayClient:
     """码支付客户端"""
     
+    # 码支付没有订单查询接口，对账任务不调用query_order
+    supports_query = False
+    
     def __init__(self, merchant_id, merchant_key):
         """
         初始化码支付客户端
@@ -23,6 +27,7 @@ class MzfPayClient:
         # 易支付接口地址（推荐）
         self.api_url = "https://pay.mzfpay.com/xpay/epay/mapi.php"  # API调用接口
         self.submit_url = "https://pay.mzfpay.com/xpay/epay/submit.php"  # 表单提交接口
+        self.signer = MD5Signer(merchant_key)
     
     def generate_sign(self, params):
         """
@@ -41,44 +46,15 @@ class MzfPayClient:
         Returns:
             签名字符串（小写）
         """
-        # 排除sign和sign_type，并过滤空值
-        filtered_params = {}
-        for k, v in params.items():
-            if k not in ['sign', 'sign_type'] and v is not None and str(v).strip():
-                # 参数值转为字符串，但不进行URL编码（易支付要求原始值参与签名）
-                filtered_params[k] = str(v).strip()
-        
-        # 按参数名ASCII码排序（使用键名排序）
-        sorted_params = sorted(filtered_params.items(), key=lambda x: x[0])
-        
-        # 拼接成字符串：key1=value1&key2=value2
-        # 易支付签名规则：参数值不需要URL编码，但需要保持原始值
-        sign_parts = []
-        for k, v in sorted_params:
-            # 确保值是字符串格式
-            v_str = str(v).strip()
-            sign_parts.append(f"{k}={v_str}")
-        
-        sign_str = '&'.join(sign_parts)
-        
-        # 在末尾加上&key=商户密钥
-        sign_str += f"&key={self.merchant_key}"
+        # 排除sign和sign_type，过滤空值；参数值不进行URL编码（易支付要求原始值参与签名）
+        sign_str = build_sign_string(params, exclude=('sign', 'sign_type'), strip=True)
         
-        # 打印调试信息
-        print(f"🔐 签名原始字符串: {sign_str}")
-        
-        # MD5加密
-        # 易支付可能要求小写或大写，先尝试小写
-        sign_lower = hashlib.md5(sign_str.encode('utf-8')).hexdigest().lower()
-        sign_upper = hashlib.md5(sign_str.encode('utf-8')).hexdigest().upper()
-        
-        print(f"🔐 签名原始字符串: {sign_str}")
-        print(f"🔐 MD5(小写): {sign_lower}")
-        print(f"🔐 MD5(大写): {sign_upper}")
-        
-        # 默认返回小写（大多数易支付平台要求小写）
-        # 如果小写失败，可以尝试大写
-        return sign_lower
+        # 末尾加上&key=商户密钥后MD5，返回小写（大多数易支付平台要求小写）
+        return self.signer.sign(sign_str)
+    
+    def sign_many(self, params_list):
+        """批量签名，返回签名列表"""
+        return self.signer.sign_many([build_sign_string(p, exclude=('sign', 'sign_type'), strip=True) for p in params_list])
     
     def verify_sign(self, params):
         """
@@ -93,10 +69,14 @@ class MzfPayClient:
         if 'sign' not in params:
             return False
         
-        received_sign = params.get('sign', '').lower()
-        calculated_sign = self.generate_sign(params)
-        
-        return received_sign == calculated_sign
+        sign_str = build_sign_string(params, exclude=('sign', 'sign_type'), strip=True)
+        return self.signer.verify(sign_str, params.get('sign', ''))
+    
+    def verify_many(self, params_list):
+        """批量验签（对账时核对历史通知），返回对应的True/False列表"""
+        return self.signer.verify_many(
+            (build_sign_string(p, exclude=('sign', 'sign_type'), strip=True), p.get('sign', '')) for p in params_list
+        )
     
     def create_payment(self, order_no, amount, product_name, payment_type='alipay',
                       notify_url=None, return_url=None, method='api'):
@@ -5,13 +5,30 @@
 
 import uuid
 import json
+import base64
+import logging
 from datetime import datetime, timedelta
+import threading
 from decimal import Decimal
-from supabase import create_client
+
+# 套餐目录在项目根目录（与DataManager共用），backend/plan_catalog.py保证单独运行backend脚本时也能导入
+from plan_catalog import get_plan_catalog
+
+logger = logging.getLogger('order_manager')
 
 class OrderManager:
     """订单管理器"""
     
+    # 统计所需的订单字段
+    STATS_COLUMNS = 'order_no,status,amount,membership_type,payment_method,created_at'
+    
+    # 订单列表返回的字段
+    LIST_COLUMNS = ('id,order_no,user_id,membership_type,membership_duration,payment_method,'
+                    'amount,status,transaction_id,created_at,paid_at,updated_at')
+    
+    # 单页最大数量
+    MAX_PAGE_SIZE = 100
+    
     def __init__(self, supabase_client):
         """
         初始化订单管理器
@@ -20,28 +37,11 @@ class OrderManager:
             supabase_client: Supabase客户端实例
         """
         self.supabase = supabase_client
-        
-        # 会员计划配置
-        self.membership_plans = {
-            'basic': {
-                'name': '基础版',
-                'price': 1900,  # 19.00元（分为单位）
-                'duration_days': 30,
-                'features': ['高质量背景移除', '多格式支持', '优先处理']
-            },
-            'professional': {
-                'name': '专业版',
-                'price': 9900,  # 99.00元
-                'duration_days': 30,
-                'features': ['无限背景移除', '批量处理', 'API访问', '高级功能']
-            },
-            'flagship': {
-                'name': '旗舰版',
-                'price': 29900,  # 299.00元
-                'duration_days': 30,
-                'features': ['无限背景移除', '批量处理', 'API访问', '高级功能', '专属客服']
-            }
-        }
+    
+    @property
+    def membership_plans(self):
+        """可购买的会员计划（来自套餐目录，修改配置后无需重启）"""
+        return get_plan_catalog().order_plans()
     
     def create_order(self, user_id, plan, payment_method, device_info=None):
         """
@@ -99,6 +99,9 @@ class OrderManager:
             response = self.supabase.table('payment_records').insert(order_data).execute()
             
             if response.data:
+                # 累计按天统计：新增一笔订单
+                self._apply_stats_delta(response.data[0], orders=1)
+                
                 return {
                     'success': True,
                     'order': response.data[0],
@@ -181,7 +184,7 @@ class OrderManager:
             if status == 'paid':
                 update_data['paid_at'] = datetime.now().isoformat()
             
-            response = self.supabase.table('payment_records').update(update_data).eq('order_no', order_no).execute()
+            response = self._update_with_transition(order_no, status, update_data)
             
             if response.data and len(response.data) > 0:
                 return {
@@ -200,6 +203,37 @@ class OrderManager:
                 'error': f'更新订单异常: {str(e)}'
             }
     
+    def _update_with_transition(self, order_no, status, update_data, attempts=3):
+        """按当前状态条件更新订单，并按实际发生的状态变化累加统计
+        
+        条件更新没有命中说明状态已被其他请求修改，重新读取后按新的当前状态再试；
+        多次都没有命中时直接更新，并重建该订单所在日期的统计
+        """
+        previous = None
+        for _ in range(attempts):
+            current = self.supabase.table('payment_records').select(
+                self.STATS_COLUMNS
+            ).eq('order_no', order_no).execute()
+            previous = current.data[0] if current.data else None
+            if not previous or previous.get('status') == status:
+                # 订单不存在或状态未变，没有统计增量
+                return self.supabase.table('payment_records').update(update_data).eq('order_no', order_no).execute()
+            
+            # 仅当状态未被并发修改时更新，保证统计增量只记一次
+            response = self.supabase.table('payment_records').update(update_data).eq(
+                'order_no', order_no
+            ).eq('status', previous.get('status')).execute()
+            if response.data:
+                self._apply_status_transition(previous, status)
+                return response
+        
+        logger.warning(f"订单 {order_no} 状态持续被并发修改，直接更新并重建当天统计")
+        response = self.supabase.table('payment_records').update(update_data).eq('order_no', order_no).execute()
+        stat_date = str(previous.get('created_at') or '')[:10]
+        if stat_date:
+            self.rebuild_order_statistics(stat_date, stat_date)
+        return response
+    
     def activate_membership(self, order_no):
         """
         激活会员权益
@@ -270,90 +304,174 @@ class OrderManager:
                 'error': f'激活会员异常: {str(e)}'
             }
     
-    def get_user_orders(self, user_id, status=None, limit=20, offset=0):
+    def get_user_orders(self, user_id, status=None, limit=20, offset=0, cursor=None):
         """
         获取用户订单列表
         
+        按(created_at, id)倒序做游标分页，深翻页与首页代价相同；
+        未传cursor但offset>0时保留旧的偏移分页以兼容老调用
+        
         Args:
             user_id: 用户ID
             status: 订单状态过滤
             limit: 限制数量
-            offset: 偏移量
+            offset: 偏移量（兼容旧接口）
+            cursor: 上一页返回的next_cursor
             
         Returns:
-            订单列表
+            订单列表和next_cursor
         """
         try:
-            query = self.supabase.table('payment_records').select('*').eq('user_id', user_id)
+            query = self.supabase.table('payment_records').select(self.LIST_COLUMNS).eq('user_id', user_id)
             
             if status:
                 query = query.eq('status', status)
             
-            query = query.order('created_at', desc=True).range(offset, offset + limit - 1)
+            if offset and not cursor:
+                query = query.order('created_at', desc=True).order('id', desc=True).range(offset, offset + limit - 1)
+                return {
+                    'success': True,
+                    'orders': query.execute().data or [],
+                    'next_cursor': None,
+                    'has_more': None
+                }
             
-            response = query.execute()
+            return self._keyset_page(query, limit, cursor)
             
+        except ValueError as e:
             return {
-                'success': True,
-                'orders': response.data or []
+                'success': False,
+                'error': str(e)
             }
-            
         except Exception as e:
             return {
                 'success': False,
                 'error': f'获取订单列表异常: {str(e)}'
             }
     
-    def get_order_statistics(self, user_id=None, start_date=None, end_date=None):
+    def list_orders(self, status=None, start_date=None, end_date=None, user_id=None, limit=50, cursor=None):
         """
-        获取订单统计信息
+        管理后台订单列表（游标分页）
         
         Args:
-            user_id: 用户ID（可选）
+            status: 订单状态过滤
             start_date: 开始日期
             end_date: 结束日期
+            user_id: 用户ID（user_profiles.id）
+            limit: 每页数量
+            cursor: 上一页返回的next_cursor
             
         Returns:
-            统计信息
+            订单列表和next_cursor
         """
         try:
-            query = self.supabase.table('payment_records').select('*')
+            query = self.supabase.table('payment_records').select(self.LIST_COLUMNS)
             
+            if status and status != 'all':
+                query = query.eq('status', status)
             if user_id:
                 query = query.eq('user_id', user_id)
-            
             if start_date:
                 query = query.gte('created_at', start_date)
-            
             if end_date:
                 query = query.lte('created_at', end_date)
             
-            response = query.execute()
-            orders = response.data or []
+            return self._keyset_page(query, limit, cursor)
             
-            # 统计计算
-            total_orders = len(orders)
-            paid_orders = [o for o in orders if o['status'] == 'paid']
-            total_amount = sum(o['amount'] for o in paid_orders)
+        except ValueError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'获取订单列表异常: {str(e)}'
+            }
+    
+    def _keyset_page(self, query, limit, cursor):
+        """按(created_at, id)倒序取一页，多取一条判断是否还有下一页"""
+        limit = max(1, min(int(limit), self.MAX_PAGE_SIZE))
+        
+        if cursor:
+            created_at, order_id = self._decode_cursor(cursor)
+            expression = f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{order_id})'
+            if hasattr(query, 'or_'):
+                query = query.or_(expression)
+            else:
+                query.params = query.params.add('or', f'({expression})')
+        
+        query = query.order('created_at', desc=True).order('id', desc=True).limit(limit + 1)
+        rows = query.execute().data or []
+        
+        has_more = len(rows) > limit
+        orders = rows[:limit]
+        return {
+            'success': True,
+            'orders': orders,
+            'next_cursor': self._encode_cursor(orders[-1]) if has_more else None,
+            'has_more': has_more
+        }
+    
+    def _encode_cursor(self, order):
+        """把最后一条订单的(created_at, id)编码为不透明游标"""
+        raw = json.dumps([order['created_at'], order['id']], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    def _decode_cursor(self, cursor):
+        """解析游标，格式错误时抛出ValueError"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, order_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            return str(created_at), str(order_id)
+        except Exception:
+            raise ValueError('无效的分页游标')
+    
+    def get_order_statistics(self, user_id=None, start_date=None, end_date=None):
+        """
+        获取订单统计信息
+        
+        全站统计读取按天维护的payment_stats_daily汇总（日期 x 计划 x 支付方式），
+        单个用户的统计只读取该用户订单的必要字段
+        
+        Args:
+            user_id: 用户ID（可选）
+            start_date: 开始日期
+            end_date: 结束日期
             
-            # 按计划统计
-            plan_stats = {}
-            for order in paid_orders:
-                plan = order['plan']
-                if plan not in plan_stats:
-                    plan_stats[plan] = {'count': 0, 'amount': 0}
-                plan_stats[plan]['count'] += 1
-                plan_stats[plan]['amount'] += order['amount']
+        Returns:
+            统计信息
+        """
+        try:
+            if user_id:
+                query = self.supabase.table('payment_records').select(self.STATS_COLUMNS).eq('user_id', user_id)
+                if start_date:
+                    query = query.gte('created_at', start_date)
+                if end_date:
+                    query = query.lte('created_at', end_date)
+                
+                buckets = {}
+                for order in query.execute().data or []:
+                    delta = self._order_delta(order, orders=1)
+                    if order.get('status') == 'paid':
+                        self._merge_delta(delta, self._order_delta(order, paid=1))
+                    elif order.get('status') == 'refunded':
+                        self._merge_delta(delta, self._order_delta(order, refunded=1))
+                    self._merge_bucket(buckets, delta)
+                rows = list(buckets.values())
+            else:
+                query = self.supabase.table('payment_stats_daily').select(
+                    'stat_date,membership_type,payment_method,total_orders,paid_orders,paid_amount,refunded_orders,refunded_amount'
+                )
+                if start_date:
+                    query = query.gte('stat_date', str(start_date)[:10])
+                if end_date:
+                    query = query.lte('stat_date', str(end_date)[:10])
+                rows = query.execute().data or []
             
             return {
                 'success': True,
-                'statistics': {
-                    'total_orders': total_orders,
-                    'paid_orders': len(paid_orders),
-                    'total_amount': total_amount,
-                    'conversion_rate': len(paid_orders) / total_orders if total_orders > 0 else 0,
-                    'plan_statistics': plan_stats
-                }
+                'statistics': self._summarize_buckets(rows)
             }
             
         except Exception as e:
@@ -362,6 +480,111 @@ class OrderManager:
                 'error': f'获取统计信息异常: {str(e)}'
             }
     
+    def _order_delta(self, order, orders=0, paid=0, refunded=0):
+        """构造一笔订单对所在日期桶的增量"""
+        amount = order.get('amount') or 0
+        return {
+            'stat_date': str(order.get('created_at') or datetime.now().isoformat())[:10],
+            'membership_type': order.get('membership_type') or 'unknown',
+            'payment_method': order.get('payment_method') or 'unknown',
+            'total_orders': orders,
+            'paid_orders': paid,
+            'paid_amount': amount * paid,
+            'refunded_orders': refunded,
+            'refunded_amount': amount * refunded
+        }
+    
+    def _merge_delta(self, target, delta):
+        for key in ('total_orders', 'paid_orders', 'paid_amount', 'refunded_orders', 'refunded_amount'):
+            target[key] += delta[key]
+        return target
+    
+    def _merge_bucket(self, buckets, delta):
+        key = (delta['stat_date'], delta['membership_type'], delta['payment_method'])
+        if key in buckets:
+            self._merge_delta(buckets[key], delta)
+        else:
+            buckets[key] = dict(delta)
+    
+    def _apply_stats_delta(self, order, orders=0, paid=0, refunded=0):
+        """把增量累加到payment_stats_daily（失败只记录日志，由重建任务校正）"""
+        delta = self._order_delta(order, orders, paid, refunded)
+        try:
+            self.supabase.rpc('apply_order_stats_delta', {
+                'p_stat_date': delta['stat_date'],
+                'p_membership_type': delta['membership_type'],
+                'p_payment_method': delta['payment_method'],
+                'p_total_orders': delta['total_orders'],
+                'p_paid_orders': delta['paid_orders'],
+                'p_paid_amount': delta['paid_amount'],
+                'p_refunded_orders': delta['refunded_orders'],
+                'p_refunded_amount': delta['refunded_amount']
+            }).execute()
+            return True
+        except Exception as e:
+            logger.warning(f"更新订单统计失败: {e}")
+            return False
+    
+    def _apply_status_transition(self, order, new_status):
+        """订单状态变化时，把订单从旧状态计数移到新状态计数"""
+        old_status = order.get('status')
+        paid = (1 if new_status == 'paid' else 0) - (1 if old_status == 'paid' else 0)
+        refunded = (1 if new_status == 'refunded' else 0) - (1 if old_status == 'refunded' else 0)
+        if paid or refunded:
+            return self._apply_stats_delta(order, paid=paid, refunded=refunded)
+        return True
+    
+    def _summarize_buckets(self, rows):
+        """合并日期桶为统计结果"""
+        total_orders = 0
+        paid_orders = 0
+        total_amount = 0
+        refunded_orders = 0
+        plan_stats = {}
+        method_stats = {}
+        daily_stats = {}
+        
+        for row in rows:
+            count = row.get('paid_orders', 0)
+            amount = row.get('paid_amount', 0)
+            total_orders += row.get('total_orders', 0)
+            paid_orders += count
+            total_amount += amount
+            refunded_orders += row.get('refunded_orders', 0)
+            
+            for stats, key in ((plan_stats, row.get('membership_type')),
+                               (method_stats, row.get('payment_method')),
+                               (daily_stats, str(row.get('stat_date')))):
+                if key not in stats:
+                    stats[key] = {'count': 0, 'amount': 0}
+                stats[key]['count'] += count
+                stats[key]['amount'] += amount
+        
+        return {
+            'total_orders': total_orders,
+            'paid_orders': paid_orders,
+            'total_amount': total_amount,
+            'refunded_orders': refunded_orders,
+            'conversion_rate': paid_orders / total_orders if total_orders > 0 else 0,
+            'plan_statistics': {k: v for k, v in plan_stats.items() if v['count']},
+            'payment_method_statistics': {k: v for k, v in method_stats.items() if v['count']},
+            'daily_statistics': dict(sorted(daily_stats.items()))
+        }
+    
+    def rebuild_order_statistics(self, start_date, end_date):
+        """按payment_records重建指定日期范围的统计汇总（用于回填和校正）"""
+        try:
+            response = self.supabase.rpc('rebuild_order_stats', {
+                'p_start_date': str(start_date)[:10],
+                'p_end_date': str(end_date)[:10]
+            }).execute()
+            return {'success': True, 'rows': response.data}
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'重建统计异常: {str(e)}'
+            }
+    
     def _generate_order_no(self):
         """生成订单号"""
         timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
@@ -431,7 +654,17 @@ class OrderManager:
                 'error': f'退款异常: {str(e)}'
             }
 
-# 全局订单管理器实例
+# 全局订单管理器实例（每个共享客户端对应一个）
+_order_managers = {}
+_order_managers_lock = threading.Lock()
+
 def get_order_manager(supabase_client):
     """获取订单管理器实例"""
-    return OrderManager(supabase_client)
\ No newline at end of file
+    manager = _order_managers.get(id(supabase_client))
+    if manager is None or manager.supabase is not supabase_client:
+        with _order_managers_lock:
+            manager = _order_managers.get(id(supabase_client))
+            if manager is None or manager.supabase is not supabase_client:
+                manager = OrderManager(supabase_client)
+                _order_managers[id(supabase_client)] = manager
+    return manager
\ No newline at end of file
@@ -5,20 +5,23 @@
 
 from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime
+import os
 import json
 import traceback
 
 from alipay_client import get_alipay_client
 from wechat_pay_client import get_wechat_client
 from order_manager import get_order_manager
-from supabase import create_client
+from payment_idempotency import PAID_STATUS, get_notification_deduper
+from supabase_pool import get_supabase_client as get_pooled_client, get_pool_metrics
+from supabase_resilience import get_resilience_stats
 
 # 创建支付蓝图
 payment_bp = Blueprint('payment', __name__, url_prefix='/api/payment')
 
 def get_supabase_client():
-    """获取Supabase客户端"""
-    return create_client(
+    """获取Supabase客户端（应用级共享，复用连接池）"""
+    return get_pooled_client(
         current_app.config['SUPABASE_URL'],
         current_app.config['SUPABASE_KEY']
     )
@@ -92,6 +95,43 @@ def create_payment_order():
             'error': '创建订单失败'
         }), 500
 
+def _handle_paid_notification(provider, order_no, transaction_id, payment_data):
+    """支付成功通知：更新订单并激活会员。
+    各种成功状态（如支付宝先后发送TRADE_SUCCESS、TRADE_FINISHED）共用一个幂等键，重发时直接确认，不再访问数据库"""
+    supabase = get_supabase_client()
+    order_manager = get_order_manager(supabase)
+    
+    def handle():
+        # 订单已是paid（其他渠道通知或对账任务已处理）时不再激活会员
+        current = order_manager.get_order(order_no)
+        if current['success'] and current['order'].get('status') == 'paid':
+            current_app.logger.info(f"{provider}订单 {order_no} 已是支付成功状态，跳过激活")
+            return {'success': True, 'already_paid': True}
+        
+        # 更新订单状态
+        update_result = order_manager.update_order_status(
+            order_no=order_no,
+            status='paid',
+            transaction_id=transaction_id,
+            payment_data=payment_data
+        )
+        if not update_result['success']:
+            current_app.logger.error(f"更新订单状态失败: {update_result['error']}")
+            return update_result
+        
+        # 激活会员
+        activate_result = order_manager.activate_membership(order_no)
+        if activate_result['success']:
+            current_app.logger.info(f"{provider}订单 {order_no} 支付成功，会员已激活")
+        else:
+            current_app.logger.error(f"激活会员失败: {activate_result['error']}")
+        return activate_result
+    
+    result = get_notification_deduper(supabase).process(provider, order_no, PAID_STATUS, handle)
+    if result['duplicate']:
+        current_app.logger.info(f"{provider}订单 {order_no} 的重复通知已忽略")
+    return result
+
 @payment_bp.route('/alipay/notify', methods=['POST'])
 def alipay_notify():
     """支付宝异步通知"""
@@ -109,26 +149,10 @@ def alipay_notify():
         trade_no = data.get('trade_no')
         
         if trade_status == 'TRADE_SUCCESS' or trade_status == 'TRADE_FINISHED':
-            supabase = get_supabase_client()
-            order_manager = get_order_manager(supabase)
-            
-            # 更新订单状态
-            update_result = order_manager.update_order_status(
-                order_no=order_no,
-                status='paid',
-                transaction_id=trade_no,
-                payment_data=data
-            )
-            
-            if update_result['success']:
-                # 激活会员
-                activate_result = order_manager.activate_membership(order_no)
-                if activate_result['success']:
-                    current_app.logger.info(f"订单 {order_no} 支付成功，会员已激活")
-                else:
-                    current_app.logger.error(f"激活会员失败: {activate_result['error']}")
-            else:
-                current_app.logger.error(f"更新订单状态失败: {update_result['error']}")
+            result = _handle_paid_notification('alipay', order_no, trade_no, data)
+            if not result['success']:
+                # 返回failure让支付宝稍后重试
+                return 'failure'
         
         return 'success'
         
@@ -143,37 +167,20 @@ def wechat_notify():
         data = request.get_data(as_text=True)
         
         # 验证签名
-        wechat_client = get_wechat_pay_client()
-        notify_data = wechat_client.parse_notify(data)
+        wechat_client = get_wechat_client()
+        verified, notify_data = wechat_client.verify_notify(data)
         
-        if not notify_data:
+        if not verified:
             return jsonify({'code': 'FAIL', 'message': '签名验证失败'})
         
         # 处理订单
-        if notify_data.get('trade_state') == 'SUCCESS':
+        if notify_data.get('result_code') == 'SUCCESS':
             order_no = notify_data.get('out_trade_no')
             transaction_id = notify_data.get('transaction_id')
             
-            supabase = get_supabase_client()
-            order_manager = get_order_manager(supabase)
-            
-            # 更新订单状态
-            update_result = order_manager.update_order_status(
-                order_no=order_no,
-                status='paid',
-                transaction_id=transaction_id,
-                payment_data=notify_data
-            )
-            
-            if update_result['success']:
-                # 激活会员
-                activate_result = order_manager.activate_membership(order_no)
-                if activate_result['success']:
-                    current_app.logger.info(f"微信支付订单 {order_no} 支付成功，会员已激活")
-                else:
-                    current_app.logger.error(f"激活会员失败: {activate_result['error']}")
-            else:
-                current_app.logger.error(f"更新订单状态失败: {update_result['error']}")
+            result = _handle_paid_notification('wechat', order_no, transaction_id, notify_data)
+            if not result['success']:
+                return jsonify({'code': 'FAIL', 'message': '处理失败'})
         
         return jsonify({'code': 'SUCCESS', 'message': '处理成功'})
         
@@ -208,11 +215,14 @@ def get_user_orders(user_id):
         status = request.args.get('status')
         limit = int(request.args.get('limit', 20))
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
         
         supabase = get_supabase_client()
         order_manager = get_order_manager(supabase)
-        result = order_manager.get_user_orders(user_id, status, limit, offset)
+        result = order_manager.get_user_orders(user_id, status, limit, offset, cursor=cursor)
         
+        if not result['success']:
+            return jsonify(result), 400
         return jsonify(result)
         
     except Exception as e:
@@ -222,6 +232,44 @@ def get_user_orders(user_id):
             'error': '获取订单列表失败'
         }), 500
 
+@payment_bp.route('/admin/orders', methods=['GET'])
+def admin_list_orders():
+    """管理后台订单列表（游标分页）"""
+    try:
+        admin_token = os.getenv('ADMIN_API_TOKEN')
+        if not admin_token:
+            return jsonify({
+                'success': False,
+                'error': '管理接口未启用'
+            }), 403
+        if request.headers.get('X-Admin-Token') != admin_token:
+            return jsonify({
+                'success': False,
+                'error': '未授权访问'
+            }), 401
+        
+        supabase = get_supabase_client()
+        order_manager = get_order_manager(supabase)
+        result = order_manager.list_orders(
+            status=request.args.get('status'),
+            start_date=request.args.get('start_date'),
+            end_date=request.args.get('end_date'),
+            user_id=request.args.get('user_id'),
+            limit=int(request.args.get('limit', 50)),
+            cursor=request.args.get('cursor')
+        )
+        
+        if not result['success']:
+            return jsonify(result), 400
+        return jsonify(result)
+        
+    except Exception as e:
+        current_app.logger.error(f"获取订单列表异常: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': '获取订单列表失败'
+        }), 500
+
 @payment_bp.route('/plans', methods=['GET'])
 def get_membership_plans():
     """获取会员计划信息"""
@@ -309,7 +357,7 @@ def payment_health():
     try:
         # 检查各个支付客户端状态
         alipay_client = get_alipay_client()
-        wechat_client = get_wechat_pay_client()
+        wechat_client = get_wechat_client()
         
         return jsonify({
             'success': True,
@@ -319,6 +367,9 @@ def payment_health():
                 'wechat': 'available',
                 'order_manager': 'available'
             },
+            'supabase_pool': get_pool_metrics(),
+            'supabase_resilience': get_resilience_stats(),
+            'notification_dedup': get_notification_deduper(get_supabase_client()).get_stats(),
             'timestamp': datetime.now().isoformat()
         })
         
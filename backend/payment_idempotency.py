@@ -0,0 +1,180 @@
+"""
+支付异步通知幂等处理
+支付宝、微信支付、码支付在没收到成功应答前会反复重发通知，原来每次重发都要执行
+update_order_status和activate_membership，产生好几次数据库往返。这里：
+- 以 (支付渠道, 商户订单号, 交易状态) 作为幂等键；支付成功类状态（TRADE_SUCCESS、TRADE_FINISHED、
+  SUCCESS、对账查到已支付）统一记为PAID_STATUS，同一订单先后收到不同的成功状态也只处理一次
+- 内存LRU在前：已处理过的通知直接确认，不访问数据库
+- processed_notifications表在后：重启后或多个进程之间也能识别已处理的通知
+- 同一订单的并发重复通知按订单加锁串行处理，只有第一个真正执行
+- 处理失败不记录，让支付渠道继续重试
+
+用法：
+    deduper = get_notification_deduper(supabase)
+    result = deduper.process('alipay', order_no, PAID_STATUS, lambda: handle(order_no))
+    if result['duplicate']: ...
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+TABLE = 'processed_notifications'
+
+# 支付成功类通知的统一交易状态
+PAID_STATUS = 'paid'
+
+
+class _OrderLock:
+    """按订单分配的锁，没有线程使用时从锁表中移除"""
+
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+
+
+class NotificationDeduper:
+    """支付通知去重"""
+
+    def __init__(self, supabase_client, capacity=10000):
+        self.supabase = supabase_client
+        self.capacity = capacity
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._order_locks = {}
+        self._stats = {'received': 0, 'memory_duplicates': 0, 'stored_duplicates': 0, 'processed': 0, 'failed': 0}
+
+    # ---- 内存LRU ----
+
+    def _remember(self, key):
+        with self._lock:
+            self._seen[key] = True
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.capacity:
+                self._seen.popitem(last=False)
+
+    def _seen_before(self, key):
+        with self._lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                return True
+            return False
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    # ---- 按订单加锁 ----
+
+    def _acquire(self, order_key):
+        with self._lock:
+            entry = self._order_locks.get(order_key)
+            if entry is None:
+                entry = self._order_locks[order_key] = _OrderLock()
+            entry.users += 1
+        entry.lock.acquire()
+        return entry
+
+    def _release(self, order_key, entry):
+        entry.lock.release()
+        with self._lock:
+            entry.users -= 1
+            if entry.users == 0:
+                self._order_locks.pop(order_key, None)
+
+    # ---- 持久化记录 ----
+
+    def _is_stored(self, key):
+        provider, out_trade_no, trade_status = key
+        try:
+            response = self.supabase.table(TABLE).select('out_trade_no').eq('provider', provider).eq(
+                'out_trade_no', out_trade_no).eq('trade_status', trade_status).limit(1).execute()
+            return bool(response.data)
+        except Exception as e:
+            # 查不到记录时按未处理对待，由订单状态的条件更新兜底
+            print(f"⚠️ 查询已处理通知失败: {e}")
+            return False
+
+    def _store(self, key):
+        provider, out_trade_no, trade_status = key
+        try:
+            self.supabase.table(TABLE).upsert({
+                'provider': provider,
+                'out_trade_no': out_trade_no,
+                'trade_status': trade_status,
+                'processed_at': datetime.now().isoformat()
+            }, on_conflict='provider,out_trade_no,trade_status').execute()
+        except Exception as e:
+            # 内存中已记录，本进程内的重复通知仍会被识别
+            print(f"⚠️ 记录已处理通知失败: {e}")
+
+    # ---- 处理 ----
+
+    def process(self, provider, out_trade_no, trade_status, handler):
+        """
+        幂等地处理一条通知
+
+        Args:
+            provider: 支付渠道（alipay/wechat/mzfpay）
+            out_trade_no: 商户订单号
+            trade_status: 交易状态
+            handler: 实际处理函数，返回{'success': bool, ...}
+
+        Returns:
+            {'success': bool, 'duplicate': bool, ...handler的返回值}
+        """
+        key = (provider, str(out_trade_no), str(trade_status))
+        self._count('received')
+        if self._seen_before(key):
+            self._count('memory_duplicates')
+            return {'success': True, 'duplicate': True}
+
+        order_key = key[:2]
+        entry = self._acquire(order_key)
+        try:
+            # 等锁期间可能已有同一通知处理完成
+            if self._seen_before(key):
+                self._count('memory_duplicates')
+                return {'success': True, 'duplicate': True}
+            if self._is_stored(key):
+                self._remember(key)
+                self._count('stored_duplicates')
+                return {'success': True, 'duplicate': True}
+
+            try:
+                result = handler() or {'success': True}
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            if not result.get('success'):
+                self._count('failed')
+                return dict(result, duplicate=False)
+
+            self._store(key)
+            self._remember(key)
+            self._count('processed')
+            return dict(result, duplicate=False)
+        finally:
+            self._release(order_key, entry)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, cached_keys=len(self._seen), locked_orders=len(self._order_locks))
+
+
+# 全局去重实例（每个共享客户端对应一个）
+_dedupers = {}
+_dedupers_lock = threading.Lock()
+
+
+def get_notification_deduper(supabase_client):
+    """获取通知去重实例"""
+    deduper = _dedupers.get(id(supabase_client))
+    if deduper is None or deduper.supabase is not supabase_client:
+        with _dedupers_lock:
+            deduper = _dedupers.get(id(supabase_client))
+            if deduper is None or deduper.supabase is not supabase_client:
+                deduper = NotificationDeduper(supabase_client)
+                _dedupers[id(supabase_client)] = deduper
+    return deduper
@@ -0,0 +1,402 @@
+"""
+待支付订单对账任务
+payment_records里卡在pending的订单（异步通知丢失、签名失败等）以前只能手动运行
+支付问题诊断工具.py、verify_payment_flow.py逐个排查。这里：
+- 按(created_at, id)分页读取创建超过min_age分钟的pending订单，每页处理完保存一次进度检查点，
+  中断后从检查点继续，一轮扫完后从头开始
+- 每个支付渠道一个线程池 + 令牌桶，并发调用AlipayClient/WeChatPayClient/MzfPayClient.query_order
+- 查询结果统一成 paid/pending/closed/not_found/error，通过OrderManager更新状态：
+  已支付的订单更新为paid并激活会员（与异步通知共用payment_idempotency的PAID_STATUS幂等键，不会重复激活），
+  关闭或不存在且超过expire_hours的订单标记为failed，其余留到下一轮
+- 没有查询接口的渠道（客户端supports_query为False，如码支付）不发请求，按not_found处理，
+  异步通知一直没到的订单超过expire_hours后标记为failed
+- FakePaymentProvider：本地模拟的支付渠道，返回与真实query_order相同格式的数据，离线测试用
+
+用法：
+    worker = ReconciliationWorker(supabase)
+    worker.run_once()            # 扫一轮
+    worker.start(interval=300)   # 后台定时对账
+    python payment_reconciler.py --once
+"""
+
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from order_manager import get_order_manager
+from payment_idempotency import PAID_STATUS, get_notification_deduper
+
+PAID = 'paid'
+PENDING = 'pending'
+CLOSED = 'closed'
+NOT_FOUND = 'not_found'
+ERROR = 'error'
+
+CHECKPOINT_TABLE = 'reconciliation_checkpoints'
+
+# 订单的payment_method -> 支付渠道
+PROVIDER_BY_METHOD = {'alipay': 'alipay', 'wechat': 'wechat', 'mzfpay': 'mzfpay'}
+
+
+# ---- 各渠道查询结果统一格式：(状态, 渠道交易状态, 渠道交易号) ----
+
+def normalize_alipay(raw):
+    raw = raw or {}
+    if raw.get('code') == '10000':
+        trade_status = raw.get('trade_status')
+        if trade_status in ('TRADE_SUCCESS', 'TRADE_FINISHED'):
+            return PAID, trade_status, raw.get('trade_no')
+        if trade_status == 'TRADE_CLOSED':
+            return CLOSED, trade_status, raw.get('trade_no')
+        return PENDING, trade_status, raw.get('trade_no')
+    if raw.get('sub_code') == 'ACQ.TRADE_NOT_EXIST':
+        return NOT_FOUND, None, None
+    return ERROR, None, None
+
+
+def normalize_wechat(raw):
+    raw = raw or {}
+    if raw.get('return_code') != 'SUCCESS':
+        return ERROR, None, None
+    if raw.get('result_code') != 'SUCCESS':
+        return (NOT_FOUND if raw.get('err_code') == 'ORDERNOTEXIST' else ERROR), None, None
+    trade_state = raw.get('trade_state')
+    if trade_state == 'SUCCESS':
+        return PAID, trade_state, raw.get('transaction_id')
+    if trade_state in ('CLOSED', 'REVOKED', 'PAYERROR'):
+        return CLOSED, trade_state, raw.get('transaction_id')
+    return PENDING, trade_state, raw.get('transaction_id')
+
+
+def normalize_mzfpay(raw):
+    raw = raw or {}
+    if not raw.get('success'):
+        return ERROR, None, None
+    status = raw.get('status')
+    if status == 'paid':
+        return PAID, 'TRADE_SUCCESS', raw.get('trade_no')
+    if status == 'expired':
+        return CLOSED, status, raw.get('trade_no')
+    return PENDING, status, raw.get('trade_no')
+
+
+NORMALIZERS = {'alipay': normalize_alipay, 'wechat': normalize_wechat, 'mzfpay': normalize_mzfpay}
+
+
+class ProviderLimit:
+    """单个支付渠道的并发线程池 + 令牌桶（rate为每秒请求数，0表示不限速）"""
+
+    def __init__(self, name, concurrency=4, rate=0.0):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1.0, rate)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f'reconcile-{name}')
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self.stats = {'calls': 0, 'waited_seconds': 0.0}
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                if self.rate <= 0:
+                    self.stats['calls'] += 1
+                    return
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.stats['calls'] += 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+                self.stats['waited_seconds'] += wait
+            time.sleep(wait)
+
+
+def _default_clients():
+    """按环境变量配置的支付渠道客户端"""
+    from alipay_client import get_alipay_client
+    from wechat_pay_client import get_wechat_client
+
+    clients = {'alipay': get_alipay_client(), 'wechat': get_wechat_client()}
+    if os.getenv('MZFPAY_MERCHANT_ID'):
+        from mzfpay_client import MzfPayClient
+        clients['mzfpay'] = MzfPayClient(os.getenv('MZFPAY_MERCHANT_ID'), os.getenv('MZFPAY_MERCHANT_KEY', ''))
+    return clients
+
+
+def _parse_time(value):
+    moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+class ReconciliationWorker:
+    """待支付订单对账"""
+
+    COLUMNS = 'id,order_no,user_id,payment_method,amount,status,created_at'
+
+    def __init__(self, supabase_client, clients=None, limits=None, page_size=100, min_age_minutes=5,
+                 expire_hours=24, checkpoint_name='pending_orders'):
+        self.supabase = supabase_client
+        self.order_manager = get_order_manager(supabase_client)
+        self.deduper = get_notification_deduper(supabase_client)
+        self.clients = clients if clients is not None else _default_clients()
+        self.limits = limits or {}
+        for provider in self.clients:
+            if provider not in self.limits:
+                self.limits[provider] = ProviderLimit(
+                    provider,
+                    int(os.getenv(f'RECONCILE_{provider.upper()}_CONCURRENCY', '4')),
+                    float(os.getenv(f'RECONCILE_{provider.upper()}_RATE', '5'))
+                )
+        self.page_size = page_size
+        self.min_age = timedelta(minutes=min_age_minutes)
+        self.expire_after = timedelta(hours=expire_hours)
+        self.checkpoint_name = checkpoint_name
+        self._stop = threading.Event()
+        self._thread = None
+        self._run_lock = threading.Lock()
+
+    # ---- 检查点 ----
+
+    def load_checkpoint(self):
+        try:
+            response = self.supabase.table(CHECKPOINT_TABLE).select('*').eq('name', self.checkpoint_name).execute()
+            return response.data[0] if response.data else {}
+        except Exception as e:
+            print(f"⚠️ 读取对账检查点失败: {e}")
+            return {}
+
+    def _save_checkpoint(self, cursor, totals, completed=False):
+        row = {
+            'name': self.checkpoint_name,
+            'cursor_created_at': cursor[0] if cursor else None,
+            'cursor_id': cursor[1] if cursor else None,
+            'stats': totals,
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }
+        if completed:
+            row['last_completed_at'] = row['updated_at']
+        try:
+            self.supabase.table(CHECKPOINT_TABLE).upsert(row, on_conflict='name').execute()
+        except Exception as e:
+            print(f"⚠️ 保存对账检查点失败: {e}")
+
+    # ---- 分页读取 ----
+
+    def _fetch_page(self, cutoff, cursor):
+        """按(created_at, id)正序取一页pending订单"""
+        query = self.supabase.table('payment_records').select(self.COLUMNS).eq('status', 'pending').lt(
+            'created_at', cutoff)
+        if cursor:
+            created_at, order_id = cursor
+            query = query.or_(f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{order_id})')
+        return query.order('created_at').order('id').limit(self.page_size).execute().data or []
+
+    # ---- 单个订单 ----
+
+    def _query(self, provider, order_no):
+        client = self.clients[provider]
+        if not getattr(client, 'supports_query', True):
+            return NOT_FOUND, None, None
+        limit = self.limits[provider]
+        limit.acquire()
+        try:
+            if provider == 'mzfpay':
+                raw = client.query_order(order_no)
+            else:
+                raw = client.query_order(out_trade_no=order_no)
+        except Exception as e:
+            raw = {'error': str(e)}
+        return NORMALIZERS[provider](raw)
+
+    def _apply(self, order, provider, result, now):
+        """根据渠道状态更新订单，返回结果分类"""
+        state, trade_status, transaction_id = result
+        order_no = order['order_no']
+        if state == PAID:
+            def handle():
+                # 等去重锁期间异步通知可能已把订单更新为paid
+                current = self.order_manager.get_order(order_no)
+                if current['success'] and current['order'].get('status') == 'paid':
+                    return {'success': True, 'already_paid': True}
+                update_result = self.order_manager.update_order_status(
+                    order_no=order_no,
+                    status='paid',
+                    transaction_id=transaction_id,
+                    payment_data={'source': 'reconciliation', 'provider': provider, 'trade_status': trade_status}
+                )
+                if not update_result['success']:
+                    return update_result
+                return self.order_manager.activate_membership(order_no)
+
+            outcome = self.deduper.process(provider, order_no, PAID_STATUS, handle)
+            if outcome['duplicate'] or outcome.get('already_paid'):
+                return 'already_paid'
+            return 'paid' if outcome['success'] else 'errors'
+        if state in (CLOSED, NOT_FOUND):
+            if now - _parse_time(order['created_at']) < self.expire_after:
+                return 'still_pending'
+            update_result = self.order_manager.update_order_status(order_no=order_no, status='failed')
+            return 'failed' if update_result['success'] else 'errors'
+        if state == PENDING:
+            return 'still_pending'
+        return 'errors'
+
+    # ---- 对账 ----
+
+    def run_once(self, max_pages=None):
+        """从检查点继续扫描pending订单，扫完一轮或达到max_pages后返回统计"""
+        with self._run_lock:
+            started = time.time()
+            now = datetime.now(timezone.utc)
+            cutoff = (now - self.min_age).isoformat()
+            checkpoint = self.load_checkpoint()
+            cursor = None
+            if checkpoint.get('cursor_created_at'):
+                cursor = (checkpoint['cursor_created_at'], checkpoint['cursor_id'])
+            totals = {'checked': 0, 'paid': 0, 'already_paid': 0, 'failed': 0, 'still_pending': 0,
+                      'errors': 0, 'skipped': 0, 'pages': 0}
+            completed = False
+
+            while not self._stop.is_set() and (max_pages is None or totals['pages'] < max_pages):
+                orders = self._fetch_page(cutoff, cursor)
+                if not orders:
+                    completed = True
+                    break
+
+                futures = []
+                for order in orders:
+                    provider = PROVIDER_BY_METHOD.get(order.get('payment_method'))
+                    if provider not in self.clients:
+                        totals['skipped'] += 1
+                        continue
+                    future = self.limits[provider].executor.submit(self._query, provider, order['order_no'])
+                    futures.append((order, provider, future))
+                for order, provider, future in futures:
+                    outcome = self._apply(order, provider, future.result(), now)
+                    totals[outcome] += 1
+                    totals['checked'] += 1
+
+                totals['pages'] += 1
+                cursor = (orders[-1]['created_at'], orders[-1]['id'])
+                if len(orders) < self.page_size:
+                    completed = True
+                    break
+                self._save_checkpoint(cursor, totals)
+
+            # 扫完一轮后从头开始
+            self._save_checkpoint(None if completed else cursor, totals, completed)
+            totals['completed'] = completed
+            totals['took_ms'] = round((time.time() - started) * 1000, 1)
+            if totals['paid'] or totals['failed']:
+                print(f"✅ 对账完成：补单{totals['paid']}笔，关闭{totals['failed']}笔，检查{totals['checked']}笔")
+            return totals
+
+    def start(self, interval=300):
+        """后台定时对账"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"❌ 对账任务异常: {e}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name='payment-reconciler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        for limit in self.limits.values():
+            limit.executor.shutdown(wait=False)
+
+    def get_stats(self):
+        return {name: dict(limit.stats) for name, limit in self.limits.items()}
+
+
+class FakePaymentProvider:
+    """本地模拟的支付渠道：按订单号设置状态，query_order返回与对应真实客户端相同格式的数据"""
+
+    def __init__(self, provider, default_state=PENDING, latency=0.0, error_rate=0.0, seed=None):
+        self.provider = provider
+        self.default_state = default_state
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.states = {}
+        self.finished = False  # 支付宝已支付订单返回TRADE_FINISHED（交易结束）而不是TRADE_SUCCESS
+        self.calls = 0
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def set_state(self, order_no, state):
+        self.states[order_no] = state
+
+    def query_order(self, out_trade_no=None, trade_no=None):
+        with self._lock:
+            self.calls += 1
+            self._active += 1
+            self.max_concurrent = max(self.max_concurrent, self._active)
+            fail = self.error_rate > 0 and self.random.random() < self.error_rate
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                raise ConnectionError(f'模拟{self.provider}查询失败')
+            return self._response(out_trade_no, self.states.get(out_trade_no, self.default_state))
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _response(self, order_no, state):
+        transaction_id = f'{self.provider.upper()}{abs(hash(order_no)) % 10 ** 12:012d}'
+        if self.provider == 'alipay':
+            if state == NOT_FOUND:
+                return {'code': '40004', 'msg': 'Business Failed', 'sub_code': 'ACQ.TRADE_NOT_EXIST'}
+            paid_status = 'TRADE_FINISHED' if self.finished else 'TRADE_SUCCESS'
+            trade_status = {PAID: paid_status, CLOSED: 'TRADE_CLOSED'}.get(state, 'WAIT_BUYER_PAY')
+            return {'code': '10000', 'msg': 'Success', 'out_trade_no': order_no, 'trade_status': trade_status,
+                    'trade_no': transaction_id}
+        if self.provider == 'wechat':
+            if state == NOT_FOUND:
+                return {'return_code': 'SUCCESS', 'result_code': 'FAIL', 'err_code': 'ORDERNOTEXIST'}
+            trade_state = {PAID: 'SUCCESS', CLOSED: 'CLOSED'}.get(state, 'NOTPAY')
+            return {'return_code': 'SUCCESS', 'result_code': 'SUCCESS', 'out_trade_no': order_no,
+                    'trade_state': trade_state, 'transaction_id': transaction_id}
+        if state == NOT_FOUND:
+            return {'success': False, 'error': '订单不存在'}
+        status = {PAID: 'paid', CLOSED: 'expired'}.get(state, 'unpaid')
+        return {'success': True, 'status': status, 'trade_no': transaction_id}
+
+
+if __name__ == '__main__':
+    import argparse
+    from supabase_pool import get_supabase_client
+
+    parser = argparse.ArgumentParser(description='待支付订单对账')
+    parser.add_argument('--once', action='store_true', help='只扫描一轮')
+    parser.add_argument('--interval', type=int, default=300, help='后台对账间隔（秒）')
+    args = parser.parse_args()
+
+    worker = ReconciliationWorker(get_supabase_client())
+    if args.once:
+        print(worker.run_once())
+    else:
+        worker.start(args.interval)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            worker.stop()
@@ -0,0 +1,182 @@
+"""
+支付签名服务
+- 待签名字符串：参数按名称排序后拼成 key1=value1&key2=value2（过滤空值和指定字段）
+- RSASigner：支付宝RSA2（SHA256withRSA）签名和验签。PEM密钥只解析一次，
+  按密钥内容缓存在进程内，每次请求新建的AlipayClient也能复用
+- MD5Signer：易支付/码支付、微信支付的 "&key=密钥" MD5签名，验签用常量时间比较
+- 都提供批量接口 sign_many / verify_many，供对账任务一次处理多笔订单
+- benchmark()：对比每次解析密钥和缓存密钥对象的每秒签名数（python payment_signing.py）
+"""
+
+import time
+import hmac
+import base64
+import hashlib
+import functools
+import threading
+
+try:
+    from Crypto.PublicKey import RSA
+    from Crypto.Signature import pkcs1_15
+    from Crypto.Hash import SHA1, SHA256
+    CRYPTO_AVAILABLE = True
+except ImportError:
+    CRYPTO_AVAILABLE = False
+
+# sign_type -> 摘要算法
+_HASHES = {'RSA2': 'SHA256', 'RSA': 'SHA1'}
+
+
+def build_sign_string(params, exclude=('sign',), strip=False):
+    """参数按名称排序拼接成待签名字符串，空值和exclude中的字段不参与签名"""
+    parts = []
+    for key in sorted(params):
+        if key in exclude:
+            continue
+        value = params[key]
+        if value is None:
+            continue
+        value = str(value).strip() if strip else str(value)
+        if value:
+            parts.append(f"{key}={value}")
+    return '&'.join(parts)
+
+
+def _to_pem(key_text, kind):
+    """支付宝后台复制出来的密钥通常只有base64正文，补上PEM头尾"""
+    key_text = (key_text or '').strip()
+    if not key_text or key_text.startswith('-----BEGIN'):
+        return key_text
+    body = '\n'.join(key_text[i:i + 64] for i in range(0, len(key_text), 64))
+    return f"-----BEGIN {kind}-----\n{body}\n-----END {kind}-----"
+
+
+@functools.lru_cache(maxsize=16)
+def load_private_key(key_text):
+    """解析应用私钥（按内容缓存）"""
+    return RSA.import_key(_to_pem(key_text, 'PRIVATE KEY'))
+
+
+@functools.lru_cache(maxsize=16)
+def load_public_key(key_text):
+    """解析支付宝公钥（按内容缓存）"""
+    return RSA.import_key(_to_pem(key_text, 'PUBLIC KEY'))
+
+
+class RSASigner:
+    """RSA/RSA2签名和验签，密钥对象在第一次使用时解析并缓存"""
+
+    def __init__(self, private_key=None, public_key=None, sign_type='RSA2'):
+        self.private_key = private_key
+        self.public_key = public_key
+        self.sign_type = sign_type
+        self._signer = None
+        self._verifier = None
+        self._lock = threading.Lock()
+
+    def _hash(self, data, sign_type=None):
+        algorithm = _HASHES.get(sign_type or self.sign_type, 'SHA256')
+        return (SHA256 if algorithm == 'SHA256' else SHA1).new(data.encode('utf-8'))
+
+    def _get_signer(self):
+        if self._signer is None:
+            if not CRYPTO_AVAILABLE:
+                raise ImportError('未安装pycryptodome')
+            with self._lock:
+                if self._signer is None:
+                    self._signer = pkcs1_15.new(load_private_key(self.private_key))
+        return self._signer
+
+    def _get_verifier(self):
+        if self._verifier is None:
+            if not CRYPTO_AVAILABLE:
+                raise ImportError('未安装pycryptodome')
+            with self._lock:
+                if self._verifier is None:
+                    self._verifier = pkcs1_15.new(load_public_key(self.public_key))
+        return self._verifier
+
+    @property
+    def can_verify(self):
+        return CRYPTO_AVAILABLE and bool(self.public_key)
+
+    def sign(self, sign_string):
+        """返回base64签名"""
+        signature = self._get_signer().sign(self._hash(sign_string))
+        return base64.b64encode(signature).decode('utf-8')
+
+    def verify(self, sign_string, sign, sign_type=None):
+        """验签，签名格式错误或不匹配都返回False"""
+        try:
+            self._get_verifier().verify(self._hash(sign_string, sign_type), base64.b64decode(sign))
+            return True
+        except (ValueError, TypeError):
+            return False
+
+    def sign_many(self, sign_strings):
+        signer = self._get_signer()
+        return [base64.b64encode(signer.sign(self._hash(s))).decode('utf-8') for s in sign_strings]
+
+    def verify_many(self, items):
+        """items: [(待签名字符串, 签名)]，返回对应的True/False列表"""
+        return [self.verify(sign_string, sign) for sign_string, sign in items]
+
+
+class MD5Signer:
+    """待签名字符串末尾加 &key=密钥 后取MD5"""
+
+    def __init__(self, secret, uppercase=False):
+        self.secret = secret
+        self.uppercase = uppercase
+
+    def sign(self, sign_string):
+        digest = hashlib.md5(f"{sign_string}&key={self.secret}".encode('utf-8')).hexdigest()
+        return digest.upper() if self.uppercase else digest
+
+    def verify(self, sign_string, sign):
+        return hmac.compare_digest(self.sign(sign_string).lower(), str(sign or '').lower())
+
+    def sign_many(self, sign_strings):
+        return [self.sign(s) for s in sign_strings]
+
+    def verify_many(self, items):
+        return [self.verify(sign_string, sign) for sign_string, sign in items]
+
+
+def benchmark(count=200, key_size=2048):
+    """对比每次解析PEM私钥（原AlipayClient._generate_sign的做法）和缓存密钥对象的每秒签名数"""
+    key = RSA.generate(key_size)
+    private_pem = key.export_key(pkcs=8).decode('utf-8')
+    public_pem = key.publickey().export_key().decode('utf-8')
+    sign_strings = [build_sign_string({'out_trade_no': f'ORDER{i:06d}', 'total_amount': '19.00', 'app_id': '2021'})
+                    for i in range(count)]
+
+    started = time.perf_counter()
+    for s in sign_strings:
+        pkcs1_15.new(RSA.import_key(private_pem)).sign(SHA256.new(s.encode('utf-8')))
+    before = count / (time.perf_counter() - started)
+
+    load_private_key.cache_clear()
+    signer = RSASigner(private_pem, public_pem)
+    started = time.perf_counter()
+    signatures = signer.sign_many(sign_strings)
+    after = count / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    verified = signer.verify_many(zip(sign_strings, signatures))
+    verify_rate = count / (time.perf_counter() - started)
+
+    return {
+        'count': count,
+        'sign_per_second_before': round(before, 1),
+        'sign_per_second_after': round(after, 1),
+        'verify_per_second': round(verify_rate, 1),
+        'all_verified': all(verified)
+    }
+
+
+if __name__ == '__main__':
+    result = benchmark()
+    print(f"📊 每次解析密钥: {result['sign_per_second_before']} 次/秒")
+    print(f"📊 缓存密钥对象: {result['sign_per_second_after']} 次/秒")
+    print(f"📊 批量验签: {result['verify_per_second']} 次/秒")
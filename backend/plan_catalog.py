@@ -0,0 +1,17 @@
+"""
+套餐目录入口
+套餐目录plan_catalog.py在项目根目录（与DataManager共用）。在backend目录单独运行脚本
+（python payment_reconciler.py、python -c "import order_manager"）时项目根目录不在sys.path中，
+这里按文件路径加载根目录的plan_catalog.py并替换本模块，所有导入方拿到的都是同一个套餐目录实例。
+项目根目录在sys.path中且排在backend之前时直接导入根目录模块，不经过这里。
+"""
+
+import os
+import sys
+import importlib.util
+
+_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'plan_catalog.py')
+_spec = importlib.util.spec_from_file_location(__name__, _path)
+_module = importlib.util.module_from_spec(_spec)
+sys.modules[__name__] = _module
+_spec.loader.exec_module(_module)
@@ -7,9 +7,12 @@ Supabase数据库配置 (Pro版)
 import os
 import logging
 import time
+import threading
+from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
-from supabase import create_client, Client
-from supabase.lib.client_options import ClientOptions
+from supabase import Client
+from supabase_pool import get_supabase_client, get_auth_client, get_pool_metrics
+from supabase_resilience import CircuitOpenError, cached_read, latency_budget, get_resilience_stats
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -33,6 +36,7 @@ class SupabaseDB:
         self.connection_timeout = int(os.getenv('SUPABASE_CONNECTION_TIMEOUT', '30'))
         self.max_retries = int(os.getenv('SUPABASE_MAX_RETRIES', '3'))
         self.retry_delay = float(os.getenv('SUPABASE_RETRY_DELAY', '1.0'))
+        self.retry_budget = float(os.getenv('SUPABASE_RETRY_BUDGET', '3.0'))
         self.is_pro = os.getenv('SUPABASE_IS_PRO', 'false').lower() == 'true'
         
         if not self.supabase_url or not self.supabase_key:
@@ -40,29 +44,13 @@ class SupabaseDB:
         
         logger.info(f"初始化Supabase客户端 (Pro模式: {self.is_pro})")
         
-        # 配置客户端选项
+        # 初始化Supabase客户端（应用级共享连接池，与主应用和支付蓝图复用同一组连接）
         try:
-            client_options = ClientOptions(
-                follow_redirects=True,
+            self.client: Client = get_supabase_client(
+                self.supabase_url,
+                self.supabase_service_key if self.supabase_service_key else self.supabase_key,
                 schema=os.getenv('SUPABASE_SCHEMA', 'public')
             )
-        except TypeError:
-            # 如果参数不支持，使用基本配置
-            client_options = None
-        
-        # 初始化Supabase客户端
-        try:
-            if client_options:
-                self.client: Client = create_client(
-                    self.supabase_url,
-                    self.supabase_service_key if self.supabase_service_key else self.supabase_key,
-                    options=client_options
-                )
-            else:
-                self.client: Client = create_client(
-                    self.supabase_url,
-                    self.supabase_service_key if self.supabase_service_key else self.supabase_key
-                )
             logger.info("Supabase客户端初始化成功")
             # 测试连接
             self.test_connection()
@@ -78,7 +66,7 @@ class SupabaseDB:
         """获取使用service key的客户端（拥有管理员权限）"""
         if self.supabase_service_key:
             try:
-                service_client = create_client(
+                service_client = get_supabase_client(
                     self.supabase_url,
                     self.supabase_service_key
                 )
@@ -104,15 +92,28 @@ class SupabaseDB:
         return False
     
     def execute_with_retry(self, func, *args, **kwargs):
-        """带重试机制的执行函数"""
+        """带重试机制的执行函数 - 熔断打开时直接失败，重试总耗时不超过retry_budget"""
+        deadline = time.monotonic() + self.retry_budget
         for attempt in range(self.max_retries):
             try:
                 return func(*args, **kwargs)
+            except CircuitOpenError:
+                raise
             except Exception as e:
                 logger.warning(f"操作失败 (尝试 {attempt + 1}/{self.max_retries}): {e}")
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (2 ** attempt))  # 指数退避
+                delay = self.retry_delay * (2 ** attempt)  # 指数退避
+                if attempt == self.max_retries - 1 or time.monotonic() + delay >= deadline:
+                    break
+                time.sleep(delay)
         raise Exception(f"操作在{self.max_retries}次尝试后失败")
+    
+    def get_pool_stats(self):
+        """获取共享连接池指标"""
+        return get_pool_metrics()
+    
+    def get_resilience_stats(self):
+        """获取熔断器状态、触发次数和对冲统计"""
+        return get_resilience_stats()
 
 # 全局数据库实例
 db = SupabaseDB()
@@ -126,8 +127,8 @@ class UserDB:
     def create_user(self, email, password, name):
         """创建用户 - Pro版支持更丰富的用户元数据"""
         try:
-            # 使用Supabase Auth创建用户
-            auth_response = self.client.auth.sign_up({
+            # 使用Supabase Auth创建用户（独立客户端，注册得到的会话不影响共享客户端）
+            auth_response = get_auth_client(self.client).auth.sign_up({
                 'email': email,
                 'password': password,
                 'options': {
@@ -173,7 +174,8 @@ class UserDB:
     def authenticate_user(self, email, password):
         """用户认证 - Pro版增强"""
         try:
-            auth_response = self.client.auth.sign_in_with_password({
+            # 在独立客户端上登录，共享客户端仍使用服务密钥
+            auth_response = get_auth_client(self.client).auth.sign_in_with_password({
                 'email': email,
                 'password': password
             })
@@ -316,9 +318,38 @@ class UserDB:
 
 # 工具使用记录
 class UsageDB:
+    """
+    工具使用记录
+    统计接口读取按天汇总的tool_usage_daily_user / tool_usage_daily表，
+    汇总表在record_usage时由increment_usage_rollup增量更新，
+    并由compact_rollups按原始tool_usage重算补齐（见supabase_init.sql）
+    """
+    
     def __init__(self, supabase_client):
         self.client = supabase_client
     
+    def _rollup_date(self):
+        """汇总表按UTC日期分桶，与数据库中created_at::date保持一致"""
+        return datetime.utcnow().strftime('%Y-%m-%d')
+    
+    def _period_start(self, days):
+        """统计周期起始日期（含当天共days天）"""
+        return (datetime.utcnow() - timedelta(days=max(days, 1) - 1)).strftime('%Y-%m-%d')
+    
+    def _increment_rollup(self, user_id, tool_name, credits_used):
+        """增量更新按天汇总表（失败不影响使用记录，由压缩任务补齐）"""
+        try:
+            self.client.rpc('increment_usage_rollup', {
+                'p_user_id': user_id,
+                'p_tool_name': tool_name,
+                'p_usage_date': self._rollup_date(),
+                'p_credits': credits_used or 0
+            }).execute()
+            return True
+        except Exception as e:
+            logger.warning(f"更新使用汇总失败: {e}")
+            return False
+    
     def record_usage(self, user_id, tool_name, credits_used, metadata=None):
         """记录工具使用 - Pro版支持更多元数据"""
         try:
@@ -338,6 +369,9 @@ class UsageDB:
             
             response = self.client.table('tool_usage').insert(usage_data).execute()
             
+            # 增量更新按天汇总
+            self._increment_rollup(user_id, tool_name, credits_used)
+            
             # 更新用户使用次数（Pro版增强）
             try:
                 # 获取当前用户信息
@@ -367,72 +401,129 @@ class UsageDB:
             return {'success': False, 'error': str(e)}
     
     def get_user_usage_stats(self, user_id, days=30):
-        """获取用户使用统计 - Pro版增强统计"""
+        """获取用户使用统计 - Supabase不可用时返回最近一次成功读取的结果"""
         try:
-            response = self.client.table('tool_usage').select('*').eq(
-                'user_id', user_id
-            ).gte('created_at', f'now() - interval \'{days} days\'').execute()
-            
-            total_credits = sum(usage['credits_used'] for usage in response.data)
-            usage_count = len(response.data)
-            
-            # 按工具类型统计（Pro版增强）
-            tool_stats = {}
-            for usage in response.data:
-                tool_name = usage['tool_name']
-                if tool_name not in tool_stats:
-                    tool_stats[tool_name] = {'count': 0, 'credits': 0}
-                tool_stats[tool_name]['count'] += 1
-                tool_stats[tool_name]['credits'] += usage['credits_used']
-            
-            # 获取使用趋势（Pro版增强）
-            daily_stats = {}
-            for usage in response.data:
-                date = usage['created_at'].split('T')[0] if isinstance(usage['created_at'], str) else str(usage['created_at']).split('T')[0]
-                if date not in daily_stats:
-                    daily_stats[date] = {'count': 0, 'credits': 0}
-                daily_stats[date]['count'] += 1
-                daily_stats[date]['credits'] += usage['credits_used']
-            
-            return {
-                'success': True,
-                'total_credits': total_credits,
-                'usage_count': usage_count,
-                'recent_usage': response.data[-10:],  # 最近10条记录
-                'tool_stats': tool_stats,  # Pro版增强
-                'daily_stats': daily_stats  # Pro版增强
-            }
-            
+            with latency_budget('usage_stats'):
+                return cached_read(
+                    ('usage_stats', user_id, days),
+                    lambda: self._load_user_usage_stats(user_id, days)
+                )
         except Exception as e:
             logger.error(f"获取使用统计失败: {e}")
             return {'success': False, 'error': str(e)}
     
+    def _load_user_usage_stats(self, user_id, days):
+        """读取按天汇总表，读取量只与工具数和天数有关"""
+        response = self.client.table('tool_usage_daily_user').select(
+            'tool_name,usage_date,usage_count,credits_used'
+        ).eq('user_id', user_id).gte('usage_date', self._period_start(days)).execute()
+        rows = response.data or []
+        
+        tool_stats = {}
+        daily_stats = {}
+        for row in rows:
+            count = row.get('usage_count', 0)
+            credits = row.get('credits_used', 0)
+            
+            tool = tool_stats.setdefault(row['tool_name'], {'count': 0, 'credits': 0})
+            tool['count'] += count
+            tool['credits'] += credits
+            
+            day = daily_stats.setdefault(str(row['usage_date']), {'count': 0, 'credits': 0})
+            day['count'] += count
+            day['credits'] += credits
+        
+        # 最近10条记录只取固定条数
+        recent_response = self.client.table('tool_usage').select('*').eq(
+            'user_id', user_id
+        ).order('created_at', desc=True).limit(10).execute()
+        
+        return {
+            'success': True,
+            'total_credits': sum(t['credits'] for t in tool_stats.values()),
+            'usage_count': sum(t['count'] for t in tool_stats.values()),
+            'recent_usage': list(reversed(recent_response.data or [])),  # 最近10条记录
+            'tool_stats': tool_stats,  # Pro版增强
+            'daily_stats': dict(sorted(daily_stats.items()))  # Pro版增强
+        }
+    
     def get_tool_stats(self, tool_name=None, days=30):
-        """获取工具使用统计 - Pro版新增功能"""
+        """获取工具使用统计 - 读取按天汇总表"""
         try:
-            query = self.client.table('tool_usage').select('*')
+            start_date = self._period_start(days)
             
+            query = self.client.table('tool_usage_daily').select('tool_name,usage_date,usage_count,credits_used')
             if tool_name:
                 query = query.eq('tool_name', tool_name)
+            rows = query.gte('usage_date', start_date).execute().data or []
             
-            response = query.gte('created_at', f'now() - interval \'{days} days\'').execute()
-            
-            total_usage = len(response.data)
-            total_credits = sum(usage['credits_used'] for usage in response.data)
-            unique_users = len(set(usage['user_id'] for usage in response.data))
+            # 去重用户数：按最后使用日期计数的汇总，周期内各天相加即为去重人数（'*'表示全部工具）
+            active_rows = self.client.table('tool_usage_active_daily').select('usage_date,last_seen_users').eq(
+                'tool_name', tool_name or '*'
+            ).gte('usage_date', start_date).execute().data or []
             
             return {
                 'success': True,
                 'tool_name': tool_name,
-                'total_usage': total_usage,
-                'total_credits': total_credits,
-                'unique_users': unique_users,
+                'total_usage': sum(row.get('usage_count', 0) for row in rows),
+                'total_credits': sum(row.get('credits_used', 0) for row in rows),
+                'unique_users': sum(row.get('last_seen_users', 0) for row in active_rows),
                 'period': f'{days} days'
             }
             
         except Exception as e:
             logger.error(f"获取工具统计失败: {e}")
             return {'success': False, 'error': str(e)}
+    
+    def _closed_until(self):
+        """最后一个已结束的汇总日期：留出一小时余量，让跨零点的请求先完成增量更新"""
+        return (datetime.utcnow() - timedelta(hours=1) - timedelta(days=1)).strftime('%Y-%m-%d')
+    
+    def compact_rollups(self, days=2):
+        """按原始tool_usage重算最近days天中已结束日期的汇总（补齐增量更新失败的记录，也用于首次回填）
+        当天只做增量更新，重算当天会和并发的record_usage重复计数"""
+        start_date = (datetime.utcnow() - timedelta(days=max(days, 1))).strftime('%Y-%m-%d')
+        end_date = self._closed_until()
+        try:
+            response = self.client.rpc('compact_usage_rollups', {
+                'p_start_date': start_date,
+                'p_end_date': end_date
+            }).execute()
+            logger.info(f"使用汇总压缩完成: {start_date} ~ {end_date}, 汇总行数 {response.data}")
+            return {'success': True, 'rows': response.data}
+        except Exception as e:
+            logger.error(f"使用汇总压缩失败: {e}")
+            return {'success': False, 'error': str(e)}
+
+# 后台汇总压缩线程（每个进程只启动一个）
+_compaction_thread = None
+_compaction_stop = threading.Event()
+_compaction_lock = threading.Lock()
+
+def start_rollup_compaction(usage_db, interval_seconds=None, days=2):
+    """启动后台汇总压缩线程（默认每小时重算前两天），重复调用不会启动多个线程"""
+    global _compaction_thread
+    interval = interval_seconds or int(os.getenv('USAGE_ROLLUP_COMPACT_INTERVAL', '3600'))
+    
+    with _compaction_lock:
+        if _compaction_thread is not None and _compaction_thread.is_alive():
+            return _compaction_thread
+        _compaction_stop.clear()
+        
+        def _loop():
+            while not _compaction_stop.is_set():
+                usage_db.compact_rollups(days)
+                _compaction_stop.wait(interval)
+        
+        _compaction_thread = threading.Thread(target=_loop, name='usage-rollup-compaction', daemon=True)
+        _compaction_thread.start()
+        return _compaction_thread
+
+def stop_rollup_compaction(timeout=None):
+    """停止后台汇总压缩线程"""
+    _compaction_stop.set()
+    if _compaction_thread is not None:
+        _compaction_thread.join(timeout)
 
 # 文件存储
 class StorageDB:
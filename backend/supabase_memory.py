@@ -0,0 +1,749 @@
+"""
+内存版Supabase后端（压测/基准测试用）
+实现应用用到的supabase-py子集：
+- table().select().eq().neq().gt().gte().lt().lte().in_().or_().order().limit().range().single().execute()
+- insert()/update()/upsert()/delete()、rpc()
+- storage.from_(bucket).upload()/download()/get_public_url()/create_signed_url()/remove()/list()
+- auth.get_user()/sign_up()/sign_in_with_password()/admin.get_user_by_id()
+数据保存在进程内，等值过滤走按列建立的哈希索引；每次execute()可注入延迟和故障，
+用于在一台机器上模拟真实的数据库往返
+
+启用方式：SUPABASE_BACKEND=memory（get_supabase_client会返回这里的客户端）
+"""
+
+import os
+import re
+import time
+import uuid
+import random
+import logging
+import threading
+from functools import cmp_to_key
+from datetime import datetime, timezone
+
+import httpx
+from postgrest.exceptions import APIError
+
+logger = logging.getLogger('supabase_memory')
+
+MEMORY_BASE_URL = 'http://memory.supabase.local'
+
+
+class MemoryBackendConfig:
+    """注入的延迟与故障率（从环境变量读取）"""
+
+    def __init__(self, latency_ms=None, jitter_ms=None, error_rate=None, seed=None):
+        self.latency_ms = float(latency_ms if latency_ms is not None else os.getenv('SUPABASE_MEMORY_LATENCY_MS', '0'))
+        self.jitter_ms = float(jitter_ms if jitter_ms is not None else os.getenv('SUPABASE_MEMORY_JITTER_MS', '0'))
+        self.error_rate = float(error_rate if error_rate is not None else os.getenv('SUPABASE_MEMORY_ERROR_RATE', '0'))
+        seed = seed if seed is not None else os.getenv('SUPABASE_MEMORY_SEED')
+        self.random = random.Random(int(seed) if seed not in (None, '') else None)
+
+    def to_dict(self):
+        return {'latency_ms': self.latency_ms, 'jitter_ms': self.jitter_ms, 'error_rate': self.error_rate}
+
+
+class MemoryResponse:
+    """与postgrest APIResponse相同的data/count字段"""
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+    def __repr__(self):
+        return f"MemoryResponse(data={self.data!r}, count={self.count!r})"
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _api_error(message, code):
+    return APIError({'message': message, 'code': code, 'hint': None, 'details': None})
+
+
+def _compare(left, right):
+    """比较两个值；类型不同时按字符串比较（与PostgREST把参数作为文本传入一致）"""
+    try:
+        return (left > right) - (left < right)
+    except TypeError:
+        left, right = str(left), str(right)
+        return (left > right) - (left < right)
+
+
+def _coerce(raw):
+    """把PostgREST过滤表达式中的字面量转换为Python值"""
+    if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+        return raw[1:-1]
+    if raw == 'null':
+        return None
+    if raw in ('true', 'false'):
+        return raw == 'true'
+    if re.fullmatch(r'-?\d+', raw):
+        return int(raw)
+    if re.fullmatch(r'-?\d+\.\d+', raw):
+        return float(raw)
+    return raw
+
+
+def _match(row, column, op, value):
+    current = row.get(column)
+    if op == 'is':
+        return current is value
+    if op == 'in':
+        return current in value
+    if current is None or value is None:
+        return op == 'neq' and current is not value
+    if op in ('like', 'ilike'):
+        pattern = '^' + re.escape(str(value)).replace('%', '.*').replace('_', '.') + '$'
+        return re.match(pattern, str(current), re.IGNORECASE if op == 'ilike' else 0) is not None
+    result = _compare(current, value)
+    return {
+        'eq': result == 0, 'neq': result != 0,
+        'gt': result > 0, 'gte': result >= 0,
+        'lt': result < 0, 'lte': result <= 0
+    }[op]
+
+
+def _split_top_level(expression):
+    """按不在括号和引号内的逗号拆分"""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in expression:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        if char == ',' and depth == 0 and not quoted:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append(''.join(current))
+    return parts
+
+
+def _parse_logic(expression, conjunction='or'):
+    """解析or_()用到的PostgREST逻辑表达式，返回row -> bool"""
+    conditions = []
+    for part in _split_top_level(expression.strip()):
+        part = part.strip()
+        nested = re.fullmatch(r'(and|or)\((.*)\)', part)
+        if nested:
+            conditions.append(_parse_logic(nested.group(2), nested.group(1)))
+            continue
+        column, op, raw = part.split('.', 2)
+        if op == 'in':
+            value = [_coerce(v.strip()) for v in _split_top_level(raw.strip('()'))]
+        else:
+            value = _coerce(raw)
+        conditions.append(lambda row, c=column, o=op, v=value: _match(row, c, o, v))
+
+    if conjunction == 'and':
+        return lambda row: all(cond(row) for cond in conditions)
+    return lambda row: any(cond(row) for cond in conditions)
+
+
+class MemoryTable:
+    """单张表：行按内部rowid保存，等值过滤的列自动建立哈希索引"""
+
+    def __init__(self, name, unique=None):
+        self.name = name
+        self.rows = {}
+        self.indexes = {}
+        self.unique = [tuple(u) if isinstance(u, (list, tuple)) else (u,) for u in (unique or [])]
+        self._next_rowid = 0
+
+    def index(self, column):
+        """获取列索引，第一次使用时建立"""
+        index = self.indexes.get(column)
+        if index is None:
+            index = {}
+            for rowid, row in self.rows.items():
+                index.setdefault(self._key(row.get(column)), set()).add(rowid)
+            self.indexes[column] = index
+        return index
+
+    @staticmethod
+    def _key(value):
+        return value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+
+    def _index_add(self, rowid, row):
+        for column, index in self.indexes.items():
+            index.setdefault(self._key(row.get(column)), set()).add(rowid)
+
+    def _index_remove(self, rowid, row):
+        for column, index in self.indexes.items():
+            bucket = index.get(self._key(row.get(column)))
+            if bucket is not None:
+                bucket.discard(rowid)
+                if not bucket:
+                    del index[self._key(row.get(column))]
+
+    def find_unique(self, row, columns):
+        candidates = None
+        for column in columns:
+            ids = self.index(column).get(self._key(row.get(column)), set())
+            candidates = ids if candidates is None else candidates & ids
+        return next(iter(candidates), None) if candidates else None
+
+    def check_unique(self, row, rowid=None):
+        for columns in self.unique:
+            # 与PostgreSQL一致：包含NULL的键不参与唯一约束
+            if any(row.get(c) is None for c in columns):
+                continue
+            existing = self.find_unique(row, columns)
+            if existing is not None and existing != rowid:
+                raise _api_error(
+                    f'duplicate key value violates unique constraint "{self.name}_{"_".join(columns)}_key"', '23505'
+                )
+
+    def insert(self, row):
+        row = dict(row)
+        now = _now_iso()
+        for column, value in row.items():
+            if value == 'now()':
+                row[column] = now
+        row.setdefault('id', str(uuid.uuid4()))
+        row.setdefault('created_at', now)
+        self.check_unique(row)
+        rowid = self._next_rowid
+        self._next_rowid += 1
+        self.rows[rowid] = row
+        self._index_add(rowid, row)
+        return row
+
+    def update(self, rowid, values):
+        row = self.rows[rowid]
+        updated = dict(row)
+        now = _now_iso()
+        updated.update({k: (now if v == 'now()' else v) for k, v in values.items()})
+        self.check_unique(updated, rowid)
+        self._index_remove(rowid, row)
+        self.rows[rowid] = updated
+        self._index_add(rowid, updated)
+        return updated
+
+    def delete(self, rowid):
+        row = self.rows.pop(rowid)
+        self._index_remove(rowid, row)
+        return row
+
+    def candidates(self, filters):
+        """用第一个等值过滤条件走索引，其余条件逐行判断"""
+        for column, op, value in filters:
+            if op == 'eq':
+                return list(self.index(column).get(self._key(value), ()))
+        return list(self.rows.keys())
+
+
+class MemoryQueryBuilder:
+    """链式查询构造器，execute()时在数据库锁内执行"""
+
+    def __init__(self, database, table):
+        self._db = database
+        self._table = table
+        self._action = 'select'
+        self._columns = '*'
+        self._payload = None
+        self._on_conflict = None
+        self._count = None
+        self._filters = []
+        self._predicates = []
+        self._order = []
+        self._limit = None
+        self._offset = 0
+        self._single = False
+        self._maybe_single = False
+
+    # ---- 动作 ----
+
+    def select(self, *columns, count=None):
+        self._columns = ','.join(columns) if columns else '*'
+        self._count = count
+        return self
+
+    def insert(self, data, **kwargs):
+        self._action = 'insert'
+        self._payload = data
+        return self
+
+    def upsert(self, data, on_conflict=None, **kwargs):
+        self._action = 'upsert'
+        self._payload = data
+        self._on_conflict = on_conflict
+        return self
+
+    def update(self, data, **kwargs):
+        self._action = 'update'
+        self._payload = data
+        return self
+
+    def delete(self, **kwargs):
+        self._action = 'delete'
+        return self
+
+    # ---- 过滤 ----
+
+    def _filter(self, column, op, value):
+        self._filters.append((column, op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column, value):
+        return self._filter(column, 'neq', value)
+
+    def gt(self, column, value):
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column, value):
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column, value):
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column, value):
+        return self._filter(column, 'lte', value)
+
+    def like(self, column, pattern):
+        return self._filter(column, 'like', pattern)
+
+    def ilike(self, column, pattern):
+        return self._filter(column, 'ilike', pattern)
+
+    def is_(self, column, value):
+        return self._filter(column, 'is', None if value in (None, 'null') else value)
+
+    def in_(self, column, values):
+        return self._filter(column, 'in', list(values))
+
+    def or_(self, filters, reference_table=None):
+        self._predicates.append(_parse_logic(filters))
+        return self
+
+    # ---- 排序与分页 ----
+
+    def order(self, column, desc=False, nullsfirst=False, foreign_table=None):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size, foreign_table=None):
+        self._limit = size
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def maybe_single(self):
+        self._maybe_single = True
+        return self
+
+    # ---- 执行 ----
+
+    def execute(self):
+        self._db.simulate_round_trip(self._table)
+        with self._db.lock:
+            table = self._db.table_store(self._table)
+            if self._action == 'insert':
+                rows = self._payload if isinstance(self._payload, list) else [self._payload]
+                data = [dict(table.insert(row)) for row in rows]
+                return MemoryResponse(data, len(data) if self._count else None)
+            if self._action == 'upsert':
+                return self._execute_upsert(table)
+
+            matched = self._matching_rowids(table)
+            if self._action == 'update':
+                data = [dict(table.update(rowid, self._payload)) for rowid in matched]
+                return MemoryResponse(data)
+            if self._action == 'delete':
+                data = [dict(table.delete(rowid)) for rowid in matched]
+                return MemoryResponse(data)
+
+            rows = [table.rows[rowid] for rowid in matched]
+            total = len(rows)
+            for column, desc in reversed(self._order):
+                present = [r for r in rows if r.get(column) is not None]
+                missing = [r for r in rows if r.get(column) is None]
+                present.sort(key=cmp_to_key(lambda a, b, c=column: _compare(a[c], b[c])), reverse=desc)
+                rows = present + missing if not desc else missing + present
+            if self._offset:
+                rows = rows[self._offset:]
+            if self._limit is not None:
+                rows = rows[:self._limit]
+            data = [self._project(row) for row in rows]
+
+        count = total if self._count else None
+        if self._single or self._maybe_single:
+            if len(data) == 1:
+                return MemoryResponse(data[0], count)
+            if self._maybe_single and not data:
+                return None
+            raise _api_error('JSON object requested, multiple (or no) rows returned', 'PGRST116')
+        return MemoryResponse(data, count)
+
+    def _matching_rowids(self, table):
+        rowids = table.candidates(self._filters)
+        rows = table.rows
+        return sorted(
+            rowid for rowid in rowids
+            if all(_match(rows[rowid], c, o, v) for c, o, v in self._filters)
+            and all(predicate(rows[rowid]) for predicate in self._predicates)
+        )
+
+    def _execute_upsert(self, table):
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        columns = tuple(c.strip() for c in self._on_conflict.split(',')) if self._on_conflict else ('id',)
+        data = []
+        for row in rows:
+            rowid = table.find_unique(row, columns) if all(c in row for c in columns) else None
+            data.append(dict(table.update(rowid, row) if rowid is not None else table.insert(row)))
+        return MemoryResponse(data)
+
+    def _project(self, row):
+        if self._columns.strip() == '*':
+            return dict(row)
+        columns = [c.strip() for c in self._columns.split(',') if c.strip()]
+        return {c: row.get(c) for c in columns}
+
+
+class MemoryRPC:
+    """rpc()调用：execute()时执行注册的Python实现"""
+
+    def __init__(self, database, name, params):
+        self._db = database
+        self._name = name
+        self._params = params or {}
+
+    def execute(self):
+        self._db.simulate_round_trip(f'rpc/{self._name}')
+        function = self._db.functions.get(self._name)
+        if function is None:
+            raise _api_error(f'Could not find the function public.{self._name}', 'PGRST202')
+        with self._db.lock:
+            return MemoryResponse(function(self._db, **self._params))
+
+
+class MemoryBucket:
+    """存储桶：文件内容保存在内存中"""
+
+    def __init__(self, database, bucket):
+        self._db = database
+        self._bucket = bucket
+
+    def _files(self):
+        return self._db.buckets.setdefault(self._bucket, {})
+
+    def upload(self, path, file, file_options=None):
+        self._db.simulate_round_trip(f'storage/{self._bucket}')
+        content = file if isinstance(file, (bytes, bytearray)) else open(file, 'rb').read()
+        with self._db.lock:
+            files = self._files()
+            upsert = str((file_options or {}).get('upsert', 'false')).lower() == 'true'
+            if path in files and not upsert:
+                raise _api_error('The resource already exists', '409')
+            files[path] = {
+                'content': bytes(content),
+                'content_type': (file_options or {}).get('content-type', 'application/octet-stream'),
+                'created_at': _now_iso()
+            }
+        return {'Key': f'{self._bucket}/{path}'}
+
+    def download(self, path):
+        self._db.simulate_round_trip(f'storage/{self._bucket}')
+        entry = self._files().get(path)
+        if entry is None:
+            raise _api_error('Object not found', '404')
+        return entry['content']
+
+    def get_public_url(self, path):
+        return f'{self._db.base_url}/storage/v1/object/public/{self._bucket}/{path}'
+
+    def create_signed_url(self, path, expires_in, options=None):
+        token = uuid.uuid4().hex
+        url = f'{self._db.base_url}/storage/v1/object/sign/{self._bucket}/{path}?token={token}&expires_in={expires_in}'
+        return {'signedURL': url, 'signedUrl': url}
+
+    def remove(self, paths):
+        self._db.simulate_round_trip(f'storage/{self._bucket}')
+        with self._db.lock:
+            files = self._files()
+            return [{'name': p} for p in paths if files.pop(p, None) is not None]
+
+    def list(self, path=None, options=None):
+        prefix = (path or '').strip('/')
+        with self._db.lock:
+            names = sorted(self._files().keys())
+        if prefix:
+            names = [n[len(prefix) + 1:] for n in names if n.startswith(prefix + '/')]
+        return [{'name': n, 'id': n} for n in names]
+
+
+class MemoryStorage:
+    def __init__(self, database):
+        self._db = database
+
+    def from_(self, bucket):
+        return MemoryBucket(self._db, bucket)
+
+
+class _Obj:
+    """把字典包装成属性访问（模拟gotrue返回的User/Session对象）"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class MemoryAuthAdmin:
+    def __init__(self, auth):
+        self._auth = auth
+
+    def get_user_by_id(self, user_id):
+        user = self._auth.users.get(user_id)
+        return _Obj(user=self._auth._user_obj(user) if user else None)
+
+    def update_user_by_id(self, user_id, attributes):
+        user = self._auth.users.get(user_id)
+        if user is None:
+            raise _api_error('User not found', '404')
+        user['user_metadata'].update((attributes or {}).get('user_metadata', {}))
+        return _Obj(user=self._auth._user_obj(user))
+
+
+class MemoryAuth:
+    """最小化的认证服务：access_token -> 用户"""
+
+    def __init__(self, database):
+        self._db = database
+        self.users = {}
+        self.tokens = {}
+        self.admin = MemoryAuthAdmin(self)
+
+    def _user_obj(self, user):
+        return _Obj(id=user['id'], email=user['email'], user_metadata=dict(user['user_metadata']),
+                    created_at=user['created_at'])
+
+    def create_user(self, email, password='', metadata=None, user_id=None):
+        """直接创建用户并返回access_token（压测数据准备用）"""
+        with self._db.lock:
+            user_id = user_id or str(uuid.uuid4())
+            self.users[user_id] = {
+                'id': user_id, 'email': email, 'password': password,
+                'user_metadata': dict(metadata or {}), 'created_at': _now_iso()
+            }
+            token = f'memory-{uuid.uuid4().hex}'
+            self.tokens[token] = user_id
+        return user_id, token
+
+    def sign_up(self, credentials):
+        self._db.simulate_round_trip('auth')
+        options = credentials.get('options') or {}
+        user_id, token = self.create_user(credentials['email'], credentials.get('password', ''), options.get('data'))
+        return _Obj(user=self._user_obj(self.users[user_id]), session=_Obj(access_token=token))
+
+    def sign_in_with_password(self, credentials):
+        self._db.simulate_round_trip('auth')
+        for user in list(self.users.values()):
+            if user['email'] == credentials.get('email') and user['password'] == credentials.get('password'):
+                token = f'memory-{uuid.uuid4().hex}'
+                self.tokens[token] = user['id']
+                return _Obj(user=self._user_obj(user), session=_Obj(access_token=token))
+        raise _api_error('Invalid login credentials', '400')
+
+    def get_user(self, jwt=None):
+        self._db.simulate_round_trip('auth')
+        user_id = self.tokens.get(jwt) if jwt else None
+        if user_id is None:
+            return None
+        return _Obj(user=self._user_obj(self.users[user_id]))
+
+
+def _increment_usage_rollup(db, p_user_id, p_tool_name, p_usage_date, p_credits=0):
+    """内存实现：supabase_init.sql中的increment_usage_rollup"""
+    per_user = db.table_store('tool_usage_daily_user')
+    key = {'user_id': p_user_id, 'tool_name': p_tool_name, 'usage_date': str(p_usage_date)}
+    rowid = per_user.find_unique(key, ('user_id', 'tool_name', 'usage_date'))
+    first_use = rowid is None
+    if first_use:
+        per_user.insert({**key, 'usage_count': 1, 'credits_used': p_credits or 0})
+    else:
+        row = per_user.rows[rowid]
+        per_user.update(rowid, {'usage_count': row['usage_count'] + 1,
+                                'credits_used': row['credits_used'] + (p_credits or 0)})
+
+    daily = db.table_store('tool_usage_daily')
+    key = {'tool_name': p_tool_name, 'usage_date': str(p_usage_date)}
+    rowid = daily.find_unique(key, ('tool_name', 'usage_date'))
+    if rowid is None:
+        daily.insert({**key, 'usage_count': 1, 'credits_used': p_credits or 0, 'unique_users': 1 if first_use else 0})
+    else:
+        row = daily.rows[rowid]
+        daily.update(rowid, {'usage_count': row['usage_count'] + 1,
+                             'credits_used': row['credits_used'] + (p_credits or 0),
+                             'unique_users': row['unique_users'] + (1 if first_use else 0)})
+    if not first_use:
+        return None
+
+    # 最后使用日期移到当天，按最后使用日期计数的用户数随之移动
+    last_seen = db.table_store('tool_usage_last_seen')
+    active = db.table_store('tool_usage_active_daily')
+    usage_date = str(p_usage_date)
+    for tool in (p_tool_name, '*'):
+        rowid = last_seen.find_unique({'tool_name': tool, 'user_id': p_user_id}, ('tool_name', 'user_id'))
+        if rowid is None:
+            last_seen.insert({'tool_name': tool, 'user_id': p_user_id, 'last_used': usage_date})
+        else:
+            previous = last_seen.rows[rowid]['last_used']
+            if previous >= usage_date:
+                continue
+            last_seen.update(rowid, {'last_used': usage_date})
+            previous_id = active.find_unique({'tool_name': tool, 'usage_date': previous}, ('tool_name', 'usage_date'))
+            if previous_id is not None:
+                active.update(previous_id, {'last_seen_users': active.rows[previous_id]['last_seen_users'] - 1})
+        active_id = active.find_unique({'tool_name': tool, 'usage_date': usage_date}, ('tool_name', 'usage_date'))
+        if active_id is None:
+            active.insert({'tool_name': tool, 'usage_date': usage_date, 'last_seen_users': 1})
+        else:
+            active.update(active_id, {'last_seen_users': active.rows[active_id]['last_seen_users'] + 1})
+    return None
+
+
+def _apply_order_stats_delta(db, p_stat_date, p_membership_type, p_payment_method, p_total_orders=0,
+                             p_paid_orders=0, p_paid_amount=0, p_refunded_orders=0, p_refunded_amount=0):
+    """内存实现：supabase_init.sql中的apply_order_stats_delta"""
+    table = db.table_store('payment_stats_daily')
+    key = {'stat_date': str(p_stat_date), 'membership_type': p_membership_type, 'payment_method': p_payment_method}
+    delta = {'total_orders': p_total_orders, 'paid_orders': p_paid_orders, 'paid_amount': p_paid_amount,
+             'refunded_orders': p_refunded_orders, 'refunded_amount': p_refunded_amount}
+    rowid = table.find_unique(key, ('stat_date', 'membership_type', 'payment_method'))
+    if rowid is None:
+        table.insert({**key, **delta})
+    else:
+        row = table.rows[rowid]
+        table.update(rowid, {k: row.get(k, 0) + v for k, v in delta.items()})
+    return None
+
+
+class MemorySupabaseClient:
+    """内存版Supabase客户端，接口与supabase.Client保持一致"""
+
+    DEFAULT_UNIQUE = {
+        'user_profiles': ['user_id'],
+        'payment_records': ['order_no'],
+        'tool_usage_daily_user': [('user_id', 'tool_name', 'usage_date')],
+        'tool_usage_daily': [('tool_name', 'usage_date')],
+        'tool_usage_last_seen': [('tool_name', 'user_id')],
+        'tool_usage_active_daily': [('tool_name', 'usage_date')],
+        'payment_stats_daily': [('stat_date', 'membership_type', 'payment_method')],
+        'processed_notifications': [('provider', 'out_trade_no', 'trade_status')],
+        'reconciliation_checkpoints': ['name']
+    }
+
+    def __init__(self, config=None, base_url=MEMORY_BASE_URL):
+        self.config = config or MemoryBackendConfig()
+        self.base_url = base_url
+        self.supabase_url = base_url
+        self.lock = threading.RLock()
+        self.tables = {}
+        self.buckets = {}
+        self.functions = {
+            'increment_usage_rollup': _increment_usage_rollup,
+            'apply_order_stats_delta': _apply_order_stats_delta
+        }
+        self.storage = MemoryStorage(self)
+        self.auth = MemoryAuth(self)
+        self._stats_lock = threading.Lock()
+        self.round_trips = 0
+        self.injected_errors = 0
+
+    # ---- 与supabase.Client相同的入口 ----
+
+    def table(self, name):
+        return MemoryQueryBuilder(self, name)
+
+    from_ = table
+
+    def rpc(self, name, params=None):
+        return MemoryRPC(self, name, params)
+
+    # ---- 压测辅助 ----
+
+    def create_table(self, name, unique=None):
+        """声明表及唯一约束（未声明的表在第一次使用时自动创建）"""
+        with self.lock:
+            self.tables[name] = MemoryTable(name, unique)
+            return self.tables[name]
+
+    def table_store(self, name):
+        table = self.tables.get(name)
+        if table is None:
+            with self.lock:
+                table = self.tables.get(name)
+                if table is None:
+                    table = self.tables[name] = MemoryTable(name, self.DEFAULT_UNIQUE.get(name))
+        return table
+
+    def register_rpc(self, name, function):
+        """注册rpc实现：function(db, **params)"""
+        self.functions[name] = function
+
+    def seed_user(self, email, plan='free', **profile):
+        """创建认证用户和user_profiles记录，返回(user_id, access_token)"""
+        user_id, token = self.auth.create_user(email, metadata={'plan': plan})
+        self.table('user_profiles').insert({'id': user_id, 'user_id': user_id, 'email': email, 'plan': plan, **profile}).execute()
+        return user_id, token
+
+    def simulate_round_trip(self, target):
+        """模拟一次网络往返：注入延迟，并按error_rate抛出连接错误"""
+        config = self.config
+        with self._stats_lock:
+            self.round_trips += 1
+            fail = config.error_rate > 0 and config.random.random() < config.error_rate
+            delay = config.latency_ms + (config.random.uniform(0, config.jitter_ms) if config.jitter_ms else 0)
+            if fail:
+                self.injected_errors += 1
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if fail:
+            raise httpx.ConnectError(f'模拟Supabase故障: {target}')
+
+    def stats(self):
+        with self.lock:
+            tables = {name: {'rows': len(t.rows), 'indexes': sorted(t.indexes)} for name, t in self.tables.items()}
+        return {
+            'backend': 'memory',
+            'round_trips': self.round_trips,
+            'injected_errors': self.injected_errors,
+            'config': self.config.to_dict(),
+            'tables': tables
+        }
+
+
+# 全局内存客户端（同一进程内共享数据）
+_memory_client = None
+_memory_lock = threading.Lock()
+
+
+def get_memory_client():
+    """获取全局内存版客户端"""
+    global _memory_client
+    if _memory_client is None:
+        with _memory_lock:
+            if _memory_client is None:
+                _memory_client = MemorySupabaseClient()
+                logger.info(f"使用内存版Supabase后端 {_memory_client.config.to_dict()}")
+    return _memory_client
+
+
+def is_memory_backend():
+    """是否通过SUPABASE_BACKEND=memory启用了内存后端"""
+    return os.getenv('SUPABASE_BACKEND', '').lower() == 'memory'
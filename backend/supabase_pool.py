@@ -0,0 +1,364 @@
+"""
+Supabase共享连接池
+应用级Supabase客户端注册表，所有客户端共享同一个keep-alive HTTP连接池
+主应用、支付蓝图、OrderManager以及UserDB/UsageDB/StorageDB都从这里取客户端，
+避免每个请求重新create_client()导致的重复TCP/TLS握手
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+from storage3 import SyncStorageClient
+from supabase import Client
+from supabase.lib.client_options import ClientOptions
+
+from supabase_resilience import ResilientTransport, get_resilience
+from supabase_memory import get_memory_client, is_memory_backend
+
+logger = logging.getLogger('supabase_pool')
+
+
+class PoolConfig:
+    """连接池配置（从环境变量读取）"""
+
+    def __init__(self):
+        self.max_connections = int(os.getenv('SUPABASE_POOL_MAX_CONNECTIONS', '20'))
+        self.max_keepalive = int(os.getenv('SUPABASE_POOL_MAX_KEEPALIVE', '10'))
+        self.keepalive_expiry = float(os.getenv('SUPABASE_POOL_KEEPALIVE_EXPIRY', '60'))
+        self.connect_timeout = float(os.getenv('SUPABASE_CONNECT_TIMEOUT', '5'))
+        self.read_timeout = float(os.getenv('SUPABASE_READ_TIMEOUT', '15'))
+        self.pool_timeout = float(os.getenv('SUPABASE_POOL_TIMEOUT', '5'))
+
+    def limits(self):
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def timeout(self):
+        return httpx.Timeout(
+            self.read_timeout,
+            connect=self.connect_timeout,
+            pool=self.pool_timeout
+        )
+
+    def to_dict(self):
+        return {
+            'max_connections': self.max_connections,
+            'max_keepalive': self.max_keepalive,
+            'keepalive_expiry': self.keepalive_expiry,
+            'connect_timeout': self.connect_timeout,
+            'read_timeout': self.read_timeout,
+            'pool_timeout': self.pool_timeout
+        }
+
+
+class PoolMetrics:
+    """连接池指标：请求数、连接复用、新建连接、等待连接"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.connections_reused = 0
+            self.connections_opened = 0
+            self.pool_waits = 0
+            self.pool_wait_seconds = 0.0
+            self.in_flight = 0
+            self.peak_in_flight = 0
+            self.errors = 0
+
+    def snapshot(self):
+        with self._lock:
+            reuse_rate = self.connections_reused / self.requests if self.requests else 0
+            return {
+                'requests': self.requests,
+                'connections_reused': self.connections_reused,
+                'connections_opened': self.connections_opened,
+                'reuse_rate': round(reuse_rate, 4),
+                'pool_waits': self.pool_waits,
+                'pool_wait_seconds': round(self.pool_wait_seconds, 4),
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'errors': self.errors
+            }
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    """带指标统计的HTTP传输层，多个httpx客户端共享同一个实例即共享连接池
+    连接数由传输层自己按连接池的限制推算（不读取httpcore内部状态）：
+    - 请求结束后连接放回空闲列表（超过max_keepalive时关闭），空闲超过keepalive_expiry视为已关闭
+    - 请求出错时连接可能已断开，不放回空闲列表
+    所有请求都发往同一个Supabase项目，按单一源统计"""
+
+    def __init__(self, metrics, limits, **kwargs):
+        super().__init__(limits=limits, **kwargs)
+        self.metrics = metrics
+        self.max_connections = limits.max_connections
+        self.max_keepalive = limits.max_keepalive_connections
+        self.keepalive_expiry = limits.keepalive_expiry
+        self._conn_lock = threading.Lock()
+        self._active = 0
+        self._idle = []  # 空闲连接放回的时间（最近的在末尾）
+
+    def _expire_idle(self, now):
+        if self.keepalive_expiry is not None:
+            self._idle = [since for since in self._idle if now - since < self.keepalive_expiry]
+
+    def _classify(self):
+        """判断请求是复用空闲连接、新建连接还是需要排队等待"""
+        with self._conn_lock:
+            self._expire_idle(time.monotonic())
+            if self._idle:
+                self._idle.pop()
+                self._active += 1
+                return 'reused'
+            if self.max_connections is not None and self._active >= self.max_connections:
+                return 'wait'
+            self._active += 1
+            return 'opened'
+
+    def _release(self, kind, keep_alive):
+        """请求结束：连接放回空闲列表或关闭；排队的请求用的是别人释放的连接，不重复计数"""
+        if kind == 'wait':
+            return
+        with self._conn_lock:
+            self._active -= 1
+            if keep_alive and (self.max_keepalive is None or len(self._idle) < self.max_keepalive):
+                self._idle.append(time.monotonic())
+
+    def connection_counts(self):
+        """(打开的连接数, 空闲连接数)"""
+        with self._conn_lock:
+            self._expire_idle(time.monotonic())
+            return self._active + len(self._idle), len(self._idle)
+
+    def handle_request(self, request):
+        metrics = self.metrics
+        kind = self._classify()
+        with metrics._lock:
+            metrics.requests += 1
+            metrics.in_flight += 1
+            metrics.peak_in_flight = max(metrics.peak_in_flight, metrics.in_flight)
+            if kind == 'reused':
+                metrics.connections_reused += 1
+            elif kind == 'opened':
+                metrics.connections_opened += 1
+            else:
+                metrics.pool_waits += 1
+
+        start = time.perf_counter()
+        keep_alive = False
+        try:
+            response = super().handle_request(request)
+            keep_alive = True
+            return response
+        except Exception:
+            with metrics._lock:
+                metrics.errors += 1
+            raise
+        finally:
+            self._release(kind, keep_alive)
+            with metrics._lock:
+                metrics.in_flight -= 1
+                if kind == 'wait':
+                    metrics.pool_wait_seconds += time.perf_counter() - start
+
+
+class _PooledPostgrestClient(SyncPostgrestClient):
+    """使用共享传输层的PostgREST客户端"""
+
+    def __init__(self, base_url, *, transport, **kwargs):
+        self._transport = transport
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout):
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=self._transport
+        )
+
+    def aclose(self):
+        # 传输层由连接池管理，这里不关闭共享连接
+        pass
+
+
+class _PooledStorageClient(SyncStorageClient):
+    """使用共享传输层的Storage客户端"""
+
+    def __init__(self, url, headers, timeout, *, transport):
+        self._transport = transport
+        super().__init__(url, headers, timeout)
+
+    def _create_session(self, base_url, headers, timeout):
+        return SyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=self._transport
+        )
+
+    def aclose(self):
+        pass
+
+
+class PooledClient(Client):
+    """Supabase客户端：表查询和存储请求走共享连接池"""
+
+    def __init__(self, supabase_url, supabase_key, options, transport):
+        self._transport = transport
+        super().__init__(supabase_url, supabase_key, options)
+
+    def _init_postgrest_client(self, rest_url, headers, schema, timeout=None):
+        return _PooledPostgrestClient(
+            rest_url,
+            headers=headers,
+            schema=schema,
+            timeout=timeout,
+            transport=self._transport
+        )
+
+    def _init_storage_client(self, storage_url, headers, storage_client_timeout=None):
+        return _PooledStorageClient(
+            storage_url,
+            headers,
+            storage_client_timeout,
+            transport=self._transport
+        )
+
+    def _get_token_header(self):
+        # 共享客户端始终用服务密钥访问表和存储，某个请求里的用户登录不能改变整个进程的Authorization
+        return {'Authorization': f'Bearer {self.supabase_key}'}
+
+    def session_client(self):
+        """用户注册/登录用的独立客户端（不缓存、不保存和刷新会话），表查询仍走共享连接池"""
+        options = ClientOptions(
+            schema=self.options.schema,
+            auto_refresh_token=False,
+            persist_session=False,
+            postgrest_client_timeout=self.options.postgrest_client_timeout,
+            storage_client_timeout=self.options.storage_client_timeout
+        )
+        return PooledClient(self.supabase_url, self.supabase_key, options, self._transport)
+
+
+class SupabasePool:
+    """应用级客户端注册表：同一(url, key)只创建一个客户端"""
+
+    def __init__(self, config=None, resilience=None):
+        self.config = config or PoolConfig()
+        self.metrics = PoolMetrics()
+        self.resilience = resilience or get_resilience()
+        self._http_transport = None
+        self._transport = None
+        self._clients: Dict[Tuple[str, str, str], Client] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            # 容错层（熔断/预算/重试/对冲）包在共享连接之外
+            self._http_transport = InstrumentedTransport(self.metrics, self.config.limits())
+            self._transport = ResilientTransport(self._http_transport, self.resilience)
+        return self._transport
+
+    def get_client(self, supabase_url, supabase_key, schema=None):
+        """获取（或创建）共享客户端"""
+        if not supabase_url or not supabase_key:
+            raise ValueError("Supabase配置缺失，请检查环境变量")
+
+        cache_key = (supabase_url, supabase_key, schema or 'public')
+        client = self._clients.get(cache_key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(cache_key)
+            if client is None:
+                timeout = self.config.timeout()
+                # 共享客户端只用服务密钥，不保存也不定时刷新用户会话
+                options = ClientOptions(
+                    schema=schema or 'public',
+                    auto_refresh_token=False,
+                    persist_session=False,
+                    postgrest_client_timeout=timeout,
+                    storage_client_timeout=timeout
+                )
+                client = PooledClient(supabase_url, supabase_key, options, self.transport)
+                self._clients[cache_key] = client
+                logger.info(f"创建共享Supabase客户端 (当前客户端数: {len(self._clients)})")
+        return client
+
+    def stats(self):
+        """连接池状态与指标"""
+        stats = self.metrics.snapshot()
+        stats['clients'] = len(self._clients)
+        stats['config'] = self.config.to_dict()
+        if self._http_transport is not None:
+            stats['open_connections'], stats['idle_connections'] = self._http_transport.connection_counts()
+        else:
+            stats['open_connections'] = 0
+            stats['idle_connections'] = 0
+        return stats
+
+    def close(self):
+        """关闭共享连接（仅在进程退出或测试中使用）"""
+        with self._lock:
+            if self._transport is not None:
+                self._transport.close()
+                self._transport = None
+                self._http_transport = None
+            self._clients.clear()
+
+
+# 全局连接池实例
+_pool: Optional[SupabasePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """获取全局连接池"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SupabasePool()
+    return _pool
+
+
+def get_supabase_client(supabase_url=None, supabase_key=None, schema=None):
+    """获取共享Supabase客户端，默认读取SUPABASE_URL和SUPABASE_SERVICE_KEY/SUPABASE_KEY
+    SUPABASE_BACKEND=memory时返回进程内的内存版客户端（压测用）"""
+    if is_memory_backend():
+        return get_memory_client()
+    supabase_url = supabase_url or os.getenv('SUPABASE_URL')
+    supabase_key = supabase_key or os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_KEY')
+    return get_pool().get_client(supabase_url, supabase_key, schema)
+
+
+def get_auth_client(client):
+    """用户注册/登录（sign_up/sign_in_with_password）用的客户端：
+    共享客户端返回每次新建的独立客户端，登录得到的会话不会写进共享客户端；内存版客户端直接返回"""
+    if isinstance(client, PooledClient):
+        return client.session_client()
+    return client
+
+
+def get_pool_metrics():
+    """导出连接池指标（用于健康检查）"""
+    stats = get_pool().stats()
+    if is_memory_backend():
+        stats['memory_backend'] = get_memory_client().stats()
+    return stats
@@ -0,0 +1,503 @@
+"""
+Supabase容错层
+包在共享连接池传输层外面，对所有经过连接池的数据库/存储请求生效：
+- 按操作的延迟预算：整个操作共享一个截止时间，超时设置和重试都不会超出预算
+- 熔断器：按服务(rest/storage)统计连续失败，打开后快速失败，定时放行单个探测请求
+- 对幂等的查询(GET)做有限次数的退避重试，并在慢请求上发送对冲请求，取先返回的结果
+- 过期缓存：熔断或网络故障时返回最近一次成功读取的会员/使用数据
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+
+import httpx
+
+logger = logging.getLogger('supabase_resilience')
+
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+RETRYABLE_STATUS = (502, 503, 504)
+
+
+class CircuitOpenError(httpx.TransportError):
+    """熔断器打开时的快速失败"""
+
+
+class LatencyBudgetExceeded(httpx.TimeoutException):
+    """操作延迟预算耗尽"""
+
+
+class ResilienceConfig:
+    """容错层配置（从环境变量读取）"""
+
+    def __init__(self):
+        self.failure_threshold = int(os.getenv('SUPABASE_BREAKER_FAILURE_THRESHOLD', '5'))
+        self.reset_timeout = float(os.getenv('SUPABASE_BREAKER_RESET_TIMEOUT', '30'))
+        self.read_budget = float(os.getenv('SUPABASE_READ_BUDGET', '3'))
+        self.write_budget = float(os.getenv('SUPABASE_WRITE_BUDGET', '10'))
+        self.storage_budget = float(os.getenv('SUPABASE_STORAGE_BUDGET', '30'))
+        self.read_retries = int(os.getenv('SUPABASE_READ_RETRIES', '2'))
+        self.retry_backoff = float(os.getenv('SUPABASE_RETRY_BACKOFF', '0.05'))
+        self.hedge_enabled = os.getenv('SUPABASE_HEDGE_ENABLED', 'true').lower() == 'true'
+        self.hedge_delay = float(os.getenv('SUPABASE_HEDGE_DELAY', '0.3'))
+        self.hedge_max_ratio = float(os.getenv('SUPABASE_HEDGE_MAX_RATIO', '0.1'))
+        self.hedge_workers = int(os.getenv('SUPABASE_HEDGE_WORKERS', '8'))
+        self.stale_ttl = float(os.getenv('SUPABASE_STALE_TTL', '900'))
+        self.stale_max_entries = int(os.getenv('SUPABASE_STALE_MAX_ENTRIES', '5000'))
+
+    def operation_budget(self, operation, default):
+        """单个操作的预算：环境变量SUPABASE_BUDGET_<OPERATION>优先"""
+        value = os.getenv(f'SUPABASE_BUDGET_{operation.upper()}')
+        return float(value) if value else default
+
+    def to_dict(self):
+        return {
+            'failure_threshold': self.failure_threshold,
+            'reset_timeout': self.reset_timeout,
+            'read_budget': self.read_budget,
+            'write_budget': self.write_budget,
+            'storage_budget': self.storage_budget,
+            'read_retries': self.read_retries,
+            'hedge_enabled': self.hedge_enabled,
+            'hedge_delay': self.hedge_delay,
+            'hedge_max_ratio': self.hedge_max_ratio,
+            'stale_ttl': self.stale_ttl
+        }
+
+
+class CircuitBreaker:
+    """熔断器：closed -> open(快速失败) -> half_open(单个探测) -> closed"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self.successes = 0
+        self.failures = 0
+        self.last_trip_at = None
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """是否放行请求；半开状态只放行一个探测请求"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self._state = self.HALF_OPEN
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            if self._state != self.CLOSED:
+                logger.info(f"熔断器[{self.name}]探测成功，恢复正常")
+            self._state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            probe_failed = self._state == self.HALF_OPEN
+            self._probe_in_flight = False
+            if probe_failed or (self._state == self.CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self.trips += 1
+                self.last_trip_at = time.time()
+                logger.warning(f"熔断器[{self.name}]打开 (连续失败 {self.consecutive_failures} 次)")
+
+    def snapshot(self):
+        state = self.state
+        with self._lock:
+            return {
+                'state': state,
+                'trips': self.trips,
+                'rejected': self.rejected,
+                'consecutive_failures': self.consecutive_failures,
+                'successes': self.successes,
+                'failures': self.failures,
+                'last_trip_at': self.last_trip_at
+            }
+
+
+class StaleCache:
+    """最近一次成功读取结果的LRU缓存，仅在故障时使用"""
+
+    def __init__(self, ttl=900.0, max_entries=5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def snapshot(self):
+        with self._lock:
+            return {'entries': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+
+class OperationStats:
+    """按操作统计调用、失败和预算耗尽次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    def record(self, operation, field):
+        with self._lock:
+            stats = self._ops.setdefault(operation, {'requests': 0, 'failures': 0, 'budget_exceeded': 0})
+            stats[field] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._ops.items()}
+
+
+class SupabaseResilience:
+    """容错层状态：熔断器、对冲统计、延迟预算和过期缓存"""
+
+    def __init__(self, config=None):
+        self.config = config or ResilienceConfig()
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._local = threading.local()
+        self.operations = OperationStats()
+        self.stale_cache = StaleCache(self.config.stale_ttl, self.config.stale_max_entries)
+        self.retries = 0
+        self.hedgeable_reads = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self._latencies = deque(maxlen=200)
+        self._hedge_delay = self.config.hedge_delay
+
+    def breaker(self, service):
+        breaker = self._breakers.get(service)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    service,
+                    CircuitBreaker(service, self.config.failure_threshold, self.config.reset_timeout)
+                )
+        return breaker
+
+    def is_degraded(self):
+        return any(b.state != CircuitBreaker.CLOSED for b in list(self._breakers.values()))
+
+    # ---- 延迟预算 ----
+
+    @contextmanager
+    def budget(self, operation, seconds=None):
+        """在一个操作内共享截止时间，嵌套时取更早的截止时间"""
+        stack = self._budget_stack()
+        seconds = seconds if seconds is not None else self.config.operation_budget(operation, self.config.read_budget)
+        deadline = time.monotonic() + seconds
+        if stack:
+            deadline = min(deadline, stack[-1][1])
+        stack.append((operation, deadline))
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def _budget_stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current_budget(self, service, idempotent):
+        """返回(操作名, 截止时间)；没有显式预算时按请求类型取默认值"""
+        stack = self._budget_stack()
+        if stack:
+            return stack[-1]
+        if service == 'storage':
+            return 'storage', time.monotonic() + self.config.storage_budget
+        if idempotent:
+            return 'read', time.monotonic() + self.config.read_budget
+        return 'write', time.monotonic() + self.config.write_budget
+
+    # ---- 对冲请求 ----
+
+    def hedge_delay(self):
+        return self._hedge_delay
+
+    def record_latency(self, seconds):
+        """记录查询延迟，每20个样本按p95更新对冲等待时间"""
+        with self._lock:
+            self._latencies.append(seconds)
+            if len(self._latencies) >= 20 and len(self._latencies) % 20 == 0:
+                ordered = sorted(self._latencies)
+                p95 = ordered[int(len(ordered) * 0.95) - 1]
+                self._hedge_delay = max(0.02, min(p95, self.config.hedge_delay * 4))
+
+    def try_reserve_hedge(self):
+        """对冲请求数量不超过查询数的hedge_max_ratio"""
+        with self._lock:
+            if self.hedges_sent + 1 > max(1.0, self.hedgeable_reads * self.config.hedge_max_ratio):
+                return False
+            self.hedges_sent += 1
+            return True
+
+    # ---- 过期缓存 ----
+
+    def cached_read(self, key, loader):
+        """执行读取并缓存结果；网络故障或熔断时返回缓存的旧数据"""
+        try:
+            value = loader()
+        except Exception as e:
+            if isinstance(e, httpx.TransportError) or self.is_degraded():
+                cached = self.stale_cache.get(key)
+                if cached is not None:
+                    logger.warning(f"Supabase不可用，使用缓存数据 {key}: {e}")
+                    return cached
+            raise
+        self.stale_cache.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            hedging = {
+                'enabled': self.config.hedge_enabled,
+                'current_delay': round(self._hedge_delay, 4),
+                'hedgeable_reads': self.hedgeable_reads,
+                'hedges_sent': self.hedges_sent,
+                'hedge_wins': self.hedge_wins
+            }
+            retries = self.retries
+        return {
+            'degraded': self.is_degraded(),
+            'breakers': {name: b.snapshot() for name, b in list(self._breakers.items())},
+            'retries': retries,
+            'hedging': hedging,
+            'operations': self.operations.snapshot(),
+            'stale_cache': self.stale_cache.snapshot(),
+            'config': self.config.to_dict()
+        }
+
+
+def _service_of(path):
+    """根据URL路径区分Supabase服务：/rest/v1、/storage/v1..."""
+    parts = path.strip('/').split('/', 1)
+    return parts[0] if parts and parts[0] else 'other'
+
+
+class ResilientTransport(httpx.BaseTransport):
+    """在共享传输层外加熔断、预算、重试和对冲"""
+
+    def __init__(self, inner, resilience):
+        self.inner = inner
+        self.resilience = resilience
+        config = resilience.config
+        self._executor = ThreadPoolExecutor(max_workers=config.hedge_workers, thread_name_prefix='supabase-hedge')
+        self._slots = threading.Semaphore(config.hedge_workers)
+
+    def handle_request(self, request):
+        res = self.resilience
+        service = _service_of(request.url.path)
+        breaker = res.breaker(service)
+        idempotent = request.method in IDEMPOTENT_METHODS
+        operation, deadline = res.current_budget(service, idempotent)
+        attempts = 1 + (res.config.read_retries if idempotent else 0)
+        hedge = idempotent and service == 'rest' and res.config.hedge_enabled
+        res.operations.record(operation, 'requests')
+
+        last_error = None
+        for attempt in range(attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not breaker.allow():
+                raise CircuitOpenError(f"Supabase {service} 熔断中，快速失败", request=request)
+
+            self._apply_deadline(request, remaining)
+            started = time.monotonic()
+            try:
+                if hedge and breaker.state == CircuitBreaker.CLOSED:
+                    response = self._hedged(request, deadline)
+                else:
+                    response = self.inner.handle_request(request)
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                res.operations.record(operation, 'failures')
+                last_error = e
+            else:
+                if response.status_code < 500:
+                    breaker.record_success()
+                    if idempotent:
+                        res.record_latency(time.monotonic() - started)
+                    return response
+                breaker.record_failure()
+                res.operations.record(operation, 'failures')
+                if response.status_code not in RETRYABLE_STATUS or attempt == attempts - 1:
+                    return response
+                response.close()
+                last_error = None
+
+            if attempt < attempts - 1:
+                backoff = res.config.retry_backoff * (2 ** attempt) * (0.5 + random.random())
+                if time.monotonic() + backoff >= deadline:
+                    break
+                with res._lock:
+                    res.retries += 1
+                time.sleep(backoff)
+
+        if isinstance(last_error, httpx.TransportError) and not isinstance(last_error, httpx.TimeoutException):
+            raise last_error
+        res.operations.record(operation, 'budget_exceeded')
+        raise LatencyBudgetExceeded(f"Supabase操作[{operation}]超出延迟预算", request=request)
+
+    def _apply_deadline(self, request, remaining):
+        """把httpx超时收紧到剩余预算之内"""
+        timeout = dict(request.extensions.get('timeout') or {})
+        for key in ('connect', 'read', 'write', 'pool'):
+            current = timeout.get(key)
+            timeout[key] = remaining if current is None else min(current, remaining)
+        request.extensions = {**request.extensions, 'timeout': timeout}
+
+    def _submit(self, request):
+        """在后台线程发送请求；没有空闲线程时返回None"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        try:
+            future = self._executor.submit(self.inner.handle_request, request)
+        except RuntimeError:
+            self._slots.release()
+            return None
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    @staticmethod
+    def _discard(future):
+        """放弃未采用的请求，完成后关闭响应归还连接"""
+        def _close(f):
+            if not f.cancelled() and f.exception() is None:
+                f.result().close()
+        future.add_done_callback(_close)
+
+    def _hedged(self, request, deadline):
+        res = self.resilience
+        with res._lock:
+            res.hedgeable_reads += 1
+
+        primary = self._submit(request)
+        if primary is None:
+            return self.inner.handle_request(request)
+
+        done, _ = wait([primary], timeout=max(0.0, min(res.hedge_delay(), deadline - time.monotonic())))
+        pending = {primary}
+        hedge = None
+        if not done and deadline > time.monotonic() and res.try_reserve_hedge():
+            hedge = self._submit(request)
+            if hedge is not None:
+                pending.add(hedge)
+
+        fallback = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    self._discard(future)
+                if fallback is not None:
+                    self._discard(fallback)
+                raise LatencyBudgetExceeded("Supabase查询超出延迟预算", request=request)
+            for future in done:
+                if future.exception() is None and future.result().status_code < 500:
+                    for other in pending:
+                        self._discard(other)
+                    if fallback is not None:
+                        self._discard(fallback)
+                    if future is hedge:
+                        with res._lock:
+                            res.hedge_wins += 1
+                    return future.result()
+                if fallback is None:
+                    fallback = future
+                else:
+                    self._discard(future)
+
+        # 两个请求都失败：返回/抛出最先失败的结果
+        if fallback.exception() is not None:
+            raise fallback.exception()
+        return fallback.result()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.inner.close()
+
+
+# 全局容错层实例
+_resilience = None
+_resilience_lock = threading.Lock()
+
+
+def get_resilience():
+    """获取全局容错层"""
+    global _resilience
+    if _resilience is None:
+        with _resilience_lock:
+            if _resilience is None:
+                _resilience = SupabaseResilience()
+    return _resilience
+
+
+def latency_budget(operation, seconds=None):
+    """为一段数据库操作设置延迟预算：with latency_budget('plan_lookup', 1.0): ..."""
+    return get_resilience().budget(operation, seconds)
+
+
+def cached_read(key, loader):
+    """读取会员/使用数据，故障时返回缓存的旧数据"""
+    return get_resilience().cached_read(key, loader)
+
+
+def get_resilience_stats():
+    """导出熔断器状态和触发次数（用于健康检查）"""
+    return get_resilience().stats()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+测试订单列表游标分页（模拟Supabase客户端）
+"""
+
+import sys
+import os
+from unittest.mock import Mock
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _orders(count):
+    return [
+        {'id': f'id-{i:03d}', 'order_no': f'ORDER{i}', 'created_at': f'2025-12-01T10:00:{59 - i:02d}', 'status': 'paid'}
+        for i in range(count)
+    ]
+
+
+def _query(rows):
+    query = Mock()
+    for method in ('select', 'eq', 'gte', 'lte', 'order', 'limit', 'range', 'or_'):
+        getattr(query, method).return_value = query
+    query.execute.return_value = Mock(data=rows)
+    return query
+
+
+def test_first_page_returns_cursor():
+    """测试首页多取一条并返回next_cursor"""
+    print("=== 测试首页游标 ===")
+
+    from order_manager import OrderManager
+
+    query = _query(_orders(6))
+    mock_supabase = Mock()
+    mock_supabase.table.return_value = query
+    manager = OrderManager(mock_supabase)
+
+    result = manager.get_user_orders('real-id', limit=5)
+    assert result['success'], result
+    assert len(result['orders']) == 5
+    assert result['has_more'] is True
+    query.limit.assert_called_with(6)
+    query.range.assert_not_called()
+
+    columns = query.select.call_args[0][0]
+    assert '*' not in columns and 'order_no' in columns
+    print("✅ 首页返回5条、next_cursor和投影字段")
+
+    created_at, order_id = manager._decode_cursor(result['next_cursor'])
+    assert (created_at, order_id) == ('2025-12-01T10:00:55', 'id-004')
+    print("✅ 游标编码为最后一条的(created_at, id)")
+
+
+def test_next_page_uses_keyset_filter():
+    """测试带游标的请求使用(created_at, id)条件而不是offset"""
+    print("\n=== 测试游标翻页 ===")
+
+    from order_manager import OrderManager
+
+    query = _query(_orders(2))
+    mock_supabase = Mock()
+    mock_supabase.table.return_value = query
+    manager = OrderManager(mock_supabase)
+
+    cursor = manager._encode_cursor({'created_at': '2025-12-01T10:00:55', 'id': 'id-004'})
+    result = manager.list_orders(status='all', limit=5, cursor=cursor)
+
+    assert result['success'], result
+    assert result['next_cursor'] is None and result['has_more'] is False
+    expression = query.or_.call_args[0][0]
+    assert 'created_at.lt."2025-12-01T10:00:55"' in expression
+    assert 'id.lt.id-004' in expression
+    print("✅ 翻页使用keyset条件，最后一页无next_cursor")
+
+
+def test_invalid_cursor_rejected():
+    """测试非法游标返回错误"""
+    print("\n=== 测试非法游标 ===")
+
+    from order_manager import OrderManager
+
+    mock_supabase = Mock()
+    mock_supabase.table.return_value = _query([])
+    result = OrderManager(mock_supabase).list_orders(cursor='not-a-cursor')
+    assert result['success'] is False
+    print("✅ 非法游标被拒绝")
+
+
+if __name__ == "__main__":
+    test_first_page_returns_cursor()
+    test_next_page_uses_keyset_filter()
+    test_invalid_cursor_rejected()
+    print("\n🎉 订单分页测试通过！")
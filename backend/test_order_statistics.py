@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+测试OrderManager按天维护的订单统计（模拟Supabase客户端）
+"""
+
+import sys
+import os
+from unittest.mock import Mock
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _chain(data):
+    """链式查询模拟：任意过滤方法返回自身，execute返回data"""
+    query = Mock()
+    for method in ('select', 'eq', 'gte', 'lte', 'update', 'insert', 'order', 'limit'):
+        getattr(query, method).return_value = query
+    query.execute.return_value = Mock(data=data)
+    return query
+
+
+def _rpc_deltas(mock_supabase):
+    return [call[0][1] for call in mock_supabase.rpc.call_args_list if call[0][0] == 'apply_order_stats_delta']
+
+
+def test_status_transitions_apply_deltas():
+    """测试创建、支付、退款时统计增量"""
+    print("=== 测试订单统计增量 ===")
+
+    from order_manager import OrderManager
+
+    order = {
+        'order_no': 'ORDER1', 'user_id': 'real-id', 'status': 'pending', 'amount': 1900,
+        'membership_type': 'basic', 'payment_method': 'alipay', 'created_at': '2025-12-01T10:00:00'
+    }
+    mock_supabase = Mock()
+    tables = {
+        'user_profiles': _chain([{'id': 'real-id'}]),
+        'payment_records': _chain([order])
+    }
+    mock_supabase.table.side_effect = lambda name: tables[name]
+    manager = OrderManager(mock_supabase)
+
+    result = manager.create_order('user-1', 'basic', 'alipay')
+    assert result['success'], result
+    deltas = _rpc_deltas(mock_supabase)
+    assert deltas[-1]['p_total_orders'] == 1 and deltas[-1]['p_paid_orders'] == 0
+    assert deltas[-1]['p_stat_date'] == '2025-12-01'
+    print("✅ 创建订单计入total_orders")
+
+    result = manager.update_order_status('ORDER1', 'paid')
+    assert result['success'], result
+    deltas = _rpc_deltas(mock_supabase)
+    assert deltas[-1]['p_paid_orders'] == 1 and deltas[-1]['p_paid_amount'] == 1900
+    print("✅ 支付成功计入paid_orders")
+
+    # 同一状态重复通知不产生增量
+    order['status'] = 'paid'
+    count = len(_rpc_deltas(mock_supabase))
+    manager.update_order_status('ORDER1', 'paid')
+    assert len(_rpc_deltas(mock_supabase)) == count
+    print("✅ 重复状态不重复计数")
+
+    manager.update_order_status('ORDER1', 'refunded')
+    deltas = _rpc_deltas(mock_supabase)
+    assert deltas[-1]['p_paid_orders'] == -1 and deltas[-1]['p_refunded_orders'] == 1
+    assert deltas[-1]['p_paid_amount'] == -1900 and deltas[-1]['p_refunded_amount'] == 1900
+    print("✅ 退款从paid移到refunded")
+
+
+def test_lost_race_applies_observed_transition():
+    """测试条件更新被并发请求抢先时，按重新读取到的状态计算增量"""
+    print("\n=== 测试并发状态修改 ===")
+
+    from order_manager import OrderManager
+
+    pending = {
+        'order_no': 'ORDER2', 'status': 'pending', 'amount': 1900,
+        'membership_type': 'basic', 'payment_method': 'alipay', 'created_at': '2025-12-01T10:00:00'
+    }
+    paid = dict(pending, status='paid')
+    records = _chain(None)
+    # 读到pending -> 条件更新落空（另一请求已改成paid）-> 重新读到paid -> 条件更新成功
+    records.execute.side_effect = [Mock(data=[pending]), Mock(data=[]), Mock(data=[paid]),
+                                   Mock(data=[dict(paid, status='refunded')])]
+    mock_supabase = Mock()
+    mock_supabase.table.return_value = records
+    manager = OrderManager(mock_supabase)
+
+    result = manager.update_order_status('ORDER2', 'refunded')
+    assert result['success'], result
+    deltas = _rpc_deltas(mock_supabase)
+    assert len(deltas) == 1
+    assert deltas[0]['p_paid_orders'] == -1 and deltas[0]['p_refunded_orders'] == 1
+    print("✅ 按实际发生的paid -> refunded累加统计")
+
+    # 一直被抢先时直接更新并重建当天统计
+    records.execute.side_effect = [Mock(data=[pending]), Mock(data=[])] * 3 + [Mock(data=[paid])]
+    mock_supabase.rpc.reset_mock()
+    result = manager.update_order_status('ORDER2', 'paid')
+    assert result['success'], result
+    calls = [call[0] for call in mock_supabase.rpc.call_args_list]
+    assert calls == [('rebuild_order_stats', {'p_start_date': '2025-12-01', 'p_end_date': '2025-12-01'})]
+    print("✅ 多次冲突后重建当天统计")
+
+
+def test_statistics_combine_day_buckets():
+    """测试全站统计合并日期桶"""
+    print("\n=== 测试统计合并 ===")
+
+    from order_manager import OrderManager
+
+    rows = [
+        {'stat_date': '2025-12-01', 'membership_type': 'basic', 'payment_method': 'alipay',
+         'total_orders': 4, 'paid_orders': 2, 'paid_amount': 3800, 'refunded_orders': 0, 'refunded_amount': 0},
+        {'stat_date': '2025-12-02', 'membership_type': 'professional', 'payment_method': 'wechat',
+         'total_orders': 2, 'paid_orders': 1, 'paid_amount': 9900, 'refunded_orders': 1, 'refunded_amount': 9900},
+    ]
+    mock_supabase = Mock()
+    mock_supabase.table.return_value = _chain(rows)
+
+    result = OrderManager(mock_supabase).get_order_statistics(start_date='2025-12-01', end_date='2025-12-31')
+    stats = result['statistics']
+    print(f"统计结果: {stats}")
+
+    assert mock_supabase.table.call_args[0][0] == 'payment_stats_daily'
+    assert stats['total_orders'] == 6
+    assert stats['paid_orders'] == 3
+    assert stats['total_amount'] == 13700
+    assert stats['conversion_rate'] == 0.5
+    assert stats['plan_statistics']['basic'] == {'count': 2, 'amount': 3800}
+    assert stats['payment_method_statistics']['wechat'] == {'count': 1, 'amount': 9900}
+    assert stats['daily_statistics']['2025-12-02']['amount'] == 9900
+    print("✅ 统计由日期桶合并得出")
+
+
+if __name__ == "__main__":
+    test_status_transitions_apply_deltas()
+    test_lost_race_applies_observed_transition()
+    test_statistics_combine_day_buckets()
+    print("\n🎉 订单统计测试通过！")
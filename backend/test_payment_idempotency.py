@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+测试支付通知幂等处理：内存LRU、持久化记录、失败重试、同一订单并发通知（内存版Supabase）
+"""
+
+import sys
+import os
+import time
+import threading
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from supabase_memory import MemorySupabaseClient
+from payment_idempotency import NotificationDeduper
+
+
+def test_deduper():
+    """测试去重逻辑"""
+    print("=== 测试通知去重 ===")
+
+    db = MemorySupabaseClient()
+    deduper = NotificationDeduper(db)
+    calls = []
+
+    def handler():
+        calls.append(1)
+        return {'success': True}
+
+    assert deduper.process('alipay', 'ORDER001', 'TRADE_SUCCESS', handler) == {'success': True, 'duplicate': False}
+    round_trips = db.round_trips
+    assert deduper.process('alipay', 'ORDER001', 'TRADE_SUCCESS', handler)['duplicate']
+    assert len(calls) == 1 and db.round_trips == round_trips
+    print("✅ 重复通知直接确认，不访问数据库")
+
+    # 不同交易状态、不同渠道各自处理
+    deduper.process('alipay', 'ORDER001', 'TRADE_FINISHED', handler)
+    deduper.process('wechat', 'ORDER001', 'TRADE_SUCCESS', handler)
+    assert len(calls) == 3
+
+    restarted = NotificationDeduper(db)
+    assert restarted.process('alipay', 'ORDER001', 'TRADE_SUCCESS', handler)['duplicate'] and len(calls) == 3
+    assert restarted.get_stats()['stored_duplicates'] == 1
+    print("✅ 重启后依靠processed_notifications表识别已处理的通知")
+
+    failures = iter([{'success': False, 'error': '更新订单失败'}])
+    result = deduper.process('alipay', 'ORDER002', 'TRADE_SUCCESS', lambda: next(failures, None) or handler())
+    assert not result['success'] and not result['duplicate']
+    assert deduper.process('alipay', 'ORDER002', 'TRADE_SUCCESS', lambda: next(failures, None) or handler())['success']
+    assert len(calls) == 4
+    print("✅ 处理失败不记录，重试时重新处理")
+
+
+def test_concurrent_duplicates():
+    """测试同一订单的并发重复通知"""
+    print("\n=== 测试并发重复通知 ===")
+
+    deduper = NotificationDeduper(MemorySupabaseClient())
+    calls = []
+
+    def slow_handler():
+        calls.append(1)
+        time.sleep(0.05)
+        return {'success': True}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        deduper.process('mzfpay', 'ORDER003', 'TRADE_SUCCESS', slow_handler))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and sum(not r['duplicate'] for r in results) == 1
+    assert all(r['success'] for r in results) and deduper.get_stats()['locked_orders'] == 0
+    print("✅ 20个并发通知只处理一次，订单锁用完即释放")
+
+
+def test_alipay_notify_route():
+    """测试支付宝通知接口"""
+    print("\n=== 测试支付宝通知接口 ===")
+
+    from flask import Flask
+    import payment_api
+    import payment_idempotency
+
+    db = MemorySupabaseClient()
+    user_id, _ = db.seed_user('buyer@example.com')
+    db.table('payment_records').insert({
+        'order_no': 'ORDER100', 'user_id': user_id, 'amount': 19.0, 'status': 'pending',
+        'membership_type': 'basic', 'membership_duration': 1, 'payment_method': 'alipay'
+    }).execute()
+    original = payment_api.get_supabase_client, os.environ.get('FLASK_ENV')
+    payment_api.get_supabase_client = lambda: db
+    os.environ['FLASK_ENV'] = 'development'  # 沙箱模式不要求支付宝公钥
+    try:
+        app = Flask(__name__)
+        app.register_blueprint(payment_api.payment_bp)
+        client = app.test_client()
+        form = {'out_trade_no': 'ORDER100', 'trade_status': 'TRADE_SUCCESS', 'trade_no': '2025001'}
+
+        assert client.post('/api/payment/alipay/notify', data=form).get_data(as_text=True) == 'success'
+        round_trips = db.round_trips
+        for _ in range(3):
+            assert client.post('/api/payment/alipay/notify', data=form).get_data(as_text=True) == 'success'
+        assert db.round_trips == round_trips
+
+        # 交易结束后支付宝再发TRADE_FINISHED，与TRADE_SUCCESS共用幂等键
+        finished = dict(form, trade_status='TRADE_FINISHED')
+        assert client.post('/api/payment/alipay/notify', data=finished).get_data(as_text=True) == 'success'
+        assert db.round_trips == round_trips
+
+        # 去重记录丢失时（如换了进程且记录写入失败），已是paid的订单也不会再次激活
+        payment_idempotency._dedupers.clear()
+        db.table('processed_notifications').delete().eq('out_trade_no', 'ORDER100').execute()
+        assert client.post('/api/payment/alipay/notify', data=finished).get_data(as_text=True) == 'success'
+    finally:
+        payment_api.get_supabase_client = original[0]
+        if original[1] is None:
+            os.environ.pop('FLASK_ENV', None)
+        else:
+            os.environ['FLASK_ENV'] = original[1]
+
+    order = db.table('payment_records').select('*').eq('order_no', 'ORDER100').execute().data[0]
+    assert order['status'] == 'paid' and order['transaction_id'] == '2025001'
+    assert len(db.table('membership_logs').select('*').execute().data) == 1
+    print("✅ 订单只更新、会员只激活一次，重发的通知和TRADE_FINISHED不产生数据库往返")
+
+
+if __name__ == "__main__":
+    test_deduper()
+    test_concurrent_duplicates()
+    test_alipay_notify_route()
+    print("\n🎉 支付通知幂等测试通过！")
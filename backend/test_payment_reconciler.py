@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+测试待支付订单对账：并发查询、状态更新、与异步通知共用去重、检查点续跑（内存版Supabase + 模拟支付渠道）
+"""
+
+import sys
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from supabase_memory import MemorySupabaseClient
+from payment_reconciler import (ReconciliationWorker, FakePaymentProvider, ProviderLimit,
+                                PAID, CLOSED, NOT_FOUND, normalize_alipay, normalize_wechat)
+from payment_idempotency import PAID_STATUS, get_notification_deduper
+from mzfpay_client import MzfPayClient
+
+METHODS = ['alipay', 'wechat', 'mzfpay']
+
+
+def _setup(count, age_hours=2, latency=0.0):
+    db = MemorySupabaseClient()
+    user_id, _ = db.seed_user('buyer@example.com')
+    start = datetime.now(timezone.utc) - timedelta(hours=age_hours)
+    for i in range(count):
+        db.table('payment_records').insert({
+            'order_no': f'ORDER{i:03d}', 'user_id': user_id, 'amount': 19.0, 'status': 'pending',
+            'membership_type': 'basic', 'membership_duration': 1, 'payment_method': METHODS[i % 3],
+            'created_at': (start + timedelta(seconds=i)).isoformat()
+        }).execute()
+    providers = {name: FakePaymentProvider(name, latency=latency) for name in METHODS}
+    return db, providers
+
+
+def _status(db, order_no):
+    return db.table('payment_records').select('status').eq('order_no', order_no).execute().data[0]['status']
+
+
+def test_reconcile():
+    """测试对账结果"""
+    print("=== 测试订单对账 ===")
+
+    db, providers = _setup(30, latency=0.02)
+    for i in range(0, 30, 2):
+        providers[METHODS[i % 3]].set_state(f'ORDER{i:03d}', PAID)
+    providers['alipay'].set_state('ORDER003', CLOSED)
+    providers['wechat'].set_state('ORDER001', NOT_FOUND)
+    # 刚创建的订单还在等待用户付款，不参与对账
+    db.table('payment_records').insert({'order_no': 'NEW', 'payment_method': 'alipay', 'status': 'pending',
+                                        'amount': 19.0, 'membership_type': 'basic', 'membership_duration': 1}).execute()
+
+    limits = {name: ProviderLimit(name, concurrency=4) for name in METHODS}
+    worker = ReconciliationWorker(db, clients=providers, limits=limits, page_size=10)
+    started = time.perf_counter()
+    totals = worker.run_once()
+    elapsed = time.perf_counter() - started
+
+    assert totals['checked'] == 30 and totals['paid'] == 15 and totals['completed']
+    assert totals['still_pending'] == 15 and totals['failed'] == 0
+    assert _status(db, 'ORDER000') == 'paid' and _status(db, 'ORDER001') == 'pending' and _status(db, 'NEW') == 'pending'
+    assert len(db.table('membership_logs').select('*').execute().data) == 15
+    assert max(p.max_concurrent for p in providers.values()) > 1 and elapsed < 30 * 0.02
+    print(f"✅ 30笔订单并发查询耗时 {elapsed * 1000:.0f}ms，补单15笔并激活会员")
+
+    # 创建超过24小时仍关闭或不存在的订单标记为failed
+    worker.expire_after = timedelta(hours=1)
+    totals = worker.run_once()
+    assert totals['checked'] == 15 and totals['paid'] == 0 and totals['failed'] == 2
+    assert _status(db, 'ORDER003') == 'failed' and _status(db, 'ORDER001') == 'failed'
+    worker.stop()
+    print("✅ 已支付订单不再查询，关闭/不存在的过期订单标记为failed")
+
+
+def test_shared_dedup_and_checkpoint():
+    """测试与异步通知共用去重，以及检查点续跑"""
+    print("\n=== 测试去重和检查点 ===")
+
+    db, providers = _setup(9)
+    for i in range(9):
+        providers[METHODS[i % 3]].set_state(f'ORDER{i:03d}', PAID)
+    # ORDER000的异步通知已处理过；对账查到的是TRADE_FINISHED，与通知共用同一个幂等键
+    get_notification_deduper(db).process('alipay', 'ORDER000', PAID_STATUS, lambda: {'success': True})
+    providers['alipay'].finished = True
+
+    worker = ReconciliationWorker(db, clients=providers, page_size=3)
+    totals = worker.run_once(max_pages=1)
+    assert totals['checked'] == 3 and totals['already_paid'] == 1 and not totals['completed']
+    checkpoint = worker.load_checkpoint()
+    assert checkpoint['cursor_id'] and checkpoint['stats']['pages'] == 1
+    print("✅ 异步通知已处理的订单不会重复激活，中断时保存检查点")
+
+    totals = worker.run_once()
+    assert totals['checked'] == 6 and totals['paid'] == 6 and totals['completed']
+    checkpoint = worker.load_checkpoint()
+    assert checkpoint['cursor_id'] is None and checkpoint['last_completed_at']
+    assert sum(p.calls for p in providers.values()) == 9
+    worker.stop()
+    print("✅ 从检查点继续，一轮扫完后检查点重置")
+
+    assert normalize_alipay({'code': '20000'})[0] == 'error'
+    assert normalize_wechat({'return_code': 'SUCCESS', 'result_code': 'SUCCESS', 'trade_state': 'USERPAYING'})[0] == 'pending'
+    print("✅ 查询失败和支付中的订单留到下一轮")
+
+
+def test_provider_without_query():
+    """测试没有查询接口的码支付：不发请求，过期后标记为failed"""
+    print("\n=== 测试码支付对账 ===")
+
+    db, _ = _setup(3)
+    mzfpay = MzfPayClient('merchant', 'key')
+    worker = ReconciliationWorker(db, clients={'mzfpay': mzfpay}, limits={'mzfpay': ProviderLimit('mzfpay')})
+    totals = worker.run_once()
+    assert totals['checked'] == 1 and totals['still_pending'] == 1 and totals['skipped'] == 2
+    assert worker.get_stats()['mzfpay']['calls'] == 0
+    print("✅ 码支付订单不调用待实现的query_order")
+
+    worker.expire_after = timedelta(hours=1)
+    totals = worker.run_once()
+    assert totals['failed'] == 1 and _status(db, 'ORDER002') == 'failed'
+    worker.stop()
+    print("✅ 异步通知一直没到的码支付订单过期后标记为failed")
+
+
+if __name__ == "__main__":
+    test_reconcile()
+    test_shared_dedup_and_checkpoint()
+    test_provider_without_query()
+    print("\n🎉 订单对账测试通过！")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+测试支付签名服务：密钥缓存、支付宝RSA2验签、码支付MD5签名、批量签名/验签
+"""
+
+import sys
+import os
+import io
+import hashlib
+import contextlib
+
+from Crypto.PublicKey import RSA
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from payment_signing import RSASigner, MD5Signer, build_sign_string, load_private_key, benchmark
+from alipay_client import AlipayClient
+from mzfpay_client import MzfPayClient
+
+_KEY = RSA.generate(2048)
+PRIVATE_PEM = _KEY.export_key(pkcs=8).decode('utf-8')
+# 支付宝后台复制的公钥只有base64正文
+PUBLIC_BODY = ''.join(_KEY.publickey().export_key().decode('utf-8').splitlines()[1:-1])
+
+
+def test_alipay_verify():
+    """测试支付宝通知验签"""
+    print("=== 测试支付宝RSA2验签 ===")
+
+    client = AlipayClient('2021', PRIVATE_PEM, '', alipay_public_key=PUBLIC_BODY)
+    notify = {'out_trade_no': 'ORDER001', 'trade_status': 'TRADE_SUCCESS', 'total_amount': '19.00',
+              'trade_no': '2025', 'sign_type': 'RSA2', 'empty': ''}
+    # 模拟支付宝用同一对密钥签名通知
+    notify['sign'] = RSASigner(PRIVATE_PEM).sign(build_sign_string(notify, exclude=('sign', 'sign_type')))
+
+    assert client.verify_notify(notify)
+    assert not client.verify_notify(dict(notify, total_amount='0.01'))
+    assert not client.verify_notify(dict(notify, sign='bm90IGEgc2lnbmF0dXJl'))
+    assert not client.verify_notify({k: v for k, v in notify.items() if k != 'sign'})
+    assert client.verify_notify_many([notify, dict(notify, trade_no='x')]) == [True, False]
+    print("✅ 真实签名通过，篡改金额、伪造签名、缺少签名都被拒绝")
+
+    assert not AlipayClient('2021', PRIVATE_PEM, '').verify_notify(notify)
+    assert AlipayClient('2021', PRIVATE_PEM, '', debug=True).verify_notify(notify)
+    print("✅ 未配置支付宝公钥时仅沙箱模式放行")
+
+    load_private_key.cache_clear()
+    params = [{'app_id': '2021', 'out_trade_no': f'ORDER{i}'} for i in range(5)]
+    signatures = client.sign_many(params)
+    assert signatures[0] == client._generate_sign(params[0])
+    assert load_private_key.cache_info().misses == 1
+    assert AlipayClient('2021', PRIVATE_PEM, '')._generate_sign(params[1]) == signatures[1]
+    assert load_private_key.cache_info().misses == 1
+    print("✅ 私钥只解析一次，新建客户端也复用缓存的密钥对象")
+
+
+def test_mzfpay_sign():
+    """测试码支付MD5签名"""
+    print("\n=== 测试码支付签名 ===")
+
+    client = MzfPayClient('1001', 'secret')
+    params = {'pid': '1001', 'type': 'alipay', 'out_trade_no': 'ORDER001', 'name': ' 会员 ', 'money': '19.00',
+              'sign_type': 'MD5', 'return_url': ''}
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        sign = client.generate_sign(params)
+    expected = hashlib.md5('money=19.00&name=会员&out_trade_no=ORDER001&pid=1001&type=alipay&key=secret'.encode('utf-8')).hexdigest()
+    assert sign == expected and output.getvalue() == ''
+    print("✅ 签名与易支付规则一致，且不再打印密钥")
+
+    signed = dict(params, sign=sign.upper())
+    assert client.verify_sign(signed) and not client.verify_sign(dict(signed, money='0.01'))
+    assert client.verify_many([signed, dict(signed, sign='')]) == [True, False]
+    assert client.sign_many([params]) == [sign]
+    assert MD5Signer('k', uppercase=True).sign('a=1') == hashlib.md5(b'a=1&key=k').hexdigest().upper()
+    print("✅ 验签（大小写不敏感）和批量签名/验签")
+
+
+def test_benchmark():
+    """测试签名基准"""
+    print("\n=== 测试签名基准 ===")
+
+    result = benchmark(count=20, key_size=1024)
+    assert result['all_verified'] and result['count'] == 20
+    print(f"✅ 每次解析 {result['sign_per_second_before']} 次/秒，缓存后 {result['sign_per_second_after']} 次/秒")
+
+
+if __name__ == "__main__":
+    test_alipay_verify()
+    test_mzfpay_sign()
+    test_benchmark()
+    print("\n🎉 支付签名测试通过！")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+测试内存版Supabase后端（查询构造器、索引、rpc、存储、认证和故障注入）
+"""
+
+import sys
+import os
+import time
+
+import httpx
+from postgrest.exceptions import APIError
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def _client(**config):
+    from supabase_memory import MemorySupabaseClient, MemoryBackendConfig
+    return MemorySupabaseClient(MemoryBackendConfig(seed=1, **config))
+
+
+def test_query_builder_and_indexes():
+    """测试过滤、排序、分页、single和等值索引"""
+    print("=== 测试查询构造器 ===")
+
+    client = _client()
+    for i in range(10):
+        client.table('tool_usage').insert({
+            'user_id': f'user-{i % 3}', 'tool_name': 'background_remover',
+            'credits_used': i, 'created_at': f'2025-12-0{i % 9 + 1}T10:00:00'
+        }).execute()
+
+    response = client.table('tool_usage').select('user_id,credits_used').eq('user_id', 'user-1').gte(
+        'created_at', '2025-12-03').order('credits_used', desc=True).execute()
+    assert [row['credits_used'] for row in response.data] == [7, 4]
+    assert set(response.data[0].keys()) == {'user_id', 'credits_used'}
+    assert 'user_id' in client.tables['tool_usage'].indexes
+    print("✅ eq/gte/order/投影正常，等值过滤建立了索引")
+
+    page = client.table('tool_usage').select('*').order('credits_used').range(2, 4).execute()
+    assert [row['credits_used'] for row in page.data] == [2, 3, 4]
+    print("✅ range分页正常")
+
+    client.table('user_profiles').insert({'user_id': 'user-1', 'plan': 'basic', 'updated_at': 'now()'}).execute()
+    profile = client.table('user_profiles').select('*').eq('user_id', 'user-1').single().execute()
+    assert profile.data['plan'] == 'basic' and profile.data['updated_at'] != 'now()'
+    try:
+        client.table('user_profiles').select('*').eq('user_id', 'missing').single().execute()
+        assert False, "没有记录时single()应报错"
+    except APIError as e:
+        assert e.code == 'PGRST116'
+    try:
+        client.table('user_profiles').insert({'user_id': 'user-1'}).execute()
+        assert False, "重复user_id应违反唯一约束"
+    except APIError as e:
+        assert e.code == '23505'
+    print("✅ single()与唯一约束行为与PostgREST一致")
+
+    client.table('user_profiles').update({'plan': 'pro'}).eq('user_id', 'user-1').execute()
+    assert client.table('user_profiles').select('plan').eq('user_id', 'user-1').execute().data == [{'plan': 'pro'}]
+    print("✅ update后索引与数据同步")
+
+
+def test_keyset_pagination_with_order_manager():
+    """测试OrderManager游标分页在内存后端上逐页读取"""
+    print("\n=== 测试游标分页 ===")
+
+    from order_manager import OrderManager
+
+    client = _client()
+    for i in range(7):
+        client.table('payment_records').insert({
+            'order_no': f'ORDER{i}', 'user_id': 'user-1', 'status': 'pending', 'amount': 1900,
+            'created_at': f'2025-12-01T10:00:0{i // 2}'
+        }).execute()
+
+    manager = OrderManager(client)
+    seen, cursor = [], None
+    while True:
+        result = manager.list_orders(limit=3, cursor=cursor)
+        assert result['success'], result
+        seen.extend(order['order_no'] for order in result['orders'])
+        cursor = result['next_cursor']
+        if not cursor:
+            break
+    assert sorted(seen) == [f'ORDER{i}' for i in range(7)] and len(set(seen)) == 7
+    print("✅ 3页读取全部7条订单，无重复")
+
+
+def test_rpc_storage_and_auth():
+    """测试rpc汇总、存储上传/URL和认证"""
+    print("\n=== 测试rpc/存储/认证 ===")
+
+    client = _client()
+    for _ in range(2):
+        client.rpc('increment_usage_rollup', {
+            'p_user_id': 'user-1', 'p_tool_name': 'image_compressor', 'p_usage_date': '2025-12-01', 'p_credits': 1
+        }).execute()
+    row = client.table('tool_usage_daily').select('*').execute().data[0]
+    assert row['usage_count'] == 2 and row['unique_users'] == 1
+    print("✅ increment_usage_rollup累加正确")
+
+    bucket = client.storage.from_('processed-images')
+    bucket.upload('user-1/a.png', b'png-bytes', file_options={'content-type': 'image/png'})
+    assert bucket.download('user-1/a.png') == b'png-bytes'
+    assert bucket.get_public_url('user-1/a.png').endswith('/processed-images/user-1/a.png')
+    assert 'token=' in bucket.create_signed_url('user-1/a.png', 60)['signedURL']
+    assert [f['name'] for f in bucket.list('user-1')] == ['a.png']
+    print("✅ 存储上传/下载/URL正常")
+
+    user_id, token = client.seed_user('load@example.com', plan='pro')
+    assert client.auth.get_user(token).user.id == user_id
+    assert client.auth.get_user('bad-token') is None
+    print("✅ auth.get_user按token返回用户")
+
+
+def test_injected_latency_and_errors():
+    """测试注入延迟和故障"""
+    print("\n=== 测试故障注入 ===")
+
+    client = _client(latency_ms=20)
+    start = time.monotonic()
+    client.table('user_profiles').select('*').execute()
+    assert time.monotonic() - start >= 0.02
+    print("✅ 每次往返注入延迟")
+
+    client = _client(error_rate=1.0)
+    try:
+        client.table('user_profiles').select('*').execute()
+        assert False, "error_rate=1时应失败"
+    except httpx.ConnectError:
+        pass
+    assert client.stats()['injected_errors'] == 1
+    print("✅ 按故障率抛出连接错误")
+
+
+def test_pool_returns_memory_client():
+    """测试SUPABASE_BACKEND=memory时共享客户端为内存版"""
+    print("\n=== 测试后端切换 ===")
+
+    from supabase_pool import get_supabase_client
+    from supabase_memory import MemorySupabaseClient
+
+    previous = os.environ.get('SUPABASE_BACKEND')
+    os.environ['SUPABASE_BACKEND'] = 'memory'
+    try:
+        client = get_supabase_client()
+        assert isinstance(client, MemorySupabaseClient)
+        assert get_supabase_client() is client
+    finally:
+        if previous is None:
+            os.environ.pop('SUPABASE_BACKEND')
+        else:
+            os.environ['SUPABASE_BACKEND'] = previous
+    print("✅ 无需SUPABASE_URL即可获取内存版客户端")
+
+
+if __name__ == "__main__":
+    test_query_builder_and_indexes()
+    test_keyset_pagination_with_order_manager()
+    test_rpc_storage_and_auth()
+    test_injected_latency_and_errors()
+    test_pool_returns_memory_client()
+    print("\n🎉 内存版Supabase测试通过！")
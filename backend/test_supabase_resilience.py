@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+测试Supabase容错层：熔断器、延迟预算、重试、对冲请求和过期缓存（模拟传输层）
+"""
+
+import sys
+import os
+import time
+import threading
+
+import httpx
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+class _ScriptedTransport(httpx.BaseTransport):
+    """按脚本依次返回结果的传输层：整数为状态码，浮点数为延迟后返回200，异常则抛出"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def handle_request(self, request):
+        with self._lock:
+            step = self.script[min(self.calls, len(self.script) - 1)]
+            self.calls += 1
+            index = self.calls
+        if isinstance(step, Exception):
+            raise step
+        if isinstance(step, float):
+            time.sleep(step)
+            step = 200
+        return httpx.Response(step, json=[{'call': index}], request=request)
+
+
+def _setup(script, **overrides):
+    from supabase_resilience import ResilienceConfig, SupabaseResilience, ResilientTransport
+
+    config = ResilienceConfig()
+    config.retry_backoff = 0.001
+    config.hedge_enabled = False
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    resilience = SupabaseResilience(config)
+    inner = _ScriptedTransport(script)
+    client = httpx.Client(base_url='http://supabase.test', transport=ResilientTransport(inner, resilience))
+    return resilience, inner, client
+
+
+def test_breaker_state_machine():
+    """测试熔断器打开、快速失败、半开探测和恢复"""
+    print("=== 测试熔断器状态 ===")
+
+    from supabase_resilience import CircuitBreaker
+
+    now = [0.0]
+    breaker = CircuitBreaker('rest', failure_threshold=3, reset_timeout=10, clock=lambda: now[0])
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == 'open' and breaker.trips == 1
+    assert not breaker.allow() and breaker.rejected == 1
+    print("✅ 连续失败后打开并快速失败")
+
+    now[0] = 11
+    assert breaker.state == 'half_open'
+    assert breaker.allow()
+    assert not breaker.allow(), "半开状态只放行一个探测请求"
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    print("✅ 探测成功后恢复")
+
+
+def test_idempotent_reads_retry_within_budget():
+    """测试查询在5xx后重试，写入不重试"""
+    print("\n=== 测试查询重试 ===")
+
+    resilience, inner, client = _setup([503, 200])
+    response = client.get('/rest/v1/user_profiles')
+    assert response.status_code == 200 and inner.calls == 2
+    assert resilience.stats()['retries'] == 1
+    print("✅ 查询在503后重试成功")
+
+    resilience, inner, client = _setup([503, 200])
+    response = client.post('/rest/v1/tool_usage', json={})
+    assert response.status_code == 503 and inner.calls == 1
+    print("✅ 写入请求不重试")
+
+
+def test_open_breaker_fails_fast():
+    """测试熔断打开后不再访问后端"""
+    print("\n=== 测试熔断快速失败 ===")
+
+    from supabase_resilience import CircuitOpenError
+
+    resilience, inner, client = _setup([httpx.ConnectError('down')], failure_threshold=2, read_retries=0)
+    for _ in range(2):
+        try:
+            client.get('/rest/v1/user_profiles')
+        except httpx.ConnectError:
+            pass
+
+    calls = inner.calls
+    start = time.monotonic()
+    try:
+        client.get('/rest/v1/user_profiles')
+        assert False, "应快速失败"
+    except CircuitOpenError:
+        pass
+    assert inner.calls == calls
+    assert time.monotonic() - start < 0.05
+
+    stats = resilience.stats()
+    print(f"熔断器状态: {stats['breakers']}")
+    assert stats['breakers']['rest']['state'] == 'open'
+    assert stats['breakers']['rest']['trips'] == 1
+    assert stats['degraded'] is True
+    print("✅ 熔断后快速失败，健康信息包含状态和触发次数")
+
+
+def test_latency_budget_caps_slow_reads():
+    """测试延迟预算限制请求总耗时"""
+    print("\n=== 测试延迟预算 ===")
+
+    from supabase_resilience import LatencyBudgetExceeded
+
+    resilience, inner, client = _setup([503])
+    start = time.monotonic()
+    try:
+        with resilience.budget('plan_lookup', 0.0):
+            client.get('/rest/v1/user_profiles')
+        assert False, "预算为0应直接失败"
+    except LatencyBudgetExceeded:
+        pass
+    assert inner.calls == 0 and time.monotonic() - start < 0.05
+    assert resilience.stats()['operations']['plan_lookup']['budget_exceeded'] == 1
+    print("✅ 预算耗尽时不再发请求")
+
+
+def test_hedged_read_returns_faster_copy():
+    """测试慢查询触发对冲请求，采用先返回的结果"""
+    print("\n=== 测试对冲请求 ===")
+
+    resilience, inner, client = _setup([0.5, 0.0], hedge_enabled=True, hedge_delay=0.05, hedge_max_ratio=1.0)
+    start = time.monotonic()
+    response = client.get('/rest/v1/user_profiles')
+    elapsed = time.monotonic() - start
+
+    assert response.json() == [{'call': 2}], "应采用对冲请求的结果"
+    assert elapsed < 0.4, f"耗时 {elapsed:.3f}s"
+    hedging = resilience.stats()['hedging']
+    assert hedging['hedges_sent'] == 1 and hedging['hedge_wins'] == 1
+    print(f"✅ 对冲请求在 {elapsed:.3f}s 内返回")
+
+
+def test_cached_read_serves_stale_data_when_open():
+    """测试熔断时返回缓存的会员数据"""
+    print("\n=== 测试过期缓存 ===")
+
+    from supabase_resilience import SupabaseResilience, CircuitOpenError
+
+    resilience = SupabaseResilience()
+    profile = [{'user_id': 'user-1', 'plan': 'basic'}]
+    assert resilience.cached_read(('profile', 'user-1'), lambda: profile) == profile
+
+    def unavailable():
+        raise CircuitOpenError('open')
+
+    assert resilience.cached_read(('profile', 'user-1'), unavailable) == profile
+    try:
+        resilience.cached_read(('profile', 'user-2'), unavailable)
+        assert False, "没有缓存时应抛出异常"
+    except CircuitOpenError:
+        pass
+    print("✅ 熔断时返回最近一次的会员数据")
+
+
+if __name__ == "__main__":
+    test_breaker_state_machine()
+    test_idempotent_reads_retry_within_budget()
+    test_open_breaker_fails_fast()
+    test_latency_budget_caps_slow_reads()
+    test_hedged_read_returns_faster_copy()
+    test_cached_read_serves_stale_data_when_open()
+    print("\n🎉 容错层测试通过！")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+测试UsageDB按天汇总统计（模拟Supabase客户端，不依赖真实数据库）
+"""
+
+import sys
+import os
+import importlib.util
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+# 添加当前目录到Python路径
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+# supabase_db导入时会初始化全局客户端，这里使用本地占位配置
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('SUPABASE_KEY', 'test.anon.key')
+os.environ.setdefault('SUPABASE_MAX_RETRIES', '1')
+
+# 项目根目录也有同名的supabase_db.py，和根目录测试一起运行时按路径加载backend中的模块
+_spec = importlib.util.spec_from_file_location('backend_supabase_db', os.path.join(BACKEND_DIR, 'supabase_db.py'))
+supabase_db = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(supabase_db)
+UsageDB = supabase_db.UsageDB
+
+from supabase_memory import MemorySupabaseClient
+
+
+def _table_mock(rows_by_table):
+    """按表名返回不同数据的模拟客户端，链式调用均返回自身"""
+    client = Mock()
+
+    def table(name):
+        query = Mock()
+        for method in ('select', 'eq', 'gte', 'order', 'limit', 'insert', 'update'):
+            getattr(query, method).return_value = query
+        query.execute.return_value = Mock(data=rows_by_table.get(name, []))
+        return query
+
+    client.table.side_effect = table
+    return client
+
+
+def test_record_usage_updates_rollup():
+    """测试记录使用时调用increment_usage_rollup"""
+    print("=== 测试增量汇总 ===")
+
+    client = _table_mock({'tool_usage': [{'id': 'usage-1'}]})
+    client.auth.admin.get_user_by_id.return_value = Mock(user=None)
+    usage_db = UsageDB(client)
+
+    result = usage_db.record_usage('user-1', 'background_remover', 2)
+    assert result['success'], result
+
+    client.rpc.assert_called_once()
+    name, params = client.rpc.call_args[0]
+    assert name == 'increment_usage_rollup'
+    assert params['p_user_id'] == 'user-1'
+    assert params['p_tool_name'] == 'background_remover'
+    assert params['p_credits'] == 2
+    print("✅ 已调用increment_usage_rollup")
+
+
+def test_user_stats_read_from_rollups():
+    """测试用户统计从汇总表聚合"""
+    print("\n=== 测试用户统计读取汇总表 ===")
+
+    client = _table_mock({
+        'tool_usage_daily_user': [
+            {'tool_name': 'background_remover', 'usage_date': '2025-12-01', 'usage_count': 3, 'credits_used': 6},
+            {'tool_name': 'image_compressor', 'usage_date': '2025-12-01', 'usage_count': 1, 'credits_used': 1},
+            {'tool_name': 'background_remover', 'usage_date': '2025-12-02', 'usage_count': 2, 'credits_used': 4},
+        ],
+        'tool_usage': [{'id': 'b'}, {'id': 'a'}]
+    })
+    result = UsageDB(client).get_user_usage_stats('user-1', days=30)
+
+    print(f"统计结果: {result}")
+    assert result['success']
+    assert result['usage_count'] == 6
+    assert result['total_credits'] == 11
+    assert result['tool_stats']['background_remover'] == {'count': 5, 'credits': 10}
+    assert result['daily_stats']['2025-12-01'] == {'count': 4, 'credits': 7}
+    assert [r['id'] for r in result['recent_usage']] == ['a', 'b']
+
+    tables = [call[0][0] for call in client.table.call_args_list]
+    assert 'tool_usage_daily_user' in tables
+    print("✅ 用户统计来自按天汇总")
+
+
+def test_tool_stats_read_from_rollups():
+    """测试工具统计从汇总表聚合"""
+    print("\n=== 测试工具统计读取汇总表 ===")
+
+    client = _table_mock({
+        'tool_usage_daily': [
+            {'tool_name': 'background_remover', 'usage_date': '2025-12-01', 'usage_count': 10, 'credits_used': 20},
+            {'tool_name': 'background_remover', 'usage_date': '2025-12-02', 'usage_count': 5, 'credits_used': 10},
+        ],
+        'tool_usage_active_daily': [
+            {'usage_date': '2025-12-01', 'last_seen_users': 1}, {'usage_date': '2025-12-02', 'last_seen_users': 1}
+        ]
+    })
+    result = UsageDB(client).get_tool_stats('background_remover', days=7)
+
+    assert result['total_usage'] == 15
+    assert result['total_credits'] == 30
+    assert result['unique_users'] == 2
+    tables = [call[0][0] for call in client.table.call_args_list]
+    assert 'tool_usage_daily_user' not in tables
+    print("✅ 工具统计来自按天汇总，不读取用户级汇总")
+
+
+def test_unique_users_rollup():
+    """测试按最后使用日期计数的去重用户数（内存版Supabase）"""
+    print("\n=== 测试去重用户汇总 ===")
+
+    client = MemorySupabaseClient()
+    today = datetime.utcnow().date()
+    usage = [('u1', 'background_remover', 5), ('u1', 'background_remover', 1), ('u2', 'background_remover', 3),
+             ('u2', 'image_compressor', 0), ('u3', 'image_compressor', 10), ('u1', 'background_remover', 1)]
+    for user_id, tool_name, days_ago in usage:
+        client.rpc('increment_usage_rollup', {
+            'p_user_id': user_id, 'p_tool_name': tool_name,
+            'p_usage_date': (today - timedelta(days=days_ago)).isoformat(), 'p_credits': 1
+        }).execute()
+
+    usage_db = UsageDB(client)
+    assert usage_db.get_tool_stats('background_remover', days=7)['unique_users'] == 2
+    assert usage_db.get_tool_stats('background_remover', days=2)['unique_users'] == 1
+    assert usage_db.get_tool_stats('image_compressor', days=30)['unique_users'] == 2
+    assert usage_db.get_tool_stats(days=7)['unique_users'] == 2
+    assert usage_db.get_tool_stats(days=30)['unique_users'] == 3
+    print("✅ 任意天数的去重用户数由按天汇总相加得到")
+
+
+def test_compaction_skips_today():
+    """测试压缩只重算已结束的日期"""
+    print("\n=== 测试汇总压缩范围 ===")
+
+    client = Mock()
+    assert UsageDB(client).compact_rollups(days=2)['success']
+    name, params = client.rpc.call_args[0]
+    assert name == 'compact_usage_rollups'
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    assert params['p_start_date'] <= params['p_end_date'] < today
+    print("✅ 当天只做增量更新，不参与重算")
+
+
+if __name__ == "__main__":
+    test_record_usage_updates_rollup()
+    test_user_stats_read_from_rollups()
+    test_tool_stats_read_from_rollups()
+    test_unique_users_rollup()
+    test_compaction_skips_today()
+    print("\n🎉 使用统计汇总测试通过！")
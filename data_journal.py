@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+DataManager预写日志（WAL）
+每次变更追加一条紧凑的JSON记录，多个并发写入合并为一次fsync（group commit），
+后台定期把内存数据写回快照文件并删除旧日志；启动时加载快照后重放日志。
+
+目录结构（data/journal/）：
+- wal-000001.log ...   日志分段，每行一条记录 {"n": 序号, "c": 集合, "k": 键, "p": 路径, "v": 值}
+- manifest.json        每个集合的快照已包含到的日志序号
+- LOCK                 单进程写入锁
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+from data_serializer import JsonSerializer, write_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows开发环境没有fcntl，不做进程锁
+    fcntl = None
+
+_DELETE = object()
+
+
+class JournalLockedError(RuntimeError):
+    """另一个进程已经在使用同一个日志目录"""
+
+
+def _dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def apply_record(collections, record):
+    """把一条日志记录应用到内存数据（设置或删除某个路径）"""
+    target = collections.get(record['c'])
+    if target is None:
+        return
+    path = [record['k']] + list(record.get('p') or [])
+    for key in path[:-1]:
+        child = target.get(key)
+        if not isinstance(child, dict):
+            child = target[key] = {}
+        target = child
+    if record.get('o') == 'del':
+        target.pop(path[-1], None)
+    else:
+        target[path[-1]] = record.get('v')
+
+
+def write_json_atomic(file_path, data, indent=2):
+    """先写临时文件并fsync，再原子替换目标文件；data为str/bytes时直接写入"""
+    if not isinstance(data, (str, bytes)):
+        data = json.dumps(data, ensure_ascii=False, indent=indent)
+    write_atomic(file_path, data)
+
+
+class Journal:
+    """追加写日志：group commit落盘、后台压缩、启动重放"""
+
+    def __init__(self, directory, source, fsync=None, commit_delay=None,
+                 compact_bytes=None, compact_interval=None, serializer=None):
+        """
+        source: 无参函数，返回 {集合名: (快照文件路径, 内存字典)}
+        serializer: 快照文件的序列化器（默认缩进JSON）
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.source = source
+        self.fsync = fsync if fsync is not None else os.getenv('DATA_JOURNAL_FSYNC', 'true').lower() != 'false'
+        self.commit_delay = commit_delay if commit_delay is not None else float(os.getenv('DATA_JOURNAL_COMMIT_DELAY_MS', '0')) / 1000.0
+        self.compact_bytes = compact_bytes or int(os.getenv('DATA_JOURNAL_COMPACT_BYTES', str(4 * 1024 * 1024)))
+        self.compact_interval = compact_interval or float(os.getenv('DATA_JOURNAL_COMPACT_INTERVAL', '300'))
+        self.serializer = serializer or JsonSerializer(indent=2)
+
+        self.manifest_file = self.directory / 'manifest.json'
+        self._cond = threading.Condition(threading.Lock())
+        self._compact_lock = threading.Lock()
+        self._buffer = []
+        self._lsn = 0
+        self._durable_lsn = 0
+        self._flushing = False
+        self._file = None
+        self._segment = None
+        self._segment_bytes = 0
+        self._manifest = {}
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._compactor = None
+
+        self.stats_data = {
+            'records': 0, 'flushes': 0, 'batched_records': 0, 'replayed': 0,
+            'compactions': 0, 'last_compaction_seconds': 0.0, 'records_since_compaction': 0
+        }
+
+    # ---- 启动 ----
+
+    def open(self):
+        """加锁、重放日志到内存数据，并打开最后一个分段继续追加；返回重放的记录数"""
+        self._acquire_process_lock()
+        self._manifest = self._read_manifest()
+        collections = {name: data for name, (_, data) in self.source().items()}
+
+        replayed = 0
+        last_lsn = max(self._manifest.values(), default=0)
+        segments = self._segments()
+        for segment in segments:
+            for record in self._read_segment(segment):
+                last_lsn = max(last_lsn, record['n'])
+                if record['n'] > self._manifest.get(record['c'], 0):
+                    apply_record(collections, record)
+                    replayed += 1
+
+        self._lsn = self._durable_lsn = last_lsn
+        self._open_segment(segments[-1] if segments else self._segment_path(1))
+        self.stats_data['replayed'] = replayed
+        self.stats_data['records_since_compaction'] = replayed
+        return replayed
+
+    def start_compactor(self):
+        """启动后台压缩线程"""
+        if self._compactor is None:
+            self._compactor = threading.Thread(target=self._compact_loop, name='data-journal-compactor', daemon=True)
+            self._compactor.start()
+
+    def _acquire_process_lock(self):
+        if fcntl is None:
+            return
+        self._lock_file = open(self.directory / 'LOCK', 'a+')
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise JournalLockedError(f"日志目录 {self.directory} 正被其他进程使用")
+
+    def _read_manifest(self):
+        if not self.manifest_file.exists():
+            return {}
+        with open(self.manifest_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get('lsn', {})
+
+    def _segments(self):
+        return sorted(self.directory.glob('wal-*.log'))
+
+    def _segment_path(self, number):
+        return self.directory / f'wal-{number:06d}.log'
+
+    def _read_segment(self, segment):
+        """逐行读取分段；最后一行不完整（崩溃时写了一半）则截掉"""
+        good_bytes = 0
+        with open(segment, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good_bytes += len(line)
+                yield record
+        if good_bytes != segment.stat().st_size:
+            print(f"⚠️ 日志 {segment.name} 末尾不完整，已截断到 {good_bytes} 字节")
+            with open(segment, 'r+b') as f:
+                f.truncate(good_bytes)
+
+    def _open_segment(self, path):
+        self._segment = path
+        self._file = open(path, 'ab')
+        self._segment_bytes = path.stat().st_size
+
+    # ---- 追加与group commit ----
+
+    def append(self, collection, key, path=(), value=None, delete=False, wait=True):
+        """追加一条变更记录，wait=True时等待落盘"""
+        return self.append_many([(collection, key, path, _DELETE if delete else value)], wait=wait)
+
+    def append_many(self, changes, wait=True):
+        """追加多条记录（同一次操作），一起落盘；changes为(集合, 键, 路径, 值)列表"""
+        with self._cond:
+            for collection, key, path, value in changes:
+                self._lsn += 1
+                record = {'n': self._lsn, 'c': collection, 'k': key}
+                if path:
+                    record['p'] = list(path)
+                if value is _DELETE:
+                    record['o'] = 'del'
+                else:
+                    record['v'] = value
+                self._buffer.append(_dumps(record).encode('utf-8'))
+            lsn = self._lsn
+            self.stats_data['records'] += len(changes)
+            self.stats_data['records_since_compaction'] += len(changes)
+        if wait:
+            self.wait_durable(lsn)
+        return lsn
+
+    def wait_durable(self, lsn):
+        """等待lsn之前的记录落盘；第一个等待者负责写入整批记录并fsync"""
+        with self._cond:
+            while self._durable_lsn < lsn:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                self._flush_locked()
+
+    def flush(self):
+        self.wait_durable(self._lsn)
+
+    def _flush_locked(self):
+        self._flushing = True
+        try:
+            if self.commit_delay:
+                # 稍等片刻让更多并发写入进入同一批
+                self._cond.wait(self.commit_delay)
+            batch, self._buffer = self._buffer, []
+            upto = self._lsn
+            handle = self._file
+            self._cond.release()
+            try:
+                data = b''.join(batch)
+                handle.write(data)
+                handle.flush()
+                if self.fsync:
+                    os.fsync(handle.fileno())
+            finally:
+                self._cond.acquire()
+            self._segment_bytes += len(data)
+            self._durable_lsn = upto
+            self.stats_data['flushes'] += 1
+            self.stats_data['batched_records'] += len(batch)
+        finally:
+            self._flushing = False
+            self._cond.notify_all()
+        if self._segment_bytes >= self.compact_bytes:
+            self._wake.set()
+
+    # ---- 压缩/检查点 ----
+
+    def checkpoint(self, names=None):
+        """把集合写回快照文件；names为None时写全部集合并删除旧日志分段"""
+        full = names is None
+        started = time.perf_counter()
+        with self._compact_lock:
+            self.flush()
+            with self._cond:
+                while self._flushing:
+                    self._cond.wait()
+                lsn = self._durable_lsn
+                old_segments = []
+                if full:
+                    # 切换到新分段，之后的记录不会被删除
+                    old_segments = self._segments()
+                    self._file.close()
+                    number = int(self._segment.stem.split('-')[1]) + 1
+                    self._open_segment(self._segment_path(number))
+                    self.stats_data['records_since_compaction'] = 0
+                payloads = self._serialize(names)
+
+            for name, (file_path, payload) in payloads.items():
+                write_json_atomic(file_path, payload)
+                self._manifest[name] = lsn
+            write_json_atomic(self.manifest_file, {'lsn': self._manifest, 'updated_at': time.time()})
+
+            for segment in old_segments:
+                segment.unlink(missing_ok=True)
+
+        elapsed = time.perf_counter() - started
+        if full:
+            self.stats_data['compactions'] += 1
+            self.stats_data['last_compaction_seconds'] = round(elapsed, 4)
+        return True
+
+    def _serialize(self, names):
+        """在日志锁内序列化快照，得到与lsn一致的内容"""
+        payloads = {}
+        for name, (file_path, data) in self.source().items():
+            if names is not None and name not in names:
+                continue
+            for _ in range(3):
+                try:
+                    payloads[name] = (file_path, self.serializer.dumps(data))
+                    break
+                except RuntimeError:
+                    # 其他线程正在修改字典，重试
+                    continue
+            else:
+                payloads[name] = (file_path, self.serializer.dumps(dict(data)))
+        return payloads
+
+    def _compact_loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.compact_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            if self.stats_data['records_since_compaction'] == 0:
+                continue
+            try:
+                self.checkpoint()
+            except Exception as e:
+                print(f"❌ 日志压缩失败: {e}")
+
+    def close(self):
+        """停止后台压缩并把剩余记录落盘"""
+        self._stop.set()
+        self._wake.set()
+        if self._file is not None and not self._file.closed:
+            self.flush()
+            self._file.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self.stats_data)
+            stats['lsn'] = self._lsn
+            stats['durable_lsn'] = self._durable_lsn
+            stats['segment'] = self._segment.name if self._segment else None
+            stats['segment_bytes'] = self._segment_bytes
+        flushes = stats['flushes']
+        stats['avg_batch_size'] = round(stats['batched_records'] / flushes, 2) if flushes else 0
+        return stats
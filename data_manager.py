@@ -6,14 +6,29 @@
 解决数据丢失问题
 """
 
-import json
 import os
+import time
+import atexit
+import threading
+import weakref
 from datetime import datetime, timedelta
 from pathlib import Path
 import uuid
 
+from data_journal import Journal, JournalLockedError
+from data_serializer import get_serializer, read_file, write_atomic
+from plan_catalog import get_plan_catalog
+
 class DataManager:
-    def __init__(self, data_dir='data'):
+    # 日志目录被其他进程占用时为True：只读取快照文件，拒绝写入
+    read_only = False
+    
+    def __init__(self, data_dir='data', journal=None):
+        """
+        journal: 是否启用预写日志模式（默认读取环境变量DATA_MANAGER_JOURNAL）
+        日志模式下每次变更只追加一条记录，快照文件由后台压缩重写；
+        日志已被其他进程占用时本实例为只读（read_only），写入返回False
+        """
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         
@@ -23,6 +38,13 @@ class DataManager:
         self.invites_file = self.data_dir / 'invites.json'  # 邀请关系数据
         self.orders_file = self.data_dir / 'orders.json'  # 订单数据
         
+        # 文件版本（mtime/size/inode），用于判断其他进程是否改过文件
+        self._file_generations = {}
+        
+        # 序列化格式（DATA_SERIALIZER）与每个文件的加载/保存耗时
+        self.serializer = get_serializer()
+        self.io_stats = {}
+        
         # 初始化数据
         self.users_db = self.load_data(self.users_file, {})
         self.user_profiles_db = self.load_data(self.profiles_file, {})
@@ -30,18 +52,151 @@ class DataManager:
         self.invites_db = self.load_data(self.invites_file, {})  # 邀请关系：{invite_code: inviter_user_id, ...}
         self.orders_db = self.load_data(self.orders_file, {})  # 订单数据：{order_no: order_data, ...}
         
+        if journal is None:
+            journal = os.getenv('DATA_MANAGER_JOURNAL', 'false').lower() in ('1', 'true', 'yes')
+        self.journal = None
+        if journal:
+            self._open_journal()
+        
+        # 二级索引：token -> user_id、email -> user_id（邀请码索引即invites_db），在日志重放之后建立
+        self._token_index = {}
+        self._email_index = {}
+        self._rebuild_user_indexes()
+        self._sync_invite_index()
+        
+        # 保护内存中资料的修改（请求线程与后台保留任务之间）
+        self._lock = threading.RLock()
+        
+        # 使用历史保留策略：超过保留天数的daily_usage汇总为月度，过期奖励清除
+        self._start_retention()
+        
         print(f"✅ 数据持久化管理器初始化成功")
         print(f"📁 数据目录: {self.data_dir.absolute()}")
         print(f"👥 用户数量: {len(self.users_db)}")
         print(f"📊 资料数量: {len(self.user_profiles_db)}")
     
+    # 集合名 -> (快照文件属性, 内存数据属性)
+    COLLECTIONS = {
+        'users': ('users_file', 'users_db'),
+        'profiles': ('profiles_file', 'user_profiles_db'),
+        'usage': ('usage_file', 'tool_usage_db'),
+        'invites': ('invites_file', 'invites_db'),
+        'orders': ('orders_file', 'orders_db')
+    }
+    
+    def _collections(self):
+        """集合名 -> (快照文件, 内存数据)，供日志重放和压缩使用"""
+        return {
+            name: (getattr(self, file_attr), getattr(self, data_attr))
+            for name, (file_attr, data_attr) in self.COLLECTIONS.items()
+        }
+    
+    def _file_generation(self, file_path):
+        """文件版本标识：mtime_ns + 大小 + inode，文件不存在时为None"""
+        try:
+            st = file_path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    
+    def _refresh_collection(self, name):
+        """文件被其他进程修改过才重新加载（一次stat判断），返回是否重新加载
+        日志模式下本进程独占写入，内存即最新数据，不需要重新加载"""
+        if self.journal is not None:
+            return False
+        file_attr, data_attr = self.COLLECTIONS[name]
+        file_path = getattr(self, file_attr)
+        if self._file_generation(file_path) == self._file_generations.get(file_path):
+            return False
+        print(f"🔄 {file_path.name} 已被其他进程更新，重新加载...")
+        setattr(self, data_attr, self.load_data(file_path, {}))
+        if name == 'users':
+            self._rebuild_user_indexes()
+        elif name in ('profiles', 'invites'):
+            self._sync_invite_index()
+        return True
+    
+    def _rebuild_user_indexes(self):
+        """重建token/email索引（重复时保留第一条，与原先线性查找的结果一致）"""
+        token_index = {}
+        email_index = {}
+        for user_id, user_data in self.users_db.items():
+            token = user_data.get('token')
+            if token:
+                token_index.setdefault(token, user_id)
+            email = (user_data.get('email') or '').lower().strip()
+            if email:
+                email_index.setdefault(email, user_id)
+        self._token_index = token_index
+        self._email_index = email_index
+    
+    def reindex_users(self):
+        """直接修改users_db后调用以刷新索引（save_users会自动调用）"""
+        self._rebuild_user_indexes()
+    
+    def _index_user(self, user_id, old_token=None):
+        """单个用户变更后更新索引"""
+        user_data = self.users_db[user_id]
+        if old_token and self._token_index.get(old_token) == user_id:
+            del self._token_index[old_token]
+        if user_data.get('token'):
+            self._token_index[user_data['token']] = user_id
+        email = (user_data.get('email') or '').lower().strip()
+        if email:
+            self._email_index.setdefault(email, user_id)
+    
+    def _sync_invite_index(self):
+        """用资料中的invite_code补全邀请码索引"""
+        for user_id, profile in self.user_profiles_db.items():
+            code = profile.get('invite_code')
+            if code and code not in self.invites_db:
+                self.invites_db[code] = user_id
+    
+    def _open_journal(self):
+        """打开预写日志：在快照之上重放日志，启动后台压缩"""
+        journal = Journal(self.data_dir / 'journal', self._collections, serializer=self.serializer)
+        try:
+            replayed = journal.open()
+        except JournalLockedError as e:
+            # 持有日志的进程不会重新加载快照文件，整文件保存的内容会被它下一次压缩覆盖
+            print(f"⚠️ {e}，本进程只读，不写入数据文件")
+            self.read_only = True
+            return
+        self.journal = journal
+        journal.start_compactor()
+        atexit.register(journal.close)
+        print(f"📒 预写日志已启用，重放 {replayed} 条记录")
+    
+    def _persist(self, changes, save=None):
+        """持久化一次变更
+        changes: [(集合, 键, 路径, 值)]，日志模式下追加为日志记录
+        save: 非日志模式下的保存函数（默认save_all）
+        """
+        if self.journal is None:
+            if self.read_only:
+                if changes:
+                    print("❌ 日志目录被其他进程占用，本进程只读，变更未保存")
+                return False
+            return (save or self.save_all)()
+        if not changes:
+            return True
+        try:
+            self.journal.append_many(changes)
+            return True
+        except Exception as e:
+            print(f"❌ 写入日志失败: {e}")
+            return False
+    
     def load_data(self, file_path, default_data):
-        """加载数据文件"""
+        """加载数据文件（按内容识别JSON/msgpack）"""
         try:
+            # 先记录版本再读取：读取期间文件被修改时，下次检查会发现变化
+            self._file_generations[file_path] = self._file_generation(file_path)
             if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                print(f"✅ 成功加载 {file_path.name}: {len(data)} 条记录")
+                started = time.perf_counter()
+                data = read_file(file_path)
+                elapsed_ms = self._record_io(file_path, 'load', started, file_path.stat().st_size)
+                print(f"✅ 成功加载 {file_path.name}: {len(data)} 条记录 ({elapsed_ms}ms)")
                 return data
             else:
                 print(f"📝 创建新文件 {file_path.name}")
@@ -51,48 +206,78 @@ class DataManager:
             return default_data
     
     def save_data(self, file_path, data):
-        """保存数据到文件"""
+        """保存数据到文件（写临时文件后原子替换，旧文件硬链接为.bak）"""
+        if self.read_only:
+            print(f"❌ 本进程只读，未保存 {file_path.name}")
+            return False
         try:
-            # 创建备份
-            if file_path.exists():
-                backup_path = file_path.with_suffix('.json.bak')
-                try:
-                    import shutil
-                    shutil.copy2(str(file_path), str(backup_path))
-                except Exception as backup_error:
-                    print(f"⚠️ 备份 {file_path.name} 失败: {backup_error}")
+            started = time.perf_counter()
+            size = write_atomic(file_path, self.serializer.dumps(data), backup=True)
+            # 记录自己写入后的版本，避免把自己的写入当成其他进程的修改
+            self._file_generations[file_path] = self._file_generation(file_path)
+            elapsed_ms = self._record_io(file_path, 'save', started, size)
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            print(f"💾 成功保存 {file_path.name}: {len(data)} 条记录")
+            print(f"💾 成功保存 {file_path.name}: {len(data)} 条记录 ({elapsed_ms}ms, {self.serializer.name})")
             return True
         except Exception as e:
             print(f"❌ 保存 {file_path.name} 失败: {e}")
             return False
     
+    def _record_io(self, file_path, operation, started, size):
+        """记录一次加载/保存的耗时（毫秒）和文件大小"""
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        stats = self.io_stats.setdefault(file_path.name, {})
+        stats[f'last_{operation}_ms'] = elapsed_ms
+        stats[f'{operation}_count'] = stats.get(f'{operation}_count', 0) + 1
+        stats['bytes'] = size
+        return elapsed_ms
+    
+    def get_io_stats(self):
+        """各数据文件的加载/保存耗时（用于比较序列化格式）"""
+        return {'serializer': self.serializer.name, 'files': dict(self.io_stats)}
+    
+    def _save_collection(self, name):
+        """整体保存一个集合；日志模式下写快照并记录对应的日志序号（供直接修改字典的旧调用方使用）"""
+        if name == 'users':
+            # 调用方可能直接修改过users_db，保存时顺带刷新索引
+            self._rebuild_user_indexes()
+        if self.journal is not None:
+            try:
+                return self.journal.checkpoint([name])
+            except Exception as e:
+                print(f"❌ 保存 {name} 快照失败: {e}")
+                return False
+        file_path, data = self._collections()[name]
+        return self.save_data(file_path, data)
+    
     def save_users(self):
         """保存用户数据"""
-        return self.save_data(self.users_file, self.users_db)
+        return self._save_collection('users')
     
     def save_profiles(self):
         """保存用户资料数据"""
-        return self.save_data(self.profiles_file, self.user_profiles_db)
+        return self._save_collection('profiles')
     
     def save_usage(self):
         """保存使用记录数据"""
-        return self.save_data(self.usage_file, self.tool_usage_db)
+        return self._save_collection('usage')
     
     def save_invites(self):
         """保存邀请关系数据"""
-        return self.save_data(self.invites_file, self.invites_db)
+        return self._save_collection('invites')
     
     def save_orders(self):
         """保存订单数据"""
-        return self.save_data(self.orders_file, self.orders_db)
+        return self._save_collection('orders')
     
     def save_all(self):
-        """保存所有数据"""
+        """保存所有数据（日志模式下为完整压缩：写全部快照并清理日志）"""
+        if self.journal is not None:
+            try:
+                return self.journal.checkpoint()
+            except Exception as e:
+                print(f"❌ 日志压缩失败: {e}")
+                return False
         results = {
             'users': self.save_users(),
             'profiles': self.save_profiles(),
@@ -112,13 +297,35 @@ class DataManager:
         order_no = order_data.get('order_no')
         if order_no:
             self.orders_db[order_no] = order_data
-            result = self.save_orders()
+            result = self._persist([('orders', order_no, (), order_data)], self.save_orders)
             # 同步更新 payment_orders (如果在 sk_app 中引用了)
             return result
         return False
     
     def create_user(self, email, password, name, plan='free'):
         """创建用户"""
+        # 生成邀请码（8位随机字符串）
+        invite_code = self.generate_invite_code()
+        user_id, token, user, profile = self._new_user_records(email, password, name, plan, invite_code)
+        
+        self.users_db[user_id] = user
+        self.user_profiles_db[user_id] = profile
+        
+        # 注册邀请码到邀请关系表
+        self.invites_db[invite_code] = user_id
+        self._index_user(user_id)
+        
+        # 保存数据
+        self._persist([
+            ('users', user_id, (), self.users_db[user_id]),
+            ('profiles', user_id, (), self.user_profiles_db[user_id]),
+            ('invites', invite_code, (), user_id)
+        ])
+        
+        return user_id, token
+    
+    def _new_user_records(self, email, password, name, plan, invite_code):
+        """构造新用户的users和profiles记录（各存储后端共用）"""
         user_id = str(uuid.uuid4())
         token = f"mock_token_{user_id[:8]}"
         
@@ -126,18 +333,15 @@ class DataManager:
         email_lower = email.lower().strip() if email else ''
         
         # 创建用户
-        self.users_db[user_id] = {
+        user = {
             'email': email_lower,
             'password': password,
             'token': token,
             'created_at': datetime.now().isoformat()
         }
         
-        # 生成邀请码（8位随机字符串）
-        invite_code = self.generate_invite_code()
-        
         # 创建用户资料
-        self.user_profiles_db[user_id] = {
+        profile = {
             'user_id': user_id,
             'email': email_lower,
             'name': name,
@@ -153,14 +357,7 @@ class DataManager:
             'created_at': datetime.now().isoformat(),
             'updated_at': datetime.now().isoformat()
         }
-        
-        # 注册邀请码到邀请关系表
-        self.invites_db[invite_code] = user_id
-        
-        # 保存数据
-        self.save_all()
-        
-        return user_id, token
+        return user_id, token, user, profile
     
     def generate_invite_code(self):
         """生成唯一的邀请码（8位大写字母+数字）"""
@@ -173,7 +370,11 @@ class DataManager:
     
     def get_inviter_by_code(self, invite_code):
         """通过邀请码获取邀请人ID"""
-        return self.invites_db.get(invite_code.upper())
+        code = invite_code.upper()
+        inviter = self.invites_db.get(code)
+        if inviter is None and self._refresh_collection('invites'):
+            inviter = self.invites_db.get(code)
+        return inviter
     
     def add_invite_reward(self, user_id, reward_type, tool_name, count, days=0):
         """添加邀请奖励
@@ -182,7 +383,17 @@ class DataManager:
         if user_id not in self.user_profiles_db:
             return False, "用户不存在"
         
-        profile = self.user_profiles_db[user_id]
+        with self._lock:
+            profile = self.user_profiles_db[user_id]
+            self._apply_invite_reward(profile, reward_type, tool_name, count, days)
+            self._persist([
+                ('profiles', user_id, ('invite_rewards',), profile['invite_rewards']),
+                ('profiles', user_id, ('updated_at',), profile['updated_at'])
+            ])
+        return True, "奖励已添加"
+    
+    def _apply_invite_reward(self, profile, reward_type, tool_name, count, days=0):
+        """把奖励写入资料的invite_rewards（各存储后端共用）"""
         if 'invite_rewards' not in profile:
             profile['invite_rewards'] = {
                 'daily_rewards': {},
@@ -212,143 +423,51 @@ class DataManager:
             })
         
         profile['updated_at'] = datetime.now().isoformat()
-        self.save_all()
-        return True, "奖励已添加"
     
     def get_default_usage_stats(self, plan='free'):
-        """获取默认使用统计"""
-        # 注意：此配置必须与 sk_app.py 中的 PLAN_DAILY_LIMITS 保持一致
-        # 直接定义套餐限制，避免循环导入
-        PLAN_DAILY_LIMITS = {
-            'free': {
-                'background_remover': 3,
-                'image_compressor': 5,
-                'format_converter': 5,
-                'image_cropper': 5,
-                'keyword_analyzer': 5,
-                'currency_converter': 3,
-                'unit_converter': 10,
-                'shipping_calculator': 10,
-                'send_email': 5,
-                'add_watermark': 10,
-                'remove_watermark': 10,
-                'image_rotate_flip': 5,  # 图片旋转/翻转
-                'listing_generator': 3  # Listing文案生成（AI功能，限制较低）
-            },
-            'basic': {
-                'background_remover': 10,
-                'image_compressor': 20,
-                'format_converter': 20,
-                'image_cropper': 20,
-                'keyword_analyzer': 50,
-                'currency_converter': -1,  # -1表示无限制
-                'unit_converter': -1,
-                'shipping_calculator': 20,
-                'send_email': 20,
-                'add_watermark': 50,
-                'remove_watermark': 50,
-                'image_rotate_flip': 50,  # 图片旋转/翻转
-                'listing_generator': 20  # Listing文案生成
-            },
-            'professional': {
-                'background_remover': 100,
-                'image_compressor': 200,
-                'format_converter': 200,
-                'image_cropper': 200,
-                'keyword_analyzer': 500,
-                'currency_converter': -1,
-                'unit_converter': -1,
-                'shipping_calculator': -1,
-                'send_email': -1,
-                'add_watermark': -1,
-                'remove_watermark': -1,
-                'image_rotate_flip': 200,  # 图片旋转/翻转
-                'listing_generator': 100  # Listing文案生成
-            },
-            'flagship': {
-                'background_remover': -1,
-                'image_compressor': -1,
-                'format_converter': -1,
-                'image_cropper': -1,
-                'keyword_analyzer': -1,
-                'currency_converter': -1,
-                'unit_converter': -1,
-                'shipping_calculator': -1,
-                'send_email': -1,
-                'add_watermark': -1,
-                'remove_watermark': -1,
-                'image_rotate_flip': -1,  # 图片旋转/翻转
-                'listing_generator': -1  # Listing文案生成（无限）
-            },
-            'enterprise': {
-                'background_remover': -1,
-                'image_compressor': -1,
-                'format_converter': -1,
-                'image_cropper': -1,
-                'keyword_analyzer': -1,
-                'currency_converter': -1,
-                'unit_converter': -1,
-                'shipping_calculator': -1,
-                'send_email': -1,
-                'add_watermark': -1,
-                'remove_watermark': -1,
-                'image_rotate_flip': -1,  # 图片旋转/翻转
-                'listing_generator': -1  # Listing文案生成（无限）
-            }
-        }
-        
-        stats = {}
-        plan_limits = PLAN_DAILY_LIMITS.get(plan, PLAN_DAILY_LIMITS['free'])
-        
-        for tool_name, daily_limit in plan_limits.items():
-            stats[tool_name] = {
-                'current_usage': 0,
-                'daily_limit': daily_limit,
-                'remaining_usage': daily_limit if daily_limit != -1 else -1
-            }
-        
-        return stats
+        """获取默认使用统计（从套餐目录预先计算的模板复制）"""
+        return get_plan_catalog().usage_stats_template(plan)
     
     def get_user_by_token(self, token):
-        """通过token获取用户"""
-        # 先在内存中查找
+        """通过token获取用户（索引查找，O(1)）"""
         found_user = self._find_user_by_token_in_memory(token)
         if found_user:
             return found_user
             
-        # 如果没找到，尝试重新加载数据（处理多进程不同步问题）
-        print(f"🔄 内存中未找到用户Token，尝试重新加载用户数据...")
-        self.users_db = self.load_data(self.users_file, {})
-        
-        # 再次查找
-        return self._find_user_by_token_in_memory(token)
+        # 没找到时，仅当users.json被其他进程改过才重新加载（处理多进程不同步问题）
+        if self._refresh_collection('users'):
+            return self._find_user_by_token_in_memory(token)
+        return None
     
     def _find_user_by_token_in_memory(self, token):
         """仅在内存中查找用户Token"""
-        for user_id, user_data in self.users_db.items():
-            if user_data.get('token') == token:
-                return {
-                    'id': user_id,
-                    'email': user_data['email'],
-                    'password': user_data['password'],
-                    'token': token
-                }
-        return None
+        user_id = self._token_index.get(token)
+        user_data = self.users_db.get(user_id) if user_id else None
+        if user_data is None or user_data.get('token') != token:
+            return None
+        return {
+            'id': user_id,
+            'email': user_data['email'],
+            'password': user_data['password'],
+            'token': token
+        }
     
     def get_user_by_email(self, email):
-        """通过邮箱获取用户"""
+        """通过邮箱获取用户（索引查找，O(1)）"""
         # 确保邮箱转小写进行比较
         email_lower = email.lower().strip() if email else ''
-        for user_id, user_data in self.users_db.items():
-            stored_email = user_data.get('email', '').lower().strip()
-            if stored_email == email_lower:
-                return {
-                    'id': user_id,
-                    'email': user_data['email'],
-                    'password': user_data['password'],
-                    'token': user_data['token']
-                }
-        return None
+        user_id = self._email_index.get(email_lower)
+        if user_id is None and self._refresh_collection('users'):
+            user_id = self._email_index.get(email_lower)
+        user_data = self.users_db.get(user_id) if user_id else None
+        if user_data is None or user_data.get('email', '').lower().strip() != email_lower:
+            return None
+        return {
+            'id': user_id,
+            'email': user_data['email'],
+            'password': user_data['password'],
+            'token': user_data['token']
+        }
     
     def authenticate_user(self, email, password):
         """用户认证"""
@@ -362,7 +481,8 @@ class DataManager:
                 # 生成新token
                 new_token = f"mock_token_{user['id'][:8]}"
                 self.users_db[user['id']]['token'] = new_token
-                self.save_users()
+                self._index_user(user['id'], old_token=user.get('token'))
+                self._persist([('users', user['id'], ('token',), new_token)], self.save_users)
                 user['token'] = new_token
                 return user
             else:
@@ -374,78 +494,196 @@ class DataManager:
     
     def get_user_profile(self, user_id):
         """获取用户资料"""
-        # 如果内存中没有，尝试重新加载
+        # 如果内存中没有，且profiles.json被其他进程改过，才重新加载
         if user_id not in self.user_profiles_db:
-            print(f"🔄 内存中未找到用户资料 {user_id}，尝试重新加载...")
-            self.user_profiles_db = self.load_data(self.profiles_file, {})
+            self._refresh_collection('profiles')
 
         if user_id in self.user_profiles_db:
-            profile = self.user_profiles_db[user_id].copy()
-            
-            # 更新使用统计
-            today = datetime.now().strftime('%Y-%m-%d')
-            daily_usage = profile.get('daily_usage', {})
-            today_usage = daily_usage.get(today, {})
-            
-            # 获取当前计划的所有工具配置
-            plan = profile.get('plan', 'free')
-            default_stats = self.get_default_usage_stats(plan)
+            stored = self.user_profiles_db[user_id]
+            changed = self._refresh_usage_stats(stored)
             
-            # 补充缺失的工具到 usage_stats（兼容老会员）
-            if 'usage_stats' not in profile:
-                profile['usage_stats'] = {}
-                
-            for tool_name, tool_stats in default_stats.items():
-                if tool_name not in profile['usage_stats']:
-                    # 新工具，添加到 usage_stats
-                    profile['usage_stats'][tool_name] = {
-                        'current_usage': 0,
-                        'daily_limit': tool_stats['daily_limit'],
-                        'remaining_usage': tool_stats['remaining_usage']
-                    }
-                else:
-                    # 已存在的工具，更新限制（如果配置有变化）
-                    profile['usage_stats'][tool_name]['daily_limit'] = tool_stats['daily_limit']
+            # 保存更新后的资料（包含新工具）；日志模式下只在工具或限制变化时记录
+            self._persist([('profiles', user_id, ('usage_stats',), stored['usage_stats'])] if changed else [])
             
-            # 更新所有工具的使用次数和剩余次数
-            for tool_name in profile['usage_stats']:
-                current_usage = today_usage.get(tool_name, 0)
-                daily_limit = profile['usage_stats'][tool_name]['daily_limit']
-                remaining = daily_limit - current_usage if daily_limit != -1 else -1
-                
-                profile['usage_stats'][tool_name]['current_usage'] = current_usage
-                profile['usage_stats'][tool_name]['remaining_usage'] = remaining
+            return stored.copy()
+        return None
+    
+    def _refresh_usage_stats(self, profile):
+        """按当前套餐补全usage_stats并填入今日使用次数，返回工具或限制是否有变化"""
+        # 更新使用统计
+        today = datetime.now().strftime('%Y-%m-%d')
+        daily_usage = profile.get('daily_usage', {})
+        today_usage = daily_usage.get(today, {})
+        
+        # 获取当前计划的所有工具配置
+        plan = profile.get('plan', 'free')
+        default_stats = self.get_default_usage_stats(plan)
+        
+        # 补充缺失的工具到 usage_stats（兼容老会员）
+        changed = False
+        if 'usage_stats' not in profile:
+            profile['usage_stats'] = {}
+            changed = True
             
-            # 保存更新后的资料（包含新工具）
-            self.save_all()
+        for tool_name, tool_stats in default_stats.items():
+            if tool_name not in profile['usage_stats']:
+                # 新工具，添加到 usage_stats
+                profile['usage_stats'][tool_name] = {
+                    'current_usage': 0,
+                    'daily_limit': tool_stats['daily_limit'],
+                    'remaining_usage': tool_stats['remaining_usage']
+                }
+                changed = True
+            elif profile['usage_stats'][tool_name].get('daily_limit') != tool_stats['daily_limit']:
+                # 已存在的工具，更新限制（如果配置有变化）
+                profile['usage_stats'][tool_name]['daily_limit'] = tool_stats['daily_limit']
+                changed = True
+        
+        # 更新所有工具的使用次数和剩余次数
+        for tool_name in profile['usage_stats']:
+            current_usage = today_usage.get(tool_name, 0)
+            daily_limit = profile['usage_stats'][tool_name]['daily_limit']
+            remaining = daily_limit - current_usage if daily_limit != -1 else -1
             
-            return profile
-        return None
+            profile['usage_stats'][tool_name]['current_usage'] = current_usage
+            profile['usage_stats'][tool_name]['remaining_usage'] = remaining
+        
+        return changed
     
     def record_usage(self, user_id, tool_name):
         """记录工具使用"""
         if user_id not in self.user_profiles_db:
             return False, "用户不存在"
         
-        profile = self.user_profiles_db[user_id]
-        today = datetime.now().strftime('%Y-%m-%d')
-        
-        # 初始化daily_usage
-        if 'daily_usage' not in profile:
-            profile['daily_usage'] = {}
-        
-        if today not in profile['daily_usage']:
-            profile['daily_usage'][today] = {}
+        with self._lock:
+            profile = self.user_profiles_db[user_id]
+            today = datetime.now().strftime('%Y-%m-%d')
+            
+            # 初始化daily_usage
+            if 'daily_usage' not in profile:
+                profile['daily_usage'] = {}
+            
+            if today not in profile['daily_usage']:
+                profile['daily_usage'][today] = {}
+            
+            # 增加使用次数
+            current_count = profile['daily_usage'][today].get(tool_name, 0)
+            profile['daily_usage'][today][tool_name] = current_count + 1
+            profile['updated_at'] = datetime.now().isoformat()
+            
+            # 保存数据（日志模式下只追加这次计数，而不是重写全部文件）
+            self._persist([
+                ('profiles', user_id, ('daily_usage', today, tool_name), current_count + 1),
+                ('profiles', user_id, ('updated_at',), profile['updated_at'])
+            ])
         
-        # 增加使用次数
-        current_count = profile['daily_usage'][today].get(tool_name, 0)
-        profile['daily_usage'][today][tool_name] = current_count + 1
-        profile['updated_at'] = datetime.now().isoformat()
+        return True, f"使用次数已记录，今日使用{current_count + 1}次"
+    
+    # ---- 使用历史保留与压缩 ----
+    
+    def _start_retention(self):
+        """加入后台保留任务（DATA_RETENTION_INTERVAL秒执行一次，0表示不启用）"""
+        self.retention_days = int(os.getenv('DATA_RETENTION_DAYS', '90'))
+        self.retention_interval = float(os.getenv('DATA_RETENTION_INTERVAL', '21600'))
+        self.retention_stats = {
+            'runs': 0, 'profiles_compacted': 0, 'days_rolled_up': 0, 'rewards_dropped': 0,
+            'last_run_at': None, 'last_run_seconds': 0.0
+        }
+        if self.retention_interval > 0 and self.retention_days > 0 and not self.read_only:
+            start_retention(self, self.retention_interval)
+    
+    def _compact_profile(self, profile, cutoff, today, now_iso):
+        """压缩单个资料（原地修改，各存储后端共用），返回(汇总天数, 清除奖励数)
+        - cutoff之前的daily_usage按月累加到monthly_usage
+        - 过期的one_time_rewards和今天之前的daily_rewards删除
+        """
+        daily_usage = profile.get('daily_usage') or {}
+        old_days = [day for day in daily_usage if day < cutoff]
+        if old_days:
+            monthly_usage = profile.setdefault('monthly_usage', {})
+            for day in old_days:
+                # 原地删除旧日期，不影响并发写入的今日计数
+                month = monthly_usage.setdefault(day[:7], {})
+                for tool_name, count in daily_usage.pop(day).items():
+                    month[tool_name] = month.get(tool_name, 0) + count
         
-        # 保存数据
-        self.save_all()
+        dropped = 0
+        rewards = profile.get('invite_rewards')
+        if rewards:
+            daily_rewards = rewards.get('daily_rewards') or {}
+            for day in [day for day in daily_rewards if day < today]:
+                del daily_rewards[day]
+                dropped += 1
+            one_time = rewards.get('one_time_rewards') or []
+            active = [reward for reward in one_time if (reward.get('expires_at') or now_iso) >= now_iso]
+            if len(active) != len(one_time):
+                dropped += len(one_time) - len(active)
+                rewards['one_time_rewards'] = active
+        return len(old_days), dropped
+    
+    def _retention_cutoff(self, retention_days=None, now=None):
+        now = now or datetime.now()
+        days = self.retention_days if retention_days is None else retention_days
+        return (
+            (now - timedelta(days=days)).strftime('%Y-%m-%d'),
+            now.strftime('%Y-%m-%d'),
+            now.isoformat()
+        )
+    
+    def _record_retention(self, started, profiles, days, dropped):
+        stats = self.retention_stats
+        stats['runs'] += 1
+        stats['profiles_compacted'] += profiles
+        stats['days_rolled_up'] += days
+        stats['rewards_dropped'] += dropped
+        stats['last_run_at'] = datetime.now().isoformat()
+        stats['last_run_seconds'] = round(time.perf_counter() - started, 4)
+        if profiles:
+            print(f"🧹 使用历史压缩: {profiles} 个资料, 汇总 {days} 天, 清除 {dropped} 条过期奖励")
+        return {'profiles': profiles, 'days_rolled_up': days, 'rewards_dropped': dropped}
+    
+    def compact_usage_history(self, retention_days=None, now=None):
+        """把超过保留天数的每日使用记录汇总为月度并清除过期奖励，使资料大小和保存耗时有上限
+        逐个资料持有管理器锁修改，不会与请求线程同时改同一份资料"""
+        started = time.perf_counter()
+        cutoff, today, now_iso = self._retention_cutoff(retention_days, now)
+        changes = []
+        total_days = total_dropped = 0
+        with self._lock:
+            user_ids = list(self.user_profiles_db)
+        for user_id in user_ids:
+            with self._lock:
+                profile = self.user_profiles_db.get(user_id)
+                if profile is None:
+                    continue
+                days, dropped = self._compact_profile(profile, cutoff, today, now_iso)
+                if not (days or dropped):
+                    continue
+                total_days += days
+                total_dropped += dropped
+                for field in ('daily_usage', 'monthly_usage', 'invite_rewards'):
+                    if field in profile:
+                        changes.append(('profiles', user_id, (field,), profile[field]))
         
-        return True, f"使用次数已记录，今日使用{current_count + 1}次"
+        profiles = len({change[1] for change in changes})
+        if profiles:
+            with self._lock:
+                self._persist(changes, self.save_profiles)
+        return self._record_retention(started, profiles, total_days, total_dropped)
+    
+    def get_retention_stats(self):
+        """保留任务统计（用于健康检查）"""
+        stats = dict(self.retention_stats)
+        stats['retention_days'] = self.retention_days
+        return stats
+    
+    def get_storage_stats(self):
+        """持久化模式与日志统计（用于健康检查）"""
+        if self.journal is None:
+            return {'mode': 'read_only' if self.read_only else 'snapshot'}
+        stats = self.journal.stats()
+        stats['mode'] = 'journal'
+        return stats
     
     def get_all_users(self):
         """获取所有用户信息（调试用）"""
@@ -462,6 +700,40 @@ class DataManager:
             })
         return users_info
 
+# 后台保留任务：所有DataManager实例共用一个线程
+_retention_managers = weakref.WeakSet()
+_retention_thread = None
+_retention_stop = threading.Event()
+_retention_lock = threading.Lock()
+
+def start_retention(manager, interval_seconds):
+    """把实例加入后台保留任务，线程只在第一次调用时启动"""
+    global _retention_thread
+    with _retention_lock:
+        _retention_managers.add(manager)
+        if _retention_thread is not None and _retention_thread.is_alive():
+            return _retention_thread
+        _retention_stop.clear()
+        
+        def _loop():
+            while not _retention_stop.wait(interval_seconds):
+                for dm in list(_retention_managers):
+                    try:
+                        dm.compact_usage_history()
+                    except Exception as e:
+                        print(f"❌ 使用历史压缩失败: {e}")
+        
+        _retention_thread = threading.Thread(target=_loop, name='data-retention', daemon=True)
+        _retention_thread.start()
+        atexit.register(stop_retention)
+        return _retention_thread
+
+def stop_retention(timeout=None):
+    """停止后台保留线程"""
+    _retention_stop.set()
+    if _retention_thread is not None and _retention_thread is not threading.current_thread():
+        _retention_thread.join(timeout)
+
 # 全局数据管理器实例
 data_manager = None
 
@@ -469,7 +741,12 @@ def get_data_manager():
     """获取数据管理器实例"""
     global data_manager
     if data_manager is None:
-        data_manager = DataManager()
+        if os.getenv('DATA_MANAGER_BACKEND', 'json').lower() == 'sqlite':
+            # 多worker部署使用SQLite后端，方法不变
+            from data_manager_sqlite import SQLiteDataManager
+            data_manager = SQLiteDataManager()
+        else:
+            data_manager = DataManager()
     return data_manager
 
 if __name__ == '__main__':
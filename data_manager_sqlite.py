@@ -0,0 +1,649 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+DataManager的SQLite存储后端
+与DataManager方法相同，数据保存在SQLite（WAL模式）中，多个gunicorn worker进程共享同一份数据：
+- 读写并发：WAL模式下读不阻塞写，写事务使用BEGIN IMMEDIATE串行化
+- token/email/邀请码走索引，使用次数用UPSERT原子累加，不再整文件重写
+- users_db/user_profiles_db等属性保留为字典视图，兼容直接访问这些字典的旧代码
+- 首次启动时自动从data/*.json导入，也可以手动执行：
+  python data_manager_sqlite.py import [数据目录] [数据库文件]
+
+启用方式：DATA_MANAGER_BACKEND=sqlite（数据库路径DATA_MANAGER_DB，默认data/data_manager.db）
+"""
+
+import os
+import sys
+import json
+import random
+import string
+import sqlite3
+import time
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from data_manager import DataManager
+from data_serializer import get_serializer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    email TEXT NOT NULL DEFAULT '',
+    token TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_users_token ON users(token);
+
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    invite_code TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_profiles_invite_code ON profiles(invite_code);
+
+CREATE TABLE IF NOT EXISTS daily_usage (
+    user_id TEXT NOT NULL,
+    usage_date TEXT NOT NULL,
+    tool_name TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, usage_date, tool_name)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS invites (
+    invite_code TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS orders (
+    order_no TEXT PRIMARY KEY,
+    user_id TEXT,
+    status TEXT,
+    created_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_user ON orders(user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS tool_usage (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 集合名 -> (表名, 主键列)
+TABLES = {
+    'users': ('users', 'user_id'),
+    'profiles': ('profiles', 'user_id'),
+    'usage': ('tool_usage', 'key'),
+    'invites': ('invites', 'invite_code'),
+    'orders': ('orders', 'order_no')
+}
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def _normalize_email(email):
+    return (email or '').lower().strip()
+
+
+class SQLiteCollection(MutableMapping):
+    """把一张表包装成字典（users_db等属性），兼容"修改字典后调用save_xxx()"的旧用法：
+    通过下标取到的对象连同读取时的快照一起记住，save_xxx()时只写回内容确实被修改过的对象"""
+
+    # 最多记住的对象数，超出时先写回最早取出的对象
+    MAX_TRACKED = 1000
+
+    def __init__(self, manager, name):
+        self._manager = manager
+        self._name = name
+        self._touched = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        # 已取出且尚未写回的对象直接返回同一个，否则前一次取出后的修改会在save_xxx()时丢失
+        with self._lock:
+            tracked = self._touched.get(key)
+            if tracked is not None:
+                self._touched.move_to_end(key)
+                return tracked[0]
+        with self._manager._read() as conn:
+            value = self._manager._load(conn, self._name, key)
+        if value is None:
+            raise KeyError(key)
+        if isinstance(value, (dict, list)):
+            with self._lock:
+                self._touched[key] = (value, _dumps(value))
+                self._touched.move_to_end(key)
+                evicted = self._touched.popitem(last=False) if len(self._touched) > self.MAX_TRACKED else None
+            if evicted:
+                self._write_changed([evicted])
+        return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            tracked = self._touched.pop(key, None)
+        # 赋值的是之前取出的对象时，按读取时的快照合并使用次数
+        snapshot = json.loads(tracked[1]) if tracked else None
+        with self._manager._transaction() as conn:
+            self._manager._store(conn, self._name, key, value, snapshot)
+
+    def __delitem__(self, key):
+        table, key_column = TABLES[self._name]
+        with self._manager._transaction() as conn:
+            deleted = conn.execute(f'DELETE FROM {table} WHERE {key_column} = ?', (key,)).rowcount
+            if self._name == 'profiles':
+                conn.execute('DELETE FROM daily_usage WHERE user_id = ?', (key,))
+        with self._lock:
+            self._touched.pop(key, None)
+        if not deleted:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        table, key_column = TABLES[self._name]
+        with self._manager._read() as conn:
+            return conn.execute(f'SELECT 1 FROM {table} WHERE {key_column} = ?', (key,)).fetchone() is not None
+
+    def __iter__(self):
+        table, key_column = TABLES[self._name]
+        with self._manager._read() as conn:
+            keys = [row[0] for row in conn.execute(f'SELECT {key_column} FROM {table} ORDER BY rowid')]
+        return iter(keys)
+
+    def __len__(self):
+        table, _ = TABLES[self._name]
+        with self._manager._read() as conn:
+            return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def _write_changed(self, tracked):
+        """写回与读取时快照不同的对象，tracked: [(key, (对象, 快照))]"""
+        changed = []
+        for key, (value, snapshot) in tracked:
+            if _dumps(value) != snapshot:
+                changed.append((key, value, json.loads(snapshot)))
+        if not changed:
+            return
+        with self._manager._transaction() as conn:
+            for key, value, snapshot in changed:
+                self._manager._store(conn, self._name, key, value, snapshot)
+
+    def flush(self):
+        """把取出后被修改过的对象写回数据库"""
+        with self._lock:
+            if not self._touched:
+                return True
+            touched, self._touched = self._touched, OrderedDict()
+        self._write_changed(touched.items())
+        return True
+
+
+class SQLiteDataManager(DataManager):
+    """SQLite存储后端，方法与DataManager一致"""
+
+    def __init__(self, db_path=None, data_dir='data', auto_import=True):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.db_path = Path(db_path or os.getenv('DATA_MANAGER_DB') or self.data_dir / 'data_manager.db')
+        self.busy_timeout = float(os.getenv('DATA_MANAGER_BUSY_TIMEOUT', '10'))
+
+        # JSON快照文件（导入用）
+        self.users_file = self.data_dir / 'users.json'
+        self.profiles_file = self.data_dir / 'profiles.json'
+        self.usage_file = self.data_dir / 'usage.json'
+        self.invites_file = self.data_dir / 'invites.json'
+        self.orders_file = self.data_dir / 'orders.json'
+
+        self.journal = None
+        self._file_generations = {}
+        self.serializer = get_serializer()
+        self.io_stats = {}
+        self._local = threading.local()
+        self._lock = threading.RLock()
+
+        with self._transaction() as conn:
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+
+        # 字典视图（兼容旧代码直接访问）
+        self.users_db = SQLiteCollection(self, 'users')
+        self.user_profiles_db = SQLiteCollection(self, 'profiles')
+        self.tool_usage_db = SQLiteCollection(self, 'usage')
+        self.invites_db = SQLiteCollection(self, 'invites')
+        self.orders_db = SQLiteCollection(self, 'orders')
+
+        self._start_retention()
+
+        if auto_import:
+            imported = self.import_json_data(only_if_empty=True)
+            if imported:
+                print(f"📥 已从JSON文件导入: {imported}")
+
+        print(f"✅ 数据持久化管理器初始化成功 (SQLite)")
+        print(f"📁 数据库: {self.db_path.absolute()}")
+        print(f"👥 用户数量: {len(self.users_db)}")
+
+    # ---- 连接与事务 ----
+
+    def _conn(self):
+        """每个线程一个连接；sqlite3会缓存参数化语句（预编译语句复用）"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                str(self.db_path),
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                cached_statements=256
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """写事务：BEGIN IMMEDIATE，多进程间串行化写入"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    @contextmanager
+    def _read(self):
+        """读操作：WAL模式下自动提交的读不阻塞写"""
+        yield self._conn()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ---- 对象与行之间的转换 ----
+
+    def _load(self, conn, name, key):
+        if name == 'users':
+            row = conn.execute('SELECT token, data FROM users WHERE user_id = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            user = json.loads(row[1])
+            user['token'] = row[0]
+            return user
+        if name == 'profiles':
+            row = conn.execute('SELECT updated_at, data FROM profiles WHERE user_id = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            return self._assemble_profile(conn, key, row[0], row[1])
+        if name == 'invites':
+            row = conn.execute('SELECT user_id FROM invites WHERE invite_code = ?', (key,)).fetchone()
+            return row[0] if row else None
+        table, key_column = TABLES[name]
+        row = conn.execute(f'SELECT data FROM {table} WHERE {key_column} = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _assemble_profile(self, conn, user_id, updated_at, data):
+        profile = json.loads(data)
+        if updated_at is not None:
+            profile['updated_at'] = updated_at
+        daily_usage = {}
+        for usage_date, tool_name, count in conn.execute(
+            'SELECT usage_date, tool_name, count FROM daily_usage WHERE user_id = ? ORDER BY usage_date', (user_id,)
+        ):
+            daily_usage.setdefault(usage_date, {})[tool_name] = count
+        profile['daily_usage'] = daily_usage
+        return profile
+
+    def _store(self, conn, name, key, value, snapshot=None):
+        if name == 'users':
+            user = dict(value)
+            token = user.pop('token', None)
+            conn.execute(
+                'INSERT INTO users (user_id, email, token, data) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(user_id) DO UPDATE SET email = excluded.email, token = excluded.token, data = excluded.data',
+                (key, _normalize_email(user.get('email')), token, _dumps(user))
+            )
+        elif name == 'profiles':
+            self._store_profile(conn, key, value, merge_usage=True,
+                                usage_base=snapshot.get('daily_usage', {}) if snapshot else None)
+        elif name == 'invites':
+            conn.execute(
+                'INSERT INTO invites (invite_code, user_id) VALUES (?, ?) '
+                'ON CONFLICT(invite_code) DO UPDATE SET user_id = excluded.user_id',
+                (key, value)
+            )
+        elif name == 'orders':
+            conn.execute(
+                'INSERT INTO orders (order_no, user_id, status, created_at, data) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(order_no) DO UPDATE SET user_id = excluded.user_id, status = excluded.status, '
+                'created_at = excluded.created_at, data = excluded.data',
+                (key, value.get('user_id'), value.get('status'), value.get('created_at'), _dumps(value))
+            )
+        else:
+            conn.execute(
+                'INSERT INTO tool_usage (key, data) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET data = excluded.data',
+                (key, _dumps(value))
+            )
+
+    def _store_profile(self, conn, user_id, profile, merge_usage=False, usage_base=None):
+        """保存资料；daily_usage单独存表，merge_usage=True时按行UPSERT合并使用记录：
+        传入usage_base（读取时的使用记录）时只累加这之后的变化，其他请求同时记录的次数不会被覆盖"""
+        data = dict(profile)
+        daily_usage = data.pop('daily_usage', None)
+        updated_at = data.pop('updated_at', None)
+        conn.execute(
+            'INSERT INTO profiles (user_id, invite_code, updated_at, data) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(user_id) DO UPDATE SET invite_code = excluded.invite_code, '
+            'updated_at = excluded.updated_at, data = excluded.data',
+            (user_id, data.get('invite_code'), updated_at, _dumps(data))
+        )
+        if not merge_usage or not daily_usage:
+            return
+        rows = []
+        for usage_date, tools in daily_usage.items():
+            for tool_name, count in tools.items():
+                if usage_base is None:
+                    rows.append((user_id, usage_date, tool_name, count, count))
+                    continue
+                delta = count - usage_base.get(usage_date, {}).get(tool_name, 0)
+                if delta:
+                    rows.append((user_id, usage_date, tool_name, count, delta))
+        if usage_base is None:
+            sql = ('INSERT INTO daily_usage (user_id, usage_date, tool_name, count) VALUES (?, ?, ?, ?) '
+                   'ON CONFLICT(user_id, usage_date, tool_name) DO UPDATE SET count = ?')
+        else:
+            sql = ('INSERT INTO daily_usage (user_id, usage_date, tool_name, count) VALUES (?, ?, ?, ?) '
+                   'ON CONFLICT(user_id, usage_date, tool_name) DO UPDATE SET count = MAX(0, count + ?)')
+        conn.executemany(sql, rows)
+
+    # ---- 导入 ----
+
+    def import_json_data(self, data_dir=None, only_if_empty=False):
+        """从data/*.json一次性导入（INSERT OR UPDATE，可重复执行），返回各集合导入条数"""
+        data_dir = Path(data_dir) if data_dir else self.data_dir
+        files = {
+            'users': data_dir / 'users.json',
+            'profiles': data_dir / 'profiles.json',
+            'usage': data_dir / 'usage.json',
+            'invites': data_dir / 'invites.json',
+            'orders': data_dir / 'orders.json'
+        }
+        if not any(path.exists() for path in files.values()):
+            return {}
+
+        with self._transaction() as conn:
+            if only_if_empty:
+                # 在写事务内检查，多个worker同时启动时只会导入一次
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported_at'").fetchone():
+                    return {}
+                if conn.execute('SELECT 1 FROM users LIMIT 1').fetchone():
+                    return {}
+            counts = {}
+            for name, path in files.items():
+                data = self.load_data(path, {})
+                for key, value in data.items():
+                    self._store(conn, name, key, value)
+                counts[name] = len(data)
+            # 资料中的邀请码补全到邀请关系表
+            conn.execute(
+                'INSERT OR IGNORE INTO invites (invite_code, user_id) '
+                'SELECT invite_code, user_id FROM profiles WHERE invite_code IS NOT NULL'
+            )
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('json_imported_at', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (datetime.now().isoformat(),)
+            )
+        return counts
+
+    # ---- 保存（兼容旧接口） ----
+
+    def _save_collection(self, name):
+        """写回通过字典视图修改过的对象"""
+        view = {
+            'users': self.users_db, 'profiles': self.user_profiles_db, 'usage': self.tool_usage_db,
+            'invites': self.invites_db, 'orders': self.orders_db
+        }[name]
+        try:
+            return view.flush()
+        except Exception as e:
+            print(f"❌ 保存 {name} 失败: {e}")
+            return False
+
+    def save_all(self):
+        """保存所有数据（每次变更已即时写入，这里只写回字典视图中修改过的对象）"""
+        return all(self._save_collection(name) for name in TABLES)
+
+    def save_order(self, order_data):
+        """保存单个订单"""
+        order_no = order_data.get('order_no')
+        if not order_no:
+            return False
+        with self._transaction() as conn:
+            self._store(conn, 'orders', order_no, order_data)
+        return True
+
+    def reindex_users(self):
+        """索引由SQLite维护，无需刷新"""
+
+    # ---- 用户 ----
+
+    def create_user(self, email, password, name, plan='free'):
+        """创建用户（用户、资料、邀请码在同一事务中写入）"""
+        for _ in range(5):
+            invite_code = self.generate_invite_code()
+            user_id, token, user, profile = self._new_user_records(email, password, name, plan, invite_code)
+            try:
+                with self._transaction() as conn:
+                    conn.execute('INSERT INTO invites (invite_code, user_id) VALUES (?, ?)', (invite_code, user_id))
+                    self._store(conn, 'users', user_id, user)
+                    self._store_profile(conn, user_id, profile)
+                return user_id, token
+            except sqlite3.IntegrityError:
+                # 邀请码被其他进程抢先使用，重新生成
+                continue
+        raise RuntimeError("生成邀请码失败")
+
+    def generate_invite_code(self):
+        """生成唯一的邀请码（8位大写字母+数字）"""
+        with self._read() as conn:
+            while True:
+                code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+                if conn.execute('SELECT 1 FROM invites WHERE invite_code = ?', (code,)).fetchone() is None:
+                    return code
+
+    def get_inviter_by_code(self, invite_code):
+        """通过邀请码获取邀请人ID"""
+        with self._read() as conn:
+            row = conn.execute('SELECT user_id FROM invites WHERE invite_code = ?', (invite_code.upper(),)).fetchone()
+        return row[0] if row else None
+
+    def _user_result(self, user_id, token, data):
+        user = json.loads(data)
+        return {
+            'id': user_id,
+            'email': user['email'],
+            'password': user['password'],
+            'token': token
+        }
+
+    def get_user_by_token(self, token):
+        """通过token获取用户（索引查找）"""
+        if not token:
+            return None
+        with self._read() as conn:
+            row = conn.execute(
+                'SELECT user_id, token, data FROM users WHERE token = ? ORDER BY rowid LIMIT 1', (token,)
+            ).fetchone()
+        return self._user_result(*row) if row else None
+
+    _find_user_by_token_in_memory = get_user_by_token
+
+    def get_user_by_email(self, email):
+        """通过邮箱获取用户（索引查找）"""
+        with self._read() as conn:
+            row = conn.execute(
+                'SELECT user_id, token, data FROM users WHERE email = ? ORDER BY rowid LIMIT 1', (_normalize_email(email),)
+            ).fetchone()
+        return self._user_result(*row) if row else None
+
+    def authenticate_user(self, email, password):
+        """用户认证"""
+        email_lower = _normalize_email(email)
+        user = self.get_user_by_email(email_lower)
+
+        if user:
+            if user.get('password') == password:
+                new_token = f"mock_token_{user['id'][:8]}"
+                with self._transaction() as conn:
+                    conn.execute('UPDATE users SET token = ? WHERE user_id = ?', (new_token, user['id']))
+                user['token'] = new_token
+                return user
+            else:
+                print(f"密码验证失败 - 存储的密码长度: {len(user.get('password', ''))}, 输入的密码长度: {len(password)}")
+        else:
+            print(f"用户未找到 - 邮箱: {email_lower}")
+
+        return None
+
+    # ---- 资料与使用记录 ----
+
+    def get_user_profile(self, user_id):
+        """获取用户资料"""
+        with self._read() as conn:
+            profile = self._load(conn, 'profiles', user_id)
+        if profile is None:
+            return None
+
+        if self._refresh_usage_stats(profile):
+            # 只更新usage_stats，不触碰并发写入的daily_usage
+            with self._transaction() as conn:
+                row = conn.execute('SELECT data FROM profiles WHERE user_id = ?', (user_id,)).fetchone()
+                if row:
+                    data = json.loads(row[0])
+                    data['usage_stats'] = profile['usage_stats']
+                    conn.execute('UPDATE profiles SET data = ? WHERE user_id = ?', (_dumps(data), user_id))
+        return profile
+
+    def record_usage(self, user_id, tool_name):
+        """记录工具使用（UPSERT原子累加，多进程安全）"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        with self._transaction() as conn:
+            updated = conn.execute(
+                'UPDATE profiles SET updated_at = ? WHERE user_id = ?', (datetime.now().isoformat(), user_id)
+            ).rowcount
+            if not updated:
+                return False, "用户不存在"
+            conn.execute(
+                'INSERT INTO daily_usage (user_id, usage_date, tool_name, count) VALUES (?, ?, ?, 1) '
+                'ON CONFLICT(user_id, usage_date, tool_name) DO UPDATE SET count = count + 1',
+                (user_id, today, tool_name)
+            )
+            count = conn.execute(
+                'SELECT count FROM daily_usage WHERE user_id = ? AND usage_date = ? AND tool_name = ?',
+                (user_id, today, tool_name)
+            ).fetchone()[0]
+
+        return True, f"使用次数已记录，今日使用{count}次"
+
+    def add_invite_reward(self, user_id, reward_type, tool_name, count, days=0):
+        """添加邀请奖励（读-改-写在同一个写事务内，避免并发丢失）"""
+        with self._transaction() as conn:
+            row = conn.execute('SELECT data FROM profiles WHERE user_id = ?', (user_id,)).fetchone()
+            if row is None:
+                return False, "用户不存在"
+            data = json.loads(row[0])
+            self._apply_invite_reward(data, reward_type, tool_name, count, days)
+            updated_at = data.pop('updated_at')
+            conn.execute(
+                'UPDATE profiles SET data = ?, updated_at = ? WHERE user_id = ?', (_dumps(data), updated_at, user_id)
+            )
+        return True, "奖励已添加"
+
+    def compact_usage_history(self, retention_days=None, now=None):
+        """把超过保留天数的daily_usage行汇总到资料的monthly_usage并删除，清除过期奖励"""
+        started = time.perf_counter()
+        cutoff, today, now_iso = self._retention_cutoff(retention_days, now)
+        total_profiles = total_days = total_dropped = 0
+        with self._transaction() as conn:
+            old_usage = {}
+            for user_id, usage_date, tool_name, count in conn.execute(
+                'SELECT user_id, usage_date, tool_name, count FROM daily_usage WHERE usage_date < ?', (cutoff,)
+            ):
+                old_usage.setdefault(user_id, {}).setdefault(usage_date, {})[tool_name] = count
+
+            for user_id, data in conn.execute('SELECT user_id, data FROM profiles').fetchall():
+                profile = json.loads(data)
+                profile['daily_usage'] = old_usage.get(user_id, {})
+                days, dropped = self._compact_profile(profile, cutoff, today, now_iso)
+                if not (days or dropped):
+                    continue
+                profile.pop('daily_usage')
+                profile.pop('updated_at', None)
+                conn.execute('UPDATE profiles SET data = ? WHERE user_id = ?', (_dumps(profile), user_id))
+                total_profiles += 1
+                total_days += days
+                total_dropped += dropped
+
+            conn.execute('DELETE FROM daily_usage WHERE usage_date < ?', (cutoff,))
+        return self._record_retention(started, total_profiles, total_days, total_dropped)
+
+    def get_all_users(self):
+        """获取所有用户信息（调试用）"""
+        users_info = []
+        with self._read() as conn:
+            rows = conn.execute(
+                'SELECT u.user_id, u.token, u.data, p.data FROM users u '
+                'LEFT JOIN profiles p ON p.user_id = u.user_id ORDER BY u.rowid'
+            ).fetchall()
+        for user_id, token, user_data, profile_data in rows:
+            user = json.loads(user_data)
+            profile = json.loads(profile_data) if profile_data else {}
+            users_info.append({
+                'user_id': user_id,
+                'email': user.get('email', '未知'),
+                'name': profile.get('name', '未知'),
+                'plan': profile.get('plan', '未知'),
+                'token': token or '未知',
+                'created_at': user.get('created_at', '未知')
+            })
+        return users_info
+
+    def get_storage_stats(self):
+        """存储后端信息（用于健康检查）"""
+        with self._read() as conn:
+            counts = {
+                name: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for name, (table, _) in TABLES.items()
+            }
+            journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        return {'mode': 'sqlite', 'path': str(self.db_path), 'journal_mode': journal_mode, 'counts': counts}
+
+
+if __name__ == '__main__':
+    # 一次性导入：python data_manager_sqlite.py import [数据目录] [数据库文件]
+    if len(sys.argv) >= 2 and sys.argv[1] == 'import':
+        source_dir = sys.argv[2] if len(sys.argv) > 2 else 'data'
+        target_db = sys.argv[3] if len(sys.argv) > 3 else None
+        manager = SQLiteDataManager(target_db, data_dir=source_dir, auto_import=False)
+        result = manager.import_json_data(source_dir)
+        print(f"✅ 导入完成: {result}")
+        print(f"📊 {manager.get_storage_stats()}")
+    else:
+        print("用法: python data_manager_sqlite.py import [数据目录] [数据库文件]")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+数据文件序列化
+DataManager和预写日志快照共用：选择序列化格式、按内容识别格式读取、原子写入文件。
+
+DATA_SERIALIZER:
+- auto（默认）: 安装了orjson时用orjson紧凑输出，否则用标准库json紧凑输出
+- orjson: orjson紧凑输出
+- msgpack: 二进制格式（需要安装msgpack）
+- json: 标准库json，缩进2格（便于人工查看，最慢）
+
+读取时按文件内容识别JSON/msgpack，切换格式后旧文件仍可读取。
+"""
+
+import os
+import json
+import tempfile
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # 没有安装时使用标准库json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class JsonSerializer:
+    """标准库json；indent为None时紧凑输出"""
+
+    def __init__(self, indent=2):
+        self.indent = indent
+        self.name = 'json' if indent else 'json-compact'
+
+    def dumps(self, data):
+        if self.indent:
+            return json.dumps(data, ensure_ascii=False, indent=self.indent).encode('utf-8')
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, raw):
+        return json.loads(raw)
+
+
+class OrjsonSerializer:
+    """orjson：输出UTF-8紧凑JSON，比标准库快数倍"""
+
+    name = 'orjson'
+
+    def dumps(self, data):
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, raw):
+        return orjson.loads(raw)
+
+
+class MsgpackSerializer:
+    """msgpack二进制格式"""
+
+    name = 'msgpack'
+
+    def dumps(self, data):
+        return msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, raw):
+        return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+
+def get_serializer(name=None):
+    """按名称（默认读取DATA_SERIALIZER）返回序列化器，依赖未安装时回退到JSON"""
+    name = (name or os.getenv('DATA_SERIALIZER', 'auto')).lower()
+    if name == 'json':
+        return JsonSerializer(indent=2)
+    if name == 'msgpack':
+        if msgpack is not None:
+            return MsgpackSerializer()
+        print("⚠️ 未安装msgpack，使用JSON格式保存")
+    elif name not in ('auto', 'orjson'):
+        print(f"⚠️ 未知的序列化格式 {name}，使用默认格式")
+    if orjson is not None:
+        return OrjsonSerializer()
+    return JsonSerializer(indent=None)
+
+
+def loads_any(raw):
+    """按内容识别格式并解析：JSON以{或[开头，否则按msgpack解析"""
+    head = raw.lstrip()[:1]
+    if head in (b'{', b'[') or not raw.strip():
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
+    if msgpack is None:
+        raise ValueError("文件不是JSON格式，且未安装msgpack")
+    return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+
+def read_file(file_path):
+    """读取并解析数据文件"""
+    with open(file_path, 'rb') as f:
+        return loads_any(f.read())
+
+
+def write_atomic(file_path, payload, fsync=True, backup=False):
+    """先写同目录的唯一临时文件（可fsync），再原子替换目标文件，失败时删除临时文件；
+    backup=True时把旧文件硬链接为.bak（不复制数据）"""
+    file_path = Path(file_path)
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    # 每次写入使用独立的临时文件，多个线程/进程同时保存同一文件时互不覆盖
+    fd, tmp_name = tempfile.mkstemp(prefix=f'.{file_path.name}.', suffix='.tmp', dir=file_path.parent)
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        # mkstemp创建的文件权限为0600，沿用原文件权限
+        try:
+            os.chmod(tmp_path, file_path.stat().st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+        if backup and file_path.exists():
+            backup_path = file_path.with_suffix(file_path.suffix + '.bak')
+            try:
+                backup_path.unlink(missing_ok=True)
+                os.link(file_path, backup_path)
+            except OSError as e:
+                print(f"⚠️ 备份 {file_path.name} 失败: {e}")
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return len(payload)
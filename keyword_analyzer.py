@@ -5,6 +5,7 @@
 关键词分析工具模块
 支持GPT关键词提取、亚马逊竞争度查询等功能
 当前使用模拟数据，后续接入真实API只需修改配置
+GPT提取、竞争度和趋势查询的结果经keyword_cache缓存（KEYWORD_CACHE=0可关闭）
 """
 
 import os
@@ -13,6 +14,11 @@ import random
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 
+from keyword_cache import cached, get_keyword_cache, extract_key, competition_key, trends_key
+from longtail_expander import LongTailExpander, competition_label
+from keyword_trends import TrendMatrix, analyze, rank_keywords, summarize
+from keyword_compare import CompetitorMatrix
+
 # API配置（后续替换为真实API）
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 AMAZON_SP_API_CONFIG = {
@@ -25,19 +31,30 @@ AMAZON_SP_API_CONFIG = {
 # 使用真实API标志
 USE_REAL_OPENAI = bool(OPENAI_API_KEY)
 USE_REAL_AMAZON = bool(AMAZON_SP_API_CONFIG['client_id'])
+USE_CACHE = os.getenv('KEYWORD_CACHE', '1') != '0'
 
 class KeywordAnalyzer:
     """关键词分析器"""
     
-    def __init__(self):
+    def __init__(self, cache=None):
         self.openai_available = USE_REAL_OPENAI
         self.amazon_available = USE_REAL_AMAZON
+        # 付费API的结果缓存，传入cache可使用独立的缓存实例，传入False不缓存
+        if cache is None:
+            cache = get_keyword_cache() if USE_CACHE else None
+        self.cache = cache or None
+        self.longtail_expander = LongTailExpander()
         
         if not self.openai_available:
             print("⚠️ OpenAI API密钥未配置，将使用模拟数据")
         if not self.amazon_available:
             print("⚠️ 亚马逊SP-API未配置，将使用模拟数据")
     
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """各方法的缓存命中率"""
+        return self.cache.get_stats() if self.cache else {'methods': {}, 'memory_entries': 0, 'stored_entries': 0}
+    
+    @cached('extract', extract_key)
     def extract_keywords_gpt(self, product_description: str, platforms: List[str] = None) -> Dict[str, Any]:
         """
         使用GPT提取跨平台关键词
@@ -94,6 +111,7 @@ class KeywordAnalyzer:
             'timestamp': datetime.now().isoformat()
         }
     
+    @cached('competition', competition_key)
     def check_amazon_competition(self, keyword: str) -> Dict[str, Any]:
         """
         查询亚马逊关键词竞争度
@@ -139,6 +157,7 @@ class KeywordAnalyzer:
             'timestamp': datetime.now().isoformat()
         }
     
+    @cached('trends', trends_key)
     def get_keyword_trends(self, keyword: str, days: int = 30) -> Dict[str, Any]:
         """
         获取关键词趋势数据
@@ -152,7 +171,8 @@ class KeywordAnalyzer:
                 'keyword': str,
                 'trend_data': List[Dict],
                 'avg_search_volume': float,
-                'trend_direction': str
+                'trend_direction': str,  # up/down/stable
+                'analysis': Dict  # 斜率、R²、周期性、波动率、异常日期、7日移动平均
             }
         """
         if USE_REAL_AMAZON:
@@ -172,69 +192,74 @@ class KeywordAnalyzer:
                 'competition': random.uniform(0.1, 0.9)
             })
         
-        avg_volume = sum(d['search_volume'] for d in trend_data) / len(trend_data)
-        trend_direction = 'up' if trend_data[-1]['search_volume'] > trend_data[0]['search_volume'] else 'down'
-        
-        return {
+        result = {
             'keyword': keyword,
             'trend_data': trend_data,
-            'avg_search_volume': round(avg_volume, 2),
-            'trend_direction': trend_direction,
             'source': 'mock' if not USE_REAL_AMAZON else 'amazon',
             'timestamp': datetime.now().isoformat()
         }
+        matrix = TrendMatrix.from_trend_results([result])
+        analysis = summarize(matrix, 0, analyze(matrix))
+        analysis.pop('keyword')
+        result['avg_search_volume'] = analysis.pop('avg_search_volume')
+        result['trend_direction'] = analysis.pop('trend_direction')
+        result['analysis'] = analysis
+        return result
     
-    def compare_competitor_keywords(self, asin_list: List[str], keywords: List[str]) -> Dict[str, Any]:
+    def rank_keyword_trends(self, keywords: List[str], days: int = 30, top: Optional[int] = None) -> List[Dict[str, Any]]:
         """
-        竞品关键词对比
+        多个关键词按趋势质量排序（趋势数据走缓存，指标一次性向量化计算）
+        
+        Returns:
+            按quality_score降序的指标列表
+        """
+        results = [self.get_keyword_trends(keyword, days) for keyword in keywords]
+        return rank_keywords(TrendMatrix.from_trend_results(results), top=top)
+    
+    def compare_competitor_keywords(self, asin_list: List[str], keywords: List[str], min_coverage: int = 2) -> Dict[str, Any]:
+        """
+        竞品关键词对比（关键词编号后按布尔矩阵向量化计算，见keyword_compare）
         
         Args:
             asin_list: 竞品ASIN列表
             keywords: 关键词列表
+            min_coverage: covered_by_at_least返回至少被多少个竞品覆盖的关键词
         
         Returns:
             {
                 'competitors': List[Dict],
                 'common_keywords': List[str],
-                'unique_keywords': Dict[str, List[str]]
+                'unique_keywords': Dict[str, List[str]],
+                'exclusive_keywords': Dict[str, List[str]],  # 只有该竞品覆盖
+                'overlap_matrix': List[List[int]],  # 两两共同关键词数，顺序同asins
+                'jaccard_matrix': List[List[float]],
+                'keyword_coverage': Dict[str, int],
+                'covered_by_at_least': List[str],
+                'coverage_gaps': Dict[str, List[str]]  # 多数其他竞品有而该竞品没有
             }
         """
         if USE_REAL_AMAZON:
-            # TODO: 接入真实API
+            # TODO: 接入真实API，按ASIN查询各竞品的关键词
             pass
         
-        # 模拟对比数据
-        competitors = []
-        for asin in asin_list:
-            competitor_keywords = random.sample(keywords, min(len(keywords), 8))
-            competitors.append({
-                'asin': asin,
-                'title': f'Competitor Product {asin}',
-                'keywords': competitor_keywords,
-                'keyword_count': len(competitor_keywords)
-            })
-        
-        # 找出共同关键词
-        if competitors:
-            common_keywords = list(set(competitors[0]['keywords']).intersection(*[c['keywords'] for c in competitors[1:]]))
-        else:
-            common_keywords = []
+        # 模拟各竞品的关键词
+        competitor_keywords = {asin: random.sample(keywords, min(len(keywords), 8)) for asin in asin_list}
         
-        return {
-            'competitors': competitors,
-            'common_keywords': common_keywords,
-            'unique_keywords': {c['asin']: list(set(c['keywords']) - set(common_keywords)) for c in competitors},
-            'source': 'mock' if not USE_REAL_AMAZON else 'amazon',
-            'timestamp': datetime.now().isoformat()
-        }
+        result = CompetitorMatrix.from_keyword_lists(competitor_keywords, keywords).compare(min_coverage=min_coverage)
+        for competitor in result['competitors']:
+            competitor['title'] = f'Competitor Product {competitor["asin"]}'
+        result['source'] = 'mock' if not USE_REAL_AMAZON else 'amazon'
+        result['timestamp'] = datetime.now().isoformat()
+        return result
     
-    def mine_long_tail_keywords(self, seed_keyword: str, depth: int = 3) -> Dict[str, Any]:
+    def mine_long_tail_keywords(self, seed_keyword: str, depth: int = 3, top_k: int = 50) -> Dict[str, Any]:
         """
-        长尾关键词挖掘
+        长尾关键词挖掘（广度优先逐层扩展，见longtail_expander）
         
         Args:
             seed_keyword: 种子关键词
-            depth: 挖掘深度
+            depth: 挖掘深度（扩展层数）
+            top_k: 返回得分最高的前K个
         
         Returns:
             {
@@ -244,38 +269,18 @@ class KeywordAnalyzer:
             }
         """
         if USE_REAL_OPENAI:
-            # TODO: 接入真实GPT API
+            # TODO: 接入真实GPT API，作为联想词来源加入self.longtail_expander.suggestion_sources
             pass
         
-        # 模拟长尾关键词
-        modifiers = ['best', 'cheap', 'buy', 'review', 'how to', 'where to', 'top', 'affordable', 'discount', 'sale']
-        question_words = ['what is', 'how to', 'where can', 'why', 'when to']
-        
-        long_tail = []
-        
-        # 生成修饰词组合
-        for mod in modifiers[:depth]:
-            long_tail.append({
-                'keyword': f"{mod} {seed_keyword}",
-                'search_volume': random.randint(100, 5000),
-                'competition': random.choice(['Low', 'Medium']),
-                'type': 'modifier'
-            })
-        
-        # 生成问题型
-        for q in question_words[:depth]:
-            long_tail.append({
-                'keyword': f"{q} {seed_keyword}",
-                'search_volume': random.randint(50, 3000),
-                'competition': 'Low',
-                'type': 'question'
-            })
+        long_tail, expansion_stats = self.longtail_expander.expand_with_stats(seed_keyword, depth=depth, top_k=top_k)
+        for item in long_tail:
+            item['competition'] = competition_label(item['competition_score'])
         
         return {
             'seed_keyword': seed_keyword,
             'long_tail_keywords': long_tail,
             'total_count': len(long_tail),
+            'expansion_stats': expansion_stats,
             'source': 'mock' if not USE_REAL_OPENAI else 'gpt',
             'timestamp': datetime.now().isoformat()
         }
-
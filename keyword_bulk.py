@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量关键词分析（并发调度 + 按服务商限流 + 流式返回）
+一次关键词调研要查几十上百个关键词，逐个调用KeywordAnalyzer太慢。这里：
+- 每个外部服务商（亚马逊SP-API、OpenAI）一个独立的线程池，线程数就是该服务商的最大并发
+- 令牌桶限制每秒请求数；服务商返回限流（ProviderRateLimited）时整个服务商暂停retry_after秒后重试
+- 已缓存的结果直接返回，不占用并发和限流额度
+- 结果按完成顺序逐条返回（Flask接口输出NDJSON，每行一个结果）
+
+配置（环境变量）：
+    KEYWORD_PROVIDER_<AMAZON|OPENAI>_CONCURRENCY  最大并发（默认8/4）
+    KEYWORD_PROVIDER_<AMAZON|OPENAI>_RATE         每秒请求数，0表示不限（未配置真实API时默认0）
+    KEYWORD_BULK_MAX_KEYWORDS                     单次最多关键词数（默认500）
+
+接口：POST /api/keywords/bulk
+    {"keywords": ["wireless mouse", ...], "actions": ["competition", "trends", "longtail"], "days": 30, "stream": true}
+    POST /api/keywords/trends/rank
+    {"keywords": [...], "days": 30, "top": 50, "budget_seconds": 10}  按趋势质量排序
+"""
+
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+
+from keyword_analyzer import KeywordAnalyzer, USE_REAL_AMAZON, USE_REAL_OPENAI
+from keyword_cache import competition_key, normalize_keyword, trends_key
+from keyword_trends import TrendMatrix, rank_keywords
+
+MAX_KEYWORDS = int(os.getenv('KEYWORD_BULK_MAX_KEYWORDS', '500'))
+MAX_RETRIES = int(os.getenv('KEYWORD_BULK_RETRIES', '3'))
+# 趋势排序接口的最长处理时间（秒），超时后用已获取的数据排序
+TREND_RANK_BUDGET = float(os.getenv('KEYWORD_TREND_RANK_BUDGET', '20'))
+
+# 动作 -> (服务商, KeywordAnalyzer方法, 缓存方法名, 缓存键)
+ACTIONS = {
+    'competition': ('amazon', 'check_amazon_competition', 'competition',
+                    lambda keyword, options: competition_key(keyword)),
+    'trends': ('amazon', 'get_keyword_trends', 'trends',
+               lambda keyword, options: trends_key(keyword, options['days'])),
+    'longtail': ('openai', 'mine_long_tail_keywords', None, None),
+}
+
+
+def _call_args(action, keyword, options):
+    if action == 'trends':
+        return (keyword, options['days'])
+    if action == 'longtail':
+        return (keyword, options['depth'])
+    return (keyword,)
+
+
+class ProviderRateLimited(Exception):
+    """服务商返回限流（HTTP 429），接入真实API时抛出此异常即可自动退避重试"""
+
+    def __init__(self, message='服务商限流', retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ProviderLimiter:
+    """单个服务商的并发线程池 + 令牌桶"""
+
+    def __init__(self, name, concurrency, rate=0.0, burst=None):
+        self.name = name
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f'keyword-{name}')
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self.stats = {'calls': 0, 'throttled': 0, 'waited_seconds': 0.0}
+
+    def acquire(self):
+        """等待一个令牌（限流暂停期间一并等待）"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self.rate <= 0:
+                    self.stats['calls'] += 1
+                    return
+                else:
+                    self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+                    self._last_refill = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.stats['calls'] += 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                self.stats['waited_seconds'] += wait
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """服务商限流：暂停所有后续请求"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.stats['throttled'] += 1
+
+
+def _default_limiters():
+    amazon_rate = '10' if USE_REAL_AMAZON else '0'
+    openai_rate = '5' if USE_REAL_OPENAI else '0'
+    return {
+        'amazon': ProviderLimiter('amazon', int(os.getenv('KEYWORD_PROVIDER_AMAZON_CONCURRENCY', '8')),
+                                  float(os.getenv('KEYWORD_PROVIDER_AMAZON_RATE', amazon_rate))),
+        'openai': ProviderLimiter('openai', int(os.getenv('KEYWORD_PROVIDER_OPENAI_CONCURRENCY', '4')),
+                                  float(os.getenv('KEYWORD_PROVIDER_OPENAI_RATE', openai_rate))),
+    }
+
+
+class BulkKeywordAnalyzer:
+    """批量关键词分析调度器（同一实例被所有请求共享，服务商限制对全部请求生效）"""
+
+    def __init__(self, analyzer=None, limiters=None, max_retries=None):
+        self.analyzer = analyzer or KeywordAnalyzer()
+        self.limiters = limiters or _default_limiters()
+        self.max_retries = MAX_RETRIES if max_retries is None else max_retries
+        self.stats = {'requests': 0, 'tasks': 0, 'cache_hits': 0, 'failed': 0, 'retries': 0}
+
+    def _cached(self, action, keyword, options):
+        _, _, cache_method, key_func = ACTIONS[action]
+        cache = getattr(self.analyzer, 'cache', None)
+        if cache is None or cache_method is None:
+            return None
+        return cache.get(cache_method, key_func(keyword, options))
+
+    def _execute(self, action, keyword, options):
+        """在服务商线程池中执行：取令牌、调用，限流时退避重试"""
+        provider, method_name, _, _ = ACTIONS[action]
+        limiter = self.limiters[provider]
+        method = getattr(self.analyzer, method_name)
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            limiter.acquire()
+            try:
+                data = method(*_call_args(action, keyword, options))
+                return self._result(keyword, action, started, data=data)
+            except ProviderRateLimited as e:
+                attempt += 1
+                limiter.pause(e.retry_after)
+                if attempt > self.max_retries:
+                    return self._result(keyword, action, started, error=f'{provider}限流，重试{self.max_retries}次后放弃')
+                self.stats['retries'] += 1
+            except Exception as e:
+                return self._result(keyword, action, started, error=str(e))
+
+    def _result(self, keyword, action, started, data=None, error=None, cached=False):
+        result = {
+            'keyword': keyword,
+            'action': action,
+            'success': error is None,
+            'cached': cached,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+        if error is None:
+            result['data'] = data
+        else:
+            result['error'] = error
+            self.stats['failed'] += 1
+        return result
+
+    def iter_results(self, keywords, actions=None, days=30, depth=3, deadline=None):
+        """按完成顺序逐条产出结果；调用方提前停止迭代时取消尚未开始的任务
+        deadline（time.perf_counter()时刻）到达时即使没有任务完成也停止等待，抛出TimeoutError"""
+        actions = list(actions or ACTIONS)
+        options = {'days': int(days), 'depth': int(depth)}
+        self.stats['requests'] += 1
+        futures = []
+        cached = []
+        try:
+            # 先把所有未缓存的任务提交到各服务商线程池，再返回缓存结果，避免慢速客户端拖慢调度
+            for keyword in keywords:
+                for action in actions:
+                    self.stats['tasks'] += 1
+                    started = time.perf_counter()
+                    data = self._cached(action, keyword, options)
+                    if data is not None:
+                        self.stats['cache_hits'] += 1
+                        cached.append(self._result(keyword, action, started, data=data, cached=True))
+                        continue
+                    limiter = self.limiters[ACTIONS[action][0]]
+                    futures.append(limiter.executor.submit(self._execute, action, keyword, options))
+            yield from cached
+            timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            for future in as_completed(futures, timeout=timeout):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def run(self, keywords, actions=None, days=30, depth=3):
+        """一次性返回全部结果和汇总"""
+        started = time.perf_counter()
+        results = list(self.iter_results(keywords, actions, days, depth))
+        return {
+            'success': True,
+            'results': results,
+            'summary': _summary(results, started)
+        }
+
+    def rank_trends(self, keywords, days=30, top=None, budget_seconds=None):
+        """并发获取趋势数据后向量化计算并按趋势质量排序；
+        超过budget_seconds时用已经返回的关键词排序，未完成的取消"""
+        started = time.perf_counter()
+        deadline = started + budget_seconds if budget_seconds else None
+        trends = []
+        failed = 0
+        results = self.iter_results(keywords, ['trends'], days=days, deadline=deadline)
+        try:
+            for result in results:
+                if result['success']:
+                    trends.append(result['data'])
+                else:
+                    failed += 1
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+        except FuturesTimeoutError:
+            # 预算用完时仍有请求未返回，不再等待
+            pass
+        finally:
+            results.close()
+        ranked = rank_keywords(TrendMatrix.from_trend_results(trends), top=top)
+        return {
+            'success': True,
+            'ranking': ranked,
+            'summary': {
+                'requested': len(keywords),
+                'analyzed': len(trends),
+                'failed': failed,
+                'incomplete': len(keywords) - len(trends) - failed,
+                'took_ms': round((time.perf_counter() - started) * 1000, 2)
+            }
+        }
+
+    def get_stats(self):
+        return {
+            'bulk': dict(self.stats),
+            'providers': {name: dict(limiter.stats, concurrency=limiter.concurrency, rate=limiter.rate)
+                          for name, limiter in self.limiters.items()}
+        }
+
+
+def _summary(results, started):
+    failed = sum(1 for result in results if not result['success'])
+    return {
+        'total': len(results),
+        'failed': failed,
+        'cached': sum(1 for result in results if result['cached']),
+        'took_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+def parse_bulk_request(data):
+    """校验请求参数，返回 (关键词列表, 动作列表, 错误信息)"""
+    raw_keywords = data.get('keywords')
+    if isinstance(raw_keywords, str):
+        raw_keywords = raw_keywords.replace('，', ',').replace('\n', ',').split(',')
+    if not isinstance(raw_keywords, list):
+        return None, None, '缺少keywords参数'
+    # 规范化后去重，保持原始顺序
+    keywords = list(dict.fromkeys(normalize_keyword(str(k)) for k in raw_keywords if str(k).strip()))
+    if not keywords:
+        return None, None, '关键词列表为空'
+    if len(keywords) > MAX_KEYWORDS:
+        return None, None, f'单次最多分析{MAX_KEYWORDS}个关键词'
+    actions = data.get('actions') or list(ACTIONS)
+    unknown = [action for action in actions if action not in ACTIONS]
+    if unknown:
+        return None, None, f"不支持的分析类型: {', '.join(unknown)}"
+    return keywords, actions, None
+
+
+# ---- Flask接口 ----
+
+keyword_bulk_bp = Blueprint('keyword_bulk', __name__, url_prefix='/api/keywords')
+
+bulk_analyzer = None
+_instance_lock = threading.Lock()
+
+
+def get_bulk_analyzer():
+    """获取批量分析调度器实例"""
+    global bulk_analyzer
+    with _instance_lock:
+        if bulk_analyzer is None:
+            bulk_analyzer = BulkKeywordAnalyzer()
+    return bulk_analyzer
+
+
+def _authorized():
+    """宿主应用可通过app.config['KEYWORD_BULK_AUTHORIZE']设置登录校验函数（返回用户或None）"""
+    authorize = current_app.config.get('KEYWORD_BULK_AUTHORIZE')
+    return authorize is None or bool(authorize())
+
+
+@keyword_bulk_bp.route('/bulk', methods=['POST'])
+def bulk_analyze():
+    """批量分析关键词；stream=true（默认）时以NDJSON逐行返回，最后一行为汇总"""
+    if not _authorized():
+        return jsonify({'success': False, 'error': '请先登录'}), 401
+
+    data = request.get_json(silent=True) or {}
+    keywords, actions, error = parse_bulk_request(data)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    try:
+        days = max(1, min(int(data.get('days', 30)), 365))
+        depth = max(1, min(int(data.get('depth', 3)), 10))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'days/depth必须是整数'}), 400
+
+    analyzer = get_bulk_analyzer()
+    if not data.get('stream', True):
+        return jsonify(analyzer.run(keywords, actions, days, depth))
+
+    def generate():
+        started = time.perf_counter()
+        total = failed = cached = 0
+        for result in analyzer.iter_results(keywords, actions, days, depth):
+            total += 1
+            failed += not result['success']
+            cached += result['cached']
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+        summary = {'total': total, 'failed': failed, 'cached': cached,
+                   'took_ms': round((time.perf_counter() - started) * 1000, 2)}
+        yield json.dumps({'done': True, 'summary': summary}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
+
+
+@keyword_bulk_bp.route('/trends/rank', methods=['POST'])
+def rank_trends():
+    """批量关键词按趋势质量排序：{"keywords": [...], "days": 30, "top": 50, "budget_seconds": 10}"""
+    if not _authorized():
+        return jsonify({'success': False, 'error': '请先登录'}), 401
+
+    data = request.get_json(silent=True) or {}
+    keywords, _, error = parse_bulk_request({'keywords': data.get('keywords')})
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    try:
+        days = max(14, min(int(data.get('days', 30)), 365))
+        top = int(data['top']) if data.get('top') else None
+        budget = min(float(data.get('budget_seconds', TREND_RANK_BUDGET)), TREND_RANK_BUDGET)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'days/top/budget_seconds必须是数字'}), 400
+    return jsonify(get_bulk_analyzer().rank_trends(keywords, days, top, budget))
+
+
+@keyword_bulk_bp.route('/bulk/stats', methods=['GET'])
+def bulk_stats():
+    if not _authorized():
+        return jsonify({'success': False, 'error': '请先登录'}), 401
+    analyzer = get_bulk_analyzer()
+    stats = analyzer.get_stats()
+    if getattr(analyzer.analyzer, 'cache', None) is not None:
+        stats['cache'] = analyzer.analyzer.get_cache_stats()
+    return jsonify({'success': True, 'stats': stats})
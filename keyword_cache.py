@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+关键词分析结果缓存（TTL + 持久化 + 并发请求合并）
+KeywordAnalyzer接入OpenAI、亚马逊SP-API后每次查询都要付费，而卖家反复查询相同的种子关键词。这里：
+- 按规范化后的参数（关键词小写并合并空白、平台去重排序、天数）作为缓存键
+- 每个方法单独的过期时间（KEYWORD_CACHE_TTL_<方法名>，秒）
+- 内存LRU在前，SQLite文件（data/keyword_cache.db）在后，重启后缓存仍然有效
+- 相同参数的并发请求只发起一次外部调用，其余请求等待同一个结果
+- 按方法统计命中率
+
+用法：
+    @cached('competition', competition_key)
+    def check_amazon_competition(self, keyword): ...
+"""
+
+import os
+import re
+import time
+import sqlite3
+import functools
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from data_serializer import get_serializer
+
+# 各方法默认缓存时间（秒）
+DEFAULT_TTLS = {
+    'extract': 7 * 24 * 3600,   # GPT提取的关键词基本不变
+    'competition': 6 * 3600,    # 竞争度随广告竞价变化
+    'trends': 12 * 3600,        # 趋势数据按天更新
+}
+DEFAULT_PLATFORMS = ['amazon', 'ebay', 'temu', 'shopee']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS keyword_cache (
+    method TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (method, cache_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_keyword_cache_expires ON keyword_cache(expires_at);
+"""
+
+
+# ---- 缓存键 ----
+
+def normalize_keyword(text):
+    return re.sub(r'\s+', ' ', (text or '').strip().lower())
+
+
+def extract_key(product_description, platforms=None):
+    platforms = sorted({p.strip().lower() for p in (platforms or DEFAULT_PLATFORMS)})
+    return f"{normalize_keyword(product_description)}|{','.join(platforms)}"
+
+
+def competition_key(keyword):
+    return normalize_keyword(keyword)
+
+
+def trends_key(keyword, days=30):
+    return f"{normalize_keyword(keyword)}|{int(days)}"
+
+
+class _Flight:
+    """一次正在进行的外部调用"""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class KeywordCache:
+    """关键词分析结果缓存"""
+
+    def __init__(self, db_path=None, ttls=None, memory_entries=None):
+        self.db_path = Path(db_path or os.getenv('KEYWORD_CACHE_DB', 'data/keyword_cache.db'))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttls = dict(DEFAULT_TTLS)
+        for method in self.ttls:
+            env_ttl = os.getenv(f'KEYWORD_CACHE_TTL_{method.upper()}')
+            if env_ttl:
+                self.ttls[method] = float(env_ttl)
+        self.ttls.update(ttls or {})
+        self.memory_entries = memory_entries or int(os.getenv('KEYWORD_CACHE_MEMORY', '1024'))
+        self.serializer = get_serializer()
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # (method, key) -> (expires_at, payload)
+        self._flights = {}
+        self._stats = {}
+
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self.purge_expired()
+
+    def _method_stats(self, method):
+        stats = self._stats.get(method)
+        if stats is None:
+            stats = self._stats[method] = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'coalesced': 0, 'errors': 0}
+        return stats
+
+    # ---- 存取 ----
+
+    def _remember(self, cache_key, expires_at, payload):
+        """放入内存LRU（调用方持有self._lock）"""
+        self._memory[cache_key] = (expires_at, payload)
+        self._memory.move_to_end(cache_key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, method, key, now):
+        """依次查内存和SQLite，返回序列化的结果或None（调用方持有self._lock）"""
+        cache_key = (method, key)
+        entry = self._memory.get(cache_key)
+        if entry is not None:
+            if entry[0] > now:
+                self._memory.move_to_end(cache_key)
+                self._method_stats(method)['hits'] += 1
+                return entry[1]
+            del self._memory[cache_key]
+
+        with self._db_lock:
+            row = self._conn.execute(
+                'SELECT value, expires_at FROM keyword_cache WHERE method = ? AND cache_key = ? AND expires_at > ?',
+                (method, key, now)
+            ).fetchone()
+        if row is None:
+            return None
+        self._remember(cache_key, row[1], row[0])
+        stats = self._method_stats(method)
+        stats['hits'] += 1
+        stats['disk_hits'] += 1
+        return row[0]
+
+    def _store(self, method, key, payload):
+        expires_at = time.time() + self.ttls.get(method, 3600)
+        with self._lock:
+            self._remember((method, key), expires_at, payload)
+        with self._db_lock:
+            self._conn.execute(
+                'INSERT INTO keyword_cache (method, cache_key, value, expires_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(method, cache_key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at',
+                (method, key, payload, expires_at)
+            )
+
+    def get(self, method, key):
+        """只查缓存、不调用外部接口，未命中返回None（不计入未命中次数）"""
+        with self._lock:
+            payload = self._lookup(method, key, time.time())
+        return self.serializer.loads(payload) if payload is not None else None
+
+    def get_or_call(self, method, key, loader):
+        """有未过期的缓存时直接返回；否则调用loader（相同参数的并发请求只调用一次）。
+        每次返回的都是新解码的对象，调用方可以随意修改"""
+        with self._lock:
+            payload = self._lookup(method, key, time.time())
+            if payload is not None:
+                return self.serializer.loads(payload)
+            flight = self._flights.get((method, key))
+            leader = flight is None
+            if leader:
+                flight = self._flights[(method, key)] = _Flight()
+                self._method_stats(method)['misses'] += 1
+            else:
+                self._method_stats(method)['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return self.serializer.loads(flight.value)
+
+        try:
+            payload = self.serializer.dumps(loader())
+            self._store(method, key, payload)
+            flight.value = payload
+        except Exception as e:
+            # 调用失败不缓存，等待中的请求收到同一个异常
+            flight.error = e
+            with self._lock:
+                self._method_stats(method)['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop((method, key), None)
+            flight.done.set()
+        return self.serializer.loads(payload)
+
+    def invalidate(self, method=None, key=None):
+        """删除缓存：不带参数时全部删除"""
+        with self._lock:
+            for cache_key in [k for k in self._memory if method in (None, k[0]) and key in (None, k[1])]:
+                del self._memory[cache_key]
+        with self._db_lock:
+            if method is None:
+                self._conn.execute('DELETE FROM keyword_cache')
+            elif key is None:
+                self._conn.execute('DELETE FROM keyword_cache WHERE method = ?', (method,))
+            else:
+                self._conn.execute('DELETE FROM keyword_cache WHERE method = ? AND cache_key = ?', (method, key))
+
+    def purge_expired(self):
+        """删除SQLite中已过期的记录，返回删除条数"""
+        with self._db_lock:
+            deleted = self._conn.execute('DELETE FROM keyword_cache WHERE expires_at <= ?', (time.time(),)).rowcount
+        if deleted:
+            print(f"🧹 清理过期关键词缓存 {deleted} 条")
+        return deleted
+
+    def get_stats(self):
+        """按方法统计命中率"""
+        with self._lock:
+            result = {}
+            for method, stats in self._stats.items():
+                lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+                result[method] = dict(stats, hit_rate=round(stats['hits'] / lookups, 4) if lookups else 0.0)
+            memory = len(self._memory)
+        with self._db_lock:
+            stored = self._conn.execute('SELECT COUNT(*) FROM keyword_cache').fetchone()[0]
+        return {'methods': result, 'memory_entries': memory, 'stored_entries': stored}
+
+    def close(self):
+        with self._db_lock:
+            self._conn.close()
+
+
+def cached(method, key_func):
+    """KeywordAnalyzer方法的缓存装饰器（实例的cache属性为None时不缓存）"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, 'cache', None)
+            if cache is None:
+                return func(self, *args, **kwargs)
+            return cache.get_or_call(method, key_func(*args, **kwargs), lambda: func(self, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+# 全局缓存实例
+keyword_cache = None
+_instance_lock = threading.Lock()
+
+
+def get_keyword_cache():
+    """获取关键词缓存实例"""
+    global keyword_cache
+    with _instance_lock:
+        if keyword_cache is None:
+            keyword_cache = KeywordCache()
+    return keyword_cache
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+竞品关键词对比（关键词编号 + 布尔矩阵）
+compare_competitor_keywords原来用一串Python集合求交集、再给每个ASIN单独做差集，
+卖家拿50个以上的ASIN对比几千个关键词时很慢。这里：
+- 关键词规范化后编号，每个竞品是 (关键词数) 的一行布尔值，全部竞品组成一个矩阵
+- 两两重合数 = 矩阵乘以自身转置；Jaccard相似度由重合数和各行关键词数算出
+- 每个关键词被多少个竞品覆盖 = 按列求和；"至少k个竞品覆盖"、共同关键词、独有关键词都由它得出
+- 覆盖缺口：超过半数的其他竞品都有、而这个竞品没有的关键词
+
+用法：
+    matrix = CompetitorMatrix.from_keyword_lists({'B0XXX': [...], 'B0YYY': [...]})
+    matrix.compare(min_coverage=2)
+"""
+
+import numpy as np
+
+from keyword_cache import normalize_keyword
+
+
+class KeywordIndex:
+    """关键词 <-> 编号（规范化后相同的关键词编号相同，保留第一次出现时的写法）"""
+
+    def __init__(self, keywords=None):
+        self.ids = {}
+        self.keywords = []
+        for keyword in keywords or []:
+            self.add(keyword)
+
+    def add(self, keyword):
+        key = normalize_keyword(keyword)
+        if not key:
+            return None
+        index = self.ids.get(key)
+        if index is None:
+            index = self.ids[key] = len(self.keywords)
+            self.keywords.append(keyword.strip())
+        return index
+
+    def get(self, keyword):
+        return self.ids.get(normalize_keyword(keyword))
+
+    def names(self, indexes):
+        return [self.keywords[i] for i in indexes]
+
+    def __len__(self):
+        return len(self.keywords)
+
+
+class CompetitorMatrix:
+    """竞品 × 关键词的布尔矩阵：rows[i, j]表示第i个竞品覆盖第j个关键词"""
+
+    def __init__(self, asins, index, rows):
+        self.asins = list(asins)
+        self.index = index
+        self.rows = np.asarray(rows, dtype=bool).reshape(len(self.asins), len(index))
+
+    @classmethod
+    def from_keyword_lists(cls, competitor_keywords, keywords=None):
+        """competitor_keywords: {asin: 关键词列表}。传入keywords时按它的顺序编号（不在其中的关键词追加在后面）"""
+        index = KeywordIndex(keywords)
+        asins = list(competitor_keywords)
+        id_lists = [[i for i in map(index.add, competitor_keywords[asin]) if i is not None] for asin in asins]
+        rows = np.zeros((len(asins), len(index)), dtype=bool)
+        for row, ids in enumerate(id_lists):
+            rows[row, ids] = True
+        return cls(asins, index, rows)
+
+    # ---- 向量化指标 ----
+
+    def keyword_counts(self):
+        """每个竞品的关键词数"""
+        return self.rows.sum(axis=1)
+
+    def coverage(self):
+        """每个关键词被多少个竞品覆盖"""
+        return self.rows.sum(axis=0)
+
+    def overlap_matrix(self):
+        """两两共同关键词数 (竞品数 × 竞品数)，对角线是各自的关键词数
+        用float32矩阵乘法走BLAS，计数在2^24以内都是精确的"""
+        rows = self.rows.astype(np.float32)
+        return np.rint(rows @ rows.T).astype(np.int64)
+
+    def jaccard_matrix(self, overlap=None):
+        """两两Jaccard相似度 = 交集 / 并集（两个都没有关键词时为0）"""
+        overlap = self.overlap_matrix() if overlap is None else overlap
+        counts = np.diag(overlap)
+        union = counts[:, None] + counts[None, :] - overlap
+        return np.where(union > 0, overlap / np.where(union > 0, union, 1), 0.0)
+
+    def covered_by_at_least(self, k):
+        """至少被k个竞品覆盖的关键词编号（按覆盖数降序）"""
+        coverage = self.coverage()
+        selected = np.flatnonzero(coverage >= max(1, int(k)))
+        return selected[np.argsort(-coverage[selected], kind='stable')]
+
+    def coverage_gaps(self, min_share=0.5):
+        """每个竞品的覆盖缺口：其他竞品中超过min_share比例都有、而它没有的关键词编号（默认超过半数）"""
+        n = len(self.asins)
+        if n < 2:
+            return [np.zeros(0, dtype=np.int64) for _ in range(n)]
+        # 其他竞品的覆盖数 = 全部覆盖数 - 自己
+        others = self.coverage()[None, :] - self.rows
+        gaps = ~self.rows & (others > min_share * (n - 1))
+        return [np.flatnonzero(row) for row in gaps]
+
+    # ---- 汇总 ----
+
+    def compare(self, min_coverage=2, gap_share=0.5):
+        """对比结果：保留原接口的competitors/common_keywords/unique_keywords，另加矩阵输出"""
+        n = len(self.asins)
+        coverage = self.coverage()
+        overlap = self.overlap_matrix()
+        names = self.index.names
+
+        common = np.flatnonzero(coverage == n) if n else np.zeros(0, dtype=np.int64)
+        is_common = np.zeros(len(self.index), dtype=bool)
+        is_common[common] = True
+        exclusive = self.rows & (coverage == 1)
+        gaps = self.coverage_gaps(gap_share)
+        uncovered = np.flatnonzero(coverage == 0)
+
+        return {
+            'competitors': [
+                {'asin': asin, 'keywords': names(np.flatnonzero(self.rows[i])), 'keyword_count': int(overlap[i, i])}
+                for i, asin in enumerate(self.asins)
+            ],
+            'common_keywords': names(common),
+            # 原接口语义：自己的关键词去掉所有竞品共有的
+            'unique_keywords': {asin: names(np.flatnonzero(self.rows[i] & ~is_common)) for i, asin in enumerate(self.asins)},
+            # 只有这一个竞品覆盖的关键词
+            'exclusive_keywords': {asin: names(np.flatnonzero(exclusive[i])) for i, asin in enumerate(self.asins)},
+            'asins': list(self.asins),
+            'overlap_matrix': overlap.tolist(),
+            'jaccard_matrix': np.round(self.jaccard_matrix(overlap), 4).tolist(),
+            'keyword_coverage': {keyword: int(count) for keyword, count in zip(self.index.keywords, coverage)},
+            'min_coverage': int(min_coverage),
+            'covered_by_at_least': names(self.covered_by_at_least(min_coverage)),
+            'coverage_gaps': {asin: names(gaps[i]) for i, asin in enumerate(self.asins)},
+            'uncovered_keywords': names(uncovered)
+        }
+
+    def most_similar(self, top=10):
+        """Jaccard相似度最高的竞品对：[(asin_a, asin_b, 相似度)]"""
+        jaccard = self.jaccard_matrix()
+        first, second = np.triu_indices(len(self.asins), k=1)
+        values = jaccard[first, second]
+        order = np.argsort(-values, kind='stable')[:int(top)]
+        return [(self.asins[first[i]], self.asins[second[i]], round(float(values[i]), 4)) for i in order]
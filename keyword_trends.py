@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+关键词趋势分析（NumPy向量化，一次处理多个关键词）
+get_keyword_trends原来只比较第一天和最后一天判断涨跌。这里把多个关键词的每日搜索量放进一个
+(关键词数 × 天数) 的矩阵，整体计算：
+- 移动平均（累加和实现）
+- 最小二乘斜率、相对日增长率和拟合优度R²
+- 周期性强度（默认按周，去趋势后各周期位置的中位数能解释的方差比例）
+- 波动率（日环比变化的标准差）
+- 异常点（去掉趋势和周期后的残差，稳健Z分数超过阈值）
+- 趋势质量分：增长越稳、越可信、波动和异常越少分数越高，用来给大批关键词排序
+
+用法：
+    matrix = TrendMatrix.from_trend_results([analyzer.get_keyword_trends(k) for k in keywords])
+    analyze(matrix)              # 每个关键词的指标（数组）
+    rank_keywords(matrix, 20)    # 按趋势质量排序
+"""
+
+import numpy as np
+
+SEASON_PERIOD = 7
+ANOMALY_Z = 3.5
+# 相对日增长率的绝对值低于此值视为平稳
+STABLE_DAILY_GROWTH = 0.002
+
+
+class TrendMatrix:
+    """多个关键词的对齐时间序列：volumes[i, t]为第i个关键词第t天的搜索量"""
+
+    def __init__(self, keywords, dates, volumes):
+        self.keywords = list(keywords)
+        self.dates = list(dates)
+        self.volumes = np.asarray(volumes, dtype=np.float64).reshape(len(self.keywords), len(self.dates))
+
+    @classmethod
+    def from_trend_results(cls, results):
+        """由get_keyword_trends的结果构造；按日期对齐，缺失的天用该关键词的均值补齐"""
+        results = [result for result in results if result and result.get('trend_data')]
+        dates = sorted({point['date'] for result in results for point in result['trend_data']})
+        column = {date: index for index, date in enumerate(dates)}
+        volumes = np.full((len(results), len(dates)), np.nan)
+        for row, result in enumerate(results):
+            for point in result['trend_data']:
+                volumes[row, column[point['date']]] = point['search_volume']
+        if np.isnan(volumes).any():
+            row_means = np.nanmean(volumes, axis=1)
+            volumes = np.where(np.isnan(volumes), row_means[:, None], volumes)
+        return cls([result['keyword'] for result in results], dates, volumes)
+
+    def __len__(self):
+        return len(self.keywords)
+
+
+# ---- 向量化指标（输入都是二维数组，按行计算） ----
+
+def moving_average(values, window=7):
+    """按行计算移动平均，返回 (n, T - window + 1)"""
+    values = np.atleast_2d(values)
+    window = max(1, min(int(window), values.shape[1]))
+    cumsum = np.cumsum(np.pad(values, ((0, 0), (1, 0))), axis=1)
+    return (cumsum[:, window:] - cumsum[:, :-window]) / window
+
+
+def linear_fit(values):
+    """按行最小二乘拟合直线，返回 (斜率, 截距, R²)"""
+    values = np.atleast_2d(values)
+    x = np.arange(values.shape[1], dtype=np.float64)
+    x_centered = x - x.mean()
+    denominator = (x_centered ** 2).sum() or 1.0
+    means = values.mean(axis=1)
+    slope = (values - means[:, None]) @ x_centered / denominator
+    intercept = means - slope * x.mean()
+    fitted = intercept[:, None] + slope[:, None] * x
+    total = ((values - means[:, None]) ** 2).sum(axis=1)
+    residual = ((values - fitted) ** 2).sum(axis=1)
+    r2 = np.where(total > 0, 1 - residual / np.where(total > 0, total, 1), 0.0)
+    return slope, intercept, r2
+
+
+def seasonal_component(detrended, period=SEASON_PERIOD):
+    """各周期位置（如星期几）的中位数，展开成与输入同样的形状；用中位数是为了不让单日异常带偏同一位置的其他天"""
+    n, length = detrended.shape
+    cycles = -(-length // period)
+    padded = np.full((n, cycles * period), np.nan)
+    padded[:, :length] = detrended
+    phase_medians = np.nanmedian(padded.reshape(n, cycles, period), axis=1)
+    return np.tile(phase_medians, cycles)[:, :length]
+
+
+def analyze(matrix, window=7, period=SEASON_PERIOD, anomaly_z=ANOMALY_Z):
+    """计算全部指标，返回字典，每个值是长度为关键词数的数组（anomalies为布尔矩阵）"""
+    values = matrix.volumes
+    n, length = values.shape
+    if n == 0 or length == 0:
+        empty = np.zeros(0)
+        return {'mean': empty, 'slope': empty, 'growth': empty, 'r2': empty, 'seasonality': empty,
+                'volatility': empty, 'anomalies': np.zeros((n, length), dtype=bool), 'anomaly_ratio': empty,
+                'quality': empty, 'moving_average': np.zeros((n, 0))}
+
+    means = values.mean(axis=1)
+    safe_means = np.where(means > 0, means, 1.0)
+    slope, intercept, r2 = linear_fit(values)
+    growth = slope / safe_means
+
+    # 周期性：去掉线性趋势后，周期中位数解释的方差比例（数据不足两个周期时为0）
+    x = np.arange(length, dtype=np.float64)
+    detrended = values - (intercept[:, None] + slope[:, None] * x)
+    if length >= 2 * period:
+        seasonal = seasonal_component(detrended, period)
+    else:
+        seasonal = np.zeros_like(detrended)
+    residual = detrended - seasonal
+    detrended_var = detrended.var(axis=1)
+    seasonality = np.where(detrended_var > 0,
+                           np.clip(1 - residual.var(axis=1) / np.where(detrended_var > 0, detrended_var, 1), 0, 1), 0.0)
+
+    # 波动率：日环比变化的标准差
+    if length > 1:
+        previous = np.where(values[:, :-1] > 0, values[:, :-1], 1.0)
+        volatility = (np.diff(values, axis=1) / previous).std(axis=1)
+    else:
+        volatility = np.zeros(n)
+
+    # 异常点：残差的稳健Z分数（中位数和MAD）
+    median = np.median(residual, axis=1)
+    mad = np.median(np.abs(residual - median[:, None]), axis=1) * 1.4826
+    robust_z = np.abs(residual - median[:, None]) / np.where(mad > 0, mad, np.inf)[:, None]
+    anomalies = robust_z > anomaly_z
+    anomaly_ratio = anomalies.mean(axis=1)
+
+    # 趋势质量：整段相对增长 × 拟合可信度，再按波动和异常打折
+    total_growth = growth * length
+    quality = total_growth * r2 / (1 + volatility * 10) * (1 - anomaly_ratio)
+
+    return {
+        'mean': means,
+        'slope': slope,
+        'growth': growth,
+        'r2': r2,
+        'seasonality': seasonality,
+        'volatility': volatility,
+        'anomalies': anomalies,
+        'anomaly_ratio': anomaly_ratio,
+        'quality': quality,
+        'moving_average': moving_average(values, window)
+    }
+
+
+def trend_direction(growth, r2=None):
+    """up/down/stable（数组）"""
+    growth = np.asarray(growth)
+    direction = np.where(growth > STABLE_DAILY_GROWTH, 'up', np.where(growth < -STABLE_DAILY_GROWTH, 'down', 'stable'))
+    if r2 is not None:
+        # 拟合很差时说明没有明显趋势
+        direction = np.where(np.asarray(r2) < 0.05, 'stable', direction)
+    return direction
+
+
+def summarize(matrix, index, metrics, window=7):
+    """单个关键词的指标（普通Python类型，便于JSON输出）"""
+    anomalies = metrics['anomalies'][index]
+    return {
+        'keyword': matrix.keywords[index],
+        'avg_search_volume': round(float(metrics['mean'][index]), 2),
+        'slope': round(float(metrics['slope'][index]), 4),
+        'daily_growth_rate': round(float(metrics['growth'][index]), 5),
+        'r2': round(float(metrics['r2'][index]), 4),
+        'trend_direction': str(trend_direction(metrics['growth'][index], metrics['r2'][index])),
+        'seasonality_strength': round(float(metrics['seasonality'][index]), 4),
+        'volatility': round(float(metrics['volatility'][index]), 4),
+        'anomaly_dates': [matrix.dates[t] for t in np.flatnonzero(anomalies)],
+        'quality_score': round(float(metrics['quality'][index]), 4),
+        f'moving_average_{window}': np.round(metrics['moving_average'][index], 2).tolist()
+    }
+
+
+def rank_keywords(matrix, top=None, window=7):
+    """按趋势质量从高到低排序，返回每个关键词的指标摘要"""
+    metrics = analyze(matrix, window=window)
+    order = np.argsort(-metrics['quality'], kind='stable')
+    if top:
+        order = order[:int(top)]
+    return [dict(summarize(matrix, int(index), metrics, window), rank=rank + 1) for rank, index in enumerate(order)]
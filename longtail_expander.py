@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+长尾关键词扩展引擎（广度优先 + 前缀树去重剪枝 + 向量化打分 + 有界堆取前K）
+以前mine_long_tail_keywords只在种子词前面拼depth个修饰词，并没有按深度递归。这里：
+- 从种子词开始逐层扩展：前置修饰词、后置修饰词、问句形式、联想词来源（如亚马逊搜索联想）
+- 前缀树按词序列去重；既不在本层前beam名、也低于当前第K名的候选在前缀树中标记为剪枝，
+  之后任何以它为前缀的候选都不再生成
+- 每一层的候选用NumPy一次性打分（估算搜索量和竞争度）
+- 每层只保留得分最高的beam个候选继续扩展，全局前K名放在大小为K的最小堆中，
+  内存占用与K成正比，和组合出来的候选总数无关
+
+用法：
+    LongTailExpander().expand('wireless mouse', depth=3, top_k=50)
+"""
+
+import re
+import heapq
+
+import numpy as np
+
+# 修饰词：(词, 意图权重)，权重越高购买意图越强
+PREFIX_MODIFIERS = [
+    ('best', 1.3), ('cheap', 1.2), ('top', 1.1), ('affordable', 1.1), ('premium', 1.0),
+    ('professional', 0.9), ('portable', 0.9), ('wireless', 0.9), ('mini', 0.8), ('durable', 0.8),
+]
+SUFFIX_MODIFIERS = [
+    ('review', 1.2), ('price', 1.2), ('sale', 1.1), ('deals', 1.1), ('discount', 1.0),
+    ('for kids', 0.9), ('for women', 0.9), ('for men', 0.9), ('2025', 0.8), ('set', 0.8),
+]
+QUESTION_FORMS = [
+    ('how to choose', 0.7), ('what is the best', 0.8), ('where to buy', 0.9), ('is it worth buying', 0.6),
+]
+
+# 每往下扩展一层，估算搜索量衰减的比例
+VOLUME_DECAY = 0.5
+TYPE_CODES = {'seed': 0, 'modifier': 1, 'suffix': 2, 'question': 3, 'suggestion': 4}
+
+_PREFIX_RANK = {word: rank for rank, (word, _) in enumerate(PREFIX_MODIFIERS)}
+_SUFFIX_WORDS = [tuple(phrase.split()) for phrase, _ in SUFFIX_MODIFIERS]
+
+
+def _tokens(text):
+    return tuple(re.sub(r'\s+', ' ', (text or '').strip().lower()).split(' ')) if text and text.strip() else ()
+
+
+class _TrieNode:
+    __slots__ = ('children', 'terminal', 'pruned')
+
+    def __init__(self):
+        self.children = {}
+        self.terminal = False
+        self.pruned = False
+
+
+class KeywordTrie:
+    """按词序列组织的前缀树：去重，以及按前缀剪枝"""
+
+    def __init__(self):
+        self.root = _TrieNode()
+        self.size = 0
+
+    def insert(self, tokens):
+        """插入候选；已存在或经过已剪枝的前缀时返回False"""
+        node = self.root
+        for token in tokens:
+            if node.pruned:
+                return False
+            node = node.children.setdefault(token, _TrieNode())
+        if node.terminal or node.pruned:
+            return False
+        node.terminal = True
+        self.size += 1
+        return True
+
+    def prune(self, tokens):
+        """标记剪枝并丢弃其下的子树"""
+        node = self.root
+        for token in tokens:
+            node = node.children.get(token)
+            if node is None:
+                return
+        node.pruned = True
+        node.children = {}
+
+    def __contains__(self, tokens):
+        node = self.root
+        for token in tokens:
+            node = node.children.get(token)
+            if node is None:
+                return False
+        return node.terminal
+
+
+class LongTailExpander:
+    """广度优先的长尾关键词扩展"""
+
+    def __init__(self, suggestion_sources=None, base_volume=None, beam_width=None):
+        # 联想词来源：函数(关键词) -> 关键词列表，接入亚马逊/谷歌联想接口时传入
+        self.suggestion_sources = list(suggestion_sources or [])
+        self.base_volume = base_volume
+        self.beam_width = beam_width
+
+    def _seed_volume(self, seed):
+        """种子词的估算搜索量（未接入真实数据时按词数估算，固定输入得到固定结果）"""
+        if self.base_volume:
+            return float(self.base_volume)
+        return 50000.0 / len(_tokens(seed))
+
+    def _expand_one(self, tokens, kind):
+        """一个候选的所有下一层扩展：(词序列, 类型, 意图权重)
+        多个前置修饰词只按列表顺序组合（有best cheap就不生成cheap best），每个词最多一个后置修饰词"""
+        existing = set(tokens)
+        first_rank = _PREFIX_RANK.get(tokens[0], len(PREFIX_MODIFIERS))
+        for rank, (word, weight) in enumerate(PREFIX_MODIFIERS):
+            if rank < first_rank and word not in existing:
+                yield (word,) + tokens, 'modifier', weight
+        if not any(tokens[-len(words):] == words for words in _SUFFIX_WORDS):
+            for (phrase, weight), words in zip(SUFFIX_MODIFIERS, _SUFFIX_WORDS):
+                if not existing.intersection(words):
+                    yield tokens + words, 'suffix', weight
+        if kind != 'question':
+            for phrase, weight in QUESTION_FORMS:
+                yield tuple(phrase.split()) + tokens, 'question', weight
+        keyword = ' '.join(tokens)
+        for source in self.suggestion_sources:
+            for suggestion in source(keyword) or []:
+                suggestion_tokens = _tokens(suggestion)
+                if suggestion_tokens and suggestion_tokens != tokens:
+                    yield suggestion_tokens, 'suggestion', 1.0
+
+    def _score(self, parents, weights, kinds, level):
+        """整层候选一次性打分：sqrt(估算搜索量) × (1 - 竞争度)
+        开方后搜索量的逐层衰减和竞争度的下降大致抵消，深层的长尾词也有机会进入前K名"""
+        weights = np.asarray(weights, dtype=np.float64)
+        kinds = np.asarray(kinds, dtype=np.int8)
+        parent_volume = np.asarray(parents, dtype=np.float64)
+
+        volume = parent_volume * VOLUME_DECAY * weights
+        # 越深竞争越小；问句形式竞争更小，联想词竞争略高
+        competition = 0.85 - 0.15 * level - 0.1 * (kinds == TYPE_CODES['question'])
+        competition = np.where(kinds == TYPE_CODES['suggestion'], competition + 0.1, competition)
+        competition = np.clip(competition, 0.05, 0.95)
+        scores = np.sqrt(volume) * (1.0 - competition)
+        return volume, competition, scores
+
+    def expand(self, seed, depth=3, top_k=50):
+        """扩展到指定深度，返回得分最高的top_k个长尾词（按得分降序）"""
+        return self.expand_with_stats(seed, depth, top_k)[0]
+
+    def expand_with_stats(self, seed, depth=3, top_k=50):
+        """同expand，另外返回本次扩展的统计（生成、重复、剪枝的候选数和前缀树大小）"""
+        seed_tokens = _tokens(seed)
+        if not seed_tokens:
+            return [], {'generated': 0, 'duplicates': 0, 'pruned': 0, 'trie_size': 0}
+        depth = max(1, int(depth))
+        top_k = max(1, int(top_k))
+        beam = self.beam_width or top_k
+        seed_volume = self._seed_volume(seed)
+
+        trie = KeywordTrie()
+        trie.insert(seed_tokens)
+        heap = []  # (得分, 关键词, 结果)，大小不超过top_k
+        # 当前层：(词序列, 类型, 估算搜索量)
+        frontier = [(seed_tokens, 'seed', seed_volume)]
+        stats = {'generated': 0, 'duplicates': 0, 'pruned': 0}
+
+        for level in range(1, depth + 1):
+            candidates = []
+            for tokens, kind, volume in frontier:
+                for child, child_kind, weight in self._expand_one(tokens, kind):
+                    stats['generated'] += 1
+                    if not trie.insert(child):
+                        stats['duplicates'] += 1
+                        continue
+                    candidates.append((child, child_kind, weight, volume))
+            if not candidates:
+                break
+
+            volumes, competitions, scores = self._score(
+                [c[3] for c in candidates], [c[2] for c in candidates],
+                [TYPE_CODES[c[1]] for c in candidates], level
+            )
+
+            # 本层按得分降序处理：最好的beam个候选进入下一层；
+            # 既没进入下一层也没进入前K名的候选在前缀树中剪枝，其他路径也不会再扩展出以它开头的词
+            order = np.argsort(-scores, kind='stable')
+            next_frontier = []
+            for rank, index in enumerate(order):
+                tokens, kind, _, _ = candidates[index]
+                score = float(scores[index])
+                if rank >= beam and len(heap) >= top_k and score <= heap[0][0]:
+                    trie.prune(tokens)
+                    stats['pruned'] += 1
+                    continue
+                keyword = ' '.join(tokens)
+                item = {
+                    'keyword': keyword,
+                    'search_volume': int(volumes[index]),
+                    'competition_score': round(float(competitions[index]), 2),
+                    'type': kind,
+                    'depth': level,
+                    'score': round(score, 2)
+                }
+                if len(heap) < top_k:
+                    heapq.heappush(heap, (score, keyword, item))
+                elif (score, keyword) > heap[0][:2]:
+                    heapq.heapreplace(heap, (score, keyword, item))
+                if rank < beam:
+                    next_frontier.append((tokens, kind, float(volumes[index])))
+            frontier = next_frontier
+
+        stats['trie_size'] = trie.size
+        return [item for _, _, item in sorted(heap, key=lambda entry: (-entry[0], entry[1]))], stats
+
+
+def competition_label(score):
+    if score < 0.35:
+        return 'Low'
+    if score < 0.65:
+        return 'Medium'
+    return 'High'
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+会员套餐目录（唯一配置来源）
+每日次数限制、工具积分、价格、文件大小限制都在这里定义，DataManager、OrderManager和
+Flask应用统一读取，不再各自维护一份。
+
+- 目录加载后不可修改（MappingProxyType/tuple），每个套餐预先计算好限制向量和usage_stats模板，
+  权限检查时的限制查询是一次字典查找
+- 热更新：设置PLAN_CATALOG_FILE指向JSON文件（结构同DEFAULT_CATALOG，只写需要覆盖的字段），
+  文件修改后最多PLAN_CATALOG_CHECK_INTERVAL秒（默认5秒）生效，不需要重启；
+  也可以调用reload_plan_catalog()立即重新加载
+- 套餐别名：Supabase应用中的'pro'即'professional'
+"""
+
+import os
+import json
+import copy
+import time
+import threading
+from types import MappingProxyType
+
+MB = 1024 * 1024
+
+# 内置套餐配置；-1表示无限制
+DEFAULT_CATALOG = {
+    'default_plan': 'free',
+    'aliases': {'pro': 'professional'},
+    'tools': [
+        'background_remover', 'image_compressor', 'format_converter', 'image_cropper',
+        'keyword_analyzer', 'currency_converter', 'unit_converter', 'shipping_calculator',
+        'send_email', 'add_watermark', 'remove_watermark',
+        'image_rotate_flip',  # 图片旋转/翻转
+        'listing_generator'  # Listing文案生成（AI功能）
+    ],
+    'plans': {
+        'free': {
+            'name': '免费版',
+            'price': 0,  # 价格（分）
+            'duration_days': 0,
+            'purchasable': False,
+            'daily_limit': 3,  # 免费版每天3次
+            'max_file_size': 5 * MB,
+            'features': ['基础背景移除', '标准质量输出'],
+            'tool_limits': {
+                'background_remover': 3, 'image_compressor': 5, 'format_converter': 5, 'image_cropper': 5,
+                'keyword_analyzer': 5, 'currency_converter': 3, 'unit_converter': 10, 'shipping_calculator': 10,
+                'send_email': 5, 'add_watermark': 10, 'remove_watermark': 10,
+                'image_rotate_flip': 5, 'listing_generator': 3
+            },
+            'tool_credits': {'background_remover': 3, 'image_compressor': 2, 'format_converter': 2, 'image_cropper': 2}
+        },
+        'basic': {
+            'name': '基础版',
+            'price': 1900,  # 19.00元
+            'duration_days': 30,
+            'purchasable': True,
+            'daily_limit': 10,  # 基础版每天10次，与会员政策一致
+            'max_file_size': 10 * MB,
+            'features': ['高质量背景移除', '多格式支持', '优先处理'],
+            'tool_limits': {
+                'background_remover': 10, 'image_compressor': 20, 'format_converter': 20, 'image_cropper': 20,
+                'keyword_analyzer': 50, 'currency_converter': -1, 'unit_converter': -1, 'shipping_calculator': 20,
+                'send_email': 20, 'add_watermark': 50, 'remove_watermark': 50,
+                'image_rotate_flip': 50, 'listing_generator': 20
+            },
+            'tool_credits': {'background_remover': 2, 'image_compressor': 1, 'format_converter': 1, 'image_cropper': 1}
+        },
+        'professional': {
+            'name': '专业版',
+            'price': 9900,  # 99.00元
+            'duration_days': 30,
+            'purchasable': True,
+            'daily_limit': 100,  # 专业版每天100次，与会员政策一致
+            'max_file_size': 50 * MB,
+            'features': ['无限背景移除', '批量处理', 'API访问', '高级功能'],
+            'tool_limits': {
+                'background_remover': 100, 'image_compressor': 200, 'format_converter': 200, 'image_cropper': 200,
+                'keyword_analyzer': 500, 'currency_converter': -1, 'unit_converter': -1, 'shipping_calculator': -1,
+                'send_email': -1, 'add_watermark': -1, 'remove_watermark': -1,
+                'image_rotate_flip': 200, 'listing_generator': 100
+            },
+            'tool_credits': {'background_remover': 1, 'image_compressor': 1, 'format_converter': 0, 'image_cropper': 0}
+        },
+        'flagship': {
+            'name': '旗舰版',
+            'price': 29900,  # 299.00元
+            'duration_days': 30,
+            'purchasable': True,
+            'daily_limit': -1,
+            'max_file_size': 100 * MB,
+            'features': ['无限背景移除', '批量处理', 'API访问', '高级功能', '专属客服'],
+            'tool_limits': {'*': -1},
+            # 原TOOL_CREDITS只给专业版免积分，旗舰版/企业版按默认1积分
+            'tool_credits': {'background_remover': 1, 'image_compressor': 1, 'format_converter': 1, 'image_cropper': 1}
+        },
+        'enterprise': {
+            'name': '企业版',
+            'price': 0,
+            'duration_days': 0,
+            'purchasable': False,
+            'daily_limit': -1,
+            'max_file_size': 500 * MB,
+            'features': ['无限背景移除', '批量处理', 'API访问', '高级功能', '专属客服'],
+            'tool_limits': {'*': -1},
+            # 原TOOL_CREDITS只给专业版免积分，旗舰版/企业版按默认1积分
+            'tool_credits': {'background_remover': 1, 'image_compressor': 1, 'format_converter': 1, 'image_cropper': 1}
+        }
+    }
+}
+
+# 没有配置积分的工具默认消耗1积分
+DEFAULT_TOOL_CREDITS = 1
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _merge(base, override):
+    """把覆盖配置逐层合并到内置配置"""
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = value
+    return base
+
+
+class PlanCatalog:
+    """不可变的套餐目录快照；热更新时整体替换快照，读取方不会看到一半新一半旧的配置"""
+
+    def __init__(self, config, version=0):
+        self.version = version
+        self.default_plan = config['default_plan']
+        self.aliases = MappingProxyType(dict(config.get('aliases', {})))
+        self.tools = tuple(config['tools'])
+        self.tool_index = MappingProxyType({tool: i for i, tool in enumerate(self.tools)})
+        self.plans = _freeze(config['plans'])
+        if self.default_plan not in self.plans:
+            raise ValueError(f"默认套餐 {self.default_plan} 不存在")
+
+        limits = {}
+        vectors = {}
+        templates = {}
+        for plan_id, plan in config['plans'].items():
+            tool_limits = plan.get('tool_limits', {})
+            fallback = tool_limits.get('*', 0)
+            vector = tuple(tool_limits.get(tool, fallback) for tool in self.tools)
+            vectors[plan_id] = vector
+            limits[plan_id] = MappingProxyType(dict(zip(self.tools, vector)))
+            templates[plan_id] = tuple(
+                (tool, {'current_usage': 0, 'daily_limit': limit, 'remaining_usage': limit})
+                for tool, limit in zip(self.tools, vector)
+            )
+        self._limits = MappingProxyType(limits)
+        self.limit_vectors = MappingProxyType(vectors)
+        self._stat_templates = templates
+
+    def resolve(self, plan):
+        """套餐名（含别名）-> 目录中的套餐ID，未知套餐按默认套餐处理"""
+        plan = self.aliases.get(plan, plan)
+        return plan if plan in self.plans else self.default_plan
+
+    def plan(self, plan):
+        return self.plans[self.resolve(plan)]
+
+    def tool_limit(self, plan, tool_name):
+        """某套餐某工具的每日次数限制，-1为无限制，未知工具为None"""
+        return self._limits[self.resolve(plan)].get(tool_name)
+
+    def daily_limit(self, plan):
+        """套餐的总每日次数限制（Supabase应用使用）"""
+        return self.plan(plan)['daily_limit']
+
+    def tool_credits(self, plan, tool_name):
+        return self.plan(plan)['tool_credits'].get(tool_name, DEFAULT_TOOL_CREDITS)
+
+    def max_file_size(self, plan):
+        return self.plan(plan)['max_file_size']
+
+    def usage_stats_template(self, plan):
+        """新的usage_stats字典（从预先计算的模板复制，调用方可以修改）"""
+        return {tool: dict(stats) for tool, stats in self._stat_templates[self.resolve(plan)]}
+
+    def membership_info(self, plan):
+        """Supabase应用返回给前端的套餐信息（价格单位：元）"""
+        info = self.plan(plan)
+        return {
+            'name': info['name'],
+            'daily_limit': info['daily_limit'],
+            'price': info['price'] // 100 if info['price'] % 100 == 0 else info['price'] / 100,
+            'features': list(info['features'])
+        }
+
+    def order_plans(self):
+        """可购买的套餐（OrderManager使用，价格单位：分）"""
+        return {
+            plan_id: {
+                'name': info['name'],
+                'price': info['price'],
+                'duration_days': info['duration_days'],
+                'features': list(info['features'])
+            }
+            for plan_id, info in self.plans.items() if info.get('purchasable')
+        }
+
+
+class _CatalogHolder:
+    """持有当前快照，按文件修改时间热更新"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._overrides = None
+        self._file_mtime = None
+        self._next_check = 0.0
+
+    def _load(self):
+        config = copy.deepcopy(DEFAULT_CATALOG)
+        path = os.getenv('PLAN_CATALOG_FILE')
+        mtime = None
+        if path and os.path.exists(path):
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, 'r', encoding='utf-8') as f:
+                _merge(config, json.load(f))
+        if self._overrides:
+            _merge(config, copy.deepcopy(self._overrides))
+        version = self._catalog.version + 1 if self._catalog else 1
+        return PlanCatalog(config, version), mtime
+
+    def get(self):
+        catalog = self._catalog
+        now = time.monotonic()
+        if catalog is not None and now < self._next_check:
+            return catalog
+        with self._lock:
+            if self._catalog is None:
+                self._catalog, self._file_mtime = self._load()
+            elif now >= self._next_check:
+                path = os.getenv('PLAN_CATALOG_FILE')
+                mtime = os.stat(path).st_mtime_ns if path and os.path.exists(path) else None
+                if mtime != self._file_mtime:
+                    # 先记下版本，配置有误时不会每次读取都重试，等文件再次修改
+                    self._file_mtime = mtime
+                    self._reload_locked()
+            self._next_check = now + float(os.getenv('PLAN_CATALOG_CHECK_INTERVAL', '5'))
+            return self._catalog
+
+    def _reload_locked(self):
+        try:
+            self._catalog, self._file_mtime = self._load()
+            print(f"✅ 套餐目录已重新加载 (版本 {self._catalog.version})")
+            return True
+        except Exception as e:
+            # 配置文件有误时保留当前目录
+            print(f"❌ 套餐目录加载失败，继续使用当前配置: {e}")
+            return False
+
+    def reload(self, overrides=None):
+        with self._lock:
+            previous = self._overrides
+            if overrides is not None:
+                self._overrides = overrides
+            self._next_check = 0.0
+            if self._reload_locked():
+                return True
+            self._overrides = previous
+            return False
+
+
+_holder = _CatalogHolder()
+
+
+def get_plan_catalog():
+    """当前套餐目录（不可变快照）"""
+    return _holder.get()
+
+
+def reload_plan_catalog(overrides=None):
+    """立即重新加载（内置配置 + PLAN_CATALOG_FILE + overrides），成功返回True；
+    overrides会保留到下一次传入新的overrides（传{}清除）"""
+    return _holder.reload(overrides)
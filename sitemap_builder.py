@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+站点地图增量生成 + 每日搜索引擎提交清单
+以前frontend/sitemap.xml手工维护，data/baidu_submission_*.txt单独生成。这里根据静态页面和文章存储：
+- 生成frontend/sitemap.xml；URL超过SITEMAP_CHUNK_SIZE条时改为站点地图索引，
+  文章按首次出现的顺序分到固定的分块文件sitemap-articles-NNN.xml中
+- data/sitemap_manifest.json记录上次生成时每个URL的lastmod和所在分块，只重写有变化的分块，
+  新文章只追加到最后一个分块；文章的增删、发布状态和更新时间都没变时直接跳过（写回浏览量不算变化）
+- 每个XML同时写出预压缩的.xml.gz
+- 新增或更新的URL追加到当天的data/baidu_submission_YYYY-MM-DD.txt
+
+用法：
+    python sitemap_builder.py [--force]
+"""
+
+import os
+import sys
+import gzip
+from datetime import date, datetime
+from pathlib import Path
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from article_store import get_article_store
+from data_serializer import get_serializer, read_file, write_atomic
+
+SITE_URL = os.getenv('SITEMAP_SITE_URL', 'https://nbfive.com').rstrip('/')
+CHUNK_SIZE = int(os.getenv('SITEMAP_CHUNK_SIZE', '5000'))
+
+# 静态页面：(路径, 对应的前端文件, changefreq, priority)
+STATIC_PAGES = [
+    ('/', 'index.html', 'daily', '1.0'),
+    ('/index.html#tools', 'index.html', 'weekly', '0.9'),
+    ('/index.html#pricing', 'index.html', 'weekly', '0.8'),
+    ('/blog.html', 'blog.html', 'daily', '0.8'),
+    ('/about.html', 'about.html', 'monthly', '0.7'),
+    ('/terms.html', 'terms.html', 'monthly', '0.5'),
+    ('/privacy.html', 'privacy.html', 'monthly', '0.5'),
+    ('/contact.html', 'contact.html', 'monthly', '0.6'),
+    ('/faq.html', 'faq.html', 'monthly', '0.7'),
+    ('/help.html', 'help.html', 'monthly', '0.7'),
+    ('/tutorial.html', 'tutorial.html', 'monthly', '0.7'),
+]
+ARTICLE_CHANGEFREQ = 'weekly'
+ARTICLE_PRIORITY = '0.8'
+
+_URLSET_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+_INDEX_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+
+
+def _url_entry(loc, lastmod, changefreq, priority):
+    return (f'  <url><loc>{escape(loc)}</loc><lastmod>{lastmod}</lastmod>'
+            f'<changefreq>{changefreq}</changefreq><priority>{priority}</priority></url>\n')
+
+
+def article_url(article_id, site_url=SITE_URL):
+    return f"{site_url}/article.html?id={quote(article_id, safe='_-')}"
+
+
+class SitemapBuilder:
+    """站点地图增量生成器"""
+
+    def __init__(self, store=None, output_dir=None, data_dir='data', site_url=None, chunk_size=None):
+        self.store = store or get_article_store()
+        self.output_dir = Path(output_dir or Path(__file__).resolve().parent / 'frontend')
+        self.data_dir = Path(data_dir)
+        self.manifest_file = self.data_dir / 'sitemap_manifest.json'
+        self.site_url = (site_url or SITE_URL).rstrip('/')
+        self.chunk_size = chunk_size or CHUNK_SIZE
+        self.serializer = get_serializer()
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        empty = {'version': 1, 'store_version': None, 'pages': {}, 'articles': {}, 'chunks': {}, 'index': False}
+        if not self.manifest_file.exists():
+            return empty
+        try:
+            manifest = read_file(self.manifest_file)
+        except Exception as e:
+            print(f"⚠️ 站点地图清单读取失败，将全量生成: {e}")
+            return empty
+        return manifest if manifest.get('site_url') == self.site_url else empty
+
+    # ---- 收集URL ----
+
+    def _static_pages(self):
+        """静态页面的lastmod取前端文件的修改日期"""
+        pages = {}
+        for path, filename, changefreq, priority in STATIC_PAGES:
+            source = self.output_dir / filename
+            if not source.exists():
+                continue
+            lastmod = datetime.fromtimestamp(source.stat().st_mtime).date().isoformat()
+            pages[self.site_url + path] = [lastmod, changefreq, priority]
+        return pages
+
+    def _assign_articles(self, metas, changed_chunks, delta):
+        """对比文章元数据和清单：新文章追加到最后一个未满的分块，修改/删除的文章标记所在分块"""
+        articles = self.manifest['articles']
+        chunks = self.manifest['chunks']
+        current = {}
+        # snapshot按创建时间倒序，这里从最早的文章开始分配，保证旧文章留在前面的分块
+        for meta in reversed(metas):
+            if meta['status'] != 'published':
+                continue
+            lastmod = (meta['updated_at'] or meta['created_at'])[:10]
+            current[meta['id']] = lastmod
+            entry = articles.get(meta['id'])
+            if entry is None:
+                chunk = str(max((int(n) for n in chunks), default=1))
+                if chunks.get(chunk, 0) >= self.chunk_size:
+                    chunk = str(int(chunk) + 1)
+                chunks[chunk] = chunks.get(chunk, 0) + 1
+                articles[meta['id']] = [chunk, lastmod]
+                changed_chunks.add(chunk)
+                delta.append(article_url(meta['id'], self.site_url))
+            elif entry[1] != lastmod:
+                entry[1] = lastmod
+                changed_chunks.add(entry[0])
+                delta.append(article_url(meta['id'], self.site_url))
+
+        for article_id in [article_id for article_id in articles if article_id not in current]:
+            chunk = articles.pop(article_id)[0]
+            chunks[chunk] -= 1
+            changed_chunks.add(chunk)
+
+    # ---- 写文件 ----
+
+    def _write(self, name, text):
+        """写XML和预压缩的.gz版本"""
+        payload = text.encode('utf-8')
+        write_atomic(self.output_dir / name, payload, fsync=False)
+        write_atomic(self.output_dir / f'{name}.gz', gzip.compress(payload, compresslevel=9, mtime=0), fsync=False)
+
+    def _remove(self, name):
+        for path in (self.output_dir / name, self.output_dir / f'{name}.gz'):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _articles_xml(self, ids, lastmods):
+        body = ''.join(_url_entry(article_url(article_id, self.site_url), lastmods[article_id],
+                                  ARTICLE_CHANGEFREQ, ARTICLE_PRIORITY) for article_id in sorted(ids))
+        return _URLSET_HEAD + body + '</urlset>\n'
+
+    def _pages_xml(self, pages):
+        body = ''.join(_url_entry(loc, *values) for loc, values in pages.items())
+        return _URLSET_HEAD + body + '</urlset>\n'
+
+    def build(self, force=False, today=None):
+        """增量生成，返回 {'changed', 'written', 'delta', 'index', 'urls'}"""
+        store_version = self.store.sitemap_generation()
+        pages = self._static_pages()
+        pages_changed = pages != self.manifest['pages']
+        if not force and not pages_changed and store_version == self.manifest['store_version']:
+            return {'changed': False, 'written': [], 'delta': [], 'index': self.manifest['index'],
+                    'urls': len(pages) + len(self.manifest['articles'])}
+
+        _, metas = self.store.snapshot()
+        changed_chunks = set()
+        delta = [loc for loc, values in pages.items() if self.manifest['pages'].get(loc, [None])[0] != values[0]]
+        self._assign_articles(metas, changed_chunks, delta)
+        lastmods = {}
+        members = {}
+        for article_id, (chunk, lastmod) in self.manifest['articles'].items():
+            lastmods[article_id] = lastmod
+            members.setdefault(chunk, []).append(article_id)
+        chunks = self.manifest['chunks']
+        total = len(pages) + len(lastmods)
+        use_index = total > self.chunk_size
+        written = []
+
+        if use_index:
+            # 索引模式：只重写有变化的分块；刚从单文件切换过来或强制生成时全部重写
+            rewrite = set(chunks) if (force or not self.manifest['index']) else changed_chunks
+            for chunk in sorted(rewrite, key=int):
+                name = f'sitemap-articles-{int(chunk):03d}.xml'
+                if chunks.get(chunk, 0) > 0:
+                    self._write(name, self._articles_xml(members[chunk], lastmods))
+                    written.append(name)
+                else:
+                    self._remove(name)
+                    chunks.pop(chunk, None)
+            if pages_changed or force or not self.manifest['index']:
+                self._write('sitemap-pages.xml', self._pages_xml(pages))
+                written.append('sitemap-pages.xml')
+
+            entries = [('sitemap-pages.xml', max((values[0] for values in pages.values()), default=''))]
+            for chunk in sorted(chunks, key=int):
+                chunk_lastmod = max((lastmods[article_id] for article_id in members.get(chunk, [])), default='')
+                entries.append((f'sitemap-articles-{int(chunk):03d}.xml', chunk_lastmod))
+            index = _INDEX_HEAD + ''.join(
+                f'  <sitemap><loc>{escape(self.site_url)}/{name}</loc><lastmod>{lastmod}</lastmod></sitemap>\n'
+                for name, lastmod in entries
+            ) + '</sitemapindex>\n'
+            self._write('sitemap.xml', index)
+        else:
+            # URL不多时sitemap.xml直接包含全部URL
+            body = ''.join(_url_entry(loc, *values) for loc, values in pages.items())
+            body += ''.join(_url_entry(article_url(article_id, self.site_url), lastmods[article_id],
+                                       ARTICLE_CHANGEFREQ, ARTICLE_PRIORITY) for article_id in sorted(lastmods))
+            self._write('sitemap.xml', _URLSET_HEAD + body + '</urlset>\n')
+            if self.manifest['index']:
+                for chunk in list(chunks):
+                    self._remove(f'sitemap-articles-{int(chunk):03d}.xml')
+                self._remove('sitemap-pages.xml')
+        written.append('sitemap.xml')
+
+        self.manifest.update({
+            'site_url': self.site_url,
+            'store_version': store_version,
+            'pages': pages,
+            'index': use_index,
+            'built_at': datetime.now().isoformat()
+        })
+        write_atomic(self.manifest_file, self.serializer.dumps(self.manifest))
+        if delta:
+            self.write_submission(delta, today)
+        print(f"✅ 站点地图已更新: {total} 个URL，写入 {len(written)} 个文件，新增/更新 {len(delta)} 个URL")
+        return {'changed': True, 'written': written, 'delta': delta, 'index': use_index, 'urls': total}
+
+    def write_submission(self, urls, today=None):
+        """追加到当天的提交清单（与已有清单合并去重，保持原来的文件格式）"""
+        day = (today or date.today()).isoformat()
+        path = self.data_dir / f'baidu_submission_{day}.txt'
+        existing = []
+        if path.exists():
+            existing = [line.strip() for line in path.read_text(encoding='utf-8').splitlines()
+                        if line.strip().startswith('http')]
+        merged = list(dict.fromkeys(existing + list(urls)))
+        text = f"百度快速抓取提交清单\n日期：{day}\n共 {len(merged)} 个URL\n\n" + '\n'.join(merged) + '\n'
+        write_atomic(path, text.encode('utf-8'), fsync=False)
+        return path
+
+
+if __name__ == '__main__':
+    result = SitemapBuilder().build(force='--force' in sys.argv)
+    if not result['changed']:
+        print("✅ 站点地图无变化")
@@ -166,6 +166,8 @@ CREATE INDEX IF NOT EXISTS idx_payment_records_user_id ON payment_records(user_i
 CREATE INDEX IF NOT EXISTS idx_payment_records_order_no ON payment_records(order_no);
 CREATE INDEX IF NOT EXISTS idx_payment_records_status ON payment_records(status);
 CREATE INDEX IF NOT EXISTS idx_payment_records_created_at ON payment_records(created_at);
+CREATE INDEX IF NOT EXISTS idx_payment_records_keyset ON payment_records(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_payment_records_user_keyset ON payment_records(user_id, created_at DESC, id DESC);
 
 -- 邀请记录表索引
 CREATE INDEX IF NOT EXISTS idx_invitation_records_inviter_id ON invitation_records(inviter_id);
@@ -300,6 +302,243 @@ CREATE POLICY "用户只能删除自己的文件" ON storage.objects FOR DELETE
     auth.uid()::text = (storage.foldername(name))[1]
 );
 
+-- ========================================
+-- 使用统计按天汇总（UsageDB统计接口读取这些表）
+-- ========================================
+
+-- 用户 x 工具 x 天
+CREATE TABLE IF NOT EXISTS tool_usage_daily_user (
+    user_id UUID NOT NULL,
+    tool_name VARCHAR(100) NOT NULL,
+    usage_date DATE NOT NULL,
+    usage_count INTEGER NOT NULL DEFAULT 0,
+    credits_used INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (user_id, tool_name, usage_date)
+);
+
+-- 工具 x 天
+CREATE TABLE IF NOT EXISTS tool_usage_daily (
+    tool_name VARCHAR(100) NOT NULL,
+    usage_date DATE NOT NULL,
+    usage_count INTEGER NOT NULL DEFAULT 0,
+    credits_used INTEGER NOT NULL DEFAULT 0,
+    unique_users INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (tool_name, usage_date)
+);
+
+-- 每个(工具, 用户)最后一次使用的日期，tool_name为'*'时表示任意工具
+CREATE TABLE IF NOT EXISTS tool_usage_last_seen (
+    tool_name VARCHAR(100) NOT NULL,
+    user_id UUID NOT NULL,
+    last_used DATE NOT NULL,
+    PRIMARY KEY (tool_name, user_id)
+);
+
+-- 按最后使用日期计数的用户数：从某天到今天的去重用户数 = 这些天的last_seen_users之和
+CREATE TABLE IF NOT EXISTS tool_usage_active_daily (
+    tool_name VARCHAR(100) NOT NULL,
+    usage_date DATE NOT NULL,
+    last_seen_users INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (tool_name, usage_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_tool_usage_daily_user_date ON tool_usage_daily_user(user_id, usage_date);
+CREATE INDEX IF NOT EXISTS idx_tool_usage_daily_user_tool_date ON tool_usage_daily_user(tool_name, usage_date);
+CREATE INDEX IF NOT EXISTS idx_tool_usage_daily_date ON tool_usage_daily(usage_date);
+CREATE INDEX IF NOT EXISTS idx_tool_usage_last_seen_date ON tool_usage_last_seen(tool_name, last_used);
+
+-- 记录一次使用：汇总表原子加一，并把用户的最后使用日期移到当天
+CREATE OR REPLACE FUNCTION increment_usage_rollup(p_user_id UUID, p_tool_name TEXT, p_usage_date DATE, p_credits INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    v_first_use BOOLEAN;
+    v_tool TEXT;
+    v_previous DATE;
+BEGIN
+    INSERT INTO tool_usage_daily_user (user_id, tool_name, usage_date, usage_count, credits_used)
+    VALUES (p_user_id, p_tool_name, p_usage_date, 1, COALESCE(p_credits, 0))
+    ON CONFLICT (user_id, tool_name, usage_date) DO UPDATE SET
+        usage_count = tool_usage_daily_user.usage_count + 1,
+        credits_used = tool_usage_daily_user.credits_used + EXCLUDED.credits_used,
+        updated_at = NOW()
+    RETURNING (xmax = 0) INTO v_first_use;
+
+    INSERT INTO tool_usage_daily (tool_name, usage_date, usage_count, credits_used, unique_users)
+    VALUES (p_tool_name, p_usage_date, 1, COALESCE(p_credits, 0), CASE WHEN v_first_use THEN 1 ELSE 0 END)
+    ON CONFLICT (tool_name, usage_date) DO UPDATE SET
+        usage_count = tool_usage_daily.usage_count + 1,
+        credits_used = tool_usage_daily.credits_used + EXCLUDED.credits_used,
+        unique_users = tool_usage_daily.unique_users + EXCLUDED.unique_users,
+        updated_at = NOW();
+
+    IF NOT v_first_use THEN
+        RETURN;
+    END IF;
+
+    FOREACH v_tool IN ARRAY ARRAY[p_tool_name, '*'] LOOP
+        INSERT INTO tool_usage_last_seen (tool_name, user_id, last_used)
+        VALUES (v_tool, p_user_id, p_usage_date)
+        ON CONFLICT (tool_name, user_id) DO NOTHING;
+        IF FOUND THEN
+            v_previous := NULL;
+        ELSE
+            SELECT last_used INTO v_previous FROM tool_usage_last_seen
+            WHERE tool_name = v_tool AND user_id = p_user_id FOR UPDATE;
+            IF v_previous >= p_usage_date THEN
+                CONTINUE;
+            END IF;
+            UPDATE tool_usage_last_seen SET last_used = p_usage_date
+            WHERE tool_name = v_tool AND user_id = p_user_id;
+            UPDATE tool_usage_active_daily SET last_seen_users = last_seen_users - 1
+            WHERE tool_name = v_tool AND usage_date = v_previous;
+        END IF;
+        INSERT INTO tool_usage_active_daily (tool_name, usage_date, last_seen_users)
+        VALUES (v_tool, p_usage_date, 1)
+        ON CONFLICT (tool_name, usage_date) DO UPDATE SET
+            last_seen_users = tool_usage_active_daily.last_seen_users + 1;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 按原始记录重算已结束日期的汇总（回填/修复），返回重算后的用户级汇总行数
+-- 当天的汇总只做增量更新：重算当天会和并发的record_usage重复计数
+CREATE OR REPLACE FUNCTION compact_usage_rollups(p_start_date DATE, p_end_date DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    v_end DATE := LEAST(p_end_date, (NOW() AT TIME ZONE 'UTC')::date - 1);
+    v_rows INTEGER;
+BEGIN
+    IF v_end < p_start_date THEN
+        RETURN 0;
+    END IF;
+    -- 重算期间暂停increment_usage_rollup，避免与迟到的增量交错
+    LOCK TABLE tool_usage_daily_user, tool_usage_daily, tool_usage_last_seen, tool_usage_active_daily
+        IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM tool_usage_daily_user WHERE usage_date BETWEEN p_start_date AND v_end;
+    INSERT INTO tool_usage_daily_user (user_id, tool_name, usage_date, usage_count, credits_used)
+    SELECT user_id, tool_name, (created_at AT TIME ZONE 'UTC')::date, COUNT(*), COALESCE(SUM(credits_used), 0)
+    FROM tool_usage
+    WHERE (created_at AT TIME ZONE 'UTC')::date BETWEEN p_start_date AND v_end
+      AND user_id IS NOT NULL
+    GROUP BY user_id, tool_name, (created_at AT TIME ZONE 'UTC')::date;
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    DELETE FROM tool_usage_daily WHERE usage_date BETWEEN p_start_date AND v_end;
+    INSERT INTO tool_usage_daily (tool_name, usage_date, usage_count, credits_used, unique_users)
+    SELECT tool_name, usage_date, SUM(usage_count), SUM(credits_used), COUNT(DISTINCT user_id)
+    FROM tool_usage_daily_user
+    WHERE usage_date BETWEEN p_start_date AND v_end
+    GROUP BY tool_name, usage_date;
+
+    -- 补齐增量失败时漏记的最后使用日期，再按它重算这几天的去重用户数
+    INSERT INTO tool_usage_last_seen (tool_name, user_id, last_used)
+    SELECT tool_name, user_id, MAX(usage_date) FROM tool_usage_daily_user
+    WHERE usage_date BETWEEN p_start_date AND v_end GROUP BY tool_name, user_id
+    UNION ALL
+    SELECT '*', user_id, MAX(usage_date) FROM tool_usage_daily_user
+    WHERE usage_date BETWEEN p_start_date AND v_end GROUP BY user_id
+    ON CONFLICT (tool_name, user_id) DO UPDATE SET
+        last_used = GREATEST(tool_usage_last_seen.last_used, EXCLUDED.last_used);
+
+    DELETE FROM tool_usage_active_daily WHERE usage_date BETWEEN p_start_date AND v_end;
+    INSERT INTO tool_usage_active_daily (tool_name, usage_date, last_seen_users)
+    SELECT tool_name, last_used, COUNT(*) FROM tool_usage_last_seen
+    WHERE last_used BETWEEN p_start_date AND v_end
+    GROUP BY tool_name, last_used;
+
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ========================================
+-- 订单统计按天汇总（OrderManager.get_order_statistics读取）
+-- ========================================
+
+CREATE TABLE IF NOT EXISTS payment_stats_daily (
+    stat_date DATE NOT NULL,
+    membership_type VARCHAR(50) NOT NULL,
+    payment_method VARCHAR(50) NOT NULL,
+    total_orders INTEGER NOT NULL DEFAULT 0,
+    paid_orders INTEGER NOT NULL DEFAULT 0,
+    paid_amount DECIMAL(12,2) NOT NULL DEFAULT 0,
+    refunded_orders INTEGER NOT NULL DEFAULT 0,
+    refunded_amount DECIMAL(12,2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (stat_date, membership_type, payment_method)
+);
+
+CREATE INDEX IF NOT EXISTS idx_payment_stats_daily_date ON payment_stats_daily(stat_date);
+
+-- 累加一个日期桶的增量（创建订单、支付、退款时调用）
+CREATE OR REPLACE FUNCTION apply_order_stats_delta(
+    p_stat_date DATE, p_membership_type TEXT, p_payment_method TEXT,
+    p_total_orders INTEGER, p_paid_orders INTEGER, p_paid_amount DECIMAL,
+    p_refunded_orders INTEGER, p_refunded_amount DECIMAL)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO payment_stats_daily (stat_date, membership_type, payment_method, total_orders,
+                                     paid_orders, paid_amount, refunded_orders, refunded_amount)
+    VALUES (p_stat_date, p_membership_type, p_payment_method, p_total_orders,
+            p_paid_orders, p_paid_amount, p_refunded_orders, p_refunded_amount)
+    ON CONFLICT (stat_date, membership_type, payment_method) DO UPDATE SET
+        total_orders = payment_stats_daily.total_orders + EXCLUDED.total_orders,
+        paid_orders = payment_stats_daily.paid_orders + EXCLUDED.paid_orders,
+        paid_amount = payment_stats_daily.paid_amount + EXCLUDED.paid_amount,
+        refunded_orders = payment_stats_daily.refunded_orders + EXCLUDED.refunded_orders,
+        refunded_amount = payment_stats_daily.refunded_amount + EXCLUDED.refunded_amount,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- 按payment_records重建指定日期范围的汇总，返回重建的桶数
+CREATE OR REPLACE FUNCTION rebuild_order_stats(p_start_date DATE, p_end_date DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    DELETE FROM payment_stats_daily WHERE stat_date BETWEEN p_start_date AND p_end_date;
+    INSERT INTO payment_stats_daily (stat_date, membership_type, payment_method, total_orders,
+                                     paid_orders, paid_amount, refunded_orders, refunded_amount)
+    SELECT created_at::date, COALESCE(membership_type, 'unknown'), COALESCE(payment_method, 'unknown'), COUNT(*),
+           COUNT(*) FILTER (WHERE status = 'paid'),
+           COALESCE(SUM(amount) FILTER (WHERE status = 'paid'), 0),
+           COUNT(*) FILTER (WHERE status = 'refunded'),
+           COALESCE(SUM(amount) FILTER (WHERE status = 'refunded'), 0)
+    FROM payment_records
+    WHERE created_at::date BETWEEN p_start_date AND p_end_date
+    GROUP BY created_at::date, COALESCE(membership_type, 'unknown'), COALESCE(payment_method, 'unknown');
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ========================================
+-- 已处理的支付异步通知（payment_idempotency去重，重复通知直接确认）
+-- ========================================
+
+CREATE TABLE IF NOT EXISTS processed_notifications (
+    provider VARCHAR(20) NOT NULL,
+    out_trade_no VARCHAR(100) NOT NULL,
+    trade_status VARCHAR(50) NOT NULL,
+    processed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (provider, out_trade_no, trade_status)
+);
+
+CREATE INDEX IF NOT EXISTS idx_processed_notifications_time ON processed_notifications(processed_at);
+
+-- 待支付订单对账进度（payment_reconciler每处理一页保存一次）
+CREATE TABLE IF NOT EXISTS reconciliation_checkpoints (
+    name VARCHAR(50) PRIMARY KEY,
+    cursor_created_at TIMESTAMP WITH TIME ZONE,
+    cursor_id UUID,
+    stats JSONB DEFAULT '{}',
+    last_completed_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- ========================================
 -- 创建视图简化查询
 -- ========================================
@@ -355,6 +594,10 @@ BEGIN
     RAISE NOTICE '- system_config (系统配置表)';
     RAISE NOTICE '- user_sessions (用户会话表)';
     RAISE NOTICE '- operation_logs (操作日志表)';
+    RAISE NOTICE '- tool_usage_daily_user / tool_usage_daily / tool_usage_active_daily (使用统计汇总表)';
+    RAISE NOTICE '- payment_stats_daily (订单统计汇总表)';
+    RAISE NOTICE '- processed_notifications (已处理支付通知表)';
+    RAISE NOTICE '- reconciliation_checkpoints (订单对账进度表)';
     RAISE NOTICE '========================================';
     RAISE NOTICE '请记得在Supabase控制台创建存储桶：processed-images';
     RAISE NOTICE '========================================';
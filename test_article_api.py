@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试文章路由（Flask测试客户端，文章存储在临时目录）
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+import article_store
+import article_search
+import article_render_cache
+import article_views
+from article_store import ArticleStore
+from article_search import ArticleSearch
+from article_render_cache import ArticleRenderCache
+from article_views import ViewCounter
+from sitemap_builder import SitemapBuilder
+
+
+def _client(data_dir):
+    """用临时目录中的文章存储替换全局实例，返回测试客户端和存储"""
+    import article_api
+    store = ArticleStore(data_dir)
+    article_store.article_store = store
+    article_search.article_search = ArticleSearch(store)
+    article_render_cache.render_cache = ArticleRenderCache(store)
+    article_views.view_counter = ViewCounter(store, start=False)
+    app = Flask(__name__)
+    app.register_blueprint(article_api.article_bp)
+    return app.test_client(), store
+
+
+def _reset():
+    import article_api
+    article_api.sitemap_builder = None
+    article_api._sitemap_checked_at = 0.0
+    article_store.article_store = None
+    article_search.article_search = None
+    article_render_cache.render_cache = None
+    article_views.view_counter = None
+
+
+def test_list_and_detail():
+    """测试首页使用的文章列表和详情接口"""
+    print("=== 测试文章列表与详情 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        try:
+            client, store = _client(data_dir)
+            ids = [store.save_article({'title': f'文章{i}', 'content': f'正文{i}', 'category': 'tips'})['id']
+                   for i in range(8)]
+            draft = store.save_article({'title': '草稿', 'content': '未发布', 'status': 'draft'})['id']
+
+            result = client.get('/api/articles?page=2&limit=6').get_json()
+            assert result['success'] and result['page'] == 2 and result['total_pages'] == 2
+            assert len(result['articles']) == 2 and 'content' not in result['articles'][0]
+            assert client.get('/api/articles?limit=abc').get_json()['limit'] == 10
+            print("✅ 列表分页与前端参数一致")
+
+            article = client.get(f'/api/articles/{ids[0]}').get_json()['article']
+            assert article['title'] == '文章0' and article['content'] == '正文0'
+            assert client.get(f'/api/articles/{draft}').status_code == 404
+            assert client.get('/api/articles/missing').status_code == 404
+            print("✅ 详情返回正文，草稿和不存在的文章返回404")
+        finally:
+            _reset()
+
+
+def test_search():
+    """测试全文搜索接口"""
+    print("\n=== 测试文章搜索 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        try:
+            client, store = _client(data_dir)
+            target = store.save_article({'title': '跨境电商物流指南', 'content': '海外仓和头程物流的选择'})['id']
+            store.save_article({'title': '图片压缩技巧', 'content': '如何压缩商品主图'})
+
+            result = client.get('/api/articles/search?q=物流').get_json()
+            assert result['success'] and result['total'] == 1
+            assert result['results'][0]['id'] == target and '<mark>' in result['results'][0]['snippet']
+            assert client.get('/api/articles/search?q=').status_code == 400
+            print("✅ 搜索返回匹配文章和高亮摘要，空查询返回400")
+        finally:
+            _reset()
+
+
+def test_rendered_pages():
+    """测试渲染缓存输出的博客列表页和文章页"""
+    print("\n=== 测试文章HTML页面 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        try:
+            client, store = _client(data_dir)
+            article_id = store.save_article({'title': '渲染页面', 'content': '## 小标题\n\n正文'})['id']
+
+            response = client.get(f'/article/{article_id}')
+            assert response.status_code == 200 and '<h2>小标题</h2>' in response.get_data(as_text=True)
+            etag = response.headers['ETag']
+            assert client.get(f'/article/{article_id}', headers={'If-None-Match': etag}).status_code == 304
+            assert client.get('/article/missing').status_code == 404
+            draft = store.save_article({'title': '草稿', 'content': '未发布', 'status': 'draft'})['id']
+            assert client.get(f'/article/{draft}').status_code == 404
+            assert article_views.view_counter.pending(draft) == 0
+            print("✅ 文章页由渲染缓存输出，ETag命中返回304，草稿返回404且不计浏览量")
+
+            response = client.get('/blog', headers={'Accept-Encoding': 'gzip'})
+            assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip'
+            print("✅ 博客列表页返回预压缩版本")
+        finally:
+            _reset()
+
+
+def test_view_counting():
+    """测试详情接口、信标和文章页计入浏览量，热门文章按写回后的浏览量排序"""
+    print("\n=== 测试文章浏览量 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        try:
+            client, store = _client(data_dir)
+            hot = store.save_article({'title': '热门', 'content': '正文'})['id']
+            cold = store.save_article({'title': '冷门', 'content': '正文'})['id']
+
+            assert client.get(f'/api/articles/{hot}').get_json()['article']['views'] == 1
+            assert client.post(f'/api/articles/{hot}/view').status_code == 204
+            assert client.get(f'/article/{hot}').status_code == 200
+            assert client.post(f'/api/articles/{cold}/view').status_code == 204
+            assert client.post('/api/articles/missing/view').status_code == 404
+            listed = {a['id']: a['views'] for a in client.get('/api/articles').get_json()['articles']}
+            assert listed == {hot: 3, cold: 1}
+            print("✅ 详情、信标、文章页都计入浏览量，列表包含未写回的增量")
+
+            article_views.view_counter.flush()
+            popular = client.get('/api/articles/popular?limit=1').get_json()['articles']
+            assert [a['id'] for a in popular] == [hot] and popular[0]['views'] == 3
+            print("✅ 热门文章按浏览量排序")
+        finally:
+            _reset()
+
+
+def test_sitemap():
+    """测试站点地图按间隔增量生成，支持预压缩版本"""
+    print("\n=== 测试站点地图路由 ===")
+
+    import gzip
+    import article_api
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        previous = os.environ.get('SITEMAP_REBUILD_INTERVAL')
+        os.environ['SITEMAP_REBUILD_INTERVAL'] = '0'
+        try:
+            client, store = _client(data_dir)
+            output_dir = os.path.join(data_dir, 'frontend')
+            os.makedirs(output_dir)
+            article_api.sitemap_builder = SitemapBuilder(store, output_dir=output_dir, data_dir=data_dir,
+                                                         site_url='https://example.com')
+            first = store.save_article({'title': '第一篇', 'content': '正文'})['id']
+
+            response = client.get('/sitemap.xml')
+            assert response.status_code == 200 and response.mimetype == 'application/xml'
+            assert f'id={first}' in response.get_data(as_text=True)
+            print("✅ 首次访问生成站点地图")
+
+            second = store.save_article({'title': '第二篇', 'content': '正文'})['id']
+            response = client.get('/sitemap.xml', headers={'Accept-Encoding': 'gzip'})
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert f'id={second}' in gzip.decompress(response.get_data()).decode('utf-8')
+            assert client.get('/sitemap-articles-abc.xml').status_code == 404
+            print("✅ 新文章增量写入，支持gzip预压缩文件")
+        finally:
+            if previous is None:
+                os.environ.pop('SITEMAP_REBUILD_INTERVAL', None)
+            else:
+                os.environ['SITEMAP_REBUILD_INTERVAL'] = previous
+            _reset()
+
+
+if __name__ == "__main__":
+    test_list_and_detail()
+    test_search()
+    test_rendered_pages()
+    test_view_counting()
+    test_sitemap()
+    print("\n🎉 文章路由测试通过！")
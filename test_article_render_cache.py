@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试文章HTML渲染缓存（Markdown转义、ETag/304、压缩版本、更新后失效）
+"""
+
+import os
+import sys
+import gzip
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from article_store import ArticleStore
+from article_render_cache import ArticleRenderCache, render_markdown
+
+
+def test_render_markdown_sanitized():
+    """测试Markdown渲染并转义原始HTML和危险链接"""
+    print("=== 测试Markdown渲染 ===")
+
+    output = render_markdown('# 标题\n\n**加粗** 和 `代码`\n\n- 一\n- 二\n\n<script>alert(1)</script>')
+    assert '<h1>标题</h1>' in output
+    assert '<strong>加粗</strong>' in output and '<code>代码</code>' in output
+    assert '<ul>\n<li>一</li>\n<li>二</li>\n</ul>' in output
+    assert '<script>' not in output and '&lt;script&gt;' in output
+    print("✅ 基本格式正确，原始HTML被转义")
+
+    links = render_markdown('[好](https://example.com) [坏](javascript:alert(1)) ![图](/a.png)')
+    assert '<a href="https://example.com" rel="nofollow noopener">好</a>' in links
+    assert 'javascript:' not in links and 'href="#"' in links
+    assert '<img src="/a.png" alt="图" loading="lazy">' in links
+    print("✅ 只允许安全的链接地址")
+
+
+def test_cache_etag_and_invalidation():
+    """测试缓存命中、304、gzip版本和文章更新后重新渲染"""
+    print("\n=== 测试渲染缓存 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = ArticleStore(data_dir)
+        meta = store.save_article({'title': '缓存<测试>', 'content': '## 小标题\n\n正文内容' * 20})
+        cache = ArticleRenderCache(store, max_age=60)
+
+        page = cache.get_article_page(meta['id'])
+        assert cache.get_article_page(meta['id']) is page
+        assert cache.stats()['renders'] == 1 and cache.stats()['hits'] == 1
+        assert '缓存&lt;测试&gt;' in page.body.decode('utf-8') and '<h2>小标题</h2>' in page.body.decode('utf-8')
+        assert cache.get_article_page('missing') is None
+        print("✅ 每篇文章只渲染一次")
+
+        status, headers, body = cache.respond(page, accept_encoding='gzip, deflate')
+        assert status == 200 and headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(body) == page.body and headers['Vary'] == 'Accept-Encoding'
+        status, headers, body = cache.respond(page, if_none_match=f'W/"x", {page.etag}')
+        assert status == 304 and body == b'' and headers['ETag'] == page.etag
+        status, headers, body = cache.respond(page, accept_encoding='gzip;q=0')
+        assert status == 200 and 'Content-Encoding' not in headers and body == page.body
+        print("✅ ETag命中返回304，按Accept-Encoding返回压缩版本")
+
+        blog = cache.get_blog_page()
+        assert 'article.html?id=' + meta['id'] in blog.body.decode('utf-8')
+
+        store.save_article({'id': meta['id'], 'content': '改过的正文'})
+        updated = cache.get_article_page(meta['id'])
+        assert updated is not page and updated.etag != page.etag
+        assert '改过的正文' in updated.body.decode('utf-8')
+        assert cache.respond(updated, if_none_match=page.etag)[0] == 200
+        assert cache.get_blog_page() is not blog
+        print("✅ 文章更新后缓存自动失效")
+
+
+if __name__ == "__main__":
+    test_render_markdown_sanitized()
+    test_cache_etag_and_invalidation()
+    print("\n🎉 文章渲染缓存测试通过！")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试文章全文搜索（二元组分词、BM25排序、增量更新、持久化和高亮）
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from article_store import ArticleStore
+from article_search import ArticleSearch, tokenize, make_snippet
+
+
+def _seed(store):
+    store.save_article({'id': 'a1', 'title': '跨境电商物流指南', 'content': '小包物流的价格对比，物流时效。', 'category': 'tips'})
+    store.save_article({'id': 'a2', 'title': '图片背景移除教程', 'content': '在跨境电商中，主图需要白色背景。', 'category': 'tutorial'})
+    store.save_article({'id': 'a3', 'title': 'Amazon Listing优化', 'content': 'Listing标题和关键词 <b>技巧</b>。', 'category': 'tips'})
+
+
+def test_tokenize_and_rank():
+    """测试分词和BM25排序"""
+    print("=== 测试分词与排序 ===")
+
+    assert tokenize('跨境电商 Listing!') == ['跨境', '境电', '电商', 'listing']
+    assert tokenize('图') == ['图']
+    print("✅ 中文二元组 + 英文单词")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = ArticleStore(data_dir)
+        _seed(store)
+        search = ArticleSearch(store)
+
+        result = search.search('跨境电商')
+        assert [r['id'] for r in result['results']] == ['a1', 'a2']
+        assert result['results'][0]['title_highlight'] == '<mark>跨境电商</mark>物流指南'
+        assert search.search('物流')['results'][0]['id'] == 'a1'
+        assert search.search('LISTING')['results'][0]['id'] == 'a3'
+        assert search.search('完全不相关')['total'] == 0
+        print(f"✅ 标题命中排在正文命中之前，耗时 {result['took_ms']}ms")
+
+        snippet = search.search('关键词')['results'][0]['snippet']
+        assert '<mark>关键词</mark>' in snippet and '<b' not in snippet and '&lt;b' in snippet
+        assert make_snippet('前' * 100 + '目标词' + '后' * 100, '目标词').startswith('…')
+        print("✅ 摘要高亮并转义HTML")
+
+
+def test_incremental_and_persisted():
+    """测试文章修改/删除后增量更新，重启后从磁盘加载不重新分词"""
+    print("\n=== 测试增量更新与持久化 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = ArticleStore(data_dir)
+        _seed(store)
+        search = ArticleSearch(store)
+        search.sync()
+        indexed = search.stats()['indexed']
+
+        store.save_article({'id': 'a2', 'content': '改成讲海外仓的内容'})
+        assert search.search('海外仓')['results'][0]['id'] == 'a2'
+        assert search.stats()['indexed'] == indexed + 1
+        assert search.search('白色')['total'] == 0
+        print("✅ 只重新索引被修改的文章")
+
+        store.delete_article('a1')
+        assert search.search('小包')['total'] == 0
+        print("✅ 删除的文章移出索引")
+
+        restarted = ArticleSearch(ArticleStore(data_dir))
+        assert restarted.sync() == 0
+        assert restarted.stats()['indexed'] == 0 and restarted.stats()['documents'] == 2
+        assert restarted.search('海外仓')['results'][0]['id'] == 'a2'
+        print("✅ 重启后加载持久化索引，无需重新分词")
+
+
+if __name__ == "__main__":
+    test_tokenize_and_rank()
+    test_incremental_and_persisted()
+    print("\n🎉 文章搜索测试通过！")
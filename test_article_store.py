@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试文章存储（从articles.json迁移、索引分页、正文按需加载、多实例同步）
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from article_store import ArticleStore
+
+
+def _write_legacy(data_dir, count=12):
+    articles = {}
+    for i in range(count):
+        article_id = f'article_202512{i + 1:02d}_{i:08x}'
+        articles[article_id] = {
+            'id': article_id,
+            'title': f'文章{i}',
+            'content': f'## 正文{i}\n\n' + '内容' * 100,
+            'summary': f'摘要{i}',
+            'category': 'tips' if i % 2 == 0 else 'tutorial',
+            'tags': ['跨境电商', '干货'] if i % 3 == 0 else "['NBFive', 'AI']",
+            'author': 'AI Assistant',
+            'status': 'published',
+            'created_at': f'2025-12-{i + 1:02d}T10:00:00',
+            'updated_at': f'2025-12-{i + 1:02d}T10:00:00',
+            'views': None if i == 0 else i
+        }
+    with open(os.path.join(data_dir, 'articles.json'), 'w', encoding='utf-8') as f:
+        json.dump(articles, f, ensure_ascii=False)
+    return articles
+
+
+def test_migrate_and_list():
+    """测试迁移后分页、分类/标签/日期过滤，列表不读取正文"""
+    print("=== 测试文章列表 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        _write_legacy(data_dir)
+        store = ArticleStore(data_dir)
+        assert len(store) == 12
+        assert os.path.exists(os.path.join(data_dir, 'articles', 'index.json'))
+
+        result = store.list_articles(page=1, limit=5)
+        assert result['success'] and result['total'] == 12 and result['total_pages'] == 3
+        assert [a['title'] for a in result['articles']] == ['文章11', '文章10', '文章9', '文章8', '文章7']
+        assert 'content' not in result['articles'][0]
+        assert store.list_articles(page=3, limit=5)['articles'][-1]['views'] == 0
+        print("✅ 按创建时间倒序分页，列表只含元数据")
+
+        assert store.list_articles(category='tutorial', limit=100)['total'] == 6
+        assert store.list_articles(tag='NBFive', limit=100)['total'] == 8
+        both = store.list_articles(category='tips', tag='干货', limit=100)
+        assert [a['title'] for a in both['articles']] == ['文章6', '文章0']
+        dated = store.list_articles(date_from='2025-12-03', date_to='2025-12-05', limit=100)
+        assert [a['title'] for a in dated['articles']] == ['文章4', '文章3', '文章2']
+        assert store.get_categories() == {'tutorial': 6, 'tips': 6}
+        print("✅ 分类/标签/日期索引过滤正确，字符串形式的标签已规范化")
+
+        assert store.stats()['body_reads'] == 0
+        article = store.get_article('article_20251205_00000004')
+        assert article['content'].startswith('## 正文4')
+        store.get_article('article_20251205_00000004')
+        stats = store.stats()
+        assert stats['body_reads'] == 1 and stats['body_cache_hits'] == 1
+        print("✅ 正文在打开文章时才读取，并被缓存")
+
+
+def test_writes_and_sync():
+    """测试新建/删除文章、其他实例同步，以及articles.json更新后合并导入"""
+    print("\n=== 测试文章写入 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        legacy = _write_legacy(data_dir, count=3)
+        store = ArticleStore(data_dir)
+        other = ArticleStore(data_dir)
+        assert other.stats()['legacy_imports'] == 0
+
+        meta = store.save_article({'title': '新文章', 'content': '# 标题\n\n新的正文', 'category': 'news', 'tags': '新品, 活动'})
+        assert meta['summary'] == '标题 新的正文' and meta['tags'] == ['新品', '活动']
+        assert other.get_article(meta['id'])['content'] == '# 标题\n\n新的正文'
+        assert other.list_articles()['articles'][0]['id'] == meta['id']
+        print("✅ 新文章对其他实例立即可见")
+
+        store.update_meta(meta['id'], views=42)
+        assert other.get_article(meta['id'], with_content=False)['views'] == 42
+        assert store.delete_article(meta['id'])
+        assert other.get_article(meta['id']) is None
+        print("✅ 元数据更新和删除同步")
+
+        first_id = next(iter(legacy))
+        legacy[first_id]['title'] = '旧脚本修改的标题'
+        with open(os.path.join(data_dir, 'articles.json'), 'w', encoding='utf-8') as f:
+            json.dump(legacy, f, ensure_ascii=False)
+        assert store.get_article(first_id)['title'] == '旧脚本修改的标题'
+        assert len(store) == 3
+        print("✅ articles.json被修改后合并导入")
+
+        # 存储中的修改、浏览量和删除不会被articles.json覆盖
+        second_id, third_id = list(legacy)[1:]
+        store.save_article({'id': second_id, 'title': '后台修改的标题'})
+        store.add_views({first_id: 10})
+        assert store.delete_article(third_id)
+        legacy[first_id]['content'] = '旧脚本修改的正文'
+        legacy['article_new'] = dict(legacy[first_id], id='article_new', title='旧脚本新增', views=7)
+        with open(os.path.join(data_dir, 'articles.json'), 'w', encoding='utf-8') as f:
+            json.dump(legacy, f, ensure_ascii=False)
+        os.utime(os.path.join(data_dir, 'articles.json'), ns=(1, 1))
+
+        assert store.get_article(second_id)['title'] == '后台修改的标题'
+        first = store.get_article(first_id)
+        assert first['content'] == '旧脚本修改的正文' and first['views'] == 10
+        assert store.get_article(third_id) is None
+        assert store.get_article('article_new')['views'] == 7 and len(store) == 3
+        print("✅ 只导入新增或变化的文章，保留存储中的修改、浏览量和删除")
+
+
+if __name__ == "__main__":
+    test_migrate_and_list()
+    test_writes_and_sync()
+    print("\n🎉 文章存储测试通过！")
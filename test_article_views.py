@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试文章浏览量计数（并发计数、批量写回、热门文章堆）
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from article_store import ArticleStore
+from article_views import ViewCounter, TopArticles
+
+
+def test_concurrent_hits_and_flush():
+    """测试多线程计数不丢失，写回时只写一次索引"""
+    print("=== 测试浏览量计数 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = ArticleStore(data_dir)
+        ids = [store.save_article({'title': f'文章{i}', 'content': '正文'})['id'] for i in range(5)]
+        counter = ViewCounter(store, shards=4, start=False)
+
+        def worker():
+            for _ in range(1000):
+                for article_id in ids:
+                    counter.hit(article_id)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.pending() == 8 * 1000 * 5
+        assert store.get_article(ids[0], with_content=False)['views'] == 0
+        assert counter.get_views(ids[0]) == 8000
+        print("✅ 并发计数不丢失，浏览时不写文件")
+
+        assert counter.flush() == 40000
+        assert counter.pending() == 0 and counter.flush() == 0
+        assert ArticleStore(data_dir).get_article(ids[0], with_content=False)['views'] == 8000
+        print("✅ 增量批量写回文章索引")
+
+        store.delete_article(ids[1])
+        counter.hit(ids[1], 3)
+        counter.hit(ids[2])
+        assert counter.flush() == 1 and counter.stats()['dropped_views'] == 3
+        print("✅ 已删除文章的浏览量被丢弃")
+
+
+def test_top_articles():
+    """测试热门文章堆"""
+    print("\n=== 测试热门文章 ===")
+
+    top = TopArticles(3)
+    top.rebuild([('a', 5), ('b', 1), ('c', 3), ('d', 4)])
+    assert top.top(3) == [('a', 5), ('d', 4), ('c', 3)]
+    top.update('b', 10)
+    top.update('c', 2)
+    assert top.top(3) == [('b', 10), ('a', 5), ('d', 4)]
+    for views in range(11, 200):
+        top.update('a', views)
+    assert top.top(1) == [('a', 199)] and len(top._heap) <= 12
+    print("✅ 堆只保留前N篇，过期条目会被清理")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = ArticleStore(data_dir)
+        ids = [store.save_article({'title': f'文章{i}', 'content': '正文'})['id'] for i in range(6)]
+        store.save_article({'id': ids[5], 'status': 'draft'})
+        counter = ViewCounter(store, start=False, top_capacity=3)
+        for i, article_id in enumerate(ids):
+            counter.hit(article_id, (i + 1) * 10)
+        counter.flush()
+        assert [a['id'] for a in counter.top(2)] == [ids[4], ids[3]]
+
+        counter.hit(ids[0], 100)
+        counter.flush()
+        popular = counter.top(3)
+        assert [a['id'] for a in popular] == [ids[0], ids[4], ids[3]] and popular[0]['views'] == 110
+        print("✅ 热门文章随写回更新，草稿不参与排行")
+
+
+if __name__ == "__main__":
+    test_concurrent_hits_and_flush()
+    test_top_articles()
+    print("\n🎉 文章浏览量测试通过！")
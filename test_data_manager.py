@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试DataManager持久化（在临时目录中运行，不影响data/）
+"""
+
+import os
+import sys
+import json
+import tempfile
+import threading
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from data_manager import DataManager
+from data_manager_sqlite import SQLiteDataManager
+
+
+def test_journal_replay_after_restart():
+    """测试日志模式：变更只追加记录，重启后快照+日志恢复完整数据"""
+    print("=== 测试日志重放 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        dm = DataManager(data_dir, journal=True)
+        user_id, token = dm.create_user('Journal@Example.com', 'secret', '日志用户')
+        for _ in range(3):
+            dm.record_usage(user_id, 'background_remover')
+        dm.add_invite_reward(user_id, 'one_time', 'background_remover', 2)
+
+        # 没有写快照文件，只有日志
+        assert not os.path.exists(os.path.join(data_dir, 'profiles.json'))
+        stats = dm.get_storage_stats()
+        assert stats['mode'] == 'journal' and stats['durable_lsn'] == stats['lsn']
+        print(f"✅ 变更写入日志: {stats['records']} 条记录, {stats['flushes']} 次fsync")
+        dm.journal.close()
+
+        restarted = DataManager(data_dir, journal=True)
+        profile = restarted.user_profiles_db[user_id]
+        today = next(iter(profile['daily_usage']))
+        assert profile['daily_usage'][today]['background_remover'] == 3
+        assert len(profile['invite_rewards']['one_time_rewards']) == 1
+        assert restarted.get_user_by_token(token)['email'] == 'journal@example.com'
+        assert restarted.get_inviter_by_code(profile['invite_code']) == user_id
+        print("✅ 重启后重放日志恢复数据")
+        restarted.journal.close()
+
+
+def test_compaction_rewrites_snapshots():
+    """测试压缩：写快照、删除旧日志，之后的记录仍可重放"""
+    print("\n=== 测试日志压缩 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        dm = DataManager(data_dir, journal=True)
+        user_id, _ = dm.create_user('compact@example.com', 'secret', '压缩用户')
+        dm.record_usage(user_id, 'image_compressor')
+        dm.save_all()
+
+        with open(os.path.join(data_dir, 'profiles.json'), encoding='utf-8') as f:
+            snapshot = json.load(f)
+        today = next(iter(snapshot[user_id]['daily_usage']))
+        assert snapshot[user_id]['daily_usage'][today]['image_compressor'] == 1
+        assert dm.get_storage_stats()['compactions'] == 1
+        segments = sorted(os.listdir(os.path.join(data_dir, 'journal')))
+        assert [s for s in segments if s.startswith('wal-')] == ['wal-000002.log']
+        print("✅ 压缩后快照包含全部数据，旧日志已删除")
+
+        dm.record_usage(user_id, 'image_compressor')
+        dm.journal.close()
+        restarted = DataManager(data_dir, journal=True)
+        assert restarted.user_profiles_db[user_id]['daily_usage'][today]['image_compressor'] == 2
+        print("✅ 压缩后的新记录重放正确")
+        restarted.journal.close()
+
+
+def test_group_commit_batches_concurrent_writes():
+    """测试并发写入合并fsync，且不丢记录"""
+    print("\n=== 测试group commit ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        dm = DataManager(data_dir, journal=True)
+        dm.journal.commit_delay = 0.005
+        user_id, _ = dm.create_user('group@example.com', 'secret', '并发用户')
+        tools = ['background_remover', 'image_compressor', 'format_converter', 'image_cropper']
+
+        def worker(tool):
+            for _ in range(10):
+                dm.journal.append('profiles', user_id, ('notes', tool), tool)
+
+        threads = [threading.Thread(target=worker, args=(tool,)) for tool in tools]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = dm.get_storage_stats()
+        print(f"日志统计: {stats}")
+        assert stats['durable_lsn'] == stats['lsn']
+        assert stats['flushes'] < stats['records']
+        dm.journal.close()
+
+        restarted = DataManager(data_dir, journal=True)
+        assert set(restarted.user_profiles_db[user_id]['notes']) == set(tools)
+        print("✅ 并发写入被合并到更少的fsync中")
+        restarted.journal.close()
+
+
+def test_second_process_is_read_only():
+    """测试日志已被占用时第二个实例只读，不会写出被持有者压缩覆盖的快照文件"""
+    print("\n=== 测试日志占用 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        owner = DataManager(data_dir, journal=True)
+        user_id, _ = owner.create_user('owner@example.com', 'secret', '持有者')
+        owner.save_all()
+
+        other = DataManager(data_dir, journal=True)
+        assert other.read_only and other.journal is None
+        assert other.get_storage_stats()['mode'] == 'read_only'
+        assert other.user_profiles_db[user_id]['invite_code']
+        before = os.stat(os.path.join(data_dir, 'profiles.json')).st_mtime_ns
+        other.record_usage(user_id, 'background_remover')
+        assert not other.save_profiles()
+        assert os.stat(os.path.join(data_dir, 'profiles.json')).st_mtime_ns == before
+        print("✅ 第二个实例可以读取快照，写入被拒绝")
+
+        owner.record_usage(user_id, 'background_remover')
+        owner.journal.close()
+        restarted = DataManager(data_dir, journal=True)
+        today = next(iter(restarted.user_profiles_db[user_id]['daily_usage']))
+        assert restarted.user_profiles_db[user_id]['daily_usage'][today]['background_remover'] == 1
+        print("✅ 持有者的数据不受第二个实例影响")
+        restarted.journal.close()
+
+
+def test_torn_tail_is_ignored():
+    """测试崩溃时写了一半的最后一条记录被截断"""
+    print("\n=== 测试不完整日志 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        dm = DataManager(data_dir, journal=True)
+        user_id, _ = dm.create_user('torn@example.com', 'secret', '崩溃用户')
+        segment = os.path.join(data_dir, 'journal', dm.get_storage_stats()['segment'])
+        dm.journal.close()
+        with open(segment, 'ab') as f:
+            f.write(b'{"n":99,"c":"profiles","k":')
+
+        restarted = DataManager(data_dir, journal=True)
+        assert user_id in restarted.user_profiles_db
+        print("✅ 截断不完整记录后正常启动")
+        restarted.journal.close()
+
+
+def test_snapshot_mode_unchanged():
+    """测试默认模式仍整体保存JSON文件"""
+    print("\n=== 测试默认保存模式 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        dm = DataManager(data_dir, journal=False)
+        user_id, _ = dm.create_user('plain@example.com', 'secret', '普通用户')
+        dm.record_usage(user_id, 'background_remover')
+        assert dm.get_storage_stats() == {'mode': 'snapshot'}
+        assert os.path.exists(os.path.join(data_dir, 'profiles.json'))
+        assert not os.path.exists(os.path.join(data_dir, 'journal'))
+        print("✅ 默认模式行为不变")
+
+
+def test_indexed_lookups_and_freshness():
+    """测试token/email/邀请码索引，以及只在文件变化时重新加载"""
+    print("\n=== 测试索引查找 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        dm = DataManager(data_dir, journal=False)
+        user_id, token = dm.create_user('Index@Example.com ', 'secret', '索引用户')
+        assert dm.get_user_by_token(token)['id'] == user_id
+        assert dm.get_user_by_email('INDEX@example.com')['id'] == user_id
+        invite_code = dm.user_profiles_db[user_id]['invite_code']
+        assert dm.get_inviter_by_code(invite_code.lower()) == user_id
+        print("✅ token/email/邀请码索引查找正确")
+
+        # 登录会更新token，旧token失效
+        dm.users_db[user_id]['token'] = 'old-token'
+        dm.reindex_users()
+        user = dm.authenticate_user('index@example.com', 'secret')
+        assert dm.get_user_by_token(user['token'])['id'] == user_id
+        assert dm.get_user_by_token('old-token') is None
+        print("✅ token变更后索引同步")
+
+        # 文件没变时，未命中不重新加载
+        loads = []
+        original_load = dm.load_data
+        dm.load_data = lambda *args: loads.append(args) or original_load(*args)
+        assert dm.get_user_by_token('missing-token') is None
+        assert dm.get_user_by_email('nobody@example.com') is None
+        assert loads == []
+        print("✅ 文件未变化时未命中不读取磁盘")
+
+        # 另一个进程写入新用户后，未命中触发一次重新加载
+        other = DataManager(data_dir, journal=False)
+        other_id, other_token = other.create_user('other@example.com', 'secret', '其他进程用户')
+        assert dm.get_user_by_token(other_token)['id'] == other_id
+        assert dm.get_user_by_email('other@example.com')['id'] == other_id
+        assert len([args for args in loads if args[0].name == 'users.json']) == 1
+        print("✅ 其他进程修改文件后按版本重新加载")
+
+
+def test_sqlite_backend_same_api():
+    """测试SQLite后端与DataManager方法一致"""
+    print("\n=== 测试SQLite后端 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        dm = SQLiteDataManager(os.path.join(data_dir, 'dm.db'), data_dir=data_dir)
+        user_id, token = dm.create_user('SQLite@Example.com', 'secret', 'SQLite用户', plan='basic')
+        assert dm.get_user_by_token(token)['id'] == user_id
+        assert dm.get_user_by_email('sqlite@example.com ')['id'] == user_id
+        for _ in range(2):
+            success, message = dm.record_usage(user_id, 'background_remover')
+        assert success and '2次' in message
+        assert dm.record_usage('missing', 'background_remover') == (False, "用户不存在")
+        dm.add_invite_reward(user_id, 'one_time', 'background_remover', 3)
+
+        profile = dm.get_user_profile(user_id)
+        today = next(iter(profile['daily_usage']))
+        assert profile['plan'] == 'basic'
+        assert profile['daily_usage'][today]['background_remover'] == 2
+        assert profile['usage_stats']['background_remover']['current_usage'] == 2
+        assert profile['usage_stats']['background_remover']['remaining_usage'] == 8
+        assert len(profile['invite_rewards']['one_time_rewards']) == 1
+        assert dm.get_inviter_by_code(profile['invite_code'].lower()) == user_id
+        print("✅ 创建/查找/记录使用/奖励结果与JSON后端一致")
+
+        user = dm.authenticate_user('sqlite@example.com', 'secret')
+        assert dm.get_user_by_token(user['token'])['id'] == user_id
+        assert dm.authenticate_user('sqlite@example.com', 'wrong') is None
+        print("✅ 登录更新token")
+
+        # 旧代码直接修改字典再调用save_xxx()
+        dm.user_profiles_db[user_id]['plan'] = 'pro'
+        dm.save_profiles()
+        dm.save_order({'order_no': 'ORDER1', 'user_id': user_id, 'status': 'pending'})
+        assert dm.user_profiles_db[user_id]['plan'] == 'pro'
+        assert dm.orders_db['ORDER1']['status'] == 'pending'
+        assert dm.get_all_users()[0]['plan'] == 'pro'
+        assert dm.get_storage_stats()['journal_mode'] == 'wal'
+        print("✅ 字典视图兼容旧代码")
+
+
+def test_sqlite_import_and_shared_writes():
+    """测试从JSON导入，以及多个实例（模拟多worker）共享数据、并发累加不丢失"""
+    print("\n=== 测试SQLite导入与多实例 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        legacy = DataManager(data_dir, journal=False)
+        user_id, token = legacy.create_user('legacy@example.com', 'secret', '旧用户')
+        legacy.record_usage(user_id, 'image_compressor')
+        legacy.save_order({'order_no': 'ORDER1', 'user_id': user_id, 'status': 'paid'})
+
+        db_path = os.path.join(data_dir, 'dm.db')
+        first = SQLiteDataManager(db_path, data_dir=data_dir)
+        assert first.get_user_by_token(token)['id'] == user_id
+        today = next(iter(first.user_profiles_db[user_id]['daily_usage']))
+        assert first.user_profiles_db[user_id]['daily_usage'][today]['image_compressor'] == 1
+        assert first.orders_db['ORDER1']['status'] == 'paid'
+        print("✅ 首次启动自动导入JSON数据")
+
+        second = SQLiteDataManager(db_path, data_dir=data_dir)
+        assert len(second.users_db) == 1
+        other_id, other_token = second.create_user('other@example.com', 'secret', '其他worker')
+        assert first.get_user_by_token(other_token)['id'] == other_id
+        print("✅ 不重复导入，其他实例的写入立即可见")
+
+        def worker(manager):
+            for _ in range(25):
+                manager.record_usage(user_id, 'format_converter')
+
+        threads = [threading.Thread(target=worker, args=(m,)) for m in (first, second, first, second)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert first.get_user_profile(user_id)['daily_usage'][today]['format_converter'] == 100
+        print("✅ 并发记录使用100次，计数无丢失")
+
+
+def test_sqlite_flush_keeps_concurrent_usage():
+    """测试只读取过的资料不会在save_all()时用旧快照覆盖其他实例记录的使用次数"""
+    print("\n=== 测试SQLite写回合并使用记录 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        db_path = os.path.join(data_dir, 'dm.db')
+        first = SQLiteDataManager(db_path, data_dir=data_dir)
+        second = SQLiteDataManager(db_path, data_dir=data_dir)
+        user_id, _ = first.create_user('flush@example.com', 'secret', '写回用户')
+        first.record_usage(user_id, 'background_remover')
+
+        # 只读取，不修改
+        profile = first.user_profiles_db[user_id]
+        today = next(iter(profile['daily_usage']))
+        second.record_usage(user_id, 'background_remover')
+        assert first.save_all()
+        assert second.get_user_profile(user_id)['daily_usage'][today]['background_remover'] == 2
+        print("✅ 读取过的资料未被写回，其他实例记录的次数保留")
+
+        # 修改了资料，写回时只合并自己的变化
+        profile = first.user_profiles_db[user_id]
+        profile['plan'] = 'pro'
+        profile['daily_usage'][today]['image_compressor'] = 1
+        second.record_usage(user_id, 'background_remover')
+        first.save_profiles()
+        usage = second.get_user_profile(user_id)['daily_usage'][today]
+        assert usage == {'background_remover': 3, 'image_compressor': 1}
+        assert second.user_profiles_db[user_id]['plan'] == 'pro'
+        print("✅ 修改过的资料按UPSERT合并使用记录")
+
+        # 记住的对象数有上限
+        first.user_profiles_db.MAX_TRACKED = 2
+        for _ in range(5):
+            first.user_profiles_db[user_id]
+        assert len(first.user_profiles_db._touched) <= 2
+        print("✅ 记住的对象数有上限")
+
+
+def test_sqlite_repeated_reads_keep_changes():
+    """测试同一资料通过两次下标取出分别修改，save_xxx()时两处修改都写回"""
+    print("\n=== 测试SQLite重复读取 ===")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        db_path = os.path.join(data_dir, 'dm.db')
+        dm = SQLiteDataManager(db_path, data_dir=data_dir)
+        user_id, _ = dm.create_user('reread@example.com', 'secret', '重复读取')
+
+        dm.user_profiles_db[user_id]['credits'] = 5
+        dm.user_profiles_db[user_id]['plan'] = 'pro'
+        assert dm.user_profiles_db[user_id] is dm.user_profiles_db[user_id]
+        assert dm.save_profiles()
+
+        profile = SQLiteDataManager(db_path, data_dir=data_dir).user_profiles_db[user_id]
+        assert profile['credits'] == 5 and profile['plan'] == 'pro'
+        print("✅ 尚未写回的资料再次取出时返回同一个对象，两次修改都保存")
+
+
+def _seed_history(profile, now):
+    """写入120天前到今天的使用记录，以及过期/有效的奖励"""
+    from datetime import timedelta
+    for offset in (120, 119, 100, 1, 0):
+        day = (now - timedelta(days=offset)).strftime('%Y-%m-%d')
+        profile['daily_usage'][day] = {'background_remover': 2}
+    profile['invite_rewards']['daily_rewards'] = {
+        (now - timedelta(days=3)).strftime('%Y-%m-%d'): {'background_remover': 1},
+        (now + timedelta(days=1)).strftime('%Y-%m-%d'): {'background_remover': 1}
+    }
+    profile['invite_rewards']['one_time_rewards'] = [
+        {'tool': 'background_remover', 'count': 1, 'expires_at': (now - timedelta(days=1)).isoformat(), 'used': 0},
+        {'tool': 'background_remover', 'count': 1, 'expires_at': (now + timedelta(days=1)).isoformat(), 'used': 0}
+    ]
+
+
+def _assert_compacted(profile, now):
+    from datetime import timedelta
+    assert sorted(profile['daily_usage']) == [
+        (now - timedelta(days=1)).strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d')
+    ]
+    assert sum(tools['background_remover'] for tools in profile['monthly_usage'].values()) == 6
+    assert list(profile['invite_rewards']['daily_rewards']) == [(now + timedelta(days=1)).strftime('%Y-%m-%d')]
+    assert len(profile['invite_rewards']['one_time_rewards']) == 1
+
+
+def test_usage_history_retention():
+    """测试保留策略：旧的每日记录汇总为月度，过期奖励删除，重启后仍生效"""
+    print("\n=== 测试使用历史保留 ===")
+
+    from datetime import datetime
+    now = datetime.now()
+    with tempfile.TemporaryDirectory() as data_dir:
+        dm = DataManager(data_dir, journal=True)
+        user_id, _ = dm.create_user('retention@example.com', 'secret', '保留用户')
+        _seed_history(dm.user_profiles_db[user_id], now)
+
+        result = dm.compact_usage_history(retention_days=90, now=now)
+        assert result == {'profiles': 1, 'days_rolled_up': 3, 'rewards_dropped': 2}
+        _assert_compacted(dm.user_profiles_db[user_id], now)
+        assert dm.compact_usage_history(retention_days=90, now=now)['profiles'] == 0
+        assert dm.get_retention_stats()['runs'] == 2
+        print("✅ 3天旧记录汇总为月度，2条过期奖励被清除，重复执行无变化")
+
+        dm.journal.close()
+        restarted = DataManager(data_dir, journal=True)
+        _assert_compacted(restarted.user_profiles_db[user_id], now)
+        print("✅ 压缩结果写入日志，重启后保持")
+        restarted.journal.close()
+
+        sqlite_dm = SQLiteDataManager(os.path.join(data_dir, 'dm.db'), data_dir=data_dir, auto_import=False)
+        sqlite_id, _ = sqlite_dm.create_user('retention@example.com', 'secret', '保留用户')
+        profile = sqlite_dm.user_profiles_db[sqlite_id]
+        _seed_history(profile, now)
+        sqlite_dm.save_profiles()
+        result = sqlite_dm.compact_usage_history(retention_days=90, now=now)
+        assert result == {'profiles': 1, 'days_rolled_up': 3, 'rewards_dropped': 2}
+        _assert_compacted(sqlite_dm.get_user_profile(sqlite_id), now)
+        print("✅ SQLite后端汇总并删除旧使用记录行")
+
+
+def test_retention_thread_shared_and_locked():
+    """测试所有实例共用一个保留线程、可以停止，压缩与记录使用并发时计数不丢失"""
+    print("\n=== 测试保留线程 ===")
+
+    import data_manager as data_manager_module
+    from datetime import datetime, timedelta
+
+    previous = os.environ.get('DATA_RETENTION_INTERVAL')
+    os.environ['DATA_RETENTION_INTERVAL'] = '3600'
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            managers = [DataManager(os.path.join(data_dir, str(i)), journal=False) for i in range(3)]
+            threads = [t for t in threading.enumerate() if t.name == 'data-retention']
+            assert len(threads) == 1
+            print("✅ 3个实例只启动1个保留线程")
+
+            dm = managers[0]
+            user_id, _ = dm.create_user('lock@example.com', 'secret', '并发用户')
+            old_day = (datetime.now() - timedelta(days=120)).strftime('%Y-%m-%d')
+
+            def use():
+                for _ in range(50):
+                    dm.record_usage(user_id, 'background_remover')
+
+            def compact():
+                for _ in range(20):
+                    dm.user_profiles_db[user_id]['daily_usage'].setdefault(old_day, {'background_remover': 1})
+                    dm.compact_usage_history(retention_days=90)
+
+            workers = [threading.Thread(target=use), threading.Thread(target=use), threading.Thread(target=compact)]
+            for t in workers:
+                t.start()
+            for t in workers:
+                t.join()
+            today = datetime.now().strftime('%Y-%m-%d')
+            assert dm.user_profiles_db[user_id]['daily_usage'][today]['background_remover'] == 100
+            print("✅ 压缩与记录使用并发，今日计数无丢失")
+
+            data_manager_module.stop_retention(timeout=5)
+            assert not any(t.name == 'data-retention' for t in threading.enumerate())
+            print("✅ stop_retention停止保留线程")
+    finally:
+        if previous is None:
+            os.environ.pop('DATA_RETENTION_INTERVAL', None)
+        else:
+            os.environ['DATA_RETENTION_INTERVAL'] = previous
+
+
+def test_serializer_and_atomic_save():
+    """测试序列化格式切换、按内容识别读取、原子保存与耗时统计"""
+    print("\n=== 测试序列化与原子保存 ===")
+
+    from data_serializer import get_serializer, JsonSerializer
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        dm = DataManager(data_dir, journal=False)
+        dm.serializer = JsonSerializer(indent=2)
+        user_id, token = dm.create_user('format@example.com', 'secret', '格式用户')
+        with open(os.path.join(data_dir, 'users.json'), encoding='utf-8') as f:
+            assert '\n  "' in f.read()
+
+        # 切换为紧凑格式后，旧的缩进文件仍能读取
+        dm.serializer = get_serializer('auto')
+        dm.record_usage(user_id, 'background_remover')
+        with open(os.path.join(data_dir, 'profiles.json'), 'rb') as f:
+            raw = f.read()
+        assert b'\n' not in raw.strip() and json.loads(raw)[user_id]['name'] == '格式用户'
+        assert os.path.exists(os.path.join(data_dir, 'profiles.json.bak'))
+        assert not [name for name in os.listdir(data_dir) if name.endswith('.tmp')]
+        print(f"✅ {dm.serializer.name}紧凑输出，原子替换并保留.bak")
+
+        restarted = DataManager(data_dir, journal=False)
+        assert restarted.get_user_by_token(token)['id'] == user_id
+        stats = dm.get_io_stats()
+        assert stats['files']['profiles.json']['save_count'] >= 2
+        assert 'last_load_ms' in restarted.get_io_stats()['files']['users.json']
+        print(f"✅ 混合格式文件重启后正常加载，耗时统计: {stats['files']['profiles.json']}")
+
+        # 多个线程同时保存同一文件，各自使用独立的临时文件
+        from data_serializer import write_atomic
+        target = os.path.join(data_dir, 'shared.json')
+        errors = []
+
+        def save(i):
+            try:
+                for _ in range(20):
+                    write_atomic(target, json.dumps({'writer': i, 'padding': 'x' * 4096}), fsync=False)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=save, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not errors
+        with open(target, encoding='utf-8') as f:
+            assert json.load(f)['writer'] in range(4)
+
+        # 写入失败时删除临时文件
+        try:
+            write_atomic(target, object())
+        except TypeError:
+            pass
+        assert not [name for name in os.listdir(data_dir) if name.endswith('.tmp')]
+        print("✅ 并发原子写入互不覆盖，失败时清理临时文件")
+
+
+if __name__ == "__main__":
+    test_journal_replay_after_restart()
+    test_compaction_rewrites_snapshots()
+    test_group_commit_batches_concurrent_writes()
+    test_second_process_is_read_only()
+    test_torn_tail_is_ignored()
+    test_snapshot_mode_unchanged()
+    test_indexed_lookups_and_freshness()
+    test_sqlite_backend_same_api()
+    test_sqlite_import_and_shared_writes()
+    test_sqlite_flush_keeps_concurrent_usage()
+    test_sqlite_repeated_reads_keep_changes()
+    test_usage_history_retention()
+    test_retention_thread_shared_and_locked()
+    test_serializer_and_atomic_save()
+    print("\n🎉 DataManager持久化测试通过！")
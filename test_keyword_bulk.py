@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试批量关键词分析（服务商并发限制、限流重试、缓存直出、NDJSON流式接口）
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+import keyword_bulk
+from keyword_bulk import BulkKeywordAnalyzer, ProviderLimiter, ProviderRateLimited, keyword_bulk_bp, parse_bulk_request
+from keyword_analyzer import KeywordAnalyzer
+from keyword_cache import KeywordCache
+
+
+class SlowAnalyzer:
+    """模拟有网络延迟的外部API，记录每个服务商的最大并发"""
+
+    cache = None
+
+    def __init__(self, latency=0.02, limited_keywords=()):
+        self.latency = latency
+        self.limited = set(limited_keywords)
+        self.lock = threading.Lock()
+        self.active = {'amazon': 0, 'openai': 0}
+        self.peak = {'amazon': 0, 'openai': 0}
+
+    def _call(self, provider, keyword):
+        with self.lock:
+            self.active[provider] += 1
+            self.peak[provider] = max(self.peak[provider], self.active[provider])
+            limited = keyword in self.limited
+            self.limited.discard(keyword)
+        try:
+            time.sleep(self.latency)
+            if limited:
+                raise ProviderRateLimited(retry_after=0.01)
+            return {'keyword': keyword, 'provider': provider}
+        finally:
+            with self.lock:
+                self.active[provider] -= 1
+
+    def check_amazon_competition(self, keyword):
+        return self._call('amazon', keyword)
+
+    def get_keyword_trends(self, keyword, days=30):
+        return self._call('amazon', keyword)
+
+    def mine_long_tail_keywords(self, seed_keyword, depth=3):
+        return self._call('openai', seed_keyword)
+
+
+def _limiters(amazon=8, openai=4):
+    return {'amazon': ProviderLimiter('amazon', amazon), 'openai': ProviderLimiter('openai', openai)}
+
+
+def test_concurrent_fan_out():
+    """测试200个关键词并发执行且不超过服务商并发上限"""
+    print("=== 测试批量并发 ===")
+
+    analyzer = SlowAnalyzer(limited_keywords={'keyword 7'})
+    bulk = BulkKeywordAnalyzer(analyzer, _limiters())
+    keywords = [f'keyword {i}' for i in range(200)]
+
+    started = time.perf_counter()
+    result = bulk.run(keywords)
+    elapsed = time.perf_counter() - started
+    assert result['summary']['total'] == 600 and result['summary']['failed'] == 0
+    assert analyzer.peak['amazon'] <= 8 and analyzer.peak['openai'] <= 4
+    # 串行需要 600 * 0.02 = 12 秒
+    assert elapsed < 3, elapsed
+    stats = bulk.get_stats()
+    assert stats['bulk']['retries'] == 1 and sum(p['throttled'] for p in stats['providers'].values()) == 1
+    print(f"✅ 600个任务耗时 {elapsed:.2f}s，并发峰值 {analyzer.peak}，限流后自动重试")
+
+
+def test_token_bucket_and_cache():
+    """测试令牌桶限速，已缓存的结果不占用额度"""
+    print("\n=== 测试限速与缓存 ===")
+
+    limiter = ProviderLimiter('amazon', 2, rate=50, burst=1)
+    started = time.perf_counter()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.perf_counter() - started >= 0.09
+    print("✅ 令牌桶按每秒请求数限速")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        analyzer = KeywordAnalyzer(cache=KeywordCache(os.path.join(tmp, 'keyword_cache.db')))
+        bulk = BulkKeywordAnalyzer(analyzer, _limiters())
+        first = bulk.run(['mouse', 'keyboard'], ['competition', 'trends'], days=7)
+        assert first['summary']['cached'] == 0
+        second = bulk.run(['mouse', 'keyboard'], ['competition', 'trends', 'longtail'], days=7)
+        assert second['summary']['cached'] == 4 and second['summary']['total'] == 6
+        assert bulk.limiters['amazon'].stats['calls'] == 4
+        print("✅ 缓存命中的结果直接返回")
+
+
+def test_stream_endpoint():
+    """测试NDJSON流式接口和参数校验"""
+    print("\n=== 测试流式接口 ===")
+
+    keywords, actions, error = parse_bulk_request({'keywords': 'Mouse，mouse , keyboard'})
+    assert keywords == ['mouse', 'keyboard'] and actions == ['competition', 'trends', 'longtail'] and error is None
+    assert parse_bulk_request({'keywords': ['a'], 'actions': ['unknown']})[2].startswith('不支持')
+
+    app = Flask(__name__)
+    app.register_blueprint(keyword_bulk_bp)
+    keyword_bulk.bulk_analyzer = BulkKeywordAnalyzer(SlowAnalyzer(latency=0.001), _limiters())
+    client = app.test_client()
+    try:
+        response = client.post('/api/keywords/bulk', json={'keywords': ['mouse', 'pad'], 'actions': ['competition', 'longtail']})
+        assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert len(lines) == 5 and lines[-1]['done'] and lines[-1]['summary']['total'] == 4
+        assert {(line['keyword'], line['action']) for line in lines[:-1]} == {
+            ('mouse', 'competition'), ('mouse', 'longtail'), ('pad', 'competition'), ('pad', 'longtail')}
+        print("✅ 逐行返回结果，最后一行为汇总")
+
+        assert client.post('/api/keywords/bulk', json={'keywords': []}).status_code == 400
+        app.config['KEYWORD_BULK_AUTHORIZE'] = lambda: None
+        assert client.post('/api/keywords/bulk', json={'keywords': ['mouse']}).status_code == 401
+        print("✅ 参数校验和登录校验")
+    finally:
+        keyword_bulk.bulk_analyzer = None
+
+
+if __name__ == "__main__":
+    test_concurrent_fan_out()
+    test_token_bucket_and_cache()
+    test_stream_endpoint()
+    print("\n🎉 批量关键词分析测试通过！")
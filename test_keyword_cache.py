@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试关键词分析缓存（参数规范化、TTL、持久化、并发请求合并、命中率统计）
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from keyword_cache import KeywordCache, extract_key, trends_key
+from keyword_analyzer import KeywordAnalyzer
+
+
+def test_analyzer_cached_and_persisted():
+    """测试相同参数命中缓存，重启后从SQLite读取"""
+    print("=== 测试关键词缓存 ===")
+
+    assert extract_key('  Wireless   Mouse ', ['Temu', 'amazon']) == extract_key('wireless mouse', ['amazon', 'temu'])
+    assert trends_key('Mouse', '7') == 'mouse|7'
+    print("✅ 参数规范化")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'keyword_cache.db')
+        analyzer = KeywordAnalyzer(cache=KeywordCache(db_path))
+
+        first = analyzer.check_amazon_competition('Wireless Mouse')
+        first['search_volume'] = -1
+        second = analyzer.check_amazon_competition('wireless  mouse')
+        assert second['search_volume'] != -1 and second['top_sellers'] == first['top_sellers']
+        trend = analyzer.get_keyword_trends('mouse', days=7)
+        assert analyzer.get_keyword_trends('mouse', 7) == trend
+        assert analyzer.get_keyword_trends('mouse', 14)['trend_data'][0] != trend['trend_data'][0]
+
+        stats = analyzer.get_cache_stats()['methods']
+        assert stats['competition'] == {'hits': 1, 'disk_hits': 0, 'misses': 1, 'coalesced': 0, 'errors': 0, 'hit_rate': 0.5}
+        assert stats['trends']['misses'] == 2 and stats['trends']['hits'] == 1
+        print("✅ 相同查询命中缓存，返回的对象互不影响")
+
+        restarted = KeywordAnalyzer(cache=KeywordCache(db_path))
+        assert restarted.check_amazon_competition('WIRELESS MOUSE')['top_sellers'] == first['top_sellers']
+        assert restarted.get_cache_stats()['methods']['competition']['disk_hits'] == 1
+        print("✅ 重启后从本地存储读取缓存")
+
+        expiring = KeywordAnalyzer(cache=KeywordCache(db_path, ttls={'competition': 0.05}))
+        expiring.cache.invalidate('competition')
+        expiring.check_amazon_competition('keyboard')
+        time.sleep(0.1)
+        expiring.check_amazon_competition('keyboard')
+        assert expiring.get_cache_stats()['methods']['competition']['misses'] == 2
+        print("✅ 按方法设置的TTL过期后重新查询")
+
+
+def test_single_flight():
+    """测试并发的相同请求只调用一次，失败不缓存"""
+    print("\n=== 测试并发请求合并 ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = KeywordCache(os.path.join(tmp, 'keyword_cache.db'))
+        calls = []
+
+        def slow_loader():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'keyword': 'mouse', 'volume': 123}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_call('competition', 'mouse', slow_loader)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 1 and len(results) == 8 and all(r == {'keyword': 'mouse', 'volume': 123} for r in results)
+        assert cache.get_stats()['methods']['competition']['coalesced'] == 7
+        print("✅ 8个并发请求只调用1次外部API")
+
+        def failing_loader():
+            raise RuntimeError('API限流')
+
+        for _ in range(2):
+            try:
+                cache.get_or_call('extract', 'mouse|amazon', failing_loader)
+                assert False, '应该抛出异常'
+            except RuntimeError:
+                pass
+        assert cache.get_stats()['methods']['extract']['errors'] == 2
+        print("✅ 调用失败不写入缓存")
+
+
+if __name__ == "__main__":
+    test_analyzer_cached_and_persisted()
+    test_single_flight()
+    print("\n🎉 关键词缓存测试通过！")
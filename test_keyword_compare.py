@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试竞品关键词对比（重合矩阵、Jaccard、覆盖数、覆盖缺口）
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from keyword_compare import CompetitorMatrix
+from keyword_analyzer import KeywordAnalyzer
+
+
+def test_compare():
+    """测试小规模对比结果"""
+    print("=== 测试竞品对比 ===")
+
+    matrix = CompetitorMatrix.from_keyword_lists({
+        'A': ['mouse', 'wireless mouse', 'gaming mouse'],
+        'B': ['Mouse', 'wireless  mouse', 'mouse pad'],
+        'C': ['mouse', 'wireless mouse', 'gaming mouse', 'usb mouse'],
+    }, keywords=['mouse', 'wireless mouse', 'gaming mouse', 'mouse pad', 'usb mouse', 'trackball'])
+    result = matrix.compare(min_coverage=2)
+
+    assert result['common_keywords'] == ['mouse', 'wireless mouse']
+    assert result['unique_keywords'] == {'A': ['gaming mouse'], 'B': ['mouse pad'], 'C': ['gaming mouse', 'usb mouse']}
+    assert result['exclusive_keywords'] == {'A': [], 'B': ['mouse pad'], 'C': ['usb mouse']}
+    print("✅ 关键词规范化后编号，共同/独有关键词正确")
+
+    assert result['overlap_matrix'] == [[3, 2, 3], [2, 3, 2], [3, 2, 4]]
+    assert result['jaccard_matrix'][0][2] == 0.75 and result['jaccard_matrix'][0][1] == 0.5
+    assert matrix.most_similar(1) == [('A', 'C', 0.75)]
+    print("✅ 重合矩阵和Jaccard相似度")
+
+    assert result['keyword_coverage']['gaming mouse'] == 2 and result['uncovered_keywords'] == ['trackball']
+    assert result['covered_by_at_least'] == ['mouse', 'wireless mouse', 'gaming mouse']
+    assert result['coverage_gaps'] == {'A': [], 'B': ['gaming mouse'], 'C': []}
+    print("✅ 覆盖数、至少k个竞品覆盖、覆盖缺口")
+
+
+def test_large_and_analyzer():
+    """测试大规模对比与KeywordAnalyzer接口"""
+    print("\n=== 测试大规模对比 ===")
+
+    rng = np.random.default_rng(1)
+    keywords = [f'keyword {i}' for i in range(5000)]
+    competitors = {f'B0{i:08d}': [keywords[j] for j in rng.choice(5000, 800, replace=False)] for i in range(100)}
+    started = time.perf_counter()
+    matrix = CompetitorMatrix.from_keyword_lists(competitors, keywords)
+    result = matrix.compare(min_coverage=30)
+    elapsed = time.perf_counter() - started
+
+    a, b = set(competitors['B000000000']), set(competitors['B000000001'])
+    assert result['overlap_matrix'][0][1] == len(a & b)
+    assert abs(result['jaccard_matrix'][0][1] - round(len(a & b) / len(a | b), 4)) < 1e-9
+    expected = {k for k in keywords if sum(k in set(v) for v in list(competitors.values())[:5]) == 5}
+    sub = CompetitorMatrix.from_keyword_lists(dict(list(competitors.items())[:5]), keywords).compare()
+    assert set(sub['common_keywords']) == expected
+    assert elapsed < 3, elapsed
+    print(f"✅ 100个ASIN×5000个关键词对比耗时 {elapsed * 1000:.0f}ms，结果与集合运算一致")
+
+    analyzer = KeywordAnalyzer(cache=False)
+    result = analyzer.compare_competitor_keywords(['B01', 'B02', 'B03'], [f'kw {i}' for i in range(12)])
+    assert [c['keyword_count'] for c in result['competitors']] == [8, 8, 8]
+    assert len(result['overlap_matrix']) == 3 and result['competitors'][0]['title'] == 'Competitor Product B01'
+    assert set(result['common_keywords']) == set.intersection(*[set(c['keywords']) for c in result['competitors']])
+    print("✅ compare_competitor_keywords保留原字段并返回矩阵")
+
+
+if __name__ == "__main__":
+    test_compare()
+    test_large_and_analyzer()
+    print("\n🎉 竞品关键词对比测试通过！")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试关键词趋势分析（移动平均、斜率、周期性、波动率、异常点、批量排序）
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from keyword_trends import TrendMatrix, analyze, moving_average, rank_keywords, trend_direction
+from keyword_analyzer import KeywordAnalyzer
+from keyword_bulk import BulkKeywordAnalyzer, ProviderLimiter
+
+
+def _matrix():
+    days = np.arange(28)
+    dates = [f'2025-12-{d + 1:02d}' for d in days]
+    spike = np.full(28, 2000.0)
+    spike[20] = 6000
+    volumes = [
+        1000 + 20 * days,                                  # 稳定上涨
+        3000 - 30 * days,                                  # 稳定下跌
+        2000 + 500 * np.sin(2 * np.pi * days / 7),         # 周期波动
+        spike,                                             # 单日异常
+    ]
+    return TrendMatrix(['rising', 'falling', 'weekly', 'spike'], dates, volumes)
+
+
+def test_metrics():
+    """测试各项指标"""
+    print("=== 测试趋势指标 ===")
+
+    matrix = _matrix()
+    metrics = analyze(matrix)
+    assert np.allclose(metrics['slope'][:2], [20, -30])
+    assert np.allclose(metrics['r2'][:2], 1.0)
+    assert list(trend_direction(metrics['growth'], metrics['r2'])) == ['up', 'down', 'stable', 'stable']
+    print("✅ 最小二乘斜率和涨跌方向")
+
+    assert metrics['seasonality'][2] > 0.95 and metrics['seasonality'][0] < 0.05
+    assert metrics['volatility'][0] < metrics['volatility'][2]
+    assert list(np.flatnonzero(metrics['anomalies'][3])) == [20] and not metrics['anomalies'][:3].any()
+    print("✅ 周期性强度、波动率和异常点")
+
+    naive = [np.mean(matrix.volumes[2, i:i + 7]) for i in range(22)]
+    assert np.allclose(moving_average(matrix.volumes, 7)[2], naive)
+    ranking = rank_keywords(matrix)
+    assert ranking[0]['keyword'] == 'rising' and ranking[-1]['keyword'] == 'falling'
+    assert ranking[-1]['rank'] == 4 and ranking[3]['anomaly_dates'] == []
+    assert [r['anomaly_dates'] for r in ranking if r['keyword'] == 'spike'] == [['2025-12-21']]
+    print("✅ 移动平均正确，按趋势质量排序")
+
+
+def test_many_keywords():
+    """测试大批关键词一次性计算，以及从get_keyword_trends结果构造"""
+    print("\n=== 测试批量计算 ===")
+
+    rng = np.random.default_rng(0)
+    volumes = 1000 + rng.normal(0, 50, (5000, 90)).cumsum(axis=1)
+    matrix = TrendMatrix([f'k{i}' for i in range(5000)], [str(d) for d in range(90)], np.abs(volumes))
+    started = time.perf_counter()
+    top = rank_keywords(matrix, top=20)
+    elapsed = time.perf_counter() - started
+    assert len(top) == 20 and top[0]['quality_score'] >= top[-1]['quality_score']
+    assert elapsed < 2, elapsed
+    print(f"✅ 5000个关键词×90天排序耗时 {elapsed * 1000:.0f}ms")
+
+    partial = TrendMatrix.from_trend_results([
+        {'keyword': 'a', 'trend_data': [{'date': '2025-12-01', 'search_volume': 10}, {'date': '2025-12-02', 'search_volume': 20}]},
+        {'keyword': 'b', 'trend_data': [{'date': '2025-12-02', 'search_volume': 5}]},
+    ])
+    assert partial.dates == ['2025-12-01', '2025-12-02'] and partial.volumes.tolist() == [[10, 20], [5, 5]]
+    print("✅ 按日期对齐，缺失值用均值补齐")
+
+    analyzer = KeywordAnalyzer(cache=False)
+    trend = analyzer.get_keyword_trends('mouse', 30)
+    assert trend['trend_direction'] in ('up', 'down', 'stable') and len(trend['analysis']['moving_average_7']) == 24
+    bulk = BulkKeywordAnalyzer(analyzer, {'amazon': ProviderLimiter('amazon', 4), 'openai': ProviderLimiter('openai', 1)})
+    result = bulk.rank_trends([f'keyword {i}' for i in range(50)], days=30, top=10)
+    assert result['summary']['analyzed'] == 50 and len(result['ranking']) == 10
+    print("✅ 批量接口并发获取趋势后统一排序")
+
+    class HangingAnalyzer:
+        """部分关键词的趋势请求迟迟不返回"""
+        cache = None
+
+        def get_keyword_trends(self, keyword, days=30):
+            if keyword.startswith('slow'):
+                time.sleep(1.5)
+            return analyzer.get_keyword_trends(keyword, days)
+
+    bulk = BulkKeywordAnalyzer(HangingAnalyzer(), {'amazon': ProviderLimiter('amazon', 4), 'openai': ProviderLimiter('openai', 1)})
+    started = time.perf_counter()
+    result = bulk.rank_trends(['fast a', 'fast b', 'slow a', 'slow b'], days=30, budget_seconds=0.3)
+    elapsed = time.perf_counter() - started
+    assert elapsed < 1.0, elapsed
+    assert result['summary']['analyzed'] == 2 and result['summary']['incomplete'] == 2
+    print(f"✅ 预算用完时不等待未返回的请求（{elapsed * 1000:.0f}ms）")
+
+
+if __name__ == "__main__":
+    test_metrics()
+    test_many_keywords()
+    print("\n🎉 关键词趋势分析测试通过！")
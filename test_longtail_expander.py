@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试长尾关键词扩展（逐层扩展、前缀树去重剪枝、前K名有界堆）
+"""
+
+import os
+import sys
+import time
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from longtail_expander import LongTailExpander, KeywordTrie
+from keyword_analyzer import KeywordAnalyzer
+
+
+def test_trie():
+    """测试前缀树去重和剪枝"""
+    print("=== 测试前缀树 ===")
+
+    trie = KeywordTrie()
+    assert trie.insert(('best', 'mouse'))
+    assert not trie.insert(('best', 'mouse'))
+    assert trie.insert(('best', 'mouse', 'review'))
+    trie.prune(('best', 'mouse'))
+    assert not trie.insert(('best', 'mouse', 'price'))
+    assert ('best', 'mouse', 'review') not in trie
+    assert trie.insert(('cheap', 'mouse'))
+    print("✅ 重复候选和已剪枝前缀下的候选被拒绝")
+
+
+def test_expand_depth_and_top_k():
+    """测试按深度扩展、结果有序且不超过K个"""
+    print("\n=== 测试长尾扩展 ===")
+
+    expander = LongTailExpander()
+    shallow, _ = expander.expand_with_stats('Wireless  Mouse', depth=1, top_k=200)
+    assert shallow and all(item['depth'] == 1 for item in shallow)
+    assert {'modifier', 'suffix', 'question'} <= {item['type'] for item in shallow}
+    assert 'wireless wireless mouse' not in {item['keyword'] for item in shallow}
+
+    started = time.perf_counter()
+    deep, stats = expander.expand_with_stats('wireless mouse', depth=4, top_k=30)
+    elapsed = time.perf_counter() - started
+    assert len(deep) == 30 and max(item['depth'] for item in deep) >= 2
+    assert [item['score'] for item in deep] == sorted((item['score'] for item in deep), reverse=True)
+    assert len({item['keyword'] for item in deep}) == 30
+    assert stats['duplicates'] > 0 and stats['pruned'] > 0
+    assert elapsed < 0.5, elapsed
+    print(f"✅ 深度4扩展耗时 {elapsed * 1000:.1f}ms，统计 {stats}")
+
+    wide, wide_stats = LongTailExpander(beam_width=30).expand_with_stats('wireless mouse', depth=6, top_k=30)
+    assert wide_stats['trie_size'] < 6 * 30 * 25
+    print("✅ 每层只扩展beam个候选，前缀树大小与K成正比")
+
+    suggestions = LongTailExpander(suggestion_sources=[lambda keyword: [keyword + ' bluetooth']])
+    assert any(item['type'] == 'suggestion' for item in suggestions.expand('mouse', depth=1, top_k=100))
+    print("✅ 联想词来源参与扩展")
+
+
+def test_analyzer_long_tail():
+    """测试KeywordAnalyzer接入扩展引擎"""
+    print("\n=== 测试关键词分析器 ===")
+
+    result = KeywordAnalyzer(cache=False).mine_long_tail_keywords('desk lamp', depth=3, top_k=20)
+    assert result['total_count'] == 20 and result['seed_keyword'] == 'desk lamp'
+    assert all(item['competition'] in ('Low', 'Medium', 'High') for item in result['long_tail_keywords'])
+    print("✅ mine_long_tail_keywords返回按得分排序的前K个长尾词")
+
+
+if __name__ == "__main__":
+    test_trie()
+    test_expand_depth_and_top_k()
+    test_analyzer_long_tail()
+    print("\n🎉 长尾关键词扩展测试通过！")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试套餐目录（限制查询、usage_stats模板、不可变性和热更新）
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from plan_catalog import get_plan_catalog, reload_plan_catalog
+from check_file_size_by_plan import check_file_size_by_user
+
+
+def test_lookups_and_templates():
+    """测试限制查询、别名和usage_stats模板"""
+    print("=== 测试套餐查询 ===")
+
+    catalog = get_plan_catalog()
+    assert catalog.tool_limit('basic', 'background_remover') == 10
+    assert catalog.tool_limit('flagship', 'listing_generator') == -1
+    assert catalog.daily_limit('pro') == catalog.daily_limit('professional') == 100
+    assert catalog.resolve('unknown') == 'free'
+    assert catalog.tool_credits('basic', 'background_remover') == 2
+    assert catalog.tool_credits('basic', 'unit_converter') == 1
+    assert catalog.tool_credits('professional', 'format_converter') == 0
+    assert catalog.tool_credits('flagship', 'format_converter') == 1
+    print("✅ 限制/积分查询正确，'pro'为'professional'的别名")
+
+    stats = catalog.usage_stats_template('professional')
+    assert stats['keyword_analyzer'] == {'current_usage': 0, 'daily_limit': 500, 'remaining_usage': 500}
+    assert len(stats) == len(catalog.tools)
+    stats['keyword_analyzer']['current_usage'] = 9
+    assert catalog.usage_stats_template('professional')['keyword_analyzer']['current_usage'] == 0
+    assert catalog.limit_vectors['basic'][catalog.tool_index['image_compressor']] == 20
+    print("✅ usage_stats模板每次返回独立副本")
+
+    try:
+        catalog.plans['basic']['daily_limit'] = 999
+        assert False, "目录应不可修改"
+    except TypeError:
+        pass
+    assert set(catalog.order_plans()) == {'basic', 'professional', 'flagship'}
+    assert catalog.membership_info('basic')['price'] == 19
+    print("✅ 目录不可修改，可购买套餐与OrderManager一致")
+
+    ok, _ = check_file_size_by_user({'plan': 'basic'}, 8 * 1024 * 1024)
+    assert ok
+    ok, message = check_file_size_by_user({'membership_type': 'free'}, 8 * 1024 * 1024)
+    assert not ok and '8.00 MB' in message and '5MB' in message
+    print("✅ 文件大小限制来自目录")
+
+
+def test_hot_reload_from_file():
+    """测试修改PLAN_CATALOG_FILE后无需重启即生效，错误配置保留旧目录"""
+    print("\n=== 测试热更新 ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'plans.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'plans': {'basic': {'daily_limit': 20, 'tool_limits': {'background_remover': 20}}}}, f)
+
+        os.environ['PLAN_CATALOG_FILE'] = path
+        os.environ['PLAN_CATALOG_CHECK_INTERVAL'] = '0'
+        try:
+            assert reload_plan_catalog()
+            catalog = get_plan_catalog()
+            assert catalog.daily_limit('basic') == 20
+            assert catalog.tool_limit('basic', 'background_remover') == 20
+            assert catalog.tool_limit('basic', 'image_compressor') == 20
+            print("✅ 配置文件覆盖的字段生效，其他字段保持内置值")
+
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('{broken')
+            os.utime(path, ns=(1, 1))
+            assert get_plan_catalog() is catalog
+            print("✅ 配置文件有误时继续使用当前目录")
+
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'plans': {'basic': {'daily_limit': 30}}}, f)
+            os.utime(path, ns=(2, 2))
+            assert get_plan_catalog().daily_limit('basic') == 30
+            assert get_plan_catalog().version > catalog.version
+            print("✅ 文件修改后下一次读取自动生效")
+        finally:
+            os.environ.pop('PLAN_CATALOG_FILE')
+            os.environ.pop('PLAN_CATALOG_CHECK_INTERVAL')
+
+        assert reload_plan_catalog({'plans': {'free': {'daily_limit': 4}}})
+        assert get_plan_catalog().daily_limit('free') == 4
+        assert reload_plan_catalog({})
+        assert get_plan_catalog().daily_limit('free') == 3
+        print("✅ reload_plan_catalog立即替换目录")
+
+
+if __name__ == "__main__":
+    test_lookups_and_templates()
+    test_hot_reload_from_file()
+    print("\n🎉 套餐目录测试通过！")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+测试站点地图增量生成（只重写有变化的分块、预压缩、每日提交清单）
+"""
+
+import os
+import sys
+import gzip
+import tempfile
+from datetime import date
+from pathlib import Path
+
+# 添加当前目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from article_store import ArticleStore
+from sitemap_builder import SitemapBuilder, article_url
+
+
+def _setup(root):
+    frontend = Path(root) / 'frontend'
+    frontend.mkdir()
+    for name in ('index.html', 'about.html'):
+        (frontend / name).write_text('<html></html>', encoding='utf-8')
+    return ArticleStore(root), frontend
+
+
+def test_single_sitemap_and_submission():
+    """测试URL不多时生成单个sitemap.xml，并写出当天的提交清单"""
+    print("=== 测试单文件站点地图 ===")
+
+    with tempfile.TemporaryDirectory() as root:
+        store, frontend = _setup(root)
+        first = store.save_article({'title': '第一篇', 'content': '正文'})
+        store.save_article({'title': '草稿', 'content': '正文', 'status': 'draft'})
+        builder = SitemapBuilder(store, output_dir=frontend, data_dir=root, site_url='https://example.com')
+        today = date(2025, 12, 21)
+
+        result = builder.build(today=today)
+        assert result['changed'] and not result['index'] and result['urls'] == 5
+        xml = (frontend / 'sitemap.xml').read_text(encoding='utf-8')
+        assert article_url(first['id'], 'https://example.com') in xml and '草稿' not in xml
+        assert gzip.decompress((frontend / 'sitemap.xml.gz').read_bytes()).decode('utf-8') == xml
+        print("✅ 生成sitemap.xml和预压缩版本，草稿不收录")
+
+        submission = (Path(root) / 'baidu_submission_2025-12-21.txt').read_text(encoding='utf-8')
+        assert '共 5 个URL' in submission
+        assert SitemapBuilder(store, output_dir=frontend, data_dir=root,
+                              site_url='https://example.com').build(today=today)['changed'] is False
+        store.add_views({first['id']: 5})
+        store.update_meta(first['id'], views=9)
+        assert builder.build(today=today)['changed'] is False
+        print("✅ 没有变化（包括只写回浏览量）时直接跳过")
+
+        second = store.save_article({'title': '第二篇', 'content': '正文'})
+        result = SitemapBuilder(store, output_dir=frontend, data_dir=root,
+                                site_url='https://example.com').build(today=today)
+        assert result['delta'] == [article_url(second['id'], 'https://example.com')]
+        submission = (Path(root) / 'baidu_submission_2025-12-21.txt').read_text(encoding='utf-8')
+        assert '共 6 个URL' in submission and submission.count(second['id']) == 1
+        print("✅ 当天清单只追加新增的URL")
+
+
+def test_index_rewrites_changed_chunks_only():
+    """测试站点地图索引模式下新文章只重写最后一个分块"""
+    print("\n=== 测试站点地图索引 ===")
+
+    with tempfile.TemporaryDirectory() as root:
+        store, frontend = _setup(root)
+        ids = [store.save_article({'title': f'文章{i}', 'content': '正文'})['id'] for i in range(7)]
+        builder = SitemapBuilder(store, output_dir=frontend, data_dir=root, site_url='https://example.com', chunk_size=3)
+
+        result = builder.build()
+        assert result['index'] and result['urls'] == 11
+        assert sorted(result['written']) == ['sitemap-articles-001.xml', 'sitemap-articles-002.xml',
+                                             'sitemap-articles-003.xml', 'sitemap-pages.xml', 'sitemap.xml']
+        index = (frontend / 'sitemap.xml').read_text(encoding='utf-8')
+        assert '<sitemapindex' in index and 'https://example.com/sitemap-articles-003.xml' in index
+        print("✅ 超过分块大小时生成站点地图索引")
+
+        newest = store.save_article({'title': '新文章', 'content': '正文'})
+        result = builder.build()
+        assert result['written'] == ['sitemap-articles-003.xml', 'sitemap.xml']
+        assert newest['id'] in (frontend / 'sitemap-articles-003.xml').read_text(encoding='utf-8')
+
+        store.delete_article(ids[0])
+        assert builder.build()['written'] == ['sitemap-articles-001.xml', 'sitemap.xml']
+        print("✅ 新增/删除文章只重写所在的分块")
+
+
+if __name__ == "__main__":
+    test_single_sitemap_and_submission()
+    test_index_rewrites_changed_chunks_only()
+    print("\n🎉 站点地图测试通过！")